@@ -61,6 +61,12 @@ const CLIMATE_SCENARIOS = {
   placemaking: "Placemaking",
 };
 
+// Whether the backend scheduler advances this table's slides (undefined if unknown)
+const fetchServerDriven = async (table) => {
+  const response = await api.get(`/api/actions/get_presentation_state/?table=${table}`);
+  return response.data?.server_driven;
+};
+
 const STATE_CONFIG = {
   mobility: ["Present", "Survey"],
   climate: Object.values(CLIMATE_SCENARIOS),
@@ -195,6 +201,7 @@ export const DataProvider = ({ children }) => {
   const wsReconnectTimeoutRef = useRef(null);
   const wsConnectedRef = useRef(false); // Track WebSocket connection state
   const lastWsUpdateRef = useRef(0); // Track last WebSocket update timestamp
+  const serverDrivenRef = useRef(false); // Backend scheduler advances slides; skip the local timer
   
 
   // Update refs when state changes
@@ -227,6 +234,22 @@ export const DataProvider = ({ children }) => {
     globalDurationRef.current = globalDuration;
   }, [globalDuration]);
 
+  // Learn up front whether slides are server-driven, so the local timer doesn't
+  // also advance the first slide before the first WS presentation update
+  useEffect(() => {
+    let cancelled = false;
+    fetchServerDriven(currentTable)
+      .then((serverDriven) => {
+        if (!cancelled && serverDriven !== undefined) {
+          serverDrivenRef.current = Boolean(serverDriven);
+        }
+      })
+      .catch((err) => console.error("Error fetching presentation state:", err));
+    return () => {
+      cancelled = true;
+    };
+  }, [currentTable]);
+
 
   // WebSocket connection for real-time sync
   useEffect(() => {
@@ -242,6 +265,14 @@ export const DataProvider = ({ children }) => {
         wsRef.current.onopen = () => {
           console.log('✓ WebSocket connected');
           wsConnectedRef.current = true;
+          // onclose fell back to the local timer; re-check before the next WS update
+          fetchServerDriven(currentTableRef.current)
+            .then((serverDriven) => {
+              if (serverDriven !== undefined) {
+                serverDrivenRef.current = Boolean(serverDriven);
+              }
+            })
+            .catch((err) => console.error("Error fetching presentation state:", err));
         };
 
         wsRef.current.onmessage = (event) => {
@@ -266,6 +297,10 @@ export const DataProvider = ({ children }) => {
 
               console.log(`📡 WS: presentation update for table '${messageTable}'`);
 
+              if (data.server_driven !== undefined) {
+                serverDrivenRef.current = Boolean(data.server_driven);
+              }
+
               // Update presentation state from WebSocket (use internal setters to avoid loops)
               if (data.is_playing !== undefined) {
                 setIsPlaying(data.is_playing);
@@ -392,6 +427,8 @@ export const DataProvider = ({ children }) => {
         wsRef.current.onclose = () => {
           console.log('✗ WebSocket disconnected, reconnecting...');
           wsConnectedRef.current = false;
+          // Without WS we won't see server-driven advances; fall back to the local timer
+          serverDrivenRef.current = false;
           wsReconnectTimeoutRef.current = setTimeout(connectWebSocket, 3000);
         };
 
@@ -1101,10 +1138,19 @@ export const DataProvider = ({ children }) => {
           changeState(currentStep.state, currentStep.type);
       }
 
-      // Set up timer for next slide
+      // The backend scheduler advances slides and broadcasts the new index
+      if (serverDrivenRef.current) {
+          return;
+      }
+
+      // Set up timer for next slide (fallback when the server scheduler is disabled)
       const durationMs = Math.max(1000, globalDuration * 1000); // Minimum 1 second
       presentationTimerRef.current = setTimeout(() => {
           // Guard: verify still playing before advancing
+          // The server may have turned out to drive slides after this timer was set
+          if (serverDrivenRef.current) {
+              return;
+          }
           if (isPlayingRef.current && isPresentationModeRef.current) {
               // Use ref to get latest sequence length, avoiding stale closure
               const currentSequenceLength = presentationSequenceRef.current?.length || 1;
@@ -15,10 +15,27 @@ const api = axios.create({
   }
 });
 
-// Add request interceptor to add cache-busting parameter to all GET requests
+// Endpoints that send ETags: let the browser keep them and revalidate with
+// If-None-Match (304 when unchanged) instead of busting the cache. A request
+// Cache-Control of "no-cache" would make the browser bypass its cache (and never
+// send If-None-Match); "max-age=0" makes it revalidate the stored response.
+const REVALIDATED_ENDPOINTS = [
+  '/api/actions/get_global_variables/',
+  '/api/actions/get_presentation_state/',
+  '/api/actions/get_file_hierarchy/',
+];
+export const REVALIDATE_REQUEST_CACHE_CONTROL = 'max-age=0';
+
+// Add request interceptor to add cache-busting parameter to all other GET requests
 api.interceptors.request.use(
   config => {
     if (config.method === 'get') {
+      if (REVALIDATED_ENDPOINTS.some(endpoint => config.url?.includes(endpoint))) {
+        config.headers['Cache-Control'] = REVALIDATE_REQUEST_CACHE_CONTROL;
+        delete config.headers['Pragma'];
+        delete config.headers['Expires'];
+        return config;
+      }
       // Add timestamp parameter to prevent caching
       config.params = {
         ...config.params,
@@ -0,0 +1,33 @@
+import api, { REVALIDATE_REQUEST_CACHE_CONTROL } from './api';
+
+jest.mock('./utils/errorLogger', () => ({ logErrorToBackend: jest.fn() }));
+
+// Capture the outgoing request instead of sending it
+const sendAndCapture = async (url) => {
+  let sent;
+  await api.get(url, {
+    adapter: async (config) => {
+      sent = config;
+      return { data: {}, status: 200, statusText: 'OK', headers: {}, config };
+    },
+  });
+  return sent;
+};
+
+test('ETag endpoints go out as conditional requests the browser revalidates', async () => {
+  const sent = await sendAndCapture('/api/actions/get_presentation_state/?table=idistrict');
+
+  // max-age=0 (not no-cache/no-store) keeps the stored ETag in play, so the
+  // browser adds If-None-Match; no cache-busting parameter changes the URL
+  expect(sent.headers['Cache-Control']).toBe(REVALIDATE_REQUEST_CACHE_CONTROL);
+  expect(sent.headers['Cache-Control']).not.toMatch(/no-cache|no-store/);
+  expect(sent.headers['Pragma']).toBeUndefined();
+  expect(sent.params?._).toBeUndefined();
+});
+
+test('other GET requests stay cache-busted', async () => {
+  const sent = await sendAndCapture('/api/actions/get_image_data/?table=idistrict');
+
+  expect(sent.headers['Cache-Control']).toMatch(/no-store/);
+  expect(sent.params._).toEqual(expect.any(Number));
+});
@@ -4,3 +4,11 @@
 class BackendConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'backend'
+
+    def ready(self):
+        from . import file_hierarchy, layer_cache, media_derivatives, media_resolution
+
+        file_hierarchy.connect_signals()
+        layer_cache.connect_signals()
+        media_derivatives.connect_signals()
+        media_resolution.connect_signals()
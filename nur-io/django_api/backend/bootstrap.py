@@ -0,0 +1,239 @@
+"""
+Stages of the API container bootstrap, run in one process by
+``manage.py bootstrap`` (see init.sh).
+
+Each stage has a fingerprint of its inputs (file contents or listings,
+migration plan, seed definitions). After a stage succeeds, its fingerprint is
+stored in BootstrapStage, and the next start skips any stage whose
+fingerprint is unchanged. The fingerprints live in the database, so resetting
+the database volume re-runs everything. Stages that copy files into the media
+volume also fingerprint what they put there, so losing or pruning that volume
+(while the database survives) re-runs them too.
+"""
+
+import hashlib
+import json
+import os
+from collections import namedtuple
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+
+from .media_sync import media_sync_pairs, sync_media, synced_listing
+
+# name, fingerprint() -> str, run(stdout), required (failure aborts the bootstrap)
+Stage = namedtuple("Stage", ["name", "fingerprint", "run", "required"])
+
+# Pre-bootstrap init.sh marked a completed first run with this file
+LEGACY_INIT_FLAG = "/app/data/db_initialized"
+
+# name -> (display_name, description)
+TABLES = {
+    "otef": ("OTEF", "OTEF Interactive Projection Module data"),
+    "idistrict": ("iDistrict", "iDistrict data and indicators"),
+}
+# idistrict (indicator_id, name, category)
+IDISTRICT_INDICATORS = [(1, "Mobility", "mobility"), (2, "Climate", "climate")]
+
+
+def digest(value):
+    """Stable SHA-256 of a JSON-serializable value."""
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def file_contents(paths):
+    """[(path, sha256 or None)] for small input files (manifests, configs)."""
+    listing = []
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                listing.append((str(path), hashlib.sha256(f.read()).hexdigest()))
+        except OSError:
+            listing.append((str(path), None))
+    return listing
+
+
+def tree_listing(root):
+    """Sorted [(relative path, size, mtime_ns)] of every file under root ([] if missing)."""
+    listing = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            stat = os.stat(path)
+            listing.append((os.path.relpath(path, root), stat.st_size, stat.st_mtime_ns))
+    listing.sort()
+    return listing
+
+
+def stored_fingerprint(name):
+    """Last recorded fingerprint for a stage (None before migrations have run)."""
+    from .models import BootstrapStage
+
+    try:
+        return BootstrapStage.objects.filter(name=name).values_list("fingerprint", flat=True).first()
+    except DatabaseError:
+        return None
+
+
+def record_fingerprint(name, fingerprint, duration):
+    from .models import BootstrapStage
+
+    try:
+        BootstrapStage.objects.update_or_create(
+            name=name, defaults={"fingerprint": fingerprint, "duration": duration}
+        )
+    except DatabaseError:
+        # Stages before the first migrate; they simply run again next start
+        pass
+
+
+# --- fingerprints ---------------------------------------------------------
+
+
+def _models_fingerprint():
+    backend = Path(__file__).resolve().parent
+    migrations = sorted(p.name for p in (backend / "migrations").glob("*.py"))
+    return digest([file_contents([backend / "models.py"]), migrations])
+
+
+def _migration_plan_fingerprint():
+    from django.db.migrations.executor import MigrationExecutor
+
+    executor = MigrationExecutor(connection)
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    return digest([(migration.app_label, migration.name) for migration, _ in plan])
+
+
+def _tables_fingerprint():
+    return digest([TABLES, IDISTRICT_INDICATORS])
+
+
+def _otef_data_fingerprint():
+    from .management.commands.import_otef_data import LAYERS_DIR, Command as ImportOTEFData
+
+    layers_dir = Path(LAYERS_DIR)
+    manifests = [layers_dir / "layers-manifest.json"]
+    try:
+        with open(manifests[0], encoding="utf-8") as f:
+            manifests += [layers_dir / pack / "manifest.json" for pack in json.load(f).get("packs", [])]
+    except (OSError, ValueError):
+        pass
+    return digest(file_contents(ImportOTEFData()._model_bounds_candidates() + manifests))
+
+
+def _media_sync_fingerprint():
+    return digest(
+        [(str(src), str(dst), tree_listing(src), synced_listing(dst)) for src, dst in media_sync_pairs()]
+    )
+
+
+def _climate_images_fingerprint():
+    return digest(
+        [
+            tree_listing(Path(settings.BASE_DIR) / "public" / "processed" / "climate"),
+            tree_listing(Path(settings.MEDIA_ROOT) / "indicators" / "climate"),
+        ]
+    )
+
+
+def _image_pyramids_fingerprint():
+    from .image_pyramid import pyramid_sources
+
+    listing = []
+    for media_path in pyramid_sources():
+        try:
+            stat = os.stat(os.path.join(settings.MEDIA_ROOT, media_path))
+            listing.append((media_path, stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            listing.append((media_path, None, None))
+    return digest(listing)
+
+
+# --- stages ---------------------------------------------------------------
+
+
+def _run_makemigrations(stdout):
+    call_command("makemigrations", interactive=False, stdout=stdout)
+
+
+def _run_migrate(stdout):
+    call_command("migrate", interactive=False, stdout=stdout)
+
+
+def ensure_tables(stdout):
+    """Create the otef/idistrict tables and the idistrict indicators."""
+    from .models import Indicator, Table
+
+    tables = {}
+    for name, (display_name, description) in TABLES.items():
+        tables[name], _ = Table.objects.get_or_create(
+            name=name,
+            defaults={"display_name": display_name, "description": description, "is_active": True},
+        )
+    idistrict = tables["idistrict"]
+
+    # Fix any orphaned indicators
+    Indicator.objects.filter(table__isnull=True).update(table=idistrict)
+
+    for indicator_id, name, category in IDISTRICT_INDICATORS:
+        indicator, _ = Indicator.objects.get_or_create(
+            table=idistrict,
+            indicator_id=indicator_id,
+            defaults={
+                "name": name,
+                "category": category,
+                "has_states": True,
+                "description": f"{name} indicators",
+            },
+        )
+        if indicator.name != name or indicator.category != category:
+            indicator.name = name
+            indicator.category = category
+            indicator.has_states = True
+            indicator.description = f"{name} indicators"
+            indicator.save()
+    stdout.write(f"  Tables: {', '.join(TABLES)}; idistrict indicators: {len(IDISTRICT_INDICATORS)}")
+
+
+def _run_initial_data(stdout):
+    from django.contrib.auth.models import User
+
+    if os.path.exists(LEGACY_INIT_FLAG):
+        stdout.write("  Already initialized by an earlier init.sh")
+        return
+    call_command("create_data", stdout=stdout)
+    # Default admin user
+    if not User.objects.filter(username="admin").exists():
+        User.objects.create_superuser("admin", "admin@example.com", "admin123")
+
+
+def _run_otef_data(stdout):
+    call_command("import_otef_data", stdout=stdout)
+
+
+def _run_media_sync(stdout):
+    sync_media(stdout)
+
+
+def _run_climate_images(stdout):
+    call_command("import_climate_images", stdout=stdout)
+
+
+def _run_image_pyramids(stdout):
+    call_command("build_image_pyramids", stdout=stdout)
+
+
+STAGES = [
+    Stage("makemigrations", _models_fingerprint, _run_makemigrations, False),
+    Stage("migrate", _migration_plan_fingerprint, _run_migrate, True),
+    Stage("tables", _tables_fingerprint, ensure_tables, True),
+    # Runs once per database
+    Stage("initial_data", lambda: "done", _run_initial_data, True),
+    Stage("otef_data", _otef_data_fingerprint, _run_otef_data, False),
+    Stage("media_sync", _media_sync_fingerprint, _run_media_sync, False),
+    Stage("climate_images", _climate_images_fingerprint, _run_climate_images, False),
+    Stage("image_pyramids", _image_pyramids_fingerprint, _run_image_pyramids, False),
+]
@@ -54,6 +54,12 @@
 DEFAULT_CLIMATE_TYPE = "utci"
 
 
+# Reverse lookup: display name (as used in presentation slides) -> scenario key
+SCENARIO_KEY_BY_DISPLAY_NAME = {
+    v["display_name"]: k for k, v in CLIMATE_SCENARIO_MAPPING.items()
+}
+
+
 def get_scenario_list():
     """Returns list of scenario keys in order"""
     return list(CLIMATE_SCENARIO_MAPPING.keys())
@@ -94,3 +100,8 @@ def get_image_filename(scenario_key, scenario_type):
         return None
 
     return scenario.get(f"{scenario_type}_image")
+
+
+def get_scenario_key_for_display_name(display_name):
+    """Returns the scenario key for a display name (e.g. 'Existing' -> 'existing'), or None"""
+    return SCENARIO_KEY_BY_DISPLAY_NAME.get(display_name)
@@ -0,0 +1,168 @@
+"""
+Table > indicator > state > media tree served by get_file_hierarchy.
+
+The tree is built with a fixed set of prefetch queries, whatever the number of
+tables or indicators. It is cached per worker as ready-to-send JSON bytes and
+its ETag, keyed by the ``table`` filter. As with the media index (see
+media_resolution), a shared generation counter in the state store invalidates
+every worker's cache. Saving or deleting any model the tree is built from bumps
+it. That covers ImageUploadView, IndicatorViewSet.create/destroy,
+StateViewSet.create/destroy and the admin.
+"""
+
+import hashlib
+import json
+import threading
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Prefetch
+from django.db.models.signals import post_delete, post_save
+from django.utils.http import quote_etag
+
+from .models import Indicator, IndicatorData, IndicatorImage, State, Table
+from .state_store import get_state_store
+
+FILE_HIERARCHY_NAMESPACE = "file_hierarchy"
+FILE_HIERARCHY_KEY = "generation"
+
+# Distinct ?table= filters kept per worker
+MAX_CACHED_FILTERS = 32
+
+_cache = {}
+_cache_generation = None
+_cache_lock = threading.Lock()
+
+
+def _media_url_path(image_path):
+    """
+    Path relative to MEDIA_URL for a stored file name:
+    - indicators/, ugc_indicators/ - use as-is
+    - processed/... (legacy system data) - add indicators/ prefix
+    - plain filename (no /) - use as-is (stored in media root)
+    """
+    if image_path.startswith(("indicators/", "ugc_indicators/")) or "/" not in image_path:
+        return image_path
+    return f"indicators/{image_path}"
+
+
+def build_file_hierarchy(table_name=None):
+    """Build the hierarchy list (active tables, optionally one by name)."""
+    tables = Table.objects.filter(is_active=True)
+    if table_name:
+        tables = tables.filter(name=table_name)
+    tables = tables.prefetch_related(
+        "indicators",
+        Prefetch("indicators__data", queryset=IndicatorData.objects.select_related("state")),
+        Prefetch(
+            "indicators__data__images",
+            queryset=IndicatorImage.objects.only("id", "image", "media_type", "uploaded_at", "indicatorData_id"),
+        ),
+    )
+
+    hierarchy = []
+    for table in tables:
+        indicators = []
+        for indicator in table.indicators.all():
+            seen_states = {}
+            for ind_data in indicator.data.all():
+                state = ind_data.state
+                if state.id not in seen_states:
+                    seen_states[state.id] = {
+                        "id": state.id,
+                        "state_values": state.state_values,
+                        "scenario_type": state.scenario_type,
+                        "scenario_name": state.scenario_name,
+                        "is_user_generated": state.is_user_generated,
+                        "indicator_data_id": ind_data.id,
+                        "media": [],
+                    }
+                seen_states[state.id]["media"].extend(
+                    {
+                        "id": img.id,
+                        "url": _media_url_path(img.image.name) if img.image else None,
+                        "media_type": img.media_type,
+                        "uploaded_at": img.uploaded_at.isoformat() if img.uploaded_at else None,
+                    }
+                    for img in ind_data.images.all()
+                )
+
+            indicators.append(
+                {
+                    "id": indicator.id,
+                    "indicator_id": indicator.indicator_id,
+                    "name": indicator.name,
+                    "category": indicator.category,
+                    "description": indicator.description,
+                    "is_user_generated": indicator.is_user_generated,
+                    "has_states": indicator.has_states,
+                    "states": list(seen_states.values()),
+                }
+            )
+
+        hierarchy.append(
+            {
+                "id": table.id,
+                "name": table.name,
+                "display_name": table.display_name,
+                "description": table.description,
+                "indicators": indicators,
+            }
+        )
+    return hierarchy
+
+
+def _encode(hierarchy):
+    """Canonical JSON bytes and their ETag (same form as views.payload_etag)."""
+    body = json.dumps(hierarchy, sort_keys=True, separators=(",", ":"), cls=DjangoJSONEncoder).encode("utf-8")
+    return body, quote_etag(hashlib.sha256(body).hexdigest()[:32])
+
+
+def get_file_hierarchy(table_name=None):
+    """Return (json_bytes, etag) for the hierarchy, from this worker's cache when current."""
+    global _cache_generation
+    _, generation = get_state_store().get(FILE_HIERARCHY_NAMESPACE, FILE_HIERARCHY_KEY)
+    key = table_name or None
+    with _cache_lock:
+        if _cache_generation != generation:
+            _cache.clear()
+            _cache_generation = generation
+        entry = _cache.get(key)
+    if entry is not None:
+        return entry
+
+    entry = _encode(build_file_hierarchy(key))
+    with _cache_lock:
+        if _cache_generation == generation:
+            if len(_cache) >= MAX_CACHED_FILTERS:
+                _cache.clear()
+            _cache[key] = entry
+    return entry
+
+
+def reset_file_hierarchy_cache():
+    """Drop this worker's cached trees (tests)."""
+    global _cache_generation
+    with _cache_lock:
+        _cache.clear()
+        _cache_generation = None
+
+
+def invalidate_file_hierarchy():
+    """Bump the shared generation so every worker rebuilds on next request."""
+    get_state_store().update(FILE_HIERARCHY_NAMESPACE, FILE_HIERARCHY_KEY, lambda data: None, dict)
+
+
+def _on_hierarchy_source_changed(sender, **kwargs):
+    # Rebuild from committed rows only, otherwise another worker could cache stale data
+    transaction.on_commit(invalidate_file_hierarchy)
+
+
+def connect_signals():
+    for model in (Indicator, IndicatorData, IndicatorImage, State, Table):
+        post_save.connect(
+            _on_hierarchy_source_changed, sender=model, dispatch_uid=f"file_hierarchy_save_{model.__name__}"
+        )
+        post_delete.connect(
+            _on_hierarchy_source_changed, sender=model, dispatch_uid=f"file_hierarchy_delete_{model.__name__}"
+        )
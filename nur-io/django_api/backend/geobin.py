@@ -0,0 +1,286 @@
+"""
+GeoBin: a compact binary encoding of GeoJSON FeatureCollections.
+
+Geometry is sent as quantized, delta-encoded integer coordinates in a typed
+array layout, so clients decode it with ``DataView``/typed-array views instead
+of ``JSON.parse`` on a multi-megabyte string. Only properties and other
+non-geometry members stay JSON, in a small header.
+
+Selected with ``Accept: application/vnd.nur.geobin`` or ``?format=geobin`` on
+the GIS layer GeoJSON endpoints and the Supabase submission features endpoint
+(see GeoBinRenderer). Decoders: ``decode`` below and
+``otef-interactive/frontend/src/shared/geobin.js``.
+
+Layout (version 1, little-endian, every section starts on a 4-byte boundary)::
+
+    offset  size          content
+    0       4             magic b"NGB1"
+    4       4             uint32 H: header length in bytes (multiple of 4)
+    8       H             header, UTF-8 JSON padded with spaces
+    ...     n             uint8 geometry type per feature (GEOMETRY_TYPES), padded
+    ...     4 * (n + 1)   uint32 part offsets: feature i -> parts [o[i], o[i+1])
+    ...     4 * (p + 1)   uint32 ring offsets: part j -> rings [o[j], o[j+1])
+    ...     4 * (r + 1)   uint32 coord offsets: ring k -> coords [o[k], o[k+1])
+    ...     2 * c * w     int16 or int32 (w = 2 or 4) x/y pairs, padded
+
+Header keys: ``version``, ``counts`` ({features, parts, rings, coords} =
+n, p, r, c), ``coord_type`` ("int16" | "int32"), ``origin`` ([x0, y0]),
+``scale``, ``properties`` (per feature), ``ids`` (per feature, only when some
+feature has an id), ``members`` (other top-level FeatureCollection members,
+e.g. crs), and ``raw_geometries`` ({feature index: geometry} for geometries
+the layout can't hold, e.g. GeometryCollection).
+
+Coordinates are deltas from the previous coordinate across the whole array
+(the first from 0). Summing them gives q, and the value is
+``origin + q / scale``. Scale is the largest of 10**7 ... 10**0 that keeps
+the layer's extent within int32.
+
+Every geometry has parts, rings and coords. A Point is 1 part with 1 ring of
+1 coord. A MultiPoint has one part per point. A LineString is 1 part with 1
+ring, and a MultiLineString has one part per line. A Polygon is 1 part with
+one ring per linear ring (closing coordinate kept), and a MultiPolygon has
+one part per polygon. Only x/y are encoded; extra ordinates (z) are dropped.
+"""
+
+import json
+import struct
+import sys
+from array import array
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
+
+MEDIA_TYPE = "application/vnd.nur.geobin"
+MAGIC = b"NGB1"
+VERSION = 1
+
+# Type code -> GeoJSON geometry type (0: null or see raw_geometries)
+GEOMETRY_TYPES = {
+    1: "Point",
+    2: "LineString",
+    3: "Polygon",
+    4: "MultiPoint",
+    5: "MultiLineString",
+    6: "MultiPolygon",
+}
+_TYPE_CODES = {name: code for code, name in GEOMETRY_TYPES.items()}
+
+_INT32_MAX = 2 ** 31 - 1
+_INT16_MAX = 2 ** 15 - 1
+
+
+def _parts(gtype, coords):
+    """Geometry coordinates as parts -> rings -> [x, y] coords."""
+    if gtype == "Point":
+        return [[[coords]]]
+    if gtype == "MultiPoint":
+        return [[[c]] for c in coords]
+    if gtype == "LineString":
+        return [[coords]]
+    if gtype == "MultiLineString":
+        return [[line] for line in coords]
+    if gtype == "Polygon":
+        return [coords]
+    return list(coords)  # MultiPolygon
+
+
+def _pad(buf):
+    buf.extend(b"\0" * (-len(buf) % 4))
+
+
+def _little_endian(arr):
+    if sys.byteorder == "big":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def encode(collection):
+    """Encode a GeoJSON FeatureCollection (dict) as GeoBin bytes."""
+    features = collection.get("features") or []
+    types = bytearray()
+    part_offsets = array("I", [0])
+    ring_offsets = array("I", [0])
+    coord_offsets = array("I", [0])
+    xs, ys = [], []
+    properties, ids, raw = [], [], {}
+
+    for index, feature in enumerate(features):
+        feature = feature if isinstance(feature, dict) else {}
+        properties.append(feature.get("properties"))
+        ids.append(feature.get("id"))
+        geometry = feature.get("geometry")
+        code = _TYPE_CODES.get((geometry or {}).get("type")) if isinstance(geometry, dict) else None
+        parts = None
+        if code:
+            try:
+                parts = _parts(geometry["type"], geometry.get("coordinates") or [])
+                flat = [
+                    (float(c[0]), float(c[1]))
+                    for part in parts for ring in part for c in ring
+                ]
+            except (TypeError, ValueError, IndexError):
+                parts = None
+        if parts is None:
+            if geometry is not None:
+                raw[str(index)] = geometry
+            types.append(0)
+            part_offsets.append(len(ring_offsets) - 1)
+            continue
+
+        types.append(code)
+        xs.extend(x for x, _ in flat)
+        ys.extend(y for _, y in flat)
+        for part in parts:
+            for ring in part:
+                coord_offsets.append(coord_offsets[-1] + len(ring))
+            ring_offsets.append(len(coord_offsets) - 1)
+        part_offsets.append(len(ring_offsets) - 1)
+
+    origin = [min(xs), min(ys)] if xs else [0.0, 0.0]
+    span = max(max(xs) - origin[0], max(ys) - origin[1]) if xs else 0.0
+    scale = 10 ** 7
+    while scale > 1 and span * scale > _INT32_MAX:
+        scale //= 10
+
+    deltas = array("i")
+    px = py = 0
+    for x, y in zip(xs, ys):
+        qx = int(round((x - origin[0]) * scale))
+        qy = int(round((y - origin[1]) * scale))
+        deltas.append(qx - px)
+        deltas.append(qy - py)
+        px, py = qx, qy
+    coord_type = "int32"
+    if all(-_INT16_MAX <= d <= _INT16_MAX for d in deltas):
+        deltas = array("h", deltas)
+        coord_type = "int16"
+
+    header = {
+        "version": VERSION,
+        "counts": {
+            "features": len(types),
+            "parts": len(ring_offsets) - 1,
+            "rings": len(coord_offsets) - 1,
+            "coords": len(xs),
+        },
+        "coord_type": coord_type,
+        "origin": origin,
+        "scale": scale,
+        "properties": properties,
+        "members": {k: v for k, v in collection.items() if k not in ("type", "features")},
+    }
+    if any(fid is not None for fid in ids):
+        header["ids"] = ids
+    if raw:
+        header["raw_geometries"] = raw
+    header_bytes = json.dumps(header, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    header_bytes += b" " * (-len(header_bytes) % 4)
+
+    buf = bytearray(MAGIC)
+    buf.extend(struct.pack("<I", len(header_bytes)))
+    buf.extend(header_bytes)
+    buf.extend(types)
+    _pad(buf)
+    for section in (part_offsets, ring_offsets, coord_offsets, deltas):
+        buf.extend(_little_endian(section))
+        _pad(buf)
+    return bytes(buf)
+
+
+def decode(payload):
+    """Decode GeoBin bytes back into a GeoJSON FeatureCollection."""
+    if payload[:4] != MAGIC:
+        raise ValueError("Not a GeoBin payload")
+    (header_len,) = struct.unpack_from("<I", payload, 4)
+    header = json.loads(payload[8:8 + header_len])
+    counts = header["counts"]
+    pos = 8 + header_len
+
+    def take(typecode, count, width):
+        nonlocal pos
+        arr = array(typecode)
+        arr.frombytes(payload[pos:pos + count * width])
+        if sys.byteorder == "big":
+            arr.byteswap()
+        pos += count * width
+        pos += -pos % 4
+        return arr
+
+    types = take("B", counts["features"], 1)
+    part_offsets = take("I", counts["features"] + 1, 4)
+    ring_offsets = take("I", counts["parts"] + 1, 4)
+    coord_offsets = take("I", counts["rings"] + 1, 4)
+    if header["coord_type"] == "int16":
+        deltas = take("h", counts["coords"] * 2, 2)
+    else:
+        deltas = take("i", counts["coords"] * 2, 4)
+
+    ox, oy = header["origin"]
+    scale = header["scale"]
+    coords, qx, qy = [], 0, 0
+    for i in range(0, len(deltas), 2):
+        qx += deltas[i]
+        qy += deltas[i + 1]
+        coords.append([ox + qx / scale, oy + qy / scale])
+
+    raw = header.get("raw_geometries") or {}
+    ids = header.get("ids")
+    features = []
+    for index, code in enumerate(types):
+        if code == 0:
+            geometry = raw.get(str(index))
+        else:
+            parts = [
+                [
+                    coords[coord_offsets[r]:coord_offsets[r + 1]]
+                    for r in range(ring_offsets[p], ring_offsets[p + 1])
+                ]
+                for p in range(part_offsets[index], part_offsets[index + 1])
+            ]
+            gtype = GEOMETRY_TYPES[code]
+            if gtype == "Point":
+                value = parts[0][0][0]
+            elif gtype == "MultiPoint":
+                value = [part[0][0] for part in parts]
+            elif gtype == "LineString":
+                value = parts[0][0]
+            elif gtype == "MultiLineString":
+                value = [part[0] for part in parts]
+            elif gtype == "Polygon":
+                value = parts[0]
+            else:
+                value = parts
+            geometry = {"type": gtype, "coordinates": value}
+        feature = {"type": "Feature", "properties": header["properties"][index], "geometry": geometry}
+        if ids is not None and ids[index] is not None:
+            feature["id"] = ids[index]
+        features.append(feature)
+    return {"type": "FeatureCollection", **header.get("members", {}), "features": features}
+
+
+class GeoBinRenderer(BaseRenderer):
+    """DRF renderer for FeatureCollection responses (other payloads, e.g. errors, fall back to JSON)."""
+
+    media_type = MEDIA_TYPE
+    format = "geobin"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict) and data.get("type") == "FeatureCollection":
+            return encode(data)
+        response = (renderer_context or {}).get("response")
+        if response is not None:
+            response["Content-Type"] = "application/json"
+        return json.dumps(data).encode("utf-8")
+
+
+# For views that can answer with GeoBin: the project defaults plus GeoBinRenderer
+GEOBIN_RENDERER_CLASSES = [*api_settings.DEFAULT_RENDERER_CLASSES, GeoBinRenderer]
+
+
+def wants_geobin(request):
+    """True when content negotiation picked GeoBinRenderer for this DRF request."""
+    renderer = getattr(request, "accepted_renderer", None)
+    return getattr(renderer, "format", None) == GeoBinRenderer.format
@@ -0,0 +1,264 @@
+"""
+Deep-zoom (DZI) tile pyramids for large rasters: climate UTCI/plan images and
+the OTEF model image.
+
+A pyramid for ``MEDIA_ROOT/<path>`` is written to
+``MEDIA_ROOT/pyramids/<path without extension>/``:
+
+    image.dzi                       standard DZI descriptor
+    image_files/<level>/<col>_<row>.<fmt>
+    manifest.json                   levels, tile size and source fingerprint
+
+Level ``max_level`` is full resolution and each level below halves it, down to
+1x1 at level 0 (the DZI convention, readable by OpenSeadragon and Leaflet/
+OpenLayers DZI sources). The source is consumed in horizontal strips. Each
+level keeps only the rows of its current tile row and hands 2x box-filtered
+rows down to the next level, so memory stays bounded by a few tile rows per
+level rather than whole downsampled copies. Pillow still decodes the source
+once in full, but strips are converted to RGB/RGBA one at a time rather than
+as a second full-size copy.
+"""
+
+import hashlib
+import json
+import math
+import os
+import shutil
+
+from django.conf import settings
+from PIL import Image
+
+PYRAMIDS_DIR = "pyramids"
+TILE_SIZE = 256
+# Rows pulled from the source at a time
+STRIP_HEIGHT = TILE_SIZE
+# Smaller images are served whole
+MIN_PYRAMID_SIZE = 2048
+DESCRIPTOR_NAME = "image.dzi"
+MANIFEST_NAME = "manifest.json"
+
+RASTER_EXTENSIONS = (".jpg", ".jpeg", ".png", ".tif", ".tiff", ".webp")
+JPEG_QUALITY = 85
+
+
+class InvalidMediaPath(ValueError):
+    pass
+
+
+def normalize_media_path(path):
+    """Media-relative path with no traversal; raises InvalidMediaPath."""
+    path = (path or "").strip().lstrip("/")
+    media_url = settings.MEDIA_URL.strip("/")
+    if media_url and path.startswith(media_url + "/"):
+        path = path[len(media_url) + 1 :]
+    normalized = os.path.normpath(path).replace(os.sep, "/")
+    if not path or normalized.startswith("../") or normalized in (".", ".."):
+        raise InvalidMediaPath(f"Invalid media path: {path!r}")
+    return normalized
+
+
+def pyramid_dir(media_path):
+    """Media-relative directory holding the pyramid for a media-relative source path."""
+    return f"{PYRAMIDS_DIR}/{os.path.splitext(normalize_media_path(media_path))[0]}"
+
+
+def level_sizes(width, height):
+    """[(width, height)] for levels 0..max_level."""
+    max_level = math.ceil(math.log2(max(width, height, 1)))
+    sizes = []
+    for level in range(max_level + 1):
+        scale = 2 ** (max_level - level)
+        sizes.append((max(1, math.ceil(width / scale)), max(1, math.ceil(height / scale))))
+    return sizes
+
+
+def source_fingerprint(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _vstack(top, bottom):
+    if top is None:
+        return bottom
+    stacked = Image.new(top.mode, (top.width, top.height + bottom.height))
+    stacked.paste(top, (0, 0))
+    stacked.paste(bottom, (0, top.height))
+    return stacked
+
+
+class _LevelWriter:
+    """Cuts one pyramid level into tile rows as strips arrive, feeding the level below."""
+
+    def __init__(self, tiles_dir, level, size, fmt, below=None):
+        self.dir = os.path.join(tiles_dir, str(level))
+        self.width, self.height = size
+        self.fmt = fmt
+        self.below = below
+        self.pending = None  # rows not yet written as tiles
+        self.unpaired = None  # rows not yet downsampled for the level below
+        self.tile_row = 0
+        os.makedirs(self.dir, exist_ok=True)
+
+    def push(self, strip):
+        self.pending = _vstack(self.pending, strip)
+        while self.pending is not None and self.pending.height >= TILE_SIZE:
+            self._write_row(self.pending.crop((0, 0, self.width, TILE_SIZE)))
+            self.pending = self._rest(self.pending, TILE_SIZE)
+
+        if self.below is not None:
+            self.unpaired = _vstack(self.unpaired, strip)
+            even = self.unpaired.height - self.unpaired.height % 2
+            if even:
+                self.below.push(self._halve(self.unpaired.crop((0, 0, self.width, even)), even // 2))
+                self.unpaired = self._rest(self.unpaired, even)
+
+    def flush(self):
+        if self.pending is not None:
+            self._write_row(self.pending)
+            self.pending = None
+        if self.below is not None:
+            if self.unpaired is not None:
+                # Odd last row becomes the final row of the level below
+                self.below.push(self._halve(self.unpaired, 1))
+                self.unpaired = None
+            self.below.flush()
+
+    def _rest(self, image, offset):
+        if image.height <= offset:
+            return None
+        return image.crop((0, offset, self.width, image.height))
+
+    def _halve(self, rows, height):
+        return rows.resize((self.below.width, height), Image.BOX)
+
+    def _write_row(self, rows):
+        for col in range(math.ceil(self.width / TILE_SIZE)):
+            left = col * TILE_SIZE
+            tile = rows.crop((left, 0, min(left + TILE_SIZE, self.width), rows.height))
+            target = os.path.join(self.dir, f"{col}_{self.tile_row}.{self.fmt}")
+            if self.fmt == "jpg":
+                tile.convert("RGB").save(target, format="JPEG", quality=JPEG_QUALITY)
+            else:
+                tile.save(target, format="PNG", optimize=False)
+        self.tile_row += 1
+
+
+def read_manifest(media_path):
+    """The stored manifest for a media-relative source path, or None."""
+    path = os.path.join(settings.MEDIA_ROOT, pyramid_dir(media_path), MANIFEST_NAME)
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def build_pyramid(media_path, force=False):
+    """
+    Build (or reuse) the pyramid for a media-relative raster path.
+    Returns the manifest dict; raises FileNotFoundError / ValueError for
+    missing or unsupported sources.
+    """
+    media_path = normalize_media_path(media_path)
+    source = os.path.join(settings.MEDIA_ROOT, media_path)
+    if os.path.splitext(source)[1].lower() not in RASTER_EXTENSIONS:
+        raise ValueError(f"Not a raster image: {media_path}")
+    fingerprint = source_fingerprint(source)
+
+    existing = read_manifest(media_path)
+    if existing and not force and existing.get("source") == fingerprint:
+        return existing
+
+    rel_dir = pyramid_dir(media_path)
+    out_dir = os.path.join(settings.MEDIA_ROOT, rel_dir)
+    # Build next to the live pyramid and swap, so readers never see a partial one
+    staging = out_dir + ".building"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    tiles_name = os.path.splitext(DESCRIPTOR_NAME)[0] + "_files"
+
+    try:
+        with Image.open(source) as image:
+            has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+            mode = "RGBA" if has_alpha else "RGB"
+            fmt = "png" if has_alpha else "jpg"
+            width, height = image.size
+            sizes = level_sizes(width, height)
+
+            writer = None
+            for level, size in enumerate(sizes):
+                writer = _LevelWriter(os.path.join(staging, tiles_name), level, size, fmt, below=writer)
+
+            for top in range(0, height, STRIP_HEIGHT):
+                strip = image.crop((0, top, width, min(top + STRIP_HEIGHT, height)))
+                writer.push(strip if strip.mode == mode else strip.convert(mode))
+            writer.flush()
+
+        manifest = {
+            "source": fingerprint,
+            "source_path": media_path,
+            "width": width,
+            "height": height,
+            "tile_size": TILE_SIZE,
+            "overlap": 0,
+            "format": fmt,
+            "max_level": len(sizes) - 1,
+            "levels": [
+                {
+                    "level": level,
+                    "width": w,
+                    "height": h,
+                    "columns": math.ceil(w / TILE_SIZE),
+                    "rows": math.ceil(h / TILE_SIZE),
+                }
+                for level, (w, h) in enumerate(sizes)
+            ],
+            "dzi": f"{rel_dir}/{DESCRIPTOR_NAME}",
+            "tiles": f"{rel_dir}/{tiles_name}/{{level}}/{{col}}_{{row}}.{fmt}",
+        }
+        manifest["version"] = hashlib.sha256(
+            json.dumps(manifest, sort_keys=True).encode("utf-8")
+        ).hexdigest()[:16]
+
+        with open(os.path.join(staging, DESCRIPTOR_NAME), "w", encoding="utf-8") as f:
+            f.write(
+                '<?xml version="1.0" encoding="UTF-8"?>\n'
+                f'<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" '
+                f'Format="{fmt}" Overlap="0" TileSize="{TILE_SIZE}">'
+                f'<Size Width="{width}" Height="{height}"/></Image>\n'
+            )
+        with open(os.path.join(staging, MANIFEST_NAME), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    os.makedirs(os.path.dirname(out_dir), exist_ok=True)
+    # Two renames, then delete the old tree: the pyramid is missing only between the renames
+    retired = out_dir + ".old"
+    shutil.rmtree(retired, ignore_errors=True)
+    if os.path.isdir(out_dir):
+        os.replace(out_dir, retired)
+    os.replace(staging, out_dir)
+    shutil.rmtree(retired, ignore_errors=True)
+    return manifest
+
+
+def pyramid_sources():
+    """
+    Media-relative paths (as served in get_image_data) of the large rasters
+    that get pyramids: climate indicator images and OTEF model images.
+    """
+    from .media_resolution import media_path_for_image
+    from .models import IndicatorImage, OTEFModelConfig
+
+    paths = []
+    climate = IndicatorImage.objects.filter(indicatorData__indicator__category="climate").select_related(
+        "indicatorData__indicator"
+    )
+    for image in climate:
+        if image.image:
+            paths.append(media_path_for_image(image, is_ugc=image.indicatorData.indicator.is_user_generated)[0])
+    for config in OTEFModelConfig.objects.all():
+        paths.extend(f.name for f in (config.model_image, config.model_image_transparent) if f)
+    return sorted({p for p in paths if p and os.path.splitext(p)[1].lower() in RASTER_EXTENSIONS})
@@ -0,0 +1,214 @@
+"""
+Pre-serialized, pre-compressed GeoJSON for database-stored GIS layers.
+
+get_otef_layers used to inline every layer's GeoJSON. Layers are now fetched
+by URL instead: ``/api/gis_layers/<id>/geojson/<data_hash>/``. The hash
+changes whenever ``GISLayer.data`` does, so those responses can be cached as
+immutable. The serialized bytes (plus .gz and, when the brotli package is
+installed, .br variants) are written once per (layer, hash) under
+``settings.GIS_LAYER_CACHE_DIR`` and shared by all workers, as are the
+GeoBin encodings (see geobin). Files for superseded hashes (including vector
+tiles, see vector_tiles) are removed when the layer is saved or deleted (see
+connect_signals).
+"""
+
+import glob
+import gzip
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.http import FileResponse
+from django.utils.cache import patch_vary_headers
+
+from . import geobin
+from .layer_variants import schedule_variants, variants_ready
+from .models import GISLayer
+from .simplify import pick_variant
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# (suffix, Content-Encoding) in order of preference
+ENCODINGS = [(".br", "br"), (".gz", "gzip")]
+
+
+def cache_dir():
+    return getattr(
+        settings,
+        "GIS_LAYER_CACHE_DIR",
+        os.path.join(settings.MEDIA_ROOT, "cache", "gis_layers"),
+    )
+
+
+def geojson_url(layer, query=""):
+    """
+    Versioned URL for a layer's GeoJSON (DB-stored data) or its file endpoint.
+    ``query`` (e.g. ``detail=low``) selects a simplified variant of DB-stored data.
+    """
+    if layer.data_hash:
+        url = f"/api/gis_layers/{layer.id}/geojson/{layer.data_hash}/"
+        return f"{url}?{query}" if query else url
+    return f"/api/gis_layers/{layer.id}/get_layer_geojson/"
+
+
+def _variant_data(layer, level):
+    """layer.data, or its stored simplification closest to (not coarser than) level."""
+    if level is None:
+        return layer.data
+    levels = (layer.simplified_data or {}).get("levels") or {}
+    key = pick_variant(levels, float(level))
+    return levels[key] if key else layer.data
+
+
+def _write_atomic(path, payload):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(payload)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# fmt -> (file extension, Content-Type)
+FORMATS = {
+    "json": (".json", "application/json"),
+    "geobin": (".ngb", geobin.MEDIA_TYPE),
+}
+
+
+def _serialize(data, fmt):
+    if fmt == "geobin":
+        return geobin.encode(data)
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _cache_path(layer, level, fmt):
+    data_hash = layer.data_hash or GISLayer.compute_data_hash(layer.data)
+    suffix = f"-{level}" if level else ""
+    return os.path.join(cache_dir(), f"{layer.id}-{data_hash}{suffix}{FORMATS[fmt][0]}")
+
+
+def cached_geojson_path(layer, level=None, fmt="json"):
+    """
+    Return the identity-encoded cache file for the layer's current data (or
+    its simplified variant for ``level``, a SIMPLIFY_TOLERANCES key) as
+    GeoJSON or GeoBin (``fmt``), serializing and compressing it on first use.
+    ``layer.data`` is only read on a cache miss, so callers can load the layer
+    with ``defer("data", "simplified_data")``. While the layer's variants are
+    still being built this is the full-detail file (see layer_variants).
+    """
+    os.makedirs(cache_dir(), exist_ok=True)
+    path = _cache_path(layer, level, fmt)
+    if os.path.exists(path):
+        return path
+    if level and not variants_ready(layer):
+        # Never cache full detail under the level's name
+        schedule_variants(layer.id)
+        return cached_geojson_path(layer, None, fmt)
+
+    body = _serialize(_variant_data(layer, level), fmt)
+    siblings = [(path + ".gz", gzip.compress(body, compresslevel=9))]
+    if brotli is not None:
+        siblings.append((path + ".br", brotli.compress(body)))
+    for sibling, payload in siblings:
+        _write_atomic(sibling, payload)
+    # Identity file last: its presence means every variant is ready
+    _write_atomic(path, body)
+    # Siblings must not look older than the file (see precompressed_file_response)
+    mtime_ns = os.stat(path).st_mtime_ns
+    for sibling, _ in siblings:
+        os.utime(sibling, ns=(mtime_ns, mtime_ns))
+    return path
+
+
+def precompressed_file_response(request, path, content_type, cache_control):
+    """
+    Stream ``path`` or, if the client accepts it and it exists, its precompressed
+    ``.br`` / ``.gz`` sibling. The bytes are sent as stored, with no parsing or recompression.
+    """
+    path = str(path)
+    accepted = {
+        token.split(";")[0].strip().lower()
+        for token in request.META.get("HTTP_ACCEPT_ENCODING", "").split(",")
+    }
+    chosen, encoding = path, None
+    for suffix, name in ENCODINGS:
+        sibling = path + suffix
+        # Ignore siblings older than the file (e.g. the file was replaced by hand)
+        if (
+            name in accepted
+            and os.path.exists(sibling)
+            and os.stat(sibling).st_mtime_ns >= os.stat(path).st_mtime_ns
+        ):
+            chosen, encoding = sibling, name
+            break
+
+    response = FileResponse(open(chosen, "rb"), content_type=content_type)
+    if encoding:
+        response["Content-Encoding"] = encoding
+    response["Vary"] = "Accept-Encoding"
+    response["Cache-Control"] = cache_control
+    return response
+
+
+def geojson_etag(layer, level=None, fmt="json"):
+    tag = layer.data_hash
+    if level:
+        tag += f"-{level}"
+    if fmt != "json":
+        tag += f".{fmt}"
+    return f'"{tag}"'
+
+
+def geojson_file_response(request, layer, cache_control, level=None, fmt="json"):
+    """FileResponse for the layer's cached GeoJSON/GeoBin in the best accepted encoding."""
+    path = cached_geojson_path(layer, level, fmt)
+    if level and path != _cache_path(layer, level, fmt):
+        # Full detail standing in for a pending variant: must not be kept as the level
+        cache_control, level = "no-cache", None
+    response = precompressed_file_response(request, path, FORMATS[fmt][1], cache_control)
+    response["ETag"] = geojson_etag(layer, level, fmt)
+    # The format can be negotiated with Accept on the same URL
+    patch_vary_headers(response, ["Accept"])
+    return response
+
+
+def purge_layer_cache(layer_id, keep_hash=None):
+    """Delete cached files (and vector tiles) for a layer, except those for keep_hash."""
+    keep_prefix = f"{layer_id}-{keep_hash}" if keep_hash else None
+    for path in glob.glob(os.path.join(cache_dir(), f"{layer_id}-*.*")):
+        if keep_prefix and os.path.basename(path).startswith(keep_prefix):
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    keep_tiles = f"{layer_id}-{keep_hash}" if keep_hash else None
+    for path in glob.glob(os.path.join(cache_dir(), "tiles", f"{layer_id}-*")):
+        if os.path.basename(path) != keep_tiles:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _on_layer_saved(sender, instance, **kwargs):
+    purge_layer_cache(instance.id, keep_hash=instance.data_hash)
+
+
+def _on_layer_deleted(sender, instance, **kwargs):
+    purge_layer_cache(instance.id)
+
+
+def connect_signals():
+    post_save.connect(_on_layer_saved, sender=GISLayer, dispatch_uid="gis_layer_cache_save")
+    post_delete.connect(_on_layer_deleted, sender=GISLayer, dispatch_uid="gis_layer_cache_delete")
@@ -0,0 +1,92 @@
+"""
+Background builds of GISLayer simplified variants.
+
+build_variants checks every simplified ring against the rest of its polygon
+and the neighbouring parts of its MultiPolygon (see simplify._valid_rings).
+That keeps topology intact but costs seconds on large layers: about 5 s for
+200 polygons of 1,000 vertices each. GISLayer.save() therefore only clears
+``simplified_data`` when ``data`` changes and calls schedule_variants. Once
+the transaction commits, a worker from a small thread pool builds the variants
+and stores them with a conditional UPDATE, so a build for data that has since
+changed again is discarded.
+
+Until the variants are stored, the layer endpoints serve full-detail data for
+any ``?detail=`` / ``?zoom=``, uncached as that level (see
+layer_cache.cached_geojson_path). Such a request also schedules a build, which
+covers layers cleared by migration 0024 and builds lost when a process exited.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .models import GISLayer
+from .simplify import build_variants
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+# Layer ids submitted to this process's pool whose build hasn't started yet
+_queued = set()
+_queued_lock = threading.Lock()
+
+
+def variants_ready(layer):
+    """Whether layer.simplified_data was built from its current data."""
+    return (layer.simplified_data or {}).get("source_hash") == layer.data_hash
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "GIS_LAYER_VARIANT_WORKERS", 1),
+                thread_name_prefix="gis-layer-variants",
+            )
+        return _executor
+
+
+def build_layer_variants(layer_id):
+    """
+    Build and store the simplified variants of one GISLayer synchronously.
+    Returns False if the layer is gone or its data changed during the build.
+    """
+    layer = GISLayer.objects.only("id", "data", "data_hash").filter(id=layer_id).first()
+    if layer is None:
+        return False
+    simplified = {"source_hash": layer.data_hash, "levels": build_variants(layer.data)}
+    # A save since the read scheduled its own build; don't overwrite it with stale levels
+    return bool(
+        GISLayer.objects.filter(id=layer_id, data_hash=layer.data_hash).update(simplified_data=simplified)
+    )
+
+
+def _run_in_worker(layer_id):
+    # Started: a save from now on must queue a new build for its data
+    with _queued_lock:
+        _queued.discard(layer_id)
+    close_old_connections()
+    try:
+        build_layer_variants(layer_id)
+    except Exception:
+        logger.exception("Simplified variants failed for GISLayer %s", layer_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_variants(layer_id):
+    """Build a GISLayer's variants in the background once the transaction commits."""
+
+    def submit():
+        with _queued_lock:
+            if layer_id in _queued:
+                return
+            _queued.add(layer_id)
+        _get_executor().submit(_run_in_worker, layer_id)
+
+    transaction.on_commit(submit)
@@ -0,0 +1,62 @@
+"""
+Management command that prepares the API on container start: migrations,
+tables, first-run data, OTEF data, media sync, climate images and image
+pyramids (see backend/bootstrap.py). Stages whose inputs are unchanged since
+their last successful run are skipped.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.bootstrap import STAGES, record_fingerprint, stored_fingerprint
+
+
+class Command(BaseCommand):
+    help = "Run the container bootstrap stages, skipping those whose inputs are unchanged"
+
+    def add_arguments(self, parser):
+        names = [stage.name for stage in STAGES]
+        parser.add_argument("--force", action="store_true", help="Run every stage regardless of fingerprints")
+        parser.add_argument("--only", nargs="+", choices=names, help="Run only these stages")
+        parser.add_argument("--skip", nargs="+", choices=names, default=[], help="Leave out these stages")
+
+    def handle(self, *args, **options):
+        stages = [
+            stage
+            for stage in STAGES
+            if (not options["only"] or stage.name in options["only"]) and stage.name not in options["skip"]
+        ]
+        timings = []
+        started = time.perf_counter()
+
+        for stage in stages:
+            stage_started = time.perf_counter()
+            try:
+                fingerprint = stage.fingerprint()
+                if not options["force"] and fingerprint == stored_fingerprint(stage.name):
+                    timings.append((stage.name, "skipped", time.perf_counter() - stage_started))
+                    self.stdout.write(f"[SKIP] {stage.name}: inputs unchanged")
+                    continue
+
+                self.stdout.write(f"[RUN] {stage.name}")
+                stage.run(self.stdout)
+                duration = time.perf_counter() - stage_started
+                # Fingerprint after the run: stages may change their own inputs
+                # (makemigrations adds files, migrate empties the plan)
+                record_fingerprint(stage.name, stage.fingerprint(), duration)
+                timings.append((stage.name, "ran", duration))
+            except Exception as e:
+                timings.append((stage.name, "failed", time.perf_counter() - stage_started))
+                if stage.required:
+                    self._report(timings, started)
+                    raise CommandError(f"Bootstrap stage {stage.name} failed: {e}") from e
+                self.stdout.write(self.style.WARNING(f"[WARN] {stage.name} failed: {e}"))
+
+        self._report(timings, started)
+
+    def _report(self, timings, started):
+        self.stdout.write("\nBootstrap timings:")
+        for name, outcome, duration in timings:
+            self.stdout.write(f"  {name:<16} {outcome:<8} {duration:7.2f}s")
+        self.stdout.write(self.style.SUCCESS(f"  {'total':<16} {'':<8} {time.perf_counter() - started:7.2f}s"))
@@ -0,0 +1,67 @@
+"""
+Management command to build deep-zoom (DZI) tile pyramids for large images.
+By default covers every climate indicator image and the OTEF model images;
+pyramids whose source is unchanged are kept as they are.
+"""
+
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from backend import image_pyramid
+from PIL import Image
+
+
+class Command(BaseCommand):
+    help = "Build deep-zoom tile pyramids for climate and OTEF model images"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "paths",
+            nargs="*",
+            help="Media-relative image paths (default: climate and model images)",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Rebuild pyramids even when the source is unchanged",
+        )
+        parser.add_argument(
+            "--min-size",
+            type=int,
+            default=image_pyramid.MIN_PYRAMID_SIZE,
+            help="Skip images whose longest side is below this many pixels",
+        )
+
+    def handle(self, *args, **options):
+        paths = options["paths"] or image_pyramid.pyramid_sources()
+        built = skipped = failed = 0
+
+        for media_path in paths:
+            source = os.path.join(settings.MEDIA_ROOT, media_path)
+            if not os.path.exists(source):
+                self.stdout.write(self.style.WARNING(f"⚠ Not found: {media_path}"))
+                skipped += 1
+                continue
+            try:
+                with Image.open(source) as image:
+                    size = max(image.size)
+                if size < options["min_size"]:
+                    self.stdout.write(f"  Skipped (small, {size}px): {media_path}")
+                    skipped += 1
+                    continue
+                manifest = image_pyramid.build_pyramid(media_path, force=options["force"])
+            except (OSError, ValueError) as e:
+                self.stdout.write(self.style.ERROR(f"✗ {media_path}: {e}"))
+                failed += 1
+                continue
+            built += 1
+            self.stdout.write(
+                f"✓ {media_path}: {manifest['width']}x{manifest['height']}, "
+                f"{manifest['max_level'] + 1} levels"
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Pyramids ready: {built}, skipped: {skipped}, failed: {failed}")
+        )
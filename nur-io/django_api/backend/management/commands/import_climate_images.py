@@ -1,16 +1,83 @@
 """
 Management command to import climate scenario images from public/processed to media directory.
-This physically moves the images and updates the database references.
+This copies the images and updates the database references.
+
+Unchanged files (same size and mtime, or same content hash) are skipped, copies
+run on a thread pool, and the IndicatorData/IndicatorImage rows are written in
+bulk, so re-running it on every container start is close to a no-op.
 """
 
-from django.core.management.base import BaseCommand
-from django.conf import settings
-from backend.models import Indicator, State, IndicatorData, IndicatorImage
-from backend.climate_scenarios import CLIMATE_SCENARIO_MAPPING
+import hashlib
 import os
 import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from backend.climate_scenarios import CLIMATE_SCENARIO_MAPPING
+from backend.file_hierarchy import invalidate_file_hierarchy
+from backend.media_resolution import invalidate_media_index
+from backend.models import Indicator, IndicatorData, IndicatorImage, State
+
+# scenario_type -> (source/destination folder name, CLIMATE_SCENARIO_MAPPING key)
+IMAGE_TYPES = {
+    "utci": ("utci-scenarios", "utci_image"),
+    "plan": ("plan-scenarios", "plan_image"),
+}
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_unchanged(source, dest):
+    """True when dest already holds source's content."""
+    if not dest.exists():
+        return False
+    src_stat, dest_stat = source.stat(), dest.stat()
+    if src_stat.st_size != dest_stat.st_size:
+        return False
+    # copy2 preserves mtime, so a matching size+mtime means an earlier import
+    if src_stat.st_mtime_ns == dest_stat.st_mtime_ns:
+        return True
+    return file_digest(source) == file_digest(dest)
+
+
+def place_file(source, dest, link=False):
+    """Copy (or hard-link) source to dest atomically; returns "linked" or "copied"."""
+    fd, tmp = tempfile.mkstemp(dir=dest.parent, prefix=".import-")
+    os.close(fd)
+    try:
+        method = "copied"
+        if link:
+            os.remove(tmp)
+            try:
+                os.link(source, tmp)
+                method = "linked"
+            except OSError:
+                # Different filesystem (e.g. bind-mounted public/): fall back to copying
+                shutil.copy2(source, tmp)
+        else:
+            shutil.copy2(source, tmp)
+        if method == "copied":
+            os.chmod(tmp, 0o644)
+        os.replace(tmp, dest)
+        return method
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
 
 class Command(BaseCommand):
     help = "Import climate scenario images from public/processed into media/indicators"
@@ -21,29 +88,31 @@ def add_arguments(self, parser):
             action="store_true",
             help="Show what would be done without actually doing it",
         )
+        parser.add_argument(
+            "--link",
+            action="store_true",
+            help="Hard-link instead of copying when source and media share a filesystem",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=min(8, (os.cpu_count() or 1) * 2),
+            help="Parallel copy workers",
+        )
 
     def handle(self, *args, **options):
         dry_run = options["dry_run"]
 
         # Define source and destination directories
-        source_utci = (
-            Path(settings.BASE_DIR) / "public/processed/climate/utci-scenarios"
-        )
-        source_plan = (
-            Path(settings.BASE_DIR) / "public/processed/climate/plan-scenarios"
-        )
+        source_base = Path(settings.BASE_DIR) / "public/processed/climate"
         dest_base = Path(settings.MEDIA_ROOT) / "indicators/climate"
-        dest_utci = dest_base / "utci-scenarios"
-        dest_plan = dest_base / "plan-scenarios"
 
         # Ensure destination directories exist
-        if not dry_run:
-            dest_utci.mkdir(parents=True, exist_ok=True)
-            dest_plan.mkdir(parents=True, exist_ok=True)
-            self.stdout.write(f"✓ Created destination directories")
-        else:
-            self.stdout.write(f"[DRY RUN] Would create: {dest_utci}")
-            self.stdout.write(f"[DRY RUN] Would create: {dest_plan}")
+        for folder, _ in IMAGE_TYPES.values():
+            if not dry_run:
+                (dest_base / folder).mkdir(parents=True, exist_ok=True)
+            else:
+                self.stdout.write(f"[DRY RUN] Would create: {dest_base / folder}")
 
         # Get climate indicator
         climate_indicator = Indicator.objects.filter(category="climate").first()
@@ -53,100 +122,111 @@ def handle(self, *args, **options):
 
         self.stdout.write(f"✓ Found climate indicator: {climate_indicator.name}")
 
-        copied_count = 0
-        updated_count = 0
-
-        # Process each scenario
+        # (scenario_type, scenario_key, folder, filename, source, dest)
+        jobs = []
         for scenario_key, scenario_data in CLIMATE_SCENARIO_MAPPING.items():
-            self.stdout.write(f"\nProcessing scenario: {scenario_data['display_name']}")
-
-            # Process UTCI image
-            utci_filename = scenario_data["utci_image"]
-            source_utci_file = source_utci / utci_filename
-            dest_utci_file = dest_utci / utci_filename
-
-            if source_utci_file.exists():
-                if not dry_run:
-                    # Copy file
-                    shutil.copy2(source_utci_file, dest_utci_file)
-                    os.chmod(dest_utci_file, 0o644)
-                    copied_count += 1
-                    self.stdout.write(f"  ✓ Copied UTCI: {utci_filename}")
-
-                    # Update database
-                    utci_state = State.objects.filter(
-                        scenario_type="utci", scenario_name=scenario_key
-                    ).first()
-
-                    if utci_state:
-                        utci_data, _ = IndicatorData.objects.get_or_create(
-                            indicator=climate_indicator, state=utci_state
-                        )
-
-                        image_path = (
-                            f"indicators/climate/utci-scenarios/{utci_filename}"
-                        )
-                        IndicatorImage.objects.update_or_create(
-                            indicatorData=utci_data, defaults={"image": image_path}
-                        )
-                        updated_count += 1
-                else:
-                    self.stdout.write(
-                        f"  [DRY RUN] Would copy: {source_utci_file} -> {dest_utci_file}"
-                    )
-            else:
-                self.stdout.write(
-                    self.style.WARNING(f"  ⚠ UTCI image not found: {source_utci_file}")
-                )
-
-            # Process Plan image
-            plan_filename = scenario_data["plan_image"]
-            source_plan_file = source_plan / plan_filename
-            dest_plan_file = dest_plan / plan_filename
-
-            if source_plan_file.exists():
-                if not dry_run:
-                    # Copy file
-                    shutil.copy2(source_plan_file, dest_plan_file)
-                    os.chmod(dest_plan_file, 0o644)
-                    copied_count += 1
-                    self.stdout.write(f"  ✓ Copied Plan: {plan_filename}")
-
-                    # Update database
-                    plan_state = State.objects.filter(
-                        scenario_type="plan", scenario_name=scenario_key
-                    ).first()
-
-                    if plan_state:
-                        plan_data, _ = IndicatorData.objects.get_or_create(
-                            indicator=climate_indicator, state=plan_state
-                        )
-
-                        image_path = (
-                            f"indicators/climate/plan-scenarios/{plan_filename}"
-                        )
-                        IndicatorImage.objects.update_or_create(
-                            indicatorData=plan_data, defaults={"image": image_path}
-                        )
-                        updated_count += 1
-                else:
+            for scenario_type, (folder, image_key) in IMAGE_TYPES.items():
+                filename = scenario_data[image_key]
+                source = source_base / folder / filename
+                if not source.exists():
                     self.stdout.write(
-                        f"  [DRY RUN] Would copy: {source_plan_file} -> {dest_plan_file}"
+                        self.style.WARNING(f"  ⚠ {scenario_type.upper()} image not found: {source}")
                     )
-            else:
-                self.stdout.write(
-                    self.style.WARNING(f"  ⚠ Plan image not found: {source_plan_file}")
-                )
+                    continue
+                jobs.append((scenario_type, scenario_key, folder, filename, source, dest_base / folder / filename))
+
+        if dry_run:
+            pending = [job for job in jobs if not is_unchanged(job[4], job[5])]
+            for *_, source, dest in pending:
+                self.stdout.write(f"  [DRY RUN] Would copy: {source} -> {dest}")
+            self.stdout.write(self.style.SUCCESS(f"\n{'=' * 60}"))
+            self.stdout.write(self.style.SUCCESS("DRY RUN COMPLETE"))
+            self.stdout.write(f"Would copy {len(pending)} images ({len(jobs) - len(pending)} unchanged)")
+            return
+
+        def transfer(job):
+            source, dest = job[4], job[5]
+            if is_unchanged(source, dest):
+                return "unchanged"
+            return place_file(source, dest, link=options["link"])
+
+        with ThreadPoolExecutor(max_workers=max(1, options["workers"])) as pool:
+            results = list(pool.map(transfer, jobs))
+        for job, result in zip(jobs, results):
+            if result != "unchanged":
+                self.stdout.write(f"  ✓ {result.capitalize()} {job[0].upper()}: {job[3]}")
+
+        created, updated = self._sync_records(climate_indicator, jobs)
 
         # Summary
+        copied = sum(result != "unchanged" for result in results)
         self.stdout.write(self.style.SUCCESS(f"\n{'=' * 60}"))
-        if dry_run:
-            self.stdout.write(self.style.SUCCESS(f"DRY RUN COMPLETE"))
-            self.stdout.write(f"Would copy {copied_count} images")
-            self.stdout.write(f"Would update {updated_count} database records")
-        else:
-            self.stdout.write(self.style.SUCCESS(f"IMPORT COMPLETE"))
-            self.stdout.write(self.style.SUCCESS(f"✓ Copied {copied_count} images"))
-            self.stdout.write(
-                self.style.SUCCESS(f"✓ Updated {updated_count} database records")
-            )
+        self.stdout.write(self.style.SUCCESS("IMPORT COMPLETE"))
+        self.stdout.write(
+            self.style.SUCCESS(f"✓ Copied {copied} images ({len(results) - copied} unchanged)")
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"✓ Created {created}, updated {updated} database records")
+        )
+
+    def _sync_records(self, indicator, jobs):
+        """Point each scenario state's newest IndicatorImage at its file, in bulk."""
+        wanted = {
+            (scenario_type, scenario_key): f"indicators/climate/{folder}/{filename}"
+            for scenario_type, scenario_key, folder, filename, _, _ in jobs
+        }
+        if not wanted:
+            return 0, 0
+
+        # Lowest id wins among duplicates, like the per-scenario .first() lookups did
+        states = {}
+        for state in State.objects.filter(
+            scenario_type__in=list(IMAGE_TYPES), scenario_name__in={key for _, key in wanted}
+        ).order_by("id"):
+            states.setdefault((state.scenario_type, state.scenario_name), state)
+
+        with transaction.atomic():
+            data_by_state = {}
+            for data in IndicatorData.objects.filter(indicator=indicator, state__in=states.values()).order_by("id"):
+                data_by_state.setdefault(data.state_id, data)
+            new_data = [
+                IndicatorData(indicator=indicator, state=state)
+                for key, state in states.items()
+                if key in wanted and state.id not in data_by_state
+            ]
+            if new_data:
+                IndicatorData.objects.bulk_create(new_data)
+                for data in IndicatorData.objects.filter(
+                    indicator=indicator, state__in=[d.state for d in new_data]
+                ).order_by("id"):
+                    data_by_state.setdefault(data.state_id, data)
+
+            # Newest first (model ordering), like get_image_data
+            image_by_data = {}
+            for image in IndicatorImage.objects.filter(indicatorData__in=data_by_state.values()):
+                image_by_data.setdefault(image.indicatorData_id, image)
+
+            to_create, to_update = [], []
+            for key, image_path in wanted.items():
+                state = states.get(key)
+                if state is None:
+                    continue
+                data = data_by_state[state.id]
+                media_type = IndicatorImage.infer_media_type(image_path)
+                image = image_by_data.get(data.id)
+                if image is None:
+                    to_create.append(IndicatorImage(indicatorData=data, image=image_path, media_type=media_type))
+                elif image.image.name != image_path or image.media_type != media_type:
+                    image.image = image_path
+                    image.media_type = media_type
+                    to_update.append(image)
+
+            IndicatorImage.objects.bulk_create(to_create)
+            IndicatorImage.objects.bulk_update(to_update, ["image", "media_type"])
+
+            if new_data or to_create or to_update:
+                # Bulk writes send no post_save: refresh the cached media views explicitly
+                transaction.on_commit(invalidate_media_index)
+                transaction.on_commit(invalidate_file_hierarchy)
+
+        return len(to_create), len(to_update)
@@ -7,16 +7,34 @@
     OTEFViewportState,
 )
 from backend.calibration_io import normalize_calibration_payload, write_model_bounds_to_storage
+import hashlib
 import json
 import os
 from pathlib import Path
 
 from django.conf import settings
+from django.db import transaction
+
+# Mounted public directory (aligned with docker-compose volume mount); this
+# matches where nginx serves files and where frontend LayerRegistry loads from
+LAYERS_DIR = '/app/public/processed/layers'
 
 
 class Command(BaseCommand):
     help = 'Import OTEF model config and seed layer groups from processed manifests'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--layers-dir',
+            default=LAYERS_DIR,
+            help='Processed layers directory holding layers-manifest.json',
+        )
+        parser.add_argument(
+            '--force-seed',
+            action='store_true',
+            help='Seed layer groups even when the manifests are unchanged',
+        )
+
     def _model_bounds_candidates(self):
         """Paths to check for model-bounds.json (Docker mount, then repo-relative, then legacy)."""
         base = Path(settings.BASE_DIR)
@@ -83,107 +101,125 @@ def handle(self, *args, **options):
             )
 
         # Seed layer groups from processed manifests
-        self._seed_layer_groups(otef_table)
+        self._seed_layer_groups(
+            otef_table, layers_dir=options['layers_dir'], force=options['force_seed']
+        )
 
         self.stdout.write(
             self.style.SUCCESS('\n[SUCCESS] OTEF data import completed.')
         )
 
-    def _seed_layer_groups(self, table):
-        """Seed LayerGroup and LayerState from processed manifests"""
-        # Use mounted public directory path (aligned with docker-compose volume mount)
-        # This matches where nginx serves files and where frontend LayerRegistry loads from
-        layers_manifest_path = '/app/public/processed/layers/layers-manifest.json'
-
+    def _read_layer_manifests(self, layers_dir):
+        """
+        Return (packs, digest): [(pack_id, pack_manifest)] for every pack with a
+        manifest, and a SHA-256 over the root and pack manifest bytes.
+        None when the root manifest is missing.
+        """
+        layers_manifest_path = os.path.join(layers_dir, 'layers-manifest.json')
         if not os.path.exists(layers_manifest_path):
             self.stdout.write(
                 self.style.WARNING(f'[WARN] Layers manifest not found at: {layers_manifest_path}, skipping layer groups seeding')
             )
-            return
-
+            return None
+
+        digest = hashlib.sha256()
+        with open(layers_manifest_path, 'rb') as f:
+            raw = f.read()
+        digest.update(raw)
+        root_manifest = json.loads(raw)
+
+        packs = []
+        for pack_id in root_manifest.get('packs', []):
+            pack_manifest_path = os.path.join(layers_dir, pack_id, 'manifest.json')
+            if not os.path.exists(pack_manifest_path):
+                self.stdout.write(
+                    self.style.WARNING(f'[WARN] Pack manifest not found: {pack_manifest_path}')
+                )
+                continue
+            with open(pack_manifest_path, 'rb') as f:
+                raw = f.read()
+            digest.update(pack_id.encode('utf-8') + b'\0' + raw)
+            packs.append((pack_id, json.loads(raw)))
+        return packs, digest.hexdigest()
+
+    def _seed_layer_groups(self, table, layers_dir=LAYERS_DIR, force=False):
+        """
+        Seed LayerGroup and LayerState from processed manifests.
+
+        Existing rows for the table are read once, the missing/changed rows are
+        diffed against every pack manifest and written in bulk in one
+        transaction. The manifest digest is stored on OTEFModelConfig, so a
+        restart with unchanged manifests skips seeding altogether.
+        """
         try:
-            with open(layers_manifest_path, 'r', encoding='utf-8') as f:
-                root_manifest = json.load(f)
-
-            packs = root_manifest.get('packs', [])
+            manifests = self._read_layer_manifests(layers_dir)
+            if manifests is None:
+                return
+            packs, digest = manifests
             if not packs:
                 self.stdout.write(
                     self.style.WARNING('[WARN] No packs found in layers manifest')
                 )
                 return
 
-            self.stdout.write(f'\nSeeding layer groups from {len(packs)} pack(s) (source: {layers_manifest_path})...')
-
-            for pack_id in packs:
-                pack_manifest_path = f'/app/public/processed/layers/{pack_id}/manifest.json'
-
-                if not os.path.exists(pack_manifest_path):
-                    self.stdout.write(
-                        self.style.WARNING(f'[WARN] Pack manifest not found: {pack_manifest_path}')
-                    )
-                    continue
-
-                with open(pack_manifest_path, 'r', encoding='utf-8') as f:
-                    pack_manifest = json.load(f)
-
-                # Create or update LayerGroup
-                # projector_base is the new default base for the projector
-                group_enabled = (pack_id == 'projector_base')
+            config = OTEFModelConfig.objects.filter(table=table).first()
+            if config and config.layers_manifest_hash == digest and not force:
+                self.stdout.write(f'[OK] Layer manifests unchanged, skipping layer groups seeding ({len(packs)} pack(s))')
+                return
 
-                group, group_created = LayerGroup.objects.get_or_create(
-                    table=table,
-                    group_id=pack_id,
-                    defaults={
-                        'enabled': group_enabled
-                    }
-                )
+            self.stdout.write(f'\nSeeding layer groups from {len(packs)} pack(s) (source: {layers_dir})...')
 
-                if group_created:
-                    self.stdout.write(
-                        self.style.SUCCESS(f'[OK] Created layer group: {pack_id} (enabled={group_enabled})')
-                    )
-                else:
-                    # Update enabled state for existing group if it's projector_base
-                    if group_enabled and not group.enabled:
-                        group.enabled = True
-                        group.save()
-                        self.stdout.write(self.style.SUCCESS(f'[OK] Enabled layer group: {pack_id}'))
-
-                # Process layers in this pack
-                layers = pack_manifest.get('layers', [])
-                for layer_info in layers:
+            # projector_base is the default base for the projector; every other
+            # group and every LayerState (incl. SEA, רקע_שחור, model_base) starts disabled
+            wanted_groups = {pack_id: pack_id == 'projector_base' for pack_id, _ in packs}
+            wanted_layers = {}
+            for pack_id, pack_manifest in packs:
+                for layer_info in pack_manifest.get('layers', []):
                     layer_id = layer_info.get('id')
-                    if not layer_id:
-                        continue
-
-                    # Full layer ID format: "group_id.layer_id"
-                    full_layer_id = f"{pack_id}.{layer_id}"
-
-                    # New LayerState rows default to disabled (incl. SEA, רקע_שחור, model_base)
-                    layer_enabled = False
-
-                    # Create or update LayerState
-                    layer_state, layer_created = LayerState.objects.get_or_create(
-                        table=table,
-                        layer_id=full_layer_id,
-                        defaults={
-                            'enabled': layer_enabled
-                        }
-                    )
-
-                    if layer_created:
-                        self.stdout.write(
-                            self.style.SUCCESS(f'  [OK] Created layer state: {full_layer_id} (enabled={layer_enabled})')
-                        )
-                    else:
-                        # Update enabled state for existing important layers
-                        if layer_enabled and not layer_state.enabled:
-                            layer_state.enabled = True
-                            layer_state.save()
-                            self.stdout.write(self.style.SUCCESS(f'  [OK] Enabled layer state: {full_layer_id}'))
+                    if layer_id:
+                        # Full layer ID format: "group_id.layer_id"
+                        full_id = f'{pack_id}.{layer_id}'
+                        # Split as LayerState.save() would (a dotted pack id splits at its first dot)
+                        wanted_layers[full_id] = LayerState.split_layer_id(full_id)
+
+            with transaction.atomic():
+                groups = {g.group_id: g for g in LayerGroup.objects.filter(table=table)}
+                new_groups = [
+                    LayerGroup(table=table, group_id=group_id, enabled=enabled)
+                    for group_id, enabled in wanted_groups.items()
+                    if group_id not in groups
+                ]
+                # Existing groups are only ever switched on (projector_base), never off
+                enabled_groups = [
+                    groups[group_id]
+                    for group_id, enabled in wanted_groups.items()
+                    if enabled and group_id in groups and not groups[group_id].enabled
+                ]
+                for group in enabled_groups:
+                    group.enabled = True
+
+                existing_layers = set(
+                    LayerState.objects.filter(table=table, layer_id__in=wanted_layers).values_list('layer_id', flat=True)
+                )
+                # bulk_create bypasses LayerState.save(), so set the split columns here
+                new_layers = [
+                    LayerState(table=table, layer_id=full_id, group_id=group_id, layer_key=layer_key, enabled=False)
+                    for full_id, (group_id, layer_key) in wanted_layers.items()
+                    if full_id not in existing_layers
+                ]
+
+                LayerGroup.objects.bulk_create(new_groups, ignore_conflicts=True)
+                LayerGroup.objects.bulk_update(enabled_groups, ['enabled'])
+                LayerState.objects.bulk_create(new_layers, ignore_conflicts=True)
+                if config:
+                    OTEFModelConfig.objects.filter(pk=config.pk).update(layers_manifest_hash=digest)
 
             self.stdout.write(
-                self.style.SUCCESS(f'[OK] Seeded {len(packs)} layer group(s)')
+                self.style.SUCCESS(
+                    f'[OK] Seeded {len(packs)} layer group(s): '
+                    f'{len(new_groups)} created, {len(enabled_groups)} enabled, '
+                    f'{len(new_layers)} layer state(s) created'
+                )
             )
 
         except Exception as e:
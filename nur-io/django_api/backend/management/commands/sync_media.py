@@ -0,0 +1,22 @@
+"""
+Management command to sync processed files (public/processed, idistrict
+mobility/climate) into media/indicators/processed incrementally. Run by the
+bootstrap on start and by the layer processing scripts after processing.
+"""
+
+from django.core.management.base import BaseCommand
+
+from backend.media_sync import sync_media
+
+
+class Command(BaseCommand):
+    help = "Incrementally sync processed files into media (changed files only, orphans removed)"
+
+    def handle(self, *args, **options):
+        results = sync_media(self.stdout)
+        if not results:
+            self.stdout.write(self.style.WARNING("No processed directories found to sync"))
+            return
+        placed = sum(r.placed for r in results.values())
+        deleted = sum(r.deleted for r in results.values())
+        self.stdout.write(self.style.SUCCESS(f"Media sync complete: {placed} updated, {deleted} deleted"))
@@ -0,0 +1,254 @@
+"""
+Responsive derivatives (resized WebP/AVIF renditions, video posters) of
+IndicatorImage uploads.
+
+ImageUploadView stores the original, then calls schedule_derivatives. Once the
+transaction commits, a worker from a small thread pool renders every width in
+DERIVATIVE_WIDTHS that is narrower than the source, in each supported format.
+Each run renders into a fresh ``MEDIA_ROOT/derivatives/<image id>/<build>/``
+directory and registers the files as IndicatorImageDerivative rows. Earlier
+builds are removed only after the new rows commit, so the rows and the media
+index never point at missing files. get_image_data returns the renditions as
+``srcset`` (and ``poster`` for videos), so displays can fetch the size they
+need instead of the full-size original. Deleting the IndicatorImage removes
+its derivatives directory (see connect_signals).
+
+AVIF needs Pillow >= 11 or the optional ``pillow-avif-plugin`` package. Video
+posters need ``ffmpeg`` on PATH. Without them those renditions are skipped.
+"""
+
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models.signals import post_delete
+from PIL import Image
+
+from .models import IndicatorImage, IndicatorImageDerivative
+
+try:
+    import pillow_avif  # noqa: F401  registers the AVIF codec with Pillow < 11
+except ImportError:
+    pass
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_WIDTHS = (480, 960, 1920)
+DERIVATIVES_DIR = "derivatives"
+
+RASTER_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+VIDEO_EXTENSIONS = (".mp4", ".webm", ".ogg", ".avi", ".mov")
+
+# format -> (Pillow format name, save options)
+FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "avif": ("AVIF", {"quality": 60}),
+}
+
+CONTENT_TYPES = {"webp": "image/webp", "avif": "image/avif", "jpeg": "image/jpeg"}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def supported_formats():
+    Image.init()
+    return [fmt for fmt, (pil_format, _) in FORMATS.items() if pil_format in Image.SAVE]
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "MEDIA_DERIVATIVE_WORKERS", 2),
+                thread_name_prefix="media-derivatives",
+            )
+        return _executor
+
+
+def _run_in_worker(image_id):
+    close_old_connections()
+    try:
+        generate_derivatives(image_id)
+    except Exception:
+        logger.exception("Derivative generation failed for IndicatorImage %s", image_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_derivatives(image_id):
+    """Render derivatives for an IndicatorImage in the background once the transaction commits."""
+    if not getattr(settings, "MEDIA_DERIVATIVES_ENABLED", True):
+        return
+    transaction.on_commit(lambda: _get_executor().submit(_run_in_worker, image_id))
+
+
+def _save_rendition(source, width, fmt, target):
+    pil_format, options = FORMATS[fmt]
+    height = max(1, round(source.height * width / source.width))
+    resized = source.resize((width, height), Image.LANCZOS)
+    tmp = target + ".tmp"
+    resized.save(tmp, format=pil_format, **options)
+    os.replace(tmp, target)
+    return height
+
+
+def _extract_poster(video_path, target):
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        return False
+    result = subprocess.run(
+        [ffmpeg, "-y", "-loglevel", "error", "-ss", "1", "-i", video_path, "-frames:v", "1", target],
+        capture_output=True,
+        timeout=120,
+    )
+    if result.returncode != 0 or not os.path.exists(target):
+        # Clips shorter than a second have no frame at 1s
+        result = subprocess.run(
+            [ffmpeg, "-y", "-loglevel", "error", "-i", video_path, "-frames:v", "1", target],
+            capture_output=True,
+            timeout=120,
+        )
+    return result.returncode == 0 and os.path.exists(target)
+
+
+def derivatives_dir(image_id):
+    """Absolute directory holding every derivative build of an IndicatorImage."""
+    return os.path.join(settings.MEDIA_ROOT, DERIVATIVES_DIR, str(image_id))
+
+
+def _prune_builds(image_id, builds=None):
+    """Remove the named derivative builds of an image (its whole directory for None)."""
+    image_dir = derivatives_dir(image_id)
+    if builds is None:
+        shutil.rmtree(image_dir, ignore_errors=True)
+        return
+    for build in builds:
+        path = os.path.join(image_dir, build)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.exists(path):
+            # Renditions written directly into image_dir by the older flat layout
+            os.remove(path)
+
+
+def generate_derivatives(image_id):
+    """
+    (Re)build the derivatives of one IndicatorImage synchronously.
+    Returns the IndicatorImageDerivative rows created.
+    """
+    image = IndicatorImage.objects.filter(id=image_id).first()
+    if image is None or not image.image:
+        return []
+
+    source_path = os.path.join(settings.MEDIA_ROOT, image.image.name)
+    ext = os.path.splitext(source_path)[1].lower()
+    if not os.path.exists(source_path) or ext not in RASTER_EXTENSIONS + VIDEO_EXTENSIONS:
+        return []
+
+    # A new build directory; earlier builds stay live until the new rows commit.
+    # Only builds that predate this run are pruned, so an overlapping run for the
+    # same image never loses its directory.
+    try:
+        stale = os.listdir(derivatives_dir(image.id))
+    except OSError:
+        stale = []
+    build = uuid.uuid4().hex[:12]
+    rel_dir = os.path.join(DERIVATIVES_DIR, str(image.id), build)
+    out_dir = os.path.join(settings.MEDIA_ROOT, rel_dir)
+    os.makedirs(out_dir)
+    try:
+        rows = _render_derivatives(image, source_path, ext, rel_dir, out_dir)
+    except BaseException:
+        shutil.rmtree(out_dir, ignore_errors=True)
+        raise
+
+    with transaction.atomic():
+        IndicatorImageDerivative.objects.filter(image=image).delete()
+        IndicatorImageDerivative.objects.bulk_create(rows)
+    # bulk_create sends no post_save: refresh the media index explicitly
+    from .media_resolution import invalidate_media_index
+
+    transaction.on_commit(invalidate_media_index)
+    transaction.on_commit(lambda: _prune_builds(image.id, stale if rows else stale + [build]))
+    logger.info("Generated %d derivatives for IndicatorImage %s", len(rows), image.id)
+    return rows
+
+
+def _render_derivatives(image, source_path, ext, rel_dir, out_dir):
+    """Render an image's derivatives into out_dir; returns unsaved IndicatorImageDerivative rows."""
+    rows = []
+    if ext in VIDEO_EXTENSIONS:
+        poster_name = "poster.jpg"
+        if not _extract_poster(source_path, os.path.join(out_dir, poster_name)):
+            return []
+        source_path = os.path.join(out_dir, poster_name)
+        with Image.open(source_path) as poster:
+            rows.append(
+                IndicatorImageDerivative(
+                    image=image,
+                    kind="poster",
+                    format="jpeg",
+                    width=poster.width,
+                    height=poster.height,
+                    file=os.path.join(rel_dir, poster_name),
+                )
+            )
+        kind = "poster"
+    else:
+        kind = "image"
+
+    with Image.open(source_path) as source:
+        source.load()
+        if source.mode not in ("RGB", "RGBA"):
+            source = source.convert("RGBA" if "transparency" in source.info else "RGB")
+        for fmt in supported_formats():
+            for width in DERIVATIVE_WIDTHS:
+                if width >= source.width:
+                    break
+                name = f"{kind}-{width}.{fmt}"
+                height = _save_rendition(source, width, fmt, os.path.join(out_dir, name))
+                rows.append(
+                    IndicatorImageDerivative(
+                        image=image,
+                        kind=kind,
+                        format=fmt,
+                        width=width,
+                        height=height,
+                        file=os.path.join(rel_dir, name),
+                    )
+                )
+    return rows
+
+
+def derivative_payload(derivatives):
+    """
+    {"srcset": [...], "poster": path or None} for get_image_data, from an
+    image's derivatives. srcset entries are {"url", "width", "type"}, narrowest first.
+    URLs are relative to MEDIA_URL, like image_data.
+    """
+    srcset = []
+    poster = None
+    for d in sorted(derivatives, key=lambda d: (d.width, d.format)):
+        if d.format == "jpeg" and d.kind == "poster":
+            poster = d.file.name
+            continue
+        srcset.append({"url": d.file.name, "width": d.width, "type": CONTENT_TYPES.get(d.format, "")})
+    return {"srcset": srcset, "poster": poster}
+
+
+def _on_image_deleted(sender, instance, **kwargs):
+    # Only once the delete commits: a rolled-back delete keeps its renditions
+    image_id = instance.id
+    transaction.on_commit(lambda: _prune_builds(image_id))
+
+
+def connect_signals():
+    post_delete.connect(_on_image_deleted, sender=IndicatorImage, dispatch_uid="media_derivatives_delete")
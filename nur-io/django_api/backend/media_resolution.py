@@ -0,0 +1,348 @@
+"""
+Resolve a presentation slide (or explicit indicator/scenario/type params) to the
+media file get_image_data would serve for it.
+
+Used to attach the current and next slide media to presentation broadcasts so
+displays can preload and switch without another get_image_data round-trip.
+
+The media index maps (table, indicator_id, scenario, type) to the resolved media
+so exact matches need no State/IndicatorData/IndicatorImage queries. Non-climate
+indicators are also indexed by their exact current state (see
+lookup_current_media), the way get_image_data resolves them outside prefetch. It is
+built on first use in each worker and rebuilt whenever the shared generation
+counter in the state store changes; saving or deleting any of the models it is
+built from bumps that counter (see connect_signals).
+"""
+
+import json
+import os
+import threading
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .climate_scenarios import (
+    DEFAULT_CLIMATE_SCENARIO,
+    DEFAULT_CLIMATE_TYPE,
+    get_scenario_key_for_display_name,
+)
+from .media_derivatives import derivative_payload
+from .models import Indicator, IndicatorData, IndicatorImage, IndicatorImageDerivative, State, Table
+from .state_store import get_state_store
+
+# Indicator name to ID mapping (same as get_image_data)
+INDICATOR_MAPPING = {"mobility": 1, "climate": 2, "land_use": 3}
+
+VIDEO_EXTENSIONS = (".mp4", ".webm", ".ogg", ".avi", ".mov")
+
+
+def slide_to_query(slide):
+    """
+    Translate a presentation slide into get_image_data query params.
+
+    Returns a dict with indicator, scenario, type and (for UGC slides)
+    ugc_indicator_id / state_id, or None for an invalid slide.
+    """
+    if not isinstance(slide, dict):
+        return None
+    indicator = slide.get("indicator")
+    state_name = slide.get("state")
+    if not indicator or not state_name:
+        return None
+
+    if indicator.startswith("ugc_"):
+        try:
+            ugc_indicator_id = int(indicator.replace("ugc_", ""))
+        except ValueError:
+            return None
+        return {
+            "indicator": indicator,
+            "scenario": None,
+            "type": None,
+            "ugc_indicator_id": ugc_indicator_id,
+            "state_id": slide.get("stateId"),
+        }
+
+    if indicator not in INDICATOR_MAPPING:
+        return None
+
+    slide_type = slide.get("type")
+    if indicator == "climate" and slide_type:
+        # Slides carry the display name (e.g. "Existing"); map it to the scenario key
+        scenario = get_scenario_key_for_display_name(state_name) or state_name.lower().replace(" ", "_")
+        return {"indicator": indicator, "scenario": scenario, "type": slide_type or "utci"}
+
+    return {"indicator": indicator, "scenario": state_name.lower(), "type": None}
+
+
+def media_path_for_image(image, is_ugc=False):
+    """Return (path relative to MEDIA_URL, media type) for an IndicatorImage."""
+    image_path = image.image.name
+    # UGC indicators already have ugc_indicators/ prefix from upload_to function;
+    # standard indicators may need indicators/ prefix added
+    valid_prefixes = ("indicators/", "ugc_indicators/")
+    if not any(image_path.startswith(p) for p in valid_prefixes):
+        image_path = f"ugc_indicators/{image_path}" if is_ugc else f"indicators/{image_path}"
+
+    file_extension = os.path.splitext(image_path)[1].lower()
+    return image_path, "video" if file_extension in VIDEO_EXTENSIONS else "image"
+
+
+def media_entry(image, is_ugc=False, derivatives=None):
+    """
+    get_image_data payload for an IndicatorImage: image_data and type, plus
+    srcset/poster when responsive derivatives exist (see media_derivatives).
+    """
+    image_path, media_type = media_path_for_image(image, is_ugc=is_ugc)
+    entry = {"image_data": image_path, "type": media_type}
+    if derivatives is None:
+        derivatives = list(image.derivatives.all())
+    if derivatives:
+        entry.update(derivative_payload(derivatives))
+    return entry
+
+
+MEDIA_INDEX_NAMESPACE = "media_index"
+MEDIA_INDEX_KEY = "generation"
+
+_index = None
+_index_generation = None
+_index_lock = threading.Lock()
+
+# Third element of (table, indicator_id, ...) keys for indicators without states
+# (has_states=False), which get_image_data always resolves to the {} state
+STATELESS = ("state_values", "*")
+
+
+def state_values_key(state_values):
+    """Third element of the index key for an exact state_values match (key order ignored)."""
+    return ("state_values", json.dumps(state_values, sort_keys=True))
+
+
+def build_media_index():
+    """
+    Precompute {(table, indicator_id, scenario, type): media} for every exact
+    match get_image_data can resolve. Climate indicators are keyed by
+    (scenario_name, scenario_type); other indicators by state_values["scenario"]
+    with type None. As in get_image_data, the first State (by id) for a scenario
+    wins, then the first IndicatorData for it and its newest IndicatorImage.
+
+    Non-climate indicators also get (table, indicator_id, state_values_key(values))
+    entries for the first State with exactly those values, or a single
+    (table, indicator_id, STATELESS) entry (None if nothing resolves) when they
+    have no states.
+    """
+    climate_states = {}
+    scenario_states = {}
+    exact_states = {}
+    for state_id, scenario_name, scenario_type, scenario, state_values in State.objects.order_by(
+        "id"
+    ).values_list("id", "scenario_name", "scenario_type", "scenario_key", "state_values"):
+        if scenario_name:
+            climate_states.setdefault((scenario_name, scenario_type), state_id)
+        if scenario is not None:
+            scenario_states.setdefault(scenario, state_id)
+        exact_states.setdefault(state_values_key(state_values), state_id)
+
+    data_by_indicator_state = {}
+    for data_id, indicator_id, state_id in IndicatorData.objects.order_by("id").values_list(
+        "id", "indicator_id", "state_id"
+    ):
+        data_by_indicator_state.setdefault((indicator_id, state_id), data_id)
+
+    image_by_data = {}
+    # Default ordering (newest upload first) matches the .first() used by get_image_data
+    for image in IndicatorImage.objects.only("id", "image", "indicatorData_id", "uploaded_at"):
+        if image.image:
+            image_by_data.setdefault(image.indicatorData_id, image)
+
+    derivatives_by_image = {}
+    for derivative in IndicatorImageDerivative.objects.all():
+        derivatives_by_image.setdefault(derivative.image_id, []).append(derivative)
+
+    def entry_for(indicator, state_id):
+        data_id = data_by_indicator_state.get((indicator.id, state_id))
+        image = image_by_data.get(data_id) if data_id else None
+        if image is None:
+            return None
+        return {
+            **media_entry(
+                image,
+                is_ugc=indicator.is_user_generated,
+                derivatives=derivatives_by_image.get(image.id, []),
+            ),
+            "is_user_generated": indicator.is_user_generated,
+        }
+
+    index = {}
+    for indicator in Indicator.objects.select_related("table").order_by("id"):
+        table_name = indicator.table.name
+        if indicator.category == "climate":
+            candidates = list(climate_states.items())
+        else:
+            candidates = [((scenario, None), state_id) for scenario, state_id in scenario_states.items()]
+            if indicator.has_states:
+                for values_key, state_id in exact_states.items():
+                    entry = entry_for(indicator, state_id)
+                    if entry:
+                        index.setdefault((table_name, indicator.indicator_id, values_key), entry)
+            else:
+                empty_state_id = exact_states.get(state_values_key({}))
+                index.setdefault(
+                    (table_name, indicator.indicator_id, STATELESS),
+                    entry_for(indicator, empty_state_id) if empty_state_id else None,
+                )
+
+        for (scenario, scenario_type), state_id in candidates:
+            key = (table_name, indicator.indicator_id, scenario, scenario_type)
+            if key in index:
+                continue
+            entry = entry_for(indicator, state_id)
+            if entry:
+                index[key] = entry
+    return index
+
+
+def get_media_index():
+    """Return this worker's media index, rebuilding it if the shared generation moved."""
+    global _index, _index_generation
+    _, generation = get_state_store().get(MEDIA_INDEX_NAMESPACE, MEDIA_INDEX_KEY)
+    with _index_lock:
+        if _index is None or _index_generation != generation:
+            _index = build_media_index()
+            _index_generation = generation
+        return _index
+
+
+def reset_media_index():
+    """Drop this worker's cached index so the next lookup rebuilds it (tests)."""
+    global _index, _index_generation
+    with _index_lock:
+        _index = None
+        _index_generation = None
+
+
+def invalidate_media_index():
+    """Bump the shared generation so every worker rebuilds its index on next use."""
+    get_state_store().update(MEDIA_INDEX_NAMESPACE, MEDIA_INDEX_KEY, lambda data: None, dict)
+
+
+def lookup_media(table_name, indicator_id, scenario, scenario_type=None):
+    """Return a copy of the indexed media for an exact match, or None."""
+    entry = get_media_index().get((table_name, indicator_id, scenario, scenario_type))
+    return dict(entry) if entry else None
+
+
+def lookup_current_media(table_name, indicator_id, state_values):
+    """
+    Return a copy of the indexed media for a non-climate indicator's current
+    state outside prefetch mode (exact state_values match, or the {} state for
+    indicators without states), or None when get_image_data must resolve it.
+    """
+    index = get_media_index()
+    stateless_key = (table_name, indicator_id, STATELESS)
+    if stateless_key in index:
+        entry = index[stateless_key]
+    else:
+        entry = index.get((table_name, indicator_id, state_values_key(state_values)))
+    return dict(entry) if entry else None
+
+
+def _on_media_source_changed(sender, **kwargs):
+    # Rebuild from committed rows only, otherwise another worker could cache stale data
+    transaction.on_commit(invalidate_media_index)
+
+
+def connect_signals():
+    for model in (Indicator, IndicatorData, IndicatorImage, IndicatorImageDerivative, State, Table):
+        post_save.connect(_on_media_source_changed, sender=model, dispatch_uid=f"media_index_save_{model.__name__}")
+        post_delete.connect(_on_media_source_changed, sender=model, dispatch_uid=f"media_index_delete_{model.__name__}")
+
+
+def _resolve_state(indicator_obj, scenario, scenario_type, state_id):
+    if state_id:
+        return State.objects.filter(id=state_id).first()
+
+    if indicator_obj.category == "climate":
+        state = None
+        if scenario:
+            state = State.objects.filter(
+                scenario_name=scenario, scenario_type=scenario_type or "utci"
+            ).first()
+        if not state:
+            state = State.objects.filter(
+                scenario_name=DEFAULT_CLIMATE_SCENARIO,
+                scenario_type=DEFAULT_CLIMATE_TYPE,
+            ).first()
+        return state
+
+    return State.matching(scenario=scenario).first()
+
+
+def resolve_media(table_name, indicator, scenario=None, scenario_type=None, ugc_indicator_id=None, state_id=None):
+    """
+    Resolve explicit request params to {"image_data": path, "type": ...}.
+    Mirrors get_image_data in prefetch mode; returns None when nothing matches.
+    """
+    table = Table.objects.filter(name=table_name).first()
+    if not table:
+        return None
+
+    is_ugc = ugc_indicator_id is not None
+    if not is_ugc and indicator in INDICATOR_MAPPING:
+        entry = lookup_media(
+            table_name,
+            INDICATOR_MAPPING[indicator],
+            scenario,
+            (scenario_type or "utci") if indicator == "climate" else None,
+        )
+        if entry:
+            return {"image_data": entry["image_data"], "type": entry["type"]}
+
+    if is_ugc:
+        indicator_obj = Indicator.objects.filter(id=ugc_indicator_id, table=table).first()
+    else:
+        indicator_obj = Indicator.objects.filter(
+            table=table, indicator_id=INDICATOR_MAPPING.get(indicator)
+        ).first()
+    if not indicator_obj:
+        return None
+
+    state = _resolve_state(indicator_obj, scenario, scenario_type, state_id)
+    if not state:
+        if is_ugc and state_id:
+            return None
+        state = State.objects.first()
+        if not state:
+            return None
+
+    indicator_data = IndicatorData.objects.filter(indicator=indicator_obj, state=state).first()
+    if not indicator_data:
+        indicator_data = IndicatorData.objects.filter(indicator=indicator_obj).first()
+    if not indicator_data:
+        return None
+
+    image = IndicatorImage.objects.filter(indicatorData=indicator_data).first()
+    if not image or not image.image:
+        return None
+
+    return media_entry(image, is_ugc=is_ugc)
+
+
+def resolve_slide_media(table_name, slide):
+    """Resolve a presentation slide to its media dict, or None."""
+    query = slide_to_query(slide)
+    if not query:
+        return None
+    try:
+        return resolve_media(
+            table_name,
+            query["indicator"],
+            query["scenario"],
+            query["type"],
+            ugc_indicator_id=query.get("ugc_indicator_id"),
+            state_id=query.get("state_id"),
+        )
+    except Exception as e:
+        print(f"⚠️ Could not resolve media for slide {slide} (table: {table_name}): {e}")
+        return None
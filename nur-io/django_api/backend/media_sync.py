@@ -0,0 +1,197 @@
+"""
+Incremental one-way sync of processed files (layers, PMTiles, climate and
+mobility media) into the media volume served by nginx.
+
+Each destination keeps a manifest (``.media-sync.json``) of the files it
+received: relative path -> [size, mtime_ns, sha256]. A file is only
+transferred when its size or content differs; a changed mtime with identical
+content just updates the manifest. Transfers hard-link when source and
+destination share a filesystem and otherwise copy (preserving mtime). Either
+way the new file is written under a temporary name and renamed over the old
+one, so nginx never serves a partial file. Files that were synced earlier but
+have disappeared from the source are deleted; anything else in the
+destination (files from other sources, uploads) is left alone.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from collections import namedtuple
+from pathlib import Path
+
+from django.conf import settings
+
+MANIFEST_NAME = ".media-sync.json"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+SyncResult = namedtuple("SyncResult", ["placed", "unchanged", "deleted"])
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def media_sync_pairs():
+    """(source, destination) directories mirrored into media on start."""
+    base = Path(settings.BASE_DIR)
+    dest = Path(settings.MEDIA_ROOT) / "indicators" / "processed"
+    idistrict = base / "public_idistrict" / "processed"
+    return [
+        (base / "public" / "processed", dest),
+        (idistrict / "mobility", dest / "mobility"),
+        (idistrict / "climate", dest / "climate"),
+    ]
+
+
+def _read_manifest(dest):
+    try:
+        with open(os.path.join(dest, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f).get("files", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def synced_listing(dest):
+    """
+    Sorted [(relative path, size, mtime_ns)] of the files dest's manifest says
+    were synced there (None for those that have gone missing since).
+    """
+    listing = []
+    for rel in sorted(_read_manifest(dest)):
+        try:
+            stat = os.stat(os.path.join(dest, *rel.split("/")))
+            listing.append((rel, stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            listing.append((rel, None, None))
+    return listing
+
+
+def _write_manifest(dest, files):
+    path = os.path.join(dest, MANIFEST_NAME)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"files": files}, f, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def _place(source, dest, link):
+    """Link or copy source to a temp name next to dest, then rename it over dest."""
+    tmp = f"{dest}.sync-tmp"
+    if os.path.lexists(tmp):
+        os.remove(tmp)
+    try:
+        if link:
+            try:
+                os.link(source, tmp)
+                os.replace(tmp, dest)
+                return
+            except OSError:
+                # Different filesystem (bind-mounted public/ vs the media volume)
+                pass
+        shutil.copy2(source, tmp)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, dest)
+    except BaseException:
+        if os.path.lexists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _is_current(src_stat, dst_path, entry, src_path):
+    """Whether dst_path already holds src_path's content; may hash. Returns (current, sha256 or None)."""
+    try:
+        dst_stat = os.stat(dst_path)
+    except FileNotFoundError:
+        return False, None
+    if (dst_stat.st_dev, dst_stat.st_ino) == (src_stat.st_dev, src_stat.st_ino):
+        return True, entry[2] if entry and entry[:2] == [src_stat.st_size, src_stat.st_mtime_ns] else None
+    if dst_stat.st_size != src_stat.st_size:
+        return False, None
+    if entry and entry[:2] == [src_stat.st_size, src_stat.st_mtime_ns]:
+        return True, entry[2]
+    # Same size but unknown or touched source: compare content
+    src_hash = file_sha256(src_path)
+    if entry and entry[2] == src_hash:
+        return True, src_hash
+    return file_sha256(dst_path) == src_hash, src_hash
+
+
+def sync_tree(source, dest, link=True, delete_orphans=True):
+    """
+    Sync every file under source into dest (see module docstring).
+    Returns SyncResult(placed, unchanged, deleted).
+    """
+    source, dest = str(source), str(dest)
+    old_manifest = _read_manifest(dest)
+    new_manifest = {}
+    placed = unchanged = 0
+
+    for dirpath, dirnames, filenames in os.walk(source):
+        dirnames.sort()
+        target_dir = os.path.join(dest, os.path.relpath(dirpath, source))
+        if not os.path.isdir(target_dir):
+            os.makedirs(target_dir)
+            os.chmod(target_dir, 0o755)
+        for name in sorted(filenames):
+            src = os.path.join(dirpath, name)
+            rel = os.path.relpath(src, source).replace(os.sep, "/")
+            if rel == MANIFEST_NAME:
+                continue
+            dst = os.path.join(target_dir, name)
+            src_stat = os.stat(src)
+            current, sha = _is_current(src_stat, dst, old_manifest.get(rel), src)
+            if current:
+                unchanged += 1
+            else:
+                _place(src, dst, link)
+                placed += 1
+            new_manifest[rel] = [src_stat.st_size, src_stat.st_mtime_ns, sha or file_sha256(src)]
+
+    deleted = 0
+    if delete_orphans:
+        for rel in sorted(set(old_manifest) - set(new_manifest)):
+            path = os.path.join(dest, *rel.split("/"))
+            if os.path.isfile(path):
+                os.remove(path)
+                deleted += 1
+            _prune_empty_dirs(os.path.dirname(path), dest)
+    else:
+        # Keep tracking orphans so a later run with deletion still removes them
+        for rel, entry in old_manifest.items():
+            new_manifest.setdefault(rel, entry)
+
+    if new_manifest or old_manifest:
+        os.makedirs(dest, exist_ok=True)
+        _write_manifest(dest, new_manifest)
+    return SyncResult(placed, unchanged, deleted)
+
+
+def _prune_empty_dirs(directory, root):
+    root = os.path.abspath(root)
+    directory = os.path.abspath(directory)
+    while directory != root and directory.startswith(root + os.sep):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            return
+        directory = os.path.dirname(directory)
+
+
+def sync_media(stdout=None):
+    """Sync every media_sync_pairs() source that exists; returns {source: SyncResult}."""
+    results = {}
+    for source, dest in media_sync_pairs():
+        if not source.is_dir():
+            continue
+        results[source] = result = sync_tree(source, dest)
+        if stdout is not None:
+            stdout.write(
+                f"  {source} -> {dest}: {result.placed} updated, "
+                f"{result.unchanged} unchanged, {result.deleted} deleted"
+            )
+    return results
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.27 on 2026-10-19 04:04
+
+from django.db import migrations, models
+
+
+def backfill_layer_state_group_id_layer_key(apps, schema_editor):
+    LayerState = apps.get_model('backend', 'LayerState')
+    to_update = []
+    for state in LayerState.objects.only('id', 'layer_id').iterator():
+        layer_id = state.layer_id or ''
+        if '.' in layer_id:
+            state.group_id, state.layer_key = layer_id.split('.', 1)
+        else:
+            state.group_id, state.layer_key = '', layer_id
+        to_update.append(state)
+    LayerState.objects.bulk_update(to_update, ['group_id', 'layer_key'], batch_size=500)
+
+
+def noop_reverse(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0015_otefviewportstate_projection_slideshow'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='layerstate',
+            name='group_id',
+            field=models.CharField(blank=True, default='', help_text='Layer pack ID (part of layer_id before the first dot)', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='layerstate',
+            name='layer_key',
+            field=models.CharField(blank=True, default='', help_text='Layer ID within its group (part of layer_id after the first dot)', max_length=200),
+        ),
+        migrations.RunPython(backfill_layer_state_group_id_layer_key, noop_reverse),
+        migrations.AddIndex(
+            model_name='layerstate',
+            index=models.Index(fields=['table', 'group_id'], name='backend_lay_table_i_0bda1a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='layerstate',
+            index=models.Index(fields=['table', 'layer_key'], name='backend_lay_table_i_5c8969_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.27 on 2026-10-19 04:13
+
+from django.db import migrations, models
+
+
+def backfill_state_year_scenario_key(apps, schema_editor):
+    State = apps.get_model('backend', 'State')
+    to_update = []
+    for state in State.objects.only('id', 'state_values').iterator():
+        values = state.state_values if isinstance(state.state_values, dict) else {}
+        year = values.get('year')
+        scenario = values.get('scenario')
+        state.year = year if isinstance(year, int) and not isinstance(year, bool) else None
+        state.scenario_key = scenario if isinstance(scenario, str) else None
+        to_update.append(state)
+    State.objects.bulk_update(to_update, ['year', 'scenario_key'], batch_size=500)
+
+
+def noop_reverse(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0016_layerstate_group_id_layer_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='state',
+            name='scenario_key',
+            field=models.CharField(blank=True, help_text="state_values['scenario'] when it is a string", max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='state',
+            name='year',
+            field=models.IntegerField(blank=True, help_text="state_values['year'] when it is an integer", null=True),
+        ),
+        migrations.RunPython(backfill_state_year_scenario_key, noop_reverse),
+        migrations.AddIndex(
+            model_name='state',
+            index=models.Index(fields=['year', 'scenario_key'], name='state_year_scenario_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='state',
+            index=models.Index(fields=['scenario_key'], name='state_scenario_key_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.27 on 2026-10-19 04:16
+
+import hashlib
+import json
+
+from django.db import migrations, models
+
+
+def backfill_gislayer_data_hash(apps, schema_editor):
+    GISLayer = apps.get_model('backend', 'GISLayer')
+    to_update = []
+    for layer in GISLayer.objects.only('id', 'data').iterator():
+        if layer.data:
+            canonical = json.dumps(layer.data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+            layer.data_hash = hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+        else:
+            layer.data_hash = ''
+        to_update.append(layer)
+    GISLayer.objects.bulk_update(to_update, ['data_hash'], batch_size=100)
+
+
+def noop_reverse(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0017_state_year_scenario_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gislayer',
+            name='data_hash',
+            field=models.CharField(blank=True, default='', help_text='Content hash of data; versions the cached GeoJSON URL', max_length=64),
+        ),
+        migrations.RunPython(backfill_gislayer_data_hash, noop_reverse),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.27 on 2026-10-19 09:02
+
+from django.db import migrations, models
+
+# Existing rows are backfilled by 0024 (with its own frozen copy of the
+# simplification), not by importing backend.simplify here.
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0018_gislayer_data_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gislayer',
+            name='simplified_data',
+            field=models.JSONField(blank=True, default=dict, help_text='Simplified copies of data: {source_hash, levels: {tolerance: FeatureCollection}}'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.27 on 2026-10-19 10:40
+
+from django.db import migrations
+
+# Same mapping as IndicatorImage.EXTENSION_MEDIA_TYPES
+EXTENSION_MEDIA_TYPES = {
+    'mp4': 'video',
+    'webm': 'video',
+    'ogg': 'video',
+    'avi': 'video',
+    'mov': 'video',
+    'html': 'html_map',
+    'htm': 'html_map',
+    'json': 'deckgl_layer',
+}
+
+
+def backfill_indicatorimage_media_type(apps, schema_editor):
+    IndicatorImage = apps.get_model('backend', 'IndicatorImage')
+    to_update = []
+    for image in IndicatorImage.objects.only('id', 'image', 'media_type').iterator():
+        name = image.image.name if image.image else ''
+        ext = name.rsplit('.', 1)[-1].lower() if '.' in name else ''
+        media_type = EXTENSION_MEDIA_TYPES.get(ext, image.media_type)
+        if media_type != image.media_type:
+            image.media_type = media_type
+            to_update.append(image)
+    IndicatorImage.objects.bulk_update(to_update, ['media_type'], batch_size=500)
+
+
+def noop_reverse(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0019_gislayer_simplified_data'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_indicatorimage_media_type, noop_reverse),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.27 on 2026-10-19 04:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0020_indicatorimage_media_type_backfill'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndicatorImageDerivative',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('image', 'Image'), ('poster', 'Video poster')], default='image', max_length=10)),
+                ('format', models.CharField(help_text='webp, avif or jpeg', max_length=10)),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('file', models.FileField(max_length=500, upload_to='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('image', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='derivatives', to='backend.indicatorimage')),
+            ],
+            options={
+                'ordering': ['image', 'width', 'format'],
+                'unique_together': {('image', 'kind', 'format', 'width')},
+            },
+        ),
+    ]
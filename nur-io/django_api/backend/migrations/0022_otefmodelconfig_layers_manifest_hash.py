@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-19 04:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0021_indicatorimagederivative'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='otefmodelconfig',
+            name='layers_manifest_hash',
+            field=models.CharField(blank=True, default='', help_text='SHA-256 of the layer pack manifests last seeded by import_otef_data', max_length=64),
+        ),
+    ]
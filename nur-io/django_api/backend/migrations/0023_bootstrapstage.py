@@ -0,0 +1,26 @@
+# Generated by Django 4.2.27 on 2026-10-19 04:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0022_otefmodelconfig_layers_manifest_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BootstrapStage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('duration', models.FloatField(default=0, help_text='Seconds the last run of this stage took')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Marks every GISLayer's simplified_data stale so it is rebuilt with
+# topology-preserving simplification. This also covers layers created before
+# simplified_data existed; 0019 only adds the field.
+#
+# Building the variants here would check every simplified ring (seconds per
+# large layer, for every layer, inside the migration). Instead they are
+# rebuilt in the background by backend.layer_variants the first time one of a
+# layer's levels is requested; full detail is served until then.
+
+from django.db import migrations
+
+
+def clear_gislayer_simplified_data(apps, schema_editor):
+    GISLayer = apps.get_model('backend', 'GISLayer')
+    GISLayer.objects.update(simplified_data={})
+
+
+def noop_reverse(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0023_bootstrapstage'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_gislayer_simplified_data, noop_reverse),
+    ]
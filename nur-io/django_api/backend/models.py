@@ -1,4 +1,6 @@
 from django.db import models
+import hashlib
+import json
 import os
 from django.utils import timezone
 
@@ -104,6 +106,10 @@ def __str__(self):
         return f"{self.table.name}/{self.name}"
 
 
+# Sentinel for "don't filter on this field" in State.matching
+_ANY = object()
+
+
 class State(models.Model):
     id = models.AutoField(primary_key=True)
     state_values = models.JSONField(
@@ -125,14 +131,85 @@ class State(models.Model):
         default=False,
         help_text="Whether this state was created by a user (vs preloaded system data)",
     )
+    # Copies of state_values["year"] / ["scenario"] so lookups can use an index
+    # instead of scanning every row; kept in sync by save()
+    year = models.IntegerField(
+        blank=True,
+        null=True,
+        help_text="state_values['year'] when it is an integer",
+    )
+    scenario_key = models.CharField(
+        max_length=100,
+        blank=True,
+        null=True,
+        help_text="state_values['scenario'] when it is a string",
+    )
 
     class Meta:
         indexes = [
             models.Index(
                 fields=["scenario_type", "scenario_name"], name="state_scenario_idx"
             ),
+            models.Index(fields=["year", "scenario_key"], name="state_year_scenario_idx"),
+            models.Index(fields=["scenario_key"], name="state_scenario_key_idx"),
         ]
 
+    @staticmethod
+    def extract_lookup_values(state_values):
+        """Return (year, scenario_key) for the given state_values dict."""
+        state_values = state_values if isinstance(state_values, dict) else {}
+        year = state_values.get("year")
+        scenario = state_values.get("scenario")
+        return (
+            year if isinstance(year, int) and not isinstance(year, bool) else None,
+            scenario if isinstance(scenario, str) else None,
+        )
+
+    @classmethod
+    def matching(cls, year=_ANY, scenario=_ANY):
+        """
+        States whose state_values year/scenario equal the given values, ordered by id.
+        Equivalent to comparing state_values.get("year"/"scenario") in Python,
+        but served by the indexed columns. None matches a missing key or JSON
+        null (not other values the columns leave empty, like a float year).
+        """
+        queryset = cls.objects.all()
+        if year is not _ANY:
+            year_value, _ = cls.extract_lookup_values({"year": year})
+            if year is None:
+                queryset = queryset.filter(year=None).filter(
+                    models.Q(state_values__year__isnull=True) | models.Q(state_values__year=None)
+                )
+            elif year_value is None:
+                # Non-integer years aren't copied to the column; match on the JSON key
+                queryset = queryset.filter(year=None, state_values__year=year)
+            else:
+                queryset = queryset.filter(year=year_value)
+        if scenario is not _ANY:
+            _, scenario_value = cls.extract_lookup_values({"scenario": scenario})
+            if scenario is None:
+                queryset = queryset.filter(scenario_key=None).filter(
+                    models.Q(state_values__scenario__isnull=True)
+                    | models.Q(state_values__scenario=None)
+                )
+            elif scenario_value is None:
+                queryset = queryset.filter(scenario_key=None, state_values__scenario=scenario)
+            else:
+                queryset = queryset.filter(scenario_key=scenario_value)
+        return queryset.order_by("id")
+
+    def save(self, *args, **kwargs):
+        """Keep year/scenario_key in sync with state_values."""
+        self.year, self.scenario_key = self.extract_lookup_values(self.state_values)
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "state_values" in update_fields:
+            kwargs["update_fields"] = list(
+                set(update_fields) | {"year", "scenario_key"}
+            )
+
+        super().save(*args, **kwargs)
+
     def __str__(self):
         if self.scenario_name:
             return f"{self.scenario_name} ({self.scenario_type})"
@@ -179,6 +256,33 @@ class IndicatorImage(models.Model):
     )
     uploaded_at = models.DateTimeField(default=timezone.now)
 
+    # File extension -> media_type; other extensions keep the stored value
+    EXTENSION_MEDIA_TYPES = {
+        "mp4": "video",
+        "webm": "video",
+        "ogg": "video",
+        "avi": "video",
+        "mov": "video",
+        "html": "html_map",
+        "htm": "html_map",
+        "json": "deckgl_layer",
+    }
+
+    @classmethod
+    def infer_media_type(cls, file_name, default="image"):
+        """media_type implied by file_name's extension, else default."""
+        ext = file_name.rsplit(".", 1)[-1].lower() if file_name and "." in file_name else ""
+        return cls.EXTENSION_MEDIA_TYPES.get(ext, default)
+
+    def save(self, *args, **kwargs):
+        """Persist the media type implied by the file extension."""
+        if self.image:
+            self.media_type = self.infer_media_type(self.image.name, self.media_type)
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None and "image" in update_fields:
+                kwargs["update_fields"] = list(set(update_fields) | {"media_type"})
+        super().save(*args, **kwargs)
+
     def __str__(self):
         indicator_name = self.indicatorData.indicator.name
         return f"{self.media_type.title()} for {indicator_name}"
@@ -187,6 +291,36 @@ class Meta:
         ordering = ["-uploaded_at"]
 
 
+class IndicatorImageDerivative(models.Model):
+    """
+    A resized or transcoded rendition of an IndicatorImage (see media_derivatives).
+    Video uploads get a JPEG poster plus resized renditions of it.
+    """
+
+    KIND_CHOICES = [
+        ("image", "Image"),
+        ("poster", "Video poster"),
+    ]
+
+    id = models.AutoField(primary_key=True)
+    image = models.ForeignKey(
+        IndicatorImage, on_delete=models.CASCADE, related_name="derivatives"
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default="image")
+    format = models.CharField(max_length=10, help_text="webp, avif or jpeg")
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    file = models.FileField(max_length=500)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["image", "width", "format"]
+        unique_together = [["image", "kind", "format", "width"]]
+
+    def __str__(self):
+        return f"{self.format} {self.width}px of image {self.image_id}"
+
+
 class DashboardFeedState(models.Model):
     id = models.AutoField(primary_key=True)
     state = models.ForeignKey(
@@ -249,6 +383,17 @@ class GISLayer(models.Model):
     style_config = models.JSONField(default=dict)
     is_active = models.BooleanField(default=True)
     order = models.IntegerField(default=0)
+    data_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        default="",
+        help_text="Content hash of data; versions the cached GeoJSON URL",
+    )
+    simplified_data = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Simplified copies of data: {source_hash, levels: {tolerance: FeatureCollection}}",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -256,6 +401,35 @@ class Meta:
         unique_together = [["table", "name", "project_name"]]
         ordering = ["order", "name"]
 
+    @staticmethod
+    def compute_data_hash(data):
+        """SHA-256 of the canonical JSON form of data ("" when there is no data)."""
+        if not data:
+            return ""
+        canonical = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def save(self, *args, **kwargs):
+        """
+        Keep data_hash in sync with data. Stale simplified variants are cleared
+        and rebuilt after commit, off the request path (see layer_variants).
+        """
+        from .layer_variants import schedule_variants
+
+        self.data_hash = self.compute_data_hash(self.data)
+
+        update_fields = kwargs.get("update_fields")
+        data_saved = update_fields is None or "data" in update_fields
+        stale = data_saved and (self.simplified_data or {}).get("source_hash") != self.data_hash
+        if stale:
+            self.simplified_data = {}
+        if update_fields is not None and "data" in update_fields:
+            kwargs["update_fields"] = list(set(update_fields) | {"data_hash", "simplified_data"})
+
+        super().save(*args, **kwargs)
+        if stale:
+            schedule_variants(self.id)
+
     def __str__(self):
         project_part = (
             f"/{self.project_name}" if getattr(self, "project_name", "") else ""
@@ -337,6 +511,12 @@ class OTEFModelConfig(models.Model):
     )
     calibration_data = models.JSONField(default=dict)
     coordinate_system = models.CharField(max_length=50, default="EPSG:2039")
+    layers_manifest_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        default="",
+        help_text="SHA-256 of the layer pack manifests last seeded by import_otef_data",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -600,6 +780,9 @@ class LayerState(models.Model):
     """
     Represents the visibility state of an individual layer within a group.
     Layer ID format: "{group_id}.{layer_id}" (e.g., "map_3_future.mimushim")
+
+    group_id and layer_key are derived from layer_id on save so group-scoped
+    queries can use indexed equality lookups instead of layer_id prefix scans.
     """
 
     id = models.AutoField(primary_key=True)
@@ -609,6 +792,18 @@ class LayerState(models.Model):
     layer_id = models.CharField(
         max_length=200, help_text="Full layer ID: group_id.layer_id"
     )
+    group_id = models.CharField(
+        max_length=100,
+        blank=True,
+        default="",
+        help_text="Layer pack ID (part of layer_id before the first dot)",
+    )
+    layer_key = models.CharField(
+        max_length=200,
+        blank=True,
+        default="",
+        help_text="Layer ID within its group (part of layer_id after the first dot)",
+    )
     enabled = models.BooleanField(
         default=False, help_text="Whether this specific layer is visible"
     )
@@ -619,8 +814,54 @@ class Meta:
         unique_together = [["table", "layer_id"]]
         indexes = [
             models.Index(fields=["table", "layer_id"]),
+            models.Index(fields=["table", "group_id"]),
+            models.Index(fields=["table", "layer_key"]),
         ]
         ordering = ["layer_id"]
 
+    @staticmethod
+    def split_layer_id(layer_id):
+        """
+        Split a full layer ID into (group_id, layer_key).
+        IDs without a dot have no group and use the whole ID as the key.
+        """
+        layer_id = str(layer_id or "")
+        if "." not in layer_id:
+            return "", layer_id
+        group_id, layer_key = layer_id.split(".", 1)
+        return group_id, layer_key
+
+    def save(self, *args, **kwargs):
+        """Keep group_id/layer_key in sync with layer_id."""
+        self.group_id, self.layer_key = self.split_layer_id(self.layer_id)
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "layer_id" in update_fields:
+            kwargs["update_fields"] = list(
+                set(update_fields) | {"group_id", "layer_key"}
+            )
+
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.table.name}/{self.layer_id}"
+
+
+class BootstrapStage(models.Model):
+    """
+    Input fingerprint of a container bootstrap stage's last successful run.
+    The bootstrap command skips stages whose inputs are unchanged.
+    """
+
+    name = models.CharField(max_length=100, unique=True)
+    fingerprint = models.CharField(max_length=64)
+    duration = models.FloatField(
+        default=0, help_text="Seconds the last run of this stage took"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self):
+        return self.name
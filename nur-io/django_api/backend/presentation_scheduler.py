@@ -0,0 +1,125 @@
+"""
+Server-driven presentation playback.
+
+A single asyncio task per ASGI process polls the shared presentation state and
+advances playing presentations once their ``next_advance_at`` deadline passes.
+The advance is done inside an atomic state store update that re-checks the
+deadline, so when several workers run the scheduler only one of them moves a
+given slide forward.
+
+The task is started lazily by PresentationSchedulerMiddleware on the first
+ASGI connection (Daphne has no lifespan events).
+"""
+
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from . import globals
+
+# How often the scheduler checks for due slides (seconds)
+TICK_SECONDS = 0.5
+
+_task = None
+
+
+def scheduler_enabled():
+    return getattr(settings, "PRESENTATION_SCHEDULER_ENABLED", True)
+
+
+def schedule_next_advance(state, now=None):
+    """Set (or clear) state["next_advance_at"] from is_playing and duration."""
+    if state.get("is_playing") and state.get("sequence"):
+        now = time.time() if now is None else now
+        state["next_advance_at"] = now + max(1, int(state.get("duration") or 1))
+    else:
+        state["next_advance_at"] = None
+
+
+def _is_due(state, now):
+    deadline = state.get("next_advance_at")
+    return bool(
+        state.get("is_playing")
+        and state.get("sequence")
+        and deadline is not None
+        and deadline <= now
+    )
+
+
+def advance_due_presentations(now=None):
+    """
+    Advance every playing presentation whose slide deadline has passed.
+    Returns the list of table names that were advanced.
+    """
+    from .views import broadcast_presentation_update, sync_indicator_from_presentation_slide
+
+    now = time.time() if now is None else now
+    advanced = []
+    for table_name in globals.get_presentation_tables():
+        if not _is_due(globals.get_presentation_state(table_name), now):
+            continue
+
+        result = {}
+
+        def _advance(state):
+            # The store may call this again on a write conflict: start every attempt afresh
+            result["advanced"] = False
+            # Re-check inside the atomic update: another worker may have advanced already
+            if not _is_due(state, now):
+                return
+            state["sequence_index"] = (state.get("sequence_index", 0) + 1) % len(state["sequence"])
+            schedule_next_advance(state, now)
+            result["advanced"] = True
+
+        state = globals.update_presentation_state(table_name, mutator=_advance)
+        if not result["advanced"]:
+            continue
+
+        print(f"⏭️ Presentation auto-advanced to slide {state['sequence_index'] + 1}/{len(state['sequence'])} (table: {table_name})")
+        sync_indicator_from_presentation_slide(table_name, state)
+        broadcast_presentation_update(table_name)
+        advanced.append(table_name)
+    return advanced
+
+
+def _scheduler_tick():
+    """One scheduler pass in a worker thread, without leaking or reusing stale DB connections."""
+    close_old_connections()
+    try:
+        return advance_due_presentations()
+    finally:
+        close_old_connections()
+
+
+async def run_presentation_scheduler(tick=TICK_SECONDS):
+    """Poll loop; runs for the lifetime of the ASGI process."""
+    while True:
+        try:
+            await sync_to_async(_scheduler_tick, thread_sensitive=False)()
+        except Exception as e:
+            print(f"❌ Presentation scheduler error: {e}")
+        await asyncio.sleep(tick)
+
+
+def ensure_scheduler_started():
+    """Start the scheduler task on the running event loop if it isn't running yet."""
+    global _task
+    if not scheduler_enabled():
+        return
+    if _task is not None and not _task.done():
+        return
+    _task = asyncio.get_running_loop().create_task(run_presentation_scheduler())
+
+
+class PresentationSchedulerMiddleware:
+    """ASGI middleware that starts the presentation scheduler on first use."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        ensure_scheduler_started()
+        return await self.app(scope, receive, send)
@@ -204,7 +204,8 @@ class GISLayerSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = GISLayer
-        fields = "__all__"
+        # Derived from data on save; served via the geojson endpoints' detail/zoom
+        exclude = ["simplified_data"]
 
 
 class OTEFModelConfigSerializer(serializers.ModelSerializer):
@@ -212,7 +213,8 @@ class OTEFModelConfigSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = OTEFModelConfig
-        fields = "__all__"
+        # Seeding bookkeeping for import_otef_data
+        exclude = ["layers_manifest_hash"]
 
 
 class OTEFViewportStateSerializer(serializers.ModelSerializer):
@@ -261,8 +263,7 @@ class Meta:
 
     def get_layers(self, obj):
         """Get all layer states for this group"""
-        # Extract group_id from layer_id (format: "group_id.layer_id")
         layer_states = LayerState.objects.filter(
-            table=obj.table, layer_id__startswith=f"{obj.group_id}."
+            table=obj.table, group_id=obj.group_id
         )
         return LayerStateSerializer(layer_states, many=True).data
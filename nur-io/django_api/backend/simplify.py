@@ -0,0 +1,324 @@
+"""
+Precomputed simplified variants of GISLayer GeoJSON.
+
+One simplified copy of ``data`` per tolerance in SIMPLIFY_TOLERANCES (degrees)
+is stored in ``GISLayer.simplified_data``, built in the background after each
+save (see layer_variants). The layer endpoints pick one with a ``detail`` (see
+DETAIL_LEVELS) or ``zoom`` query parameter, so small screens don't download and
+parse full-density geometry.
+
+Lines and rings are simplified with Douglas-Peucker. Endpoints are kept,
+rings never drop below a triangle, and a polygon's holes are dropped (not
+deformed) if they would collapse. Polygon topology is preserved: a simplified
+ring that intersects itself, another ring of its polygon (or of another part
+of its MultiPolygon), or a hole that leaves its exterior falls back to the
+ring as drawn (see _valid_rings). Points and properties pass through as-is.
+"""
+
+import math
+
+# Roughly 1 m, 10 m and 100 m at OTEF latitudes
+SIMPLIFY_TOLERANCES = (0.00001, 0.0001, 0.001)
+
+DETAIL_LEVELS = {
+    "full": None,
+    "high": 0.00001,
+    "medium": 0.0001,
+    "low": 0.001,
+}
+
+
+def _perpendicular_distance(p, a, b):
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    if dx == 0 and dy == 0:
+        return math.hypot(p[0] - a[0], p[1] - a[1])
+    t = ((p[0] - a[0]) * dx + (p[1] - a[1]) * dy) / (dx * dx + dy * dy)
+    t = max(0.0, min(1.0, t))
+    return math.hypot(p[0] - (a[0] + t * dx), p[1] - (a[1] + t * dy))
+
+
+def simplify_line(coords, tolerance):
+    """Douglas-Peucker (iterative) keeping both endpoints."""
+    if len(coords) < 3:
+        return list(coords)
+    keep = [False] * len(coords)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(coords) - 1)]
+    while stack:
+        first, last = stack.pop()
+        max_dist, index = 0.0, None
+        for i in range(first + 1, last):
+            dist = _perpendicular_distance(coords[i], coords[first], coords[last])
+            if dist > max_dist:
+                max_dist, index = dist, i
+        if index is not None and max_dist > tolerance:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [c for c, k in zip(coords, keep) if k]
+
+
+def simplify_ring(ring, tolerance):
+    """Simplify a closed ring; None if it would collapse below a triangle."""
+    if len(ring) < 4:
+        return None
+    # Split at the vertex farthest from the start so the closing point isn't the only anchor
+    far = max(range(1, len(ring) - 1), key=lambda i: math.hypot(ring[i][0] - ring[0][0], ring[i][1] - ring[0][1]))
+    simplified = simplify_line(ring[: far + 1], tolerance)[:-1] + simplify_line(ring[far:], tolerance)
+    if len(simplified) < 4:
+        return None
+    return simplified
+
+
+def _ring_segments(ring):
+    return [(ring[i], ring[i + 1]) for i in range(len(ring) - 1)]
+
+
+def _orientation(a, b, c):
+    cross = (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+    return (cross > 0) - (cross < 0)
+
+
+def _on_segment(a, b, p):
+    return min(a[0], b[0]) <= p[0] <= max(a[0], b[0]) and min(a[1], b[1]) <= p[1] <= max(a[1], b[1])
+
+
+def _segments_intersect(a, b, c, d):
+    """True if segments a-b and c-d share any point (touching included)."""
+    o1, o2 = _orientation(a, b, c), _orientation(a, b, d)
+    o3, o4 = _orientation(c, d, a), _orientation(c, d, b)
+    if o1 != o2 and o3 != o4:
+        return True
+    return (
+        (o1 == 0 and _on_segment(a, b, c))
+        or (o2 == 0 and _on_segment(a, b, d))
+        or (o3 == 0 and _on_segment(c, d, a))
+        or (o4 == 0 and _on_segment(c, d, b))
+    )
+
+
+def _crosses(segments, others=None):
+    """
+    Whether any two of ``segments`` (one closed ring) intersect, other than
+    neighbours at their shared vertex; with ``others``, whether any segment
+    intersects any of those instead. Candidate pairs come from a uniform grid.
+    """
+    pool = list(segments) + list(others or [])
+    if not pool:
+        return False
+    xs = [c[0] for seg in pool for c in seg]
+    ys = [c[1] for seg in pool for c in seg]
+    minx, miny = min(xs), min(ys)
+    cells = max(1, int(math.sqrt(len(pool))))
+    size = max(max(xs) - minx, max(ys) - miny) / cells or 1.0
+
+    def cell_range(seg):
+        x0 = int((min(seg[0][0], seg[1][0]) - minx) / size)
+        x1 = int((max(seg[0][0], seg[1][0]) - minx) / size)
+        y0 = int((min(seg[0][1], seg[1][1]) - miny) / size)
+        y1 = int((max(seg[0][1], seg[1][1]) - miny) / size)
+        return [(cx, cy) for cx in range(x0, x1 + 1) for cy in range(y0, y1 + 1)]
+
+    grid = {}
+    for j, seg in enumerate(others or []):
+        for key in cell_range(seg):
+            grid.setdefault(key, []).append(("other", j))
+    last = len(segments) - 1
+    for i, seg in enumerate(segments):
+        for key in cell_range(seg):
+            bucket = grid.setdefault(key, [])
+            for kind, j in bucket:
+                if kind == "other":
+                    if _segments_intersect(seg[0], seg[1], *others[j]):
+                        return True
+                elif others is None and abs(i - j) != 1 and {i, j} != {0, last}:
+                    if _segments_intersect(seg[0], seg[1], *segments[j]):
+                        return True
+            if others is None:
+                bucket.append(("own", i))
+    return False
+
+
+def _point_in_ring(point, ring):
+    x, y = point
+    inside = False
+    for (x1, y1), (x2, y2) in _ring_segments(ring):
+        if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+            inside = not inside
+    return inside
+
+
+def _valid_rings(rings, obstacles=()):
+    """
+    Whether polygon rings (exterior first) are simple, don't touch each other or
+    ``obstacles`` (segments of other polygons), and every hole is inside the exterior.
+    """
+    segments = [_ring_segments(ring) for ring in rings]
+    taken = list(obstacles)
+    for ring, ring_segments in zip(rings, segments):
+        if _crosses(ring_segments) or (taken and _crosses(ring_segments, taken)):
+            return False
+        taken.extend(ring_segments)
+    return all(_point_in_ring(hole[0], rings[0]) for hole in rings[1:])
+
+
+def _simplify_polygon(rings, tolerance, obstacles=()):
+    """
+    Simplify a polygon without breaking its topology: a ring whose simplified
+    form makes the polygon invalid is kept as drawn, and if that isn't enough
+    (or the original is itself invalid) the whole polygon is.
+    """
+    if not rings:
+        return rings
+    exterior = simplify_ring(rings[0], tolerance)
+    if exterior is None or not _valid_rings([exterior], obstacles):
+        # Too small to simplify without collapsing, or would self-intersect: keep it as drawn
+        exterior = rings[0]
+    out = [exterior]
+    for hole in rings[1:]:
+        simplified = simplify_ring(hole, tolerance)
+        if simplified is None:
+            continue  # collapses: drop it rather than deform it
+        if _valid_rings(out + [simplified], obstacles):
+            out.append(simplified)
+        elif _valid_rings(out + [hole], obstacles):
+            out.append(hole)
+        else:
+            return rings
+    return out
+
+
+def _polygon_bbox(rings):
+    xs = [c[0] for ring in rings for c in ring]
+    ys = [c[1] for ring in rings for c in ring]
+    return (min(xs), min(ys), max(xs), max(ys)) if xs else None
+
+
+def _simplify_multipolygon(polygons, tolerance):
+    """
+    Simplify each part, keeping it clear of the other parts (those before it
+    as simplified, those after as drawn). A ring stays within its original
+    bbox when simplified, so only parts with overlapping bboxes are checked.
+    """
+    out = list(polygons)
+    bboxes = [_polygon_bbox(polygon) for polygon in polygons]
+    for i, polygon in enumerate(polygons):
+        box = bboxes[i]
+        if box is None:
+            continue
+        obstacles = [
+            seg
+            for j, other in enumerate(out)
+            if j != i
+            and bboxes[j] is not None
+            and bboxes[j][0] <= box[2] and box[0] <= bboxes[j][2]
+            and bboxes[j][1] <= box[3] and box[1] <= bboxes[j][3]
+            for ring in other
+            for seg in _ring_segments(ring)
+        ]
+        out[i] = _simplify_polygon(polygon, tolerance, obstacles)
+    return out
+
+
+def simplify_geometry(geometry, tolerance):
+    if not isinstance(geometry, dict):
+        return geometry
+    gtype = geometry.get("type")
+    coords = geometry.get("coordinates")
+    try:
+        if gtype == "LineString":
+            coords = simplify_line(coords, tolerance)
+        elif gtype == "MultiLineString":
+            coords = [simplify_line(line, tolerance) for line in coords]
+        elif gtype == "Polygon":
+            coords = _simplify_polygon(coords, tolerance)
+        elif gtype == "MultiPolygon":
+            coords = _simplify_multipolygon(coords, tolerance)
+        elif gtype == "GeometryCollection":
+            return {
+                **geometry,
+                "geometries": [simplify_geometry(g, tolerance) for g in geometry.get("geometries") or []],
+            }
+        else:
+            return geometry
+    except (TypeError, IndexError):
+        return geometry
+    return {**geometry, "coordinates": coords}
+
+
+def simplify_feature_collection(data, tolerance):
+    """Copy of a FeatureCollection with every feature's geometry simplified."""
+    features = []
+    for feature in data.get("features") or []:
+        if isinstance(feature, dict) and feature.get("geometry"):
+            feature = {**feature, "geometry": simplify_geometry(feature["geometry"], tolerance)}
+        features.append(feature)
+    return {**data, "features": features}
+
+
+def count_vertices(data):
+    def count(coords):
+        if isinstance(coords, (list, tuple)) and coords and isinstance(coords[0], (int, float)):
+            return 1
+        if isinstance(coords, (list, tuple)):
+            return sum(count(c) for c in coords)
+        return 0
+
+    total = 0
+    for feature in (data or {}).get("features") or []:
+        geometry = (feature or {}).get("geometry") or {}
+        total += count(geometry.get("coordinates"))
+        for child in geometry.get("geometries") or []:
+            total += count((child or {}).get("coordinates"))
+    return total
+
+
+def build_variants(data):
+    """
+    {tolerance: FeatureCollection} for each tolerance that removes vertices.
+    Keys are strings (JSON object keys). Empty for non-FeatureCollection data.
+    """
+    if not isinstance(data, dict) or data.get("type") != "FeatureCollection":
+        return {}
+    variants = {}
+    previous = count_vertices(data)
+    for tolerance in SIMPLIFY_TOLERANCES:
+        simplified = simplify_feature_collection(data, tolerance)
+        vertices = count_vertices(simplified)
+        if vertices < previous:
+            variants[repr(tolerance)] = simplified
+            previous = vertices
+    return variants
+
+
+def requested_tolerance(params):
+    """
+    Tolerance (degrees) asked for by ``?detail=`` or ``?zoom=``; None means full
+    detail. ``zoom`` maps to roughly one 256px-tile pixel at that zoom.
+    Raises ValueError for unknown values.
+    """
+    detail = params.get("detail")
+    if detail:
+        if detail not in DETAIL_LEVELS:
+            raise ValueError(f"detail must be one of {', '.join(DETAIL_LEVELS)}")
+        return DETAIL_LEVELS[detail]
+    zoom = params.get("zoom")
+    if zoom not in (None, ""):
+        zoom = float(zoom)
+        if not 0 <= zoom <= 30:
+            raise ValueError("zoom must be between 0 and 30")
+        return 360.0 / (256 * 2 ** zoom)
+    return None
+
+
+def pick_variant(available, tolerance):
+    """
+    The coarsest stored tolerance key not coarser than ``tolerance``, or None
+    (full data). ``available`` are the keys of GISLayer.simplified_data["levels"].
+    """
+    if tolerance is None:
+        return None
+    candidates = [key for key in available if float(key) <= tolerance]
+    if not candidates:
+        return None
+    return max(candidates, key=float)
@@ -0,0 +1,169 @@
+"""
+Pluggable store for per-table indicator and presentation state.
+
+The API used to keep this state in module-level dicts, which diverges as soon as
+more than one ASGI worker serves requests. Every backend here exposes the same
+small interface:
+
+    get(namespace, key)                 -> (data or None, version)
+    update(namespace, key, mutator, default) -> (data, version)
+    keys(namespace)                     -> [key, ...]
+
+``update`` is an atomic read-modify-write: ``mutator`` receives a private copy of
+the current data (or ``default()`` when missing), mutates it in place, and the
+result is written back with the version incremented by one.
+
+The backend is selected with ``settings.STATE_STORE`` (same shape as
+CHANNEL_LAYERS):
+
+    STATE_STORE = {
+        "BACKEND": "backend.state_store.RedisStateStore",
+        "OPTIONS": {"url": "redis://redis:6379/1"},
+    }
+"""
+
+import copy
+import json
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class BaseStateStore:
+    """Interface shared by all state store backends."""
+
+    def get(self, namespace, key):
+        raise NotImplementedError
+
+    def update(self, namespace, key, mutator, default):
+        raise NotImplementedError
+
+    def keys(self, namespace):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class InMemoryStateStore(BaseStateStore):
+    """Process-local store. Safe for tests and single-worker deployments only."""
+
+    def __init__(self, **options):
+        self._lock = threading.Lock()
+        self._data = {}
+
+    def get(self, namespace, key):
+        with self._lock:
+            entry = self._data.get((namespace, key))
+            if entry is None:
+                return None, 0
+            data, version = entry
+            return copy.deepcopy(data), version
+
+    def update(self, namespace, key, mutator, default):
+        with self._lock:
+            entry = self._data.get((namespace, key))
+            if entry is None:
+                data, version = default(), 0
+            else:
+                data, version = copy.deepcopy(entry[0]), entry[1]
+            mutator(data)
+            version += 1
+            self._data[(namespace, key)] = (copy.deepcopy(data), version)
+            return data, version
+
+    def keys(self, namespace):
+        with self._lock:
+            return sorted(k for ns, k in self._data if ns == namespace)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class RedisStateStore(BaseStateStore):
+    """
+    Redis-backed store shared by every worker process.
+
+    Each entry is a hash ``{prefix}:{namespace}:{key}`` with ``data`` (JSON) and
+    ``version`` fields. Updates use WATCH/MULTI so concurrent writers retry
+    instead of overwriting each other.
+    """
+
+    def __init__(self, url="redis://localhost:6379/0", prefix="nur:state", **options):
+        import redis
+
+        self._redis = redis
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def _entry_key(self, namespace, key):
+        return f"{self._prefix}:{namespace}:{key}"
+
+    def _index_key(self, namespace):
+        return f"{self._prefix}:{namespace}:__keys__"
+
+    def get(self, namespace, key):
+        raw, version = self._client.hmget(
+            self._entry_key(namespace, key), "data", "version"
+        )
+        if raw is None:
+            return None, 0
+        return json.loads(raw), int(version or 0)
+
+    def update(self, namespace, key, mutator, default):
+        entry_key = self._entry_key(namespace, key)
+        with self._client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(entry_key)
+                    raw, version = pipe.hmget(entry_key, "data", "version")
+                    data = json.loads(raw) if raw is not None else default()
+                    mutator(data)
+                    version = int(version or 0) + 1
+                    pipe.multi()
+                    pipe.hset(
+                        entry_key,
+                        mapping={"data": json.dumps(data), "version": version},
+                    )
+                    pipe.sadd(self._index_key(namespace), key)
+                    pipe.execute()
+                    return data, version
+                except self._redis.WatchError:
+                    continue
+
+    def keys(self, namespace):
+        return sorted(
+            k.decode("utf-8") if isinstance(k, bytes) else k
+            for k in self._client.smembers(self._index_key(namespace))
+        )
+
+    def clear(self):
+        for entry_key in self._client.scan_iter(f"{self._prefix}:*"):
+            self._client.delete(entry_key)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_state_store():
+    """Return the configured state store, building it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                config = getattr(settings, "STATE_STORE", None) or {}
+                backend = import_string(
+                    config.get("BACKEND", "backend.state_store.InMemoryStateStore")
+                )
+                _store = backend(**(config.get("OPTIONS") or {}))
+    return _store
+
+
+def reset_state_store():
+    """Drop the cached store so the next call re-reads settings (tests)."""
+    global _store
+    with _store_lock:
+        _store = None
@@ -19,6 +19,8 @@
 from rest_framework.response import Response
 from rest_framework import status
 
+from .geobin import GEOBIN_RENDERER_CLASSES
+
 logger = logging.getLogger(__name__)
 
 
@@ -1058,22 +1060,12 @@ def _delete_layer_states_for_gis_layer_pk(table, layer_pk):
     """
     Delete LayerState rows that reference a GISLayer primary key.
 
-    Matches on the full layer id suffix after the last dot (e.g. curated_moresht_axis.1),
-    not on naive __endswith('.1'), which can collide with ids like 11, 21, 101 in some DBs.
+    Matches on the exact layer_key (e.g. curated_moresht_axis.1 -> "1"), not on a
+    naive layer_id suffix, which can collide with ids like 11, 21, 101.
     """
     from .models import LayerState
 
-    needle = str(int(layer_pk))
-    suffix = f".{needle}"
-    candidate_pks = [
-        pk
-        for pk, layer_id in LayerState.objects.filter(
-            table=table, layer_id__endswith=suffix
-        ).values_list("pk", "layer_id")
-        if str(layer_id).rsplit(".", 1)[-1] == needle
-    ]
-    if candidate_pks:
-        LayerState.objects.filter(pk__in=candidate_pks).delete()
+    LayerState.objects.filter(table=table, layer_key=str(int(layer_pk))).delete()
 
 
 def _supabase_headers():
@@ -1853,7 +1845,12 @@ def sort_key(item):
 
 
 class SupabaseSubmissionFeaturesView(APIView):
-    """GET /api/supabase/submissions/<id>/features/ - GeoJSON FeatureCollection for the submission."""
+    """
+    GET /api/supabase/submissions/<id>/features/ - GeoJSON FeatureCollection for the submission.
+    Accept: application/vnd.nur.geobin (or ?format=geobin) returns it GeoBin-encoded.
+    """
+
+    renderer_classes = GEOBIN_RENDERER_CLASSES
 
     def get(self, request, submission_id):
         base, key, err = _supabase_headers()
@@ -2956,16 +2953,11 @@ def post(self, request):
             )
 
         is_curated_name = str(getattr(layer, "name", "") or "").startswith("curated_")
-        needle = str(int(layer.id))
-        suffix = f".{needle}"
-        is_curated_state = any(
-            str(lid).rsplit(".", 1)[-1] == needle
-            for lid in LayerState.objects.filter(
-                table=table,
-                layer_id__endswith=suffix,
-                layer_id__startswith="curated",
-            ).values_list("layer_id", flat=True)
-        )
+        is_curated_state = LayerState.objects.filter(
+            table=table,
+            layer_key=str(int(layer.id)),
+            group_id__startswith="curated",
+        ).exists()
         if not (is_curated_name or is_curated_state):
             return Response(
                 {"error": "Only curated published layers can be removed from this endpoint"},
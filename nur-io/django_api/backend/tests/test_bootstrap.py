@@ -0,0 +1,57 @@
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from backend.models import BootstrapStage, Indicator, Table
+
+
+class BootstrapCommandTests(TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.base = Path(self._tmp.name)
+        override = override_settings(BASE_DIR=self.base, MEDIA_ROOT=str(self.base / "media"))
+        override.enable()
+        self.addCleanup(override.disable)
+        (self.base / "public/processed/climate").mkdir(parents=True)
+        (self.base / "public/processed/climate/utci.jpg").write_bytes(b"jpg")
+
+    def _bootstrap(self, *args):
+        out = StringIO()
+        call_command("bootstrap", "--only", "migrate", "tables", "media_sync", *args, stdout=out)
+        return out.getvalue()
+
+    def test_stages_are_skipped_until_inputs_change(self):
+        output = self._bootstrap()
+        self.assertIn("[RUN] tables", output)
+        self.assertIn("[RUN] media_sync", output)
+        self.assertIn("Bootstrap timings:", output)
+        self.assertTrue((self.base / "media/indicators/processed/climate/utci.jpg").exists())
+        self.assertTrue(Indicator.objects.filter(table__name="idistrict", category="climate").exists())
+        self.assertTrue(Table.objects.filter(name="otef").exists())
+        self.assertEqual(
+            set(BootstrapStage.objects.values_list("name", flat=True)), {"migrate", "tables", "media_sync"}
+        )
+
+        output = self._bootstrap()
+        self.assertNotIn("[RUN]", output)
+        self.assertIn("[SKIP] media_sync: inputs unchanged", output)
+
+        (self.base / "public/processed/climate/plan.jpg").write_bytes(b"plan")
+        output = self._bootstrap()
+        self.assertIn("[SKIP] tables", output)
+        self.assertIn("[RUN] media_sync", output)
+        self.assertIn("1 updated, 1 unchanged", output)
+
+        # Media volume lost or pruned while the database survived: sync again
+        (self.base / "media/indicators/processed/climate/utci.jpg").unlink()
+        output = self._bootstrap()
+        self.assertIn("[RUN] media_sync", output)
+        self.assertTrue((self.base / "media/indicators/processed/climate/utci.jpg").exists())
+        self.assertIn("[SKIP] media_sync: inputs unchanged", self._bootstrap())
+
+        self.assertIn("[RUN] tables", self._bootstrap("--force"))
@@ -0,0 +1,75 @@
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from backend.models import Table
+from backend.state_store import reset_state_store
+
+
+@override_settings(
+    CHANNEL_LAYERS={
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
+        }
+    },
+    STATE_STORE={"BACKEND": "backend.state_store.InMemoryStateStore"},
+)
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        reset_state_store()
+        Table.objects.create(name="otef", display_name="OTEF")
+
+    def tearDown(self):
+        reset_state_store()
+
+    def test_presentation_state_revalidates_with_etag(self):
+        url = "/api/actions/get_presentation_state/?table=otef"
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        etag = first["ETag"]
+        self.assertTrue(etag.startswith('"'))
+        self.assertNotIn("no-store", first["Cache-Control"])
+        self.assertIn("private", first["Cache-Control"])
+
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.content, b"")
+        self.assertEqual(cached["ETag"], etag)
+
+        self.client.post(
+            "/api/actions/set_presentation_state/",
+            data={"table": "otef", "duration": 30},
+            content_type="application/json",
+        )
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], etag)
+        self.assertEqual(changed.json()["duration"], 30)
+
+    def test_viewport_state_by_table_revalidates_with_etag(self):
+        url = "/api/otef_viewport/by-table/otef/"
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(cached.status_code, 304)
+
+        patched = self.client.patch(
+            url,
+            data={"viewer_angle_deg": 45},
+            content_type="application/json",
+            HTTP_IF_NONE_MATCH=first["ETag"],
+        )
+        self.assertEqual(patched.status_code, 200)
+        self.assertNotEqual(patched["ETag"], first["ETag"])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=patched["ETag"]).status_code, 304)
+
+    def test_layers_and_hierarchy_return_304_when_unchanged(self):
+        for url in (
+            "/api/actions/get_otef_layers/?table=otef",
+            "/api/actions/get_file_hierarchy/?table=otef",
+            "/api/actions/get_global_variables/?table=otef",
+        ):
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                self.assertEqual(first.status_code, 200)
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
@@ -0,0 +1,82 @@
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from backend.file_hierarchy import reset_file_hierarchy_cache
+from backend.models import Indicator, IndicatorData, IndicatorImage, State, Table
+from backend.state_store import reset_state_store
+
+URL = "/api/actions/get_file_hierarchy/"
+
+
+@override_settings(
+    STATE_STORE={"BACKEND": "backend.state_store.InMemoryStateStore"},
+)
+class FileHierarchyCacheTests(TestCase):
+    def setUp(self):
+        reset_state_store()
+        reset_file_hierarchy_cache()
+        states = list(State.objects.order_by("id")[:3])
+        for t in range(2):
+            table = Table.objects.create(name=f"table_{t}", display_name=f"Table {t}")
+            for i in range(3):
+                indicator = Indicator.objects.create(
+                    table=table, indicator_id=i + 1, name=f"Indicator {i}", category="mobility"
+                )
+                for state in states:
+                    data = IndicatorData.objects.create(indicator=indicator, state=state)
+                    IndicatorImage.objects.create(indicatorData=data, image=f"indicators/mobility/{t}_{i}_{state.id}.png")
+                    IndicatorImage.objects.create(indicatorData=data, image=f"processed/mobility/{t}_{i}_{state.id}.mp4")
+
+    def tearDown(self):
+        reset_state_store()
+        reset_file_hierarchy_cache()
+
+    def test_media_type_is_persisted_from_extension(self):
+        self.assertEqual(
+            set(IndicatorImage.objects.values_list("media_type", flat=True)), {"image", "video"}
+        )
+        html = IndicatorImage.objects.first()
+        html.image = "indicators/mobility/map.html"
+        html.save(update_fields=["image"])
+        html.refresh_from_db()
+        self.assertEqual(html.media_type, "html_map")
+
+    def test_hierarchy_uses_fixed_number_of_queries(self):
+        # tables, indicators, indicator data (+ states), images
+        with self.assertNumQueries(4):
+            response = self.client.get(URL)
+        self.assertEqual(response.status_code, 200)
+
+        tables = [t for t in response.json() if t["name"].startswith("table_")]
+        self.assertEqual(len(tables), 2)
+        indicator = tables[0]["indicators"][0]
+        self.assertEqual(len(indicator["states"]), 3)
+        media = indicator["states"][0]["media"]
+        self.assertEqual(
+            sorted((m["url"].split("/")[0], m["media_type"]) for m in media),
+            [("indicators", "image"), ("indicators", "video")],
+        )
+
+    def test_cached_until_sources_change(self):
+        first = self.client.get(URL, {"table": "table_0"})
+        with self.assertNumQueries(0):
+            cached = self.client.get(URL, {"table": "table_0"})
+        self.assertEqual(cached.content, first.content)
+        self.assertEqual(self.client.get(URL, {"table": "table_0"}, HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/states/", data={"state_values": {"year": 2099}}, content_type="application/json"
+            )
+        self.assertEqual(response.status_code, 201)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                "/api/indicators/",
+                data={"table": "table_0", "name": "New", "category": "mobility"},
+                content_type="application/json",
+            )
+
+        refreshed = self.client.get(URL, {"table": "table_0"}, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(refreshed.status_code, 200)
+        names = [i["name"] for i in refreshed.json()[0]["indicators"]]
+        self.assertIn("New", names)
@@ -0,0 +1,144 @@
+import json
+import math
+import os
+import tempfile
+from unittest.mock import Mock, patch
+
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from backend import geobin
+from backend.models import GISLayer, Table
+
+GEOBIN = "application/vnd.nur.geobin"
+
+FEATURES = {
+    "type": "FeatureCollection",
+    "crs": {"type": "name", "properties": {"name": "EPSG:4326"}},
+    "features": [
+        {"type": "Feature", "id": 3, "properties": {"name": "pin"}, "geometry": {"type": "Point", "coordinates": [34.8, 31.25]}},
+        {"type": "Feature", "properties": {"name": "pins"}, "geometry": {"type": "MultiPoint", "coordinates": [[34.81, 31.26], [34.82, 31.27]]}},
+        {"type": "Feature", "properties": {}, "geometry": {"type": "LineString", "coordinates": [[34.8, 31.2, 450.0], [34.9, 31.3, 460.0]]}},
+        {"type": "Feature", "properties": {}, "geometry": {"type": "MultiLineString", "coordinates": [[[34.8, 31.2], [34.85, 31.25]], [[34.9, 31.3], [34.95, 31.35]]]}},
+        {
+            "type": "Feature",
+            "properties": {"name": "donut"},
+            "geometry": {
+                "type": "Polygon",
+                "coordinates": [
+                    [[34.0, 30.0], [36.0, 30.0], [36.0, 32.0], [34.0, 32.0], [34.0, 30.0]],
+                    [[34.5, 30.5], [34.6, 30.5], [34.6, 30.6], [34.5, 30.5]],
+                ],
+            },
+        },
+        {"type": "Feature", "properties": {}, "geometry": {"type": "MultiPolygon", "coordinates": [[[[34.0, 30.0], [34.1, 30.0], [34.1, 30.1], [34.0, 30.0]]]]}},
+        {"type": "Feature", "properties": {"empty": True}, "geometry": None},
+        {"type": "Feature", "properties": {}, "geometry": {"type": "GeometryCollection", "geometries": []}},
+    ],
+}
+
+
+def _drop_z(value):
+    if isinstance(value, list) and value and isinstance(value[0], (int, float)):
+        return value[:2]
+    if isinstance(value, list):
+        return [_drop_z(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _drop_z(v) for k, v in value.items()}
+    return value
+
+
+def _assert_close(test, actual, expected, tolerance=1e-6):
+    if isinstance(expected, float) or isinstance(actual, float):
+        test.assertAlmostEqual(actual, expected, delta=tolerance)
+    elif isinstance(expected, list):
+        test.assertEqual(len(actual), len(expected))
+        for a, e in zip(actual, expected):
+            _assert_close(test, a, e, tolerance)
+    elif isinstance(expected, dict):
+        test.assertEqual(set(actual), set(expected))
+        for key in expected:
+            _assert_close(test, actual[key], expected[key], tolerance)
+    else:
+        test.assertEqual(actual, expected)
+
+
+class GeoBinEncodingTests(TestCase):
+    def test_round_trip_preserves_features_within_quantization(self):
+        payload = geobin.encode(FEATURES)
+        self.assertEqual(payload[:4], b"NGB1")
+        _assert_close(self, geobin.decode(payload), _drop_z(FEATURES))
+
+    def test_projected_coordinates_fall_back_to_coarser_scale(self):
+        itm = {
+            "type": "FeatureCollection",
+            "features": [
+                {"type": "Feature", "properties": {}, "geometry": {"type": "LineString", "coordinates": [[170000.25, 550000.5], [190000.75, 600000.0]]}}
+            ],
+        }
+        decoded = geobin.decode(geobin.encode(itm))
+        _assert_close(self, decoded, itm, tolerance=1e-3)
+
+    def test_large_layer_is_several_times_smaller(self):
+        line = [[34.8 + i * 0.00001, 31.25 + 0.00001 * math.sin(i / 10)] for i in range(5000)]
+        collection = {
+            "type": "FeatureCollection",
+            "features": [{"type": "Feature", "properties": {"i": 1}, "geometry": {"type": "LineString", "coordinates": line}}],
+        }
+        as_json = json.dumps(collection, separators=(",", ":")).encode()
+        self.assertLess(len(geobin.encode(collection)) * 4, len(as_json))
+
+
+class GeoBinEndpointTests(TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        override = override_settings(GIS_LAYER_CACHE_DIR=self._tmp.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        table = Table.objects.create(name="otef", display_name="OTEF")
+        self.layer = GISLayer.objects.create(table=table, name="curated_1", display_name="Curated 1", data=FEATURES)
+
+    def test_layer_endpoints_negotiate_geobin(self):
+        url = f"/api/gis_layers/{self.layer.id}/geojson/{self.layer.data_hash}/"
+        for kwargs in ({"HTTP_ACCEPT": GEOBIN}, {"data": {"format": "geobin"}}):
+            with self.subTest(**kwargs):
+                res = self.client.get(url, **kwargs)
+                self.assertEqual(res.status_code, 200)
+                self.assertEqual(res["Content-Type"], GEOBIN)
+                self.assertIn("Accept", res["Vary"])
+                _assert_close(self, geobin.decode(b"".join(res.streaming_content)), _drop_z(FEATURES))
+
+        plain = self.client.get(url)
+        self.assertEqual(plain["Content-Type"], "application/json")
+        self.assertNotEqual(plain["ETag"], self.client.get(url, HTTP_ACCEPT=GEOBIN)["ETag"])
+        self.assertTrue(any(name.endswith(".ngb") for name in os.listdir(self._tmp.name)))
+
+        unversioned = self.client.get(f"/api/gis_layers/{self.layer.id}/get_layer_geojson/", {"detail": "low"}, HTTP_ACCEPT=GEOBIN)
+        self.assertEqual(unversioned["Content-Type"], GEOBIN)
+
+    def test_geobin_cache_files_are_purged_on_save(self):
+        self.client.get(f"/api/gis_layers/{self.layer.id}/geojson/{self.layer.data_hash}/", HTTP_ACCEPT=GEOBIN)
+        self.layer.data = {"type": "FeatureCollection", "features": []}
+        self.layer.save()
+        self.assertEqual(os.listdir(self._tmp.name), [])
+
+    @patch("backend.supabase_proxy.requests.get")
+    @patch.dict(
+        os.environ,
+        {"SUPABASE_URL": "https://example.supabase.co", "SUPABASE_SECRET_KEY": "service-key"},
+        clear=False,
+    )
+    def test_submission_features_can_be_geobin(self, mock_get):
+        mock_get.return_value = Mock(
+            status_code=200,
+            json=Mock(return_value=[{"id": 1, "is_current": True, "geom": {"type": "Point", "coordinates": [34.8, 31.25]}}]),
+            raise_for_status=Mock(),
+        )
+        res = self.client.get("/api/supabase/submissions/00000000-0000-0000-0000-000000000001/features/", HTTP_ACCEPT=GEOBIN)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res["Content-Type"], GEOBIN)
+        [feature] = geobin.decode(res.content)["features"]
+        self.assertEqual(feature["properties"], {"id": 1, "is_current": True})
+        _assert_close(self, feature["geometry"]["coordinates"], [34.8, 31.25])
@@ -0,0 +1,67 @@
+import gzip
+import json
+import os
+import tempfile
+
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from backend.models import GISLayer, Table
+
+FEATURES = {
+    "type": "FeatureCollection",
+    "features": [
+        {"type": "Feature", "properties": {"name": "a"}, "geometry": {"type": "Point", "coordinates": [34.8, 31.2]}}
+    ],
+}
+
+
+class GISLayerGeojsonCacheTests(TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        override = override_settings(GIS_LAYER_CACHE_DIR=self._tmp.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.table = Table.objects.create(name="otef", display_name="OTEF")
+        self.layer = GISLayer.objects.create(
+            table=self.table, name="curated_1", display_name="Curated 1", data=FEATURES
+        )
+
+    def test_layer_index_lists_versioned_urls_without_inline_geojson(self):
+        res = self.client.get("/api/actions/get_otef_layers/", {"table": "otef"})
+        self.assertEqual(res.status_code, 200)
+        [entry] = res.json()
+        self.assertNotIn("geojson", entry)
+        self.assertEqual(len(self.layer.data_hash), 64)
+        self.assertEqual(entry["url"], f"/api/gis_layers/{self.layer.id}/geojson/{self.layer.data_hash}/")
+
+    def test_versioned_url_is_immutable_and_compressed(self):
+        url = f"/api/gis_layers/{self.layer.id}/geojson/{self.layer.data_hash}/"
+
+        res = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res["Content-Encoding"], "gzip")
+        self.assertIn("immutable", res["Cache-Control"])
+        self.assertEqual(json.loads(gzip.decompress(b"".join(res.streaming_content))), FEATURES)
+
+        plain = self.client.get(url)
+        self.assertNotIn("Content-Encoding", plain)
+        self.assertEqual(json.loads(b"".join(plain.streaming_content)), FEATURES)
+
+    def test_saving_new_data_changes_url_and_purges_old_files(self):
+        old_hash = self.layer.data_hash
+        old_url = f"/api/gis_layers/{self.layer.id}/geojson/{old_hash}/"
+        self.client.get(old_url)
+        self.assertTrue(any(name.startswith(f"{self.layer.id}-{old_hash}") for name in os.listdir(self._tmp.name)))
+
+        self.layer.data = {"type": "FeatureCollection", "features": []}
+        self.layer.save()
+
+        self.assertNotEqual(self.layer.data_hash, old_hash)
+        self.assertEqual(os.listdir(self._tmp.name), [])
+
+        stale = self.client.get(old_url)
+        self.assertEqual(stale.status_code, 302)
+        self.assertEqual(stale["Location"], f"/api/gis_layers/{self.layer.id}/geojson/{self.layer.data_hash}/")
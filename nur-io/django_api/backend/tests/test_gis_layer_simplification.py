@@ -0,0 +1,160 @@
+import json
+import math
+import tempfile
+from unittest.mock import Mock, patch
+
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from backend.layer_variants import build_layer_variants
+from backend.models import GISLayer, Table
+from backend.simplify import _valid_rings, count_vertices, simplify_geometry, simplify_ring
+
+
+def _wiggly_line(n=400):
+    # ~2 km line with sub-metre noise: collapses at every tolerance
+    return [[34.8 + i * 0.00005, 31.25 + 0.000002 * math.sin(i)] for i in range(n)]
+
+
+def _circle(n=200, r=0.01):
+    ring = [[34.8 + r * math.cos(2 * math.pi * i / n), 31.25 + r * math.sin(2 * math.pi * i / n)] for i in range(n)]
+    return ring + [ring[0]]
+
+
+# Square whose top edge has a 0.05 bump (up) or dent (down) around x=5: gone at tolerance 0.1
+def _square_with_top(dy):
+    return [[0, 0], [10, 0], [10, 10], [6, 10], [5, 10 + dy], [4, 10], [0, 10], [0, 0]]
+
+
+FEATURES = {
+    "type": "FeatureCollection",
+    "features": [
+        {"type": "Feature", "properties": {"kind": "route"}, "geometry": {"type": "LineString", "coordinates": _wiggly_line()}},
+        {"type": "Feature", "properties": {"kind": "area"}, "geometry": {"type": "Polygon", "coordinates": [_circle()]}},
+        {"type": "Feature", "properties": {"kind": "pin"}, "geometry": {"type": "Point", "coordinates": [34.8, 31.25]}},
+    ],
+}
+
+
+class GISLayerSimplificationTests(TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        override = override_settings(GIS_LAYER_CACHE_DIR=self._tmp.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.table = Table.objects.create(name="otef", display_name="OTEF")
+        self.layer = GISLayer.objects.create(
+            table=self.table, name="curated_1", display_name="Curated 1", data=FEATURES
+        )
+        build_layer_variants(self.layer.id)
+        self.layer.refresh_from_db()
+
+    def _fetch(self, url, **params):
+        res = self.client.get(url, params)
+        self.assertEqual(res.status_code, 200)
+        return json.loads(b"".join(res.streaming_content))
+
+    def test_variants_shrink_with_tolerance(self):
+        stored = self.layer.simplified_data
+        self.assertEqual(stored["source_hash"], self.layer.data_hash)
+        counts = [count_vertices(stored["levels"][key]) for key in ("1e-05", "0.0001", "0.001")]
+        self.assertEqual(counts, sorted(counts, reverse=True))
+        self.assertLess(counts[-1], count_vertices(FEATURES) / 10)
+
+    @patch("backend.layer_variants.close_old_connections")
+    @patch("backend.layer_variants._get_executor")
+    def test_save_builds_variants_after_commit_and_serves_full_detail_meanwhile(self, get_executor, _close):
+        # Run the pool's work inline
+        get_executor.return_value = Mock(submit=lambda fn, *args: fn(*args))
+        url = f"/api/gis_layers/{self.layer.id}/get_layer_geojson/"
+        changed = {"type": "FeatureCollection", "features": FEATURES["features"][1:]}
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.layer.data = changed
+            self.layer.save(update_fields=["data"])
+        self.layer.refresh_from_db()
+        self.assertEqual(self.layer.simplified_data, {})
+        pending = self.client.get(url, {"detail": "low"})
+        self.assertEqual(json.loads(b"".join(pending.streaming_content)), changed)
+        self.assertEqual(pending["Cache-Control"], "no-cache")
+        self.assertEqual(pending["ETag"], f'"{self.layer.data_hash}"')
+
+        for callback in callbacks:
+            callback()
+        self.layer.refresh_from_db()
+        self.assertEqual(self.layer.simplified_data["source_hash"], self.layer.data_hash)
+        low = self._fetch(url, detail="low")
+        self.assertEqual(low, self.layer.simplified_data["levels"]["0.001"])
+        self.assertLess(count_vertices(low), count_vertices(changed))
+
+    def test_build_for_superseded_data_is_discarded(self):
+        def saved_meanwhile(data):
+            # The layer's data changes while its variants are being built
+            GISLayer.objects.filter(id=self.layer.id).update(data={}, data_hash="")
+            return {}
+
+        with patch("backend.layer_variants.build_variants", side_effect=saved_meanwhile):
+            self.assertFalse(build_layer_variants(self.layer.id))
+        self.layer.refresh_from_db()
+        self.assertIn("0.001", self.layer.simplified_data["levels"])
+
+    def test_rings_stay_closed_and_never_collapse(self):
+        ring = simplify_ring(_circle(), 0.001)
+        self.assertEqual(ring[0], ring[-1])
+        self.assertGreaterEqual(len(ring), 4)
+        self.assertIsNone(simplify_ring(_circle(r=0.00001), 0.001))
+
+        low = self.layer.simplified_data["levels"]["0.001"]
+        polygon = low["features"][1]["geometry"]["coordinates"][0]
+        self.assertEqual(polygon[0], polygon[-1])
+        self.assertEqual(low["features"][2], FEATURES["features"][2])
+
+    def test_endpoints_select_variant_by_detail_or_zoom(self):
+        url = f"/api/gis_layers/{self.layer.id}/geojson/{self.layer.data_hash}/"
+        full = self._fetch(url)
+        self.assertEqual(full, FEATURES)
+
+        low = self._fetch(url, detail="low")
+        self.assertEqual(low, self.layer.simplified_data["levels"]["0.001"])
+        # zoom 10 is ~0.0014 degrees per pixel: the coarsest level fits
+        self.assertEqual(self._fetch(url, zoom="10"), low)
+        # zoom 22 is finer than any stored level
+        self.assertEqual(self._fetch(url, zoom="22"), FEATURES)
+
+        unversioned = f"/api/gis_layers/{self.layer.id}/get_layer_geojson/"
+        self.assertEqual(self._fetch(unversioned, detail="medium"), self.layer.simplified_data["levels"]["0.0001"])
+        self.assertEqual(self.client.get(url, {"detail": "tiny"}).status_code, 400)
+
+    def test_layer_index_passes_detail_to_urls(self):
+        [entry] = self.client.get("/api/actions/get_otef_layers/", {"table": "otef", "detail": "low"}).json()
+        self.assertEqual(entry["url"], f"/api/gis_layers/{self.layer.id}/geojson/{self.layer.data_hash}/?detail=low")
+        self.assertNotIn("simplified_data", self.client.get(f"/api/gis_layers/{self.layer.id}/").json())
+
+    def test_hole_that_would_escape_its_exterior_keeps_polygon_as_drawn(self):
+        # The hole fits under the bump; without the bump it would cross the exterior
+        hole = [[4.5, 9.9], [5.5, 9.9], [5.5, 10.02], [4.5, 10.02], [4.5, 9.9]]
+        polygon = [_square_with_top(0.05), hole]
+        self.assertTrue(_valid_rings(polygon))
+
+        simplified = simplify_geometry({"type": "Polygon", "coordinates": polygon}, 0.1)
+        self.assertEqual(simplified["coordinates"], polygon)
+
+        # Without the hole the bump is simplified away as usual
+        alone = simplify_geometry({"type": "Polygon", "coordinates": polygon[:1]}, 0.1)
+        self.assertEqual(len(alone["coordinates"][0]), 5)
+
+    def test_multipolygon_parts_are_kept_from_overlapping(self):
+        # A small square sits in the dent of a larger one
+        dented = _square_with_top(-0.05)
+        neighbour = [[4.8, 9.97], [5.2, 9.97], [5.2, 10.5], [4.8, 10.5], [4.8, 9.97]]
+        far = _circle(r=1)
+        parts = [[dented], [neighbour], [[[x + 100, y] for x, y in far]]]
+
+        simplified = simplify_geometry({"type": "MultiPolygon", "coordinates": parts}, 0.1)["coordinates"]
+        self.assertEqual(simplified[0], [dented])
+        self.assertEqual(simplified[1], [neighbour])
+        self.assertLess(len(simplified[2][0]), len(far))
+        for part in simplified:
+            self.assertTrue(_valid_rings(part))
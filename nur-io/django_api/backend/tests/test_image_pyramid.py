@@ -0,0 +1,140 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.test.utils import override_settings
+from PIL import Image
+
+from backend import image_pyramid
+from backend.models import Indicator, IndicatorData, IndicatorImage, OTEFModelConfig, State, Table
+
+
+class ImagePyramidTests(TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        override = override_settings(MEDIA_ROOT=self._tmp.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def _write_image(self, rel_path, size, mode="RGB"):
+        path = os.path.join(self._tmp.name, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        image = Image.new(mode, size)
+        # Left half red, right half blue, to check tiles land in the right place
+        image.paste((255, 0, 0) if mode == "RGB" else (255, 0, 0, 255), (0, 0, size[0] // 2, size[1]))
+        image.paste((0, 0, 255) if mode == "RGB" else (0, 0, 255, 128), (size[0] // 2, 0, size[0], size[1]))
+        image.save(path)
+        return path
+
+    def test_levels_cover_every_tile_with_expected_sizes(self):
+        self._write_image("indicators/climate/utci.png", (1000, 600))
+        manifest = image_pyramid.build_pyramid("indicators/climate/utci.png")
+
+        self.assertEqual(manifest["max_level"], 10)
+        self.assertEqual(manifest["format"], "jpg")
+        self.assertEqual(manifest["levels"][-1], {"level": 10, "width": 1000, "height": 600, "columns": 4, "rows": 3})
+        self.assertEqual(manifest["levels"][9]["width"], 500)
+        self.assertEqual(manifest["levels"][0]["width"], 1)
+
+        root = os.path.join(self._tmp.name, "pyramids/indicators/climate/utci")
+        for level in manifest["levels"]:
+            names = sorted(os.listdir(os.path.join(root, "image_files", str(level["level"]))))
+            expected = sorted(f"{c}_{r}.jpg" for c in range(level["columns"]) for r in range(level["rows"]))
+            self.assertEqual(names, expected)
+
+        with Image.open(os.path.join(root, "image_files/10/3_2.jpg")) as corner:
+            self.assertEqual(corner.size, (1000 - 768, 600 - 512))
+            self.assertGreater(corner.getpixel((100, 40))[2], 200)
+        with Image.open(os.path.join(root, "image_files/9/0_0.jpg")) as half:
+            self.assertEqual(half.size, (256, 256))
+            self.assertGreater(half.getpixel((10, 10))[0], 200)
+        with open(os.path.join(root, "image.dzi")) as f:
+            self.assertIn('<Size Width="1000" Height="600"/>', f.read())
+
+    def test_odd_sizes_and_alpha_use_png_tiles(self):
+        self._write_image("otef/models/model.png", (301, 257), mode="RGBA")
+        manifest = image_pyramid.build_pyramid("otef/models/model.png")
+        self.assertEqual(manifest["format"], "png")
+        self.assertEqual([level["height"] for level in manifest["levels"][-3:]], [65, 129, 257])
+        with Image.open(
+            os.path.join(self._tmp.name, "pyramids/otef/models/model/image_files/9/1_1.png")
+        ) as tile:
+            self.assertEqual(tile.size, (301 - 256, 1))
+            self.assertEqual(tile.mode, "RGBA")
+
+    def test_unchanged_source_is_not_rebuilt(self):
+        self._write_image("indicators/climate/utci.png", (600, 400))
+        first = image_pyramid.build_pyramid("indicators/climate/utci.png")
+        marker = os.path.join(self._tmp.name, "pyramids/indicators/climate/utci/image_files/0/0_0.jpg")
+        os.remove(marker)
+        self.assertEqual(image_pyramid.build_pyramid("indicators/climate/utci.png"), first)
+        self.assertFalse(os.path.exists(marker))
+        image_pyramid.build_pyramid("indicators/climate/utci.png", force=True)
+        self.assertTrue(os.path.exists(marker))
+
+    def test_palette_source_is_converted_strip_by_strip(self):
+        path = os.path.join(self._tmp.name, "otef/models/palette.png")
+        os.makedirs(os.path.dirname(path))
+        image = Image.new("P", (300, 600), 1)
+        image.putpalette([0, 0, 0, 255, 0, 0] + [0] * 762)
+        image.paste(0, (0, 300, 300, 600))
+        image.info["transparency"] = 0
+        image.save(path, transparency=0)
+
+        manifest = image_pyramid.build_pyramid("otef/models/palette.png")
+        self.assertEqual(manifest["format"], "png")
+        tiles = os.path.join(self._tmp.name, "pyramids/otef/models/palette/image_files/10")
+        with Image.open(os.path.join(tiles, "0_0.png")) as top, Image.open(os.path.join(tiles, "0_2.png")) as bottom:
+            self.assertEqual((top.mode, top.getpixel((10, 10))), ("RGBA", (255, 0, 0, 255)))
+            self.assertEqual(bottom.getpixel((10, 10))[3], 0)
+
+    def test_rebuild_keeps_the_live_pyramid_until_the_swap(self):
+        self._write_image("indicators/climate/utci.png", (600, 400))
+        image_pyramid.build_pyramid("indicators/climate/utci.png")
+        live = os.path.join(self._tmp.name, "pyramids/indicators/climate/utci")
+        rmtree = shutil.rmtree
+
+        def checked_rmtree(path, *args, **kwargs):
+            rmtree(path, *args, **kwargs)
+            self.assertTrue(os.path.exists(os.path.join(live, "manifest.json")), path)
+
+        with patch("backend.image_pyramid.shutil.rmtree", side_effect=checked_rmtree):
+            image_pyramid.build_pyramid("indicators/climate/utci.png", force=True)
+        self.assertEqual(sorted(os.listdir(os.path.dirname(live))), ["utci"])
+
+    def test_command_and_endpoint(self):
+        table = Table.objects.create(name="idistrict", display_name="iDistrict")
+        climate = Indicator.objects.create(table=table, indicator_id=2, name="Climate", category="climate")
+        state = State.objects.get(scenario_name="existing", scenario_type="utci")
+        data = IndicatorData.objects.create(indicator=climate, state=state)
+        IndicatorImage.objects.create(indicatorData=data, image="processed/climate/utci/existing.jpg")
+        self._write_image("indicators/processed/climate/utci/existing.jpg", (700, 300))
+        otef = Table.objects.create(name="otef", display_name="OTEF")
+        OTEFModelConfig.objects.create(table=otef, model_image="otef/models/model.png")
+        self._write_image("otef/models/model.png", (200, 100))
+
+        out = StringIO()
+        call_command("build_image_pyramids", "--min-size", "500", stdout=out)
+        self.assertIn("Pyramids ready: 1, skipped: 1", out.getvalue())
+
+        response = self.client.get("/api/image_pyramid/", {"path": "indicators/processed/climate/utci/existing.jpg"})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((body["width"], body["height"], body["tile_size"]), (700, 300, 256))
+        self.assertEqual(
+            body["tiles"], "pyramids/indicators/processed/climate/utci/existing/image_files/{level}/{col}_{row}.jpg"
+        )
+        self.assertNotIn("source", body)
+        self.assertEqual(
+            self.client.get("/api/image_pyramid/", {"path": body["source_path"]}, HTTP_IF_NONE_MATCH=response["ETag"]).status_code,
+            304,
+        )
+
+        self.assertEqual(self.client.get("/api/image_pyramid/", {"table": "otef"}).status_code, 404)
+        self.assertEqual(self.client.get("/api/image_pyramid/", {"path": "../secrets.jpg"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/image_pyramid/").status_code, 400)
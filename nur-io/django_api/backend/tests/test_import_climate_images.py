@@ -0,0 +1,97 @@
+import os
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from backend.models import Indicator, IndicatorData, IndicatorImage, State, Table
+
+
+class ImportClimateImagesTests(TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.base = Path(self._tmp.name)
+        override = override_settings(BASE_DIR=self.base, MEDIA_ROOT=str(self.base / "media"))
+        override.enable()
+        self.addCleanup(override.disable)
+
+        table = Table.objects.create(name="idistrict", display_name="iDistrict")
+        self.climate = Indicator.objects.create(table=table, indicator_id=2, name="Climate", category="climate")
+        self.sources = {
+            "utci": self._source("utci-scenarios/Existing.jpg", b"utci"),
+            "plan": self._source("plan-scenarios/Existing-Plan.jpg", b"plan"),
+        }
+
+    def _source(self, rel_path, content):
+        path = self.base / "public/processed/climate" / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+        return path
+
+    def _run(self, *args):
+        out = StringIO()
+        call_command("import_climate_images", *args, stdout=out)
+        return out.getvalue()
+
+    def test_first_import_copies_and_creates_records(self):
+        output = self._run()
+        self.assertIn("Copied 2 images (0 unchanged)", output)
+        self.assertIn("Created 2, updated 0", output)
+
+        dest = self.base / "media/indicators/climate/utci-scenarios/Existing.jpg"
+        self.assertEqual(dest.read_bytes(), b"utci")
+        images = IndicatorImage.objects.filter(indicatorData__indicator=self.climate)
+        self.assertEqual(
+            sorted(images.values_list("image", flat=True)),
+            [
+                "indicators/climate/plan-scenarios/Existing-Plan.jpg",
+                "indicators/climate/utci-scenarios/Existing.jpg",
+            ],
+        )
+        self.assertEqual(IndicatorData.objects.filter(indicator=self.climate).count(), 2)
+
+    def test_rerun_is_a_no_op_until_a_source_changes(self):
+        self._run()
+        output = self._run()
+        self.assertIn("Copied 0 images (2 unchanged)", output)
+        self.assertIn("Created 0, updated 0", output)
+
+        # Same content with a new mtime is detected by hash and not copied
+        os.utime(self.sources["plan"], ns=(0, 0))
+        self.assertIn("Copied 0 images", self._run())
+
+        self.sources["utci"].write_bytes(b"utci v2")
+        self.assertIn("Copied 1 images (1 unchanged)", self._run())
+        self.assertEqual(
+            (self.base / "media/indicators/climate/utci-scenarios/Existing.jpg").read_bytes(), b"utci v2"
+        )
+
+    def test_link_mode_and_repointing_existing_records(self):
+        data = IndicatorData.objects.create(
+            indicator=self.climate, state=State.objects.get(scenario_name="existing", scenario_type="utci")
+        )
+        IndicatorImage.objects.create(indicatorData=data, image="indicators/climate/old.jpg")
+
+        output = self._run("--link")
+        self.assertIn("Created 1, updated 1", output)
+        dest = self.base / "media/indicators/climate/utci-scenarios/Existing.jpg"
+        self.assertEqual(os.stat(dest).st_ino, os.stat(self.sources["utci"]).st_ino)
+        self.assertEqual(
+            IndicatorImage.objects.get(indicatorData=data).image.name,
+            "indicators/climate/utci-scenarios/Existing.jpg",
+        )
+
+    def test_duplicate_states_resolve_to_the_lowest_id(self):
+        original = State.objects.get(scenario_name="existing", scenario_type="utci")
+        duplicate = State.objects.create(scenario_name="existing", scenario_type="utci", state_values={"copy": 1})
+        kept = IndicatorData.objects.create(indicator=self.climate, state=original)
+        IndicatorData.objects.create(indicator=self.climate, state=original)
+        IndicatorData.objects.create(indicator=self.climate, state=duplicate)
+
+        self._run()
+        utci = IndicatorImage.objects.get(image="indicators/climate/utci-scenarios/Existing.jpg")
+        self.assertEqual(utci.indicatorData_id, kept.id)
@@ -0,0 +1,78 @@
+import json
+
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from backend.models import LayerGroup, LayerState, OTEFViewportState, Table
+
+
+@override_settings(
+    CHANNEL_LAYERS={
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
+        }
+    }
+)
+class LayerStateGroupLookupTests(TestCase):
+    def setUp(self):
+        self.table = Table.objects.create(name="otef", display_name="OTEF")
+        OTEFViewportState.objects.create(
+            table=self.table,
+            viewport=OTEFViewportState.DEFAULT_VIEWPORT.copy(),
+            layers=OTEFViewportState.DEFAULT_LAYERS.copy(),
+            animations={},
+        )
+
+    def test_save_derives_group_id_and_layer_key(self):
+        st = LayerState.objects.create(
+            table=self.table, layer_id="map_3_future.mimushim", enabled=True
+        )
+        st.refresh_from_db()
+        self.assertEqual(st.group_id, "map_3_future")
+        self.assertEqual(st.layer_key, "mimushim")
+
+        st.layer_id = "projector_base.SEA"
+        st.save(update_fields=["layer_id"])
+        st.refresh_from_db()
+        self.assertEqual(st.group_id, "projector_base")
+        self.assertEqual(st.layer_key, "SEA")
+
+    def test_split_layer_id_keeps_dots_in_layer_key(self):
+        self.assertEqual(LayerState.split_layer_id("g.a.b"), ("g", "a.b"))
+        self.assertEqual(LayerState.split_layer_id("nodot"), ("", "nodot"))
+
+    def test_layer_groups_do_not_mix_prefix_sharing_groups(self):
+        LayerGroup.objects.create(table=self.table, group_id="pack", enabled=False)
+        LayerGroup.objects.create(table=self.table, group_id="pack_2", enabled=False)
+        LayerState.objects.create(table=self.table, layer_id="pack.a", enabled=True)
+        LayerState.objects.create(table=self.table, layer_id="pack_2.b", enabled=False)
+
+        res = self.client.get("/api/otef_viewport/by-table/otef/")
+        self.assertEqual(res.status_code, 200)
+        groups = {g["id"]: g for g in res.json()["layerGroups"]}
+        self.assertEqual([L["id"] for L in groups["pack"]["layers"]], ["a"])
+        self.assertEqual([L["id"] for L in groups["pack_2"]["layers"]], ["b"])
+
+    def test_set_layer_toggles_populates_split_columns_and_group_flag(self):
+        LayerGroup.objects.create(table=self.table, group_id="pack", enabled=False)
+        res = self.client.post(
+            "/api/otef_viewport/by-table/otef/command/",
+            data=json.dumps(
+                {
+                    "action": "set_layer_toggles",
+                    "changes": [
+                        {"full_layer_id": "pack.a", "enabled": True},
+                        {"full_layer_id": "pack.b", "enabled": True},
+                    ],
+                }
+            ),
+            content_type="application/json",
+        )
+        self.assertEqual(res.status_code, 200)
+        rows = LayerState.objects.filter(table=self.table, group_id="pack")
+        self.assertEqual(
+            sorted(rows.values_list("layer_key", flat=True)), ["a", "b"]
+        )
+        self.assertTrue(
+            LayerGroup.objects.get(table=self.table, group_id="pack").enabled
+        )
@@ -0,0 +1,168 @@
+import io
+import os
+import tempfile
+from unittest.mock import patch
+
+from django.core.files.move import file_move_safe
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.test.utils import override_settings
+from PIL import Image
+
+from backend.media_derivatives import derivatives_dir, generate_derivatives
+from backend.media_resolution import reset_media_index
+from backend.models import Indicator, IndicatorData, IndicatorImage, IndicatorImageDerivative, State, Table
+from backend.state_store import reset_state_store
+
+
+def _png(width, height):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (40, 120, 200)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@override_settings(
+    STATE_STORE={"BACKEND": "backend.state_store.InMemoryStateStore"},
+)
+class MediaDerivativeTests(TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        override = override_settings(MEDIA_ROOT=self._tmp.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        reset_state_store()
+        reset_media_index()
+
+        self.table = Table.objects.create(name="idistrict", display_name="iDistrict")
+        self.indicator = Indicator.objects.create(
+            table=self.table, indicator_id=1, name="Mobility", category="mobility"
+        )
+        # Default states are seeded by migrations
+        self.state = next(s for s in State.objects.order_by("id") if s.state_values.get("scenario") == "present")
+
+    def tearDown(self):
+        reset_state_store()
+        reset_media_index()
+
+    def _stored_image(self, name, content):
+        path = os.path.join(self._tmp.name, "indicators", "mobility", name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(content)
+        data = IndicatorData.objects.create(indicator=self.indicator, state=self.state)
+        return IndicatorImage.objects.create(indicatorData=data, image=f"indicators/mobility/{name}")
+
+    def test_renders_narrower_widths_and_serves_srcset(self):
+        image = self._stored_image("present.png", _png(1200, 600))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            rows = generate_derivatives(image.id)
+
+        webp = sorted(d.width for d in rows if d.format == "webp")
+        self.assertEqual(webp, [480, 960])
+        self.assertEqual(IndicatorImageDerivative.objects.filter(image=image).count(), len(rows))
+        for derivative in rows:
+            with Image.open(os.path.join(self._tmp.name, derivative.file.name)) as rendered:
+                self.assertEqual(rendered.size, (derivative.width, derivative.height))
+        self.assertEqual(rows[0].height, rows[0].width // 2)
+
+        response = self.client.get(
+            "/api/actions/get_image_data/",
+            {"table": "idistrict", "indicator": "mobility", "scenario": "present"},
+        )
+        payload = response.json()
+        self.assertEqual(payload["image_data"], "indicators/mobility/present.png")
+        self.assertIsNone(payload["poster"])
+        self.assertEqual(
+            [(s["width"], s["type"]) for s in payload["srcset"] if s["type"] == "image/webp"],
+            [(480, "image/webp"), (960, "image/webp")],
+        )
+        self.assertTrue(payload["srcset"][0]["url"].startswith(f"derivatives/{image.id}/"))
+
+    def test_regenerating_replaces_rows(self):
+        image = self._stored_image("present.png", _png(600, 300))
+        generate_derivatives(image.id)
+        generate_derivatives(image.id)
+        self.assertEqual(
+            list(IndicatorImageDerivative.objects.filter(image=image, format="webp").values_list("width", flat=True)),
+            [480],
+        )
+
+    def test_previous_build_stays_until_new_rows_commit(self):
+        image = self._stored_image("present.png", _png(1200, 600))
+        with self.captureOnCommitCallbacks(execute=True):
+            old_rows = generate_derivatives(image.id)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            new_rows = generate_derivatives(image.id)
+            # Rendering must not touch the files the committed rows point at
+            for row in old_rows + new_rows:
+                self.assertTrue(os.path.exists(os.path.join(self._tmp.name, row.file.name)))
+        for callback in callbacks:
+            callback()
+
+        self.assertEqual(len(os.listdir(derivatives_dir(image.id))), 1)
+        self.assertFalse(os.path.exists(os.path.join(self._tmp.name, old_rows[0].file.name)))
+        self.assertTrue(os.path.exists(os.path.join(self._tmp.name, new_rows[0].file.name)))
+
+    def test_deleting_image_removes_its_derivatives(self):
+        image = self._stored_image("present.png", _png(1200, 600))
+        with self.captureOnCommitCallbacks(execute=True):
+            generate_derivatives(image.id)
+        self.assertTrue(os.path.isdir(derivatives_dir(image.id)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            image.indicatorData.delete()
+        self.assertFalse(os.path.exists(derivatives_dir(image.id)))
+
+    def test_small_or_unsupported_media_get_no_derivatives(self):
+        small = self._stored_image("small.png", _png(300, 200))
+        self.assertEqual(generate_derivatives(small.id), [])
+        svg = self._stored_image("map.svg", b"<svg xmlns='http://www.w3.org/2000/svg'/>")
+        self.assertEqual(generate_derivatives(svg.id), [])
+
+        response = self.client.get(
+            "/api/actions/get_image_data/",
+            {"table": "idistrict", "indicator": "mobility", "scenario": "present"},
+        )
+        self.assertNotIn("srcset", response.json())
+
+    def test_upload_streams_file_and_schedules_derivatives(self):
+        upload = SimpleUploadedFile("present.png", _png(1000, 500), content_type="image/png")
+        with patch("backend.views.schedule_derivatives") as schedule:
+            response = self.client.post(
+                "/api/upload_image/",
+                {"indicator_id": 1, "state_id": self.state.id, "table": "idistrict", "image": upload},
+            )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["derivatives"], "pending")
+        schedule.assert_called_once_with(response.json()["image_id"])
+        folder = os.path.join(self._tmp.name, "indicators", "mobility")
+        self.assertEqual(os.listdir(folder), ["mobility_2023.png"])
+
+    def test_upload_moves_spooled_file_into_place(self):
+        upload = SimpleUploadedFile("present.png", _png(1000, 500), content_type="image/png")
+        with override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=0), patch(
+            "backend.views.schedule_derivatives"
+        ), patch("backend.views.file_move_safe", wraps=file_move_safe) as move:
+            response = self.client.post(
+                "/api/upload_image/",
+                {"indicator_id": 1, "state_id": self.state.id, "table": "idistrict", "image": upload},
+            )
+
+        self.assertEqual(response.status_code, 201)
+        move.assert_called_once()
+        with open(os.path.join(self._tmp.name, "indicators", "mobility", "mobility_2023.png"), "rb") as f:
+            self.assertEqual(f.read(), _png(1000, 500))
+
+    def test_upload_accepts_video(self):
+        upload = SimpleUploadedFile("clip.mp4", b"\x00\x00\x00\x18ftypmp42", content_type="video/mp4")
+        with patch("backend.views.schedule_derivatives"):
+            response = self.client.post(
+                "/api/upload_image/",
+                {"indicator_id": 1, "state_id": self.state.id, "table": "idistrict", "image": upload},
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(IndicatorImage.objects.get(id=response.json()["image_id"]).media_type, "video")
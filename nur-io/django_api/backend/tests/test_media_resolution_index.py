@@ -0,0 +1,103 @@
+from unittest import mock
+
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from backend import globals
+from backend.media_resolution import build_media_index, lookup_media, reset_media_index
+from backend.models import Indicator, IndicatorData, IndicatorImage, State, Table
+from backend.state_store import reset_state_store
+
+
+@override_settings(
+    STATE_STORE={"BACKEND": "backend.state_store.InMemoryStateStore"},
+)
+class MediaResolutionIndexTests(TestCase):
+    def setUp(self):
+        reset_state_store()
+        reset_media_index()
+        self.table = Table.objects.create(name="idistrict", display_name="iDistrict")
+        self.mobility = Indicator.objects.create(
+            table=self.table, indicator_id=1, name="Mobility", category="mobility"
+        )
+        self.climate = Indicator.objects.create(
+            table=self.table, indicator_id=2, name="Climate", category="climate"
+        )
+        # Default states are seeded by migrations
+        present = next(s for s in State.objects.order_by("id") if s.state_values.get("scenario") == "present")
+        existing = State.objects.get(scenario_name="existing", scenario_type="utci")
+        self._add_image(self.mobility, present, "indicators/mobility/present.png")
+        self._add_image(self.climate, existing, "indicators/climate/existing_utci.mp4")
+
+    def tearDown(self):
+        reset_state_store()
+
+    def _add_image(self, indicator, state, path):
+        data = IndicatorData.objects.create(indicator=indicator, state=state)
+        return IndicatorImage.objects.create(indicatorData=data, image=path)
+
+    def test_index_keys_climate_by_scenario_and_type(self):
+        index = build_media_index()
+
+        self.assertEqual(
+            index[("idistrict", 1, "present", None)]["image_data"], "indicators/mobility/present.png"
+        )
+        self.assertEqual(index[("idistrict", 2, "existing", "utci")]["type"], "video")
+        self.assertNotIn(("idistrict", 2, "existing", None), index)
+
+    def test_get_image_data_served_from_index(self):
+        lookup_media("idistrict", 1, "present")  # warm the index
+
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                "/api/actions/get_image_data/",
+                {"table": "idistrict", "indicator": "mobility", "scenario": "present"},
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["image_data"], "indicators/mobility/present.png")
+
+    def _get_current_image(self):
+        return self.client.get("/api/actions/get_image_data/", {"table": "idistrict"}).json()
+
+    def _assert_fast_path_matches_fallback(self):
+        lookup_media("idistrict", 1, "present")  # warm the index
+        with self.assertNumQueries(0):
+            served = self._get_current_image()
+        with mock.patch("backend.views.lookup_current_media", return_value=None):
+            self.assertEqual(self._get_current_image(), served)
+        return served
+
+    def test_current_state_served_from_index_by_exact_state_values(self):
+        self.mobility.has_states = True
+        self.mobility.save()
+        # Same scenario in two years: the scenario alone doesn't pick the state
+        for year in (2030, 2040):
+            state = State.objects.create(state_values={"year": year, "scenario": "future", "label": "Future"})
+            self._add_image(self.mobility, state, f"indicators/mobility/future_{year}.png")
+        globals.update_indicator_state(
+            "idistrict", indicator_id=1, indicator_state={"year": 2040, "scenario": "future", "label": "Future"}
+        )
+
+        served = self._assert_fast_path_matches_fallback()
+        self.assertEqual(served["image_data"], "indicators/mobility/future_2040.png")
+
+    def test_stateless_indicator_served_from_index_by_empty_state(self):
+        empty = State.objects.create(state_values={})
+        self._add_image(self.mobility, empty, "indicators/mobility/static.png")
+        globals.update_indicator_state(
+            "idistrict", indicator_id=1, indicator_state={"scenario": "present", "label": "Present"}
+        )
+
+        served = self._assert_fast_path_matches_fallback()
+        self.assertEqual(served["image_data"], "indicators/mobility/static.png")
+
+    def test_saving_media_rebuilds_index(self):
+        self.assertIsNone(lookup_media("idistrict", 1, "workshop"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            future = State.objects.create(state_values={"scenario": "workshop", "label": "Workshop"})
+            self._add_image(self.mobility, future, "indicators/mobility/workshop.png")
+
+        self.assertEqual(
+            lookup_media("idistrict", 1, "workshop")["image_data"], "indicators/mobility/workshop.png"
+        )
@@ -0,0 +1,66 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from backend import media_sync
+from backend.media_sync import MANIFEST_NAME, sync_tree
+
+
+class MediaSyncTests(SimpleTestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.source = Path(self._tmp.name) / "src"
+        self.dest = Path(self._tmp.name) / "dest"
+        (self.source / "layers/pack").mkdir(parents=True)
+        (self.source / "layers/pack/a.pmtiles").write_text("a")
+        (self.source / "b.json").write_text("b")
+
+    def test_hard_links_and_skips_unchanged_files(self):
+        self.assertEqual(sync_tree(self.source, self.dest), (2, 0, 0))
+        linked = self.dest / "layers/pack/a.pmtiles"
+        self.assertEqual(os.stat(linked).st_ino, os.stat(self.source / "layers/pack/a.pmtiles").st_ino)
+        self.assertEqual(sync_tree(self.source, self.dest), (0, 2, 0))
+
+        manifest = json.loads((self.dest / MANIFEST_NAME).read_text())["files"]
+        self.assertEqual(sorted(manifest), ["b.json", "layers/pack/a.pmtiles"])
+
+    def test_unchanged_files_are_not_rehashed(self):
+        sync_tree(self.source, self.dest, link=False)
+        with patch.object(media_sync, "file_sha256") as sha:
+            self.assertEqual(sync_tree(self.source, self.dest, link=False), (0, 2, 0))
+        sha.assert_not_called()
+
+    def test_touched_but_identical_file_is_not_rewritten(self):
+        sync_tree(self.source, self.dest, link=False)
+        before = os.stat(self.dest / "b.json").st_ino
+        os.utime(self.source / "b.json", ns=(10**18, 10**18))
+        self.assertEqual(sync_tree(self.source, self.dest, link=False), (0, 2, 0))
+        self.assertEqual(os.stat(self.dest / "b.json").st_ino, before)
+
+    def test_existing_copies_without_manifest_are_adopted(self):
+        # e.g. left behind by the old `cp -rf`, with fresh mtimes
+        (self.dest / "layers/pack").mkdir(parents=True)
+        (self.dest / "layers/pack/a.pmtiles").write_text("a")
+        (self.dest / "b.json").write_text("stale")
+        self.assertEqual(sync_tree(self.source, self.dest, link=False), (1, 1, 0))
+        self.assertEqual((self.dest / "b.json").read_text(), "b")
+
+    def test_changed_files_replaced_and_orphans_deleted(self):
+        (self.dest).mkdir()
+        (self.dest / "upload.png").write_text("not ours")
+        sync_tree(self.source, self.dest, link=False)
+
+        (self.source / "b.json").write_text("b v2")
+        os.remove(self.source / "layers/pack/a.pmtiles")
+        os.rmdir(self.source / "layers/pack")
+
+        self.assertEqual(sync_tree(self.source, self.dest, link=False), (1, 0, 1))
+        self.assertEqual((self.dest / "b.json").read_text(), "b v2")
+        self.assertFalse((self.dest / "layers/pack").exists())
+        self.assertTrue((self.dest / "upload.png").exists())
+        self.assertEqual(list(self.dest.glob("**/*.sync-tmp")), [])
@@ -0,0 +1,46 @@
+import gzip
+import json
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.test import TestCase
+
+PINK_LINE = {"type": "FeatureCollection", "features": []}
+
+
+class PinkLinePrecompressedTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / "pink.geojson"
+        self.path.write_text(json.dumps(PINK_LINE), encoding="utf-8")
+        patcher = mock.patch("backend.views._PINK_LINE_PACK_CANDIDATES", [self.path])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _write_gz(self):
+        gz_path = Path(str(self.path) + ".gz")
+        gz_path.write_bytes(gzip.compress(self.path.read_bytes()))
+        return gz_path
+
+    def test_serves_gzip_sibling_when_accepted(self):
+        self._write_gz()
+        res = self.client.get("/api/pink-line/", HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res["Content-Encoding"], "gzip")
+        self.assertEqual(res["Content-Type"], "application/geo+json")
+        self.assertIn("Accept-Encoding", res["Vary"])
+        self.assertEqual(json.loads(gzip.decompress(b"".join(res.streaming_content))), PINK_LINE)
+
+    def test_streams_identity_bytes_without_sibling_or_when_sibling_is_stale(self):
+        res = self.client.get("/api/pink-line/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertNotIn("Content-Encoding", res)
+        self.assertEqual(b"".join(res.streaming_content), self.path.read_bytes())
+
+        gz_path = self._write_gz()
+        past = os.path.getmtime(self.path) - 60
+        os.utime(gz_path, (past, past))
+        res = self.client.get("/api/pink-line/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertNotIn("Content-Encoding", res)
@@ -0,0 +1,126 @@
+from unittest import mock
+
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from backend import globals
+from backend.models import Indicator, IndicatorData, IndicatorImage, State, Table
+from backend.media_resolution import reset_media_index
+from backend.presentation_scheduler import _scheduler_tick, advance_due_presentations
+from backend.state_store import reset_state_store
+from backend.views import _presentation_broadcast_data
+
+from .test_presentation_state_store import ConflictingRedis
+
+SEQUENCE = [
+    {"indicator": "mobility", "state": "Present"},
+    {"indicator": "mobility", "state": "Future"},
+]
+
+
+@override_settings(
+    CHANNEL_LAYERS={
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
+        }
+    },
+    STATE_STORE={"BACKEND": "backend.state_store.InMemoryStateStore"},
+    PRESENTATION_SCHEDULER_ENABLED=True,
+)
+class PresentationSchedulerTests(TestCase):
+    def setUp(self):
+        reset_state_store()
+        reset_media_index()
+        self.table = Table.objects.create(name="idistrict", display_name="iDistrict")
+
+    def tearDown(self):
+        reset_state_store()
+
+    def _start(self):
+        response = self.client.post(
+            "/api/actions/set_presentation_state/",
+            data={"table": "idistrict", "sequence": SEQUENCE, "sequence_index": 0, "duration": 5, "is_playing": True},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        return globals.get_presentation_state("idistrict")
+
+    def test_playing_sets_deadline_and_pause_clears_it(self):
+        state = self._start()
+        self.assertIsNotNone(state["next_advance_at"])
+
+        self.client.post(
+            "/api/actions/set_presentation_state/",
+            data={"table": "idistrict", "is_playing": False},
+            content_type="application/json",
+        )
+        self.assertIsNone(globals.get_presentation_state("idistrict")["next_advance_at"])
+
+    def test_advances_only_once_when_due(self):
+        state = self._start()
+        deadline = state["next_advance_at"]
+
+        self.assertEqual(advance_due_presentations(now=deadline - 1), [])
+        self.assertEqual(globals.get_presentation_state("idistrict")["sequence_index"], 0)
+
+        with mock.patch("backend.views.broadcast_presentation_update") as broadcast:
+            self.assertEqual(advance_due_presentations(now=deadline), ["idistrict"])
+            # A second worker polling at the same instant finds the new deadline and does nothing
+            self.assertEqual(advance_due_presentations(now=deadline), [])
+        broadcast.assert_called_once_with("idistrict")
+
+        state = globals.get_presentation_state("idistrict")
+        self.assertEqual(state["sequence_index"], 1)
+        self.assertEqual(state["next_advance_at"], deadline + 5)
+
+    def test_retry_after_another_worker_advanced_does_nothing(self):
+        redis_client = ConflictingRedis()
+        with override_settings(STATE_STORE={"BACKEND": "backend.state_store.RedisStateStore"}), mock.patch(
+            "redis.Redis.from_url", return_value=redis_client
+        ):
+            reset_state_store()
+            deadline = self._start()["next_advance_at"]
+
+            def other_worker_advances(data):
+                data.update(sequence_index=1, next_advance_at=deadline + 5)
+
+            # Another worker advances the slide between our read and our write
+            redis_client.conflicts.append(
+                lambda: redis_client.write_json("nur:state:presentation:idistrict", other_worker_advances)
+            )
+            with mock.patch("backend.views.broadcast_presentation_update") as broadcast:
+                self.assertEqual(advance_due_presentations(now=deadline), [])
+            broadcast.assert_not_called()
+            self.assertEqual(redis_client.conflicts, [])
+            self.assertEqual(globals.get_presentation_state("idistrict")["sequence_index"], 1)
+        reset_state_store()
+
+    def test_tick_closes_old_connections_around_the_pass(self):
+        with mock.patch("backend.presentation_scheduler.close_old_connections") as close, mock.patch(
+            "backend.presentation_scheduler.advance_due_presentations", side_effect=RuntimeError
+        ):
+            with self.assertRaises(RuntimeError):
+                _scheduler_tick()
+        self.assertEqual(close.call_count, 2)
+
+    def test_broadcast_includes_current_and_next_media(self):
+        indicator = Indicator.objects.create(
+            table=self.table, indicator_id=1, name="Mobility", category="mobility"
+        )
+        for scenario in ("present", "future"):
+            state = State.objects.create(
+                scenario_type="general",
+                state_values={"scenario": scenario, "label": scenario.title()},
+            )
+            data = IndicatorData.objects.create(indicator=indicator, state=state)
+            IndicatorImage.objects.create(
+                indicatorData=data, image=f"indicators/mobility/{scenario}.png"
+            )
+
+        state = self._start()
+        payload = _presentation_broadcast_data("idistrict", state)
+
+        self.assertTrue(payload["server_driven"])
+        self.assertEqual(payload["current_media"]["type"], "image")
+        self.assertIn("present", payload["current_media"]["image_data"])
+        self.assertIn("future", payload["next_media"]["image_data"])
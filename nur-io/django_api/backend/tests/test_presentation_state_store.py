@@ -0,0 +1,234 @@
+import fnmatch
+import json
+import threading
+from contextlib import redirect_stdout
+from io import StringIO
+from unittest import mock
+
+import redis
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from backend import globals
+from backend.models import Indicator, Table
+from backend.state_store import InMemoryStateStore, reset_state_store
+
+
+class ConflictingRedis:
+    """
+    In-memory stand-in for the redis client RedisStateStore uses. Callables in
+    ``conflicts`` run (one per transaction) just before a transaction executes,
+    as another worker's write, so that transaction fails with WatchError and
+    the store retries.
+    """
+
+    def __init__(self):
+        self.hashes = {}
+        self.sets = {}
+        self.conflicts = []
+
+    def hmget(self, key, *fields):
+        entry = self.hashes.get(key, {})
+        return [entry.get(field) for field in fields]
+
+    def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update({k: str(v) for k, v in mapping.items()})
+
+    def smembers(self, key):
+        return set(self.sets.get(key, ()))
+
+    def scan_iter(self, pattern):
+        return [key for key in list(self.hashes) + list(self.sets) if fnmatch.fnmatch(key, pattern)]
+
+    def delete(self, key):
+        self.hashes.pop(key, None)
+        self.sets.pop(key, None)
+
+    def pipeline(self):
+        return _ConflictingPipeline(self)
+
+    def write_json(self, key, mutate):
+        """Another writer's read-modify-write of a store entry."""
+        entry = self.hashes[key]
+        data = json.loads(entry["data"])
+        mutate(data)
+        self.hset(key, {"data": json.dumps(data), "version": int(entry["version"]) + 1})
+
+
+class _ConflictingPipeline:
+    def __init__(self, client):
+        self.client = client
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def watch(self, key):
+        self.watched = (key, self.client.hashes.get(key, {}).get("version"))
+
+    def hmget(self, key, *fields):
+        return self.client.hmget(key, *fields)
+
+    def multi(self):
+        self.queued = []
+
+    def hset(self, key, mapping):
+        self.queued.append(lambda: self.client.hset(key, mapping))
+
+    def sadd(self, key, member):
+        self.queued.append(lambda: self.client.sets.setdefault(key, set()).add(member))
+
+    def execute(self):
+        if self.client.conflicts:
+            self.client.conflicts.pop(0)()
+        key, version = self.watched
+        if self.client.hashes.get(key, {}).get("version") != version:
+            raise redis.WatchError()
+        for command in self.queued:
+            command()
+
+
+class InMemoryStateStoreTests(TestCase):
+    def test_update_is_versioned_and_returns_copies(self):
+        store = InMemoryStateStore()
+        self.assertEqual(store.get("presentation", "otef"), (None, 0))
+
+        data, version = store.update(
+            "presentation", "otef", lambda d: d.update(duration=5), dict
+        )
+        self.assertEqual((data, version), ({"duration": 5}, 1))
+
+        data["duration"] = 99  # caller copies must not leak back into the store
+        self.assertEqual(store.get("presentation", "otef"), ({"duration": 5}, 1))
+
+        _, version = store.update(
+            "presentation", "otef", lambda d: d.update(duration=6), dict
+        )
+        self.assertEqual(version, 2)
+        self.assertEqual(store.keys("presentation"), ["otef"])
+
+    def test_concurrent_updates_are_not_lost(self):
+        store = InMemoryStateStore()
+
+        def bump(d):
+            d["count"] = d.get("count", 0) + 1
+
+        threads = [
+            threading.Thread(
+                target=lambda: [
+                    store.update("indicator", "t", bump, dict) for _ in range(50)
+                ]
+            )
+            for _ in range(4)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(store.get("indicator", "t"), ({"count": 200}, 200))
+
+
+@override_settings(
+    CHANNEL_LAYERS={
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
+        }
+    },
+    STATE_STORE={"BACKEND": "backend.state_store.InMemoryStateStore"},
+)
+class PresentationStateStoreApiTests(TestCase):
+    def setUp(self):
+        reset_state_store()
+        self.table = Table.objects.create(name="idistrict", display_name="iDistrict")
+        Indicator.objects.create(
+            table=self.table, indicator_id=2, name="Climate", category="climate"
+        )
+
+    def tearDown(self):
+        reset_state_store()
+
+    def test_set_presentation_state_persists_to_store(self):
+        before = globals.get_presentation_state("idistrict")["version"]
+        res = self.client.post(
+            "/api/actions/set_presentation_state/",
+            data=json.dumps({"table": "idistrict", "duration": 7, "sequence_index": 1}),
+            content_type="application/json",
+        )
+        self.assertEqual(res.status_code, 200)
+
+        state = globals.get_presentation_state("idistrict")
+        self.assertEqual(state["duration"], 7)
+        self.assertEqual(state["sequence_index"], 1)
+        self.assertEqual(state["version"], before + 1)
+
+        body = self.client.get(
+            "/api/actions/get_presentation_state/?table=idistrict"
+        ).json()
+        self.assertEqual(body["duration"], 7)
+        self.assertEqual(body["sequence_index"], 1)
+
+    def test_set_current_indicator_updates_table_state_and_pauses(self):
+        globals.update_presentation_state("idistrict", is_playing=True)
+        res = self.client.post(
+            "/api/actions/set_current_indicator/",
+            data=json.dumps({"table": "idistrict", "indicator_id": 2}),
+            content_type="application/json",
+        )
+        self.assertEqual(res.status_code, 200)
+
+        self.assertFalse(globals.get_presentation_state("idistrict")["is_playing"])
+        body = self.client.get(
+            "/api/actions/get_global_variables/?table=idistrict"
+        ).json()
+        self.assertEqual(body["indicator_id"], 2)
+        self.assertEqual(body["indicator_state"], globals.DEFAULT_CLIMATE_STATE)
+        self.assertFalse(body["presentation_playing"])
+
+
+@override_settings(
+    CHANNEL_LAYERS={
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
+        }
+    },
+    STATE_STORE={"BACKEND": "backend.state_store.RedisStateStore"},
+)
+class RedisPresentationStateTests(TestCase):
+    def setUp(self):
+        self.redis = ConflictingRedis()
+        patcher = mock.patch("redis.Redis.from_url", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        reset_state_store()
+        self.addCleanup(reset_state_store)
+        Table.objects.create(name="idistrict", display_name="iDistrict")
+
+    def test_set_presentation_state_retry_starts_from_a_clean_slate(self):
+        globals.update_presentation_state(
+            "idistrict", is_playing=False, sequence=[{"indicator": "mobility", "state": "Present"}]
+        )
+
+        # Another worker starts playback between our read and our write
+        self.redis.conflicts.append(
+            lambda: self.redis.write_json(
+                "nur:state:presentation:idistrict", lambda data: data.update(is_playing=True, next_advance_at=123.0)
+            )
+        )
+        out = StringIO()
+        with mock.patch("backend.views.sync_indicator_from_presentation_slide") as sync, redirect_stdout(out):
+            response = self.client.post(
+                "/api/actions/set_presentation_state/",
+                data=json.dumps({"table": "idistrict", "is_playing": True}),
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.redis.conflicts, [])  # the conflict fired, so the update was retried
+
+        # On the retry playback was already running: nothing started, the timer is kept
+        sync.assert_not_called()
+        state = globals.get_presentation_state("idistrict")
+        self.assertTrue(state["is_playing"])
+        self.assertEqual(state["next_advance_at"], 123.0)
+        self.assertEqual(out.getvalue().count("✓ Presentation playing"), 1)
@@ -0,0 +1,83 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.test import TestCase
+
+from backend.management.commands.import_otef_data import Command
+from backend.models import LayerGroup, LayerState, OTEFModelConfig, Table
+
+
+class SeedLayerGroupsTests(TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.layers_dir = self._tmp.name
+        self.table = Table.objects.create(name="otef_seed", display_name="OTEF")
+        OTEFModelConfig.objects.create(table=self.table)
+        self._write_manifests(
+            {
+                "projector_base": ["model_base", "SEA"],
+                "map_3_future": ["mimushim", "roads"],
+            }
+        )
+
+    def _write_manifests(self, packs):
+        with open(os.path.join(self.layers_dir, "layers-manifest.json"), "w") as f:
+            json.dump({"packs": list(packs)}, f)
+        for pack_id, layer_ids in packs.items():
+            os.makedirs(os.path.join(self.layers_dir, pack_id), exist_ok=True)
+            with open(os.path.join(self.layers_dir, pack_id, "manifest.json"), "w") as f:
+                json.dump({"layers": [{"id": layer_id} for layer_id in layer_ids]}, f)
+
+    def _seed(self, **kwargs):
+        out = StringIO()
+        Command(stdout=out)._seed_layer_groups(self.table, layers_dir=self.layers_dir, **kwargs)
+        return out.getvalue()
+
+    def test_seeds_groups_and_states_in_bulk(self):
+        # config, groups, states, 2 bulk inserts, hash update (+ savepoint)
+        with self.assertNumQueries(8):
+            output = self._seed()
+        self.assertIn("2 created, 0 enabled, 4 layer state(s) created", output)
+
+        self.assertEqual(
+            dict(LayerGroup.objects.filter(table=self.table).values_list("group_id", "enabled")),
+            {"projector_base": True, "map_3_future": False},
+        )
+        state = LayerState.objects.get(table=self.table, layer_id="map_3_future.mimushim")
+        self.assertEqual((state.group_id, state.layer_key, state.enabled), ("map_3_future", "mimushim", False))
+
+    def test_unchanged_manifests_skip_seeding(self):
+        self._seed()
+        with self.assertNumQueries(1):
+            self.assertIn("unchanged, skipping", self._seed())
+
+    def test_changed_manifests_add_only_missing_rows(self):
+        self._seed()
+        LayerState.objects.filter(table=self.table, layer_id="map_3_future.roads").update(enabled=True)
+        LayerGroup.objects.filter(table=self.table, group_id="projector_base").update(enabled=False)
+
+        self._write_manifests(
+            {
+                "projector_base": ["model_base", "SEA"],
+                "map_3_future": ["mimushim", "roads", "parks"],
+            }
+        )
+        output = self._seed()
+        self.assertIn("0 created, 1 enabled, 1 layer state(s) created", output)
+        # Existing layer visibility is left alone
+        self.assertTrue(LayerState.objects.get(table=self.table, layer_id="map_3_future.roads").enabled)
+        self.assertEqual(LayerState.objects.filter(table=self.table).count(), 5)
+
+        LayerState.objects.filter(table=self.table, layer_id="map_3_future.parks").delete()
+        self.assertIn("unchanged", self._seed())
+        self.assertIn("1 layer state(s) created", self._seed(force=True))
+
+    def test_bulk_created_states_split_like_save(self):
+        self._write_manifests({"projector_base": ["model_base"], "v2.roads": ["major"]})
+        self._seed()
+        seeded = LayerState.objects.get(table=self.table, layer_id="v2.roads.major")
+        # Same columns LayerState.save() would store for that id
+        self.assertEqual((seeded.group_id, seeded.layer_key), ("v2", "roads.major"))
@@ -0,0 +1,70 @@
+from django.test import TestCase
+
+from backend.models import DashboardFeedState, State
+
+
+def _scan(year=None, scenario=None, match_scenario=True):
+    """The per-row Python matching the endpoints used before the indexed columns."""
+    for s in State.objects.order_by("id"):
+        values = s.state_values or {}
+        if values.get("year") == year and (not match_scenario or values.get("scenario") == scenario):
+            return s
+    return None
+
+
+class StateLookupColumnTests(TestCase):
+    def setUp(self):
+        State.objects.create(state_values={"year": 2030.5, "scenario": [1]})
+        State.objects.create(state_values={"year": 2030, "scenario": "future", "label": "Future"})
+        State.objects.create(state_values={"year": "2040", "scenario": "string_year"})
+        State.objects.create(state_values={"scenario": "no_year"})
+        State.objects.create(state_values={})
+        State.objects.create(state_values=None)
+        State.objects.create(state_values={"year": None, "scenario": None})
+
+    def test_save_keeps_columns_in_sync(self):
+        state = State.objects.create(state_values={"year": 2050, "scenario": "far"})
+        self.assertEqual((state.year, state.scenario_key), (2050, "far"))
+
+        state.state_values = {"year": 2051}
+        state.save(update_fields=["state_values"])
+        state.refresh_from_db()
+        self.assertEqual((state.year, state.scenario_key), (2051, None))
+
+    def test_matching_is_equivalent_to_python_scan(self):
+        cases = [
+            (2023, "present"),
+            (2023, "survey"),
+            (2030, "future"),
+            (2030, "present"),
+            ("2040", "string_year"),
+            (None, "no_year"),
+            (1999, None),
+            (None, None),
+            (2030.5, None),
+        ]
+        for year, scenario in cases:
+            with self.subTest(year=year, scenario=scenario):
+                self.assertEqual(
+                    State.matching(year=year, scenario=scenario).first(), _scan(year, scenario)
+                )
+                self.assertEqual(
+                    State.matching(year=year).first(), _scan(year, match_scenario=False)
+                )
+
+    def test_none_matches_missing_or_null_only(self):
+        # A year/scenario the columns can't hold (float, list) is not "no value"
+        self.assertEqual(
+            [s.state_values for s in State.matching(year=None, scenario=None)],
+            [{}, None, {"year": None, "scenario": None}],
+        )
+
+    def test_dashboard_year_lookup_uses_indexed_columns(self):
+        future = State.matching(year=2030).get()
+        DashboardFeedState.objects.create(state=future, data={"population": 1})
+
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/actions/get_current_dashboard_data/", {"year": "2030"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["state"]["scenario"], "future")
@@ -0,0 +1,191 @@
+import os
+import tempfile
+
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from backend import vector_tiles
+from backend.models import GISLayer, Table
+
+# Beer Sheva area; tile 10/610/418 contains the point
+POINT = [34.8, 31.25]
+FEATURES = {
+    "type": "FeatureCollection",
+    "features": [
+        {
+            "type": "Feature",
+            "id": 7,
+            "properties": {"name": "a", "votes": 3, "score": 0.5, "flag": True, "tags": ["x"]},
+            "geometry": {"type": "Point", "coordinates": POINT},
+        },
+        {
+            "type": "Feature",
+            "properties": {"name": "area"},
+            "geometry": {
+                "type": "Polygon",
+                "coordinates": [[[34.0, 30.0], [36.0, 30.0], [36.0, 32.0], [34.0, 32.0], [34.0, 30.0]]],
+            },
+        },
+    ],
+}
+
+
+def _read_varint(buf, pos):
+    shift = result = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return result, pos
+
+
+def _fields(buf):
+    """Minimal protobuf reader: [(field, value)] with bytes for length-delimited fields."""
+    pos, out = 0, []
+    while pos < len(buf):
+        key, pos = _read_varint(buf, pos)
+        field, wire = key >> 3, key & 7
+        if wire == 0:
+            value, pos = _read_varint(buf, pos)
+        elif wire == 1:
+            value, pos = buf[pos:pos + 8], pos + 8
+        else:
+            length, pos = _read_varint(buf, pos)
+            value, pos = buf[pos:pos + length], pos + length
+        out.append((field, value))
+    return out
+
+
+def _packed(buf):
+    pos, values = 0, []
+    while pos < len(buf):
+        value, pos = _read_varint(buf, pos)
+        values.append(value)
+    return values
+
+
+def _decode(tile):
+    [(field, layer)] = _fields(tile)
+    assert field == 3
+    fields = _fields(layer)
+    features = []
+    for f, value in fields:
+        if f == 2:
+            feature = dict(_fields(value))
+            feature["geometry"] = _packed(feature[4])
+            features.append(feature)
+    return {
+        "name": dict(fields)[1].decode(),
+        "extent": dict(fields)[5],
+        "keys": [v.decode() for f, v in fields if f == 3],
+        "features": features,
+    }
+
+
+def _unzigzag(n):
+    return (n >> 1) ^ -(n & 1)
+
+
+class VectorTileTests(TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        override = override_settings(GIS_LAYER_CACHE_DIR=self._tmp.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        vector_tiles.reset_tile_indexes()
+
+        self.table = Table.objects.create(name="otef", display_name="OTEF")
+        self.layer = GISLayer.objects.create(
+            table=self.table, name="curated_1", display_name="Curated 1", data=FEATURES
+        )
+
+    def _url(self, z, x, y):
+        return f"/api/gis_layers/{self.layer.id}/tiles/{z}/{x}/{y}.mvt"
+
+    def test_layer_index_lists_tile_template(self):
+        [entry] = self.client.get("/api/actions/get_otef_layers/", {"table": "otef"}).json()
+        self.assertEqual(
+            entry["tiles_url"],
+            f"/api/gis_layers/{self.layer.id}/tiles/{{z}}/{{x}}/{{y}}.mvt?v={self.layer.data_hash}",
+        )
+
+    def test_tile_encodes_features_and_properties(self):
+        res = self.client.get(self._url(10, 610, 418), {"v": self.layer.data_hash})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res["Content-Type"], "application/vnd.mapbox-vector-tile")
+        self.assertIn("immutable", res["Cache-Control"])
+
+        tile = _decode(b"".join(res.streaming_content))
+        self.assertEqual((tile["name"], tile["extent"]), ("curated_1", 4096))
+        self.assertEqual(set(tile["keys"]), {"name", "votes", "score", "flag", "tags"})
+        point, area = tile["features"]
+        self.assertEqual((point[1], point[3]), (7, 1))
+        self.assertEqual(area[3], 3)
+
+        # MoveTo(1) with a position inside the tile
+        command, dx, dy = point["geometry"]
+        self.assertEqual(command, (1 << 3) | 1)
+        self.assertTrue(0 <= _unzigzag(dx) < 4096 and 0 <= _unzigzag(dy) < 4096)
+
+        # The polygon covers the whole tile: clipped to the buffered tile square
+        coords, cx, cy, geom = [], 0, 0, area["geometry"]
+        i = 0
+        while i < len(geom):
+            command, count = geom[i] & 7, geom[i] >> 3
+            i += 1
+            if command == 7:
+                continue
+            for _ in range(count):
+                cx += _unzigzag(geom[i])
+                cy += _unzigzag(geom[i + 1])
+                coords.append((cx, cy))
+                i += 2
+        self.assertEqual(sorted(set(coords)), [(-64, -64), (-64, 4160), (4160, -64), (4160, 4160)])
+
+    def test_empty_tile_and_revalidation(self):
+        res = self.client.get(self._url(10, 0, 0))
+        self.assertEqual(res.status_code, 204)
+        self.assertEqual(res.content, b"")
+        self.assertIn("no-cache", res["Cache-Control"])
+
+        cached = self.client.get(self._url(10, 0, 0), HTTP_IF_NONE_MATCH=res["ETag"])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(self.client.get(self._url(1, 2, 0)).status_code, 404)
+
+    def test_only_non_empty_tiles_up_to_max_cached_zoom_are_written(self):
+        tiles_root = os.path.join(self._tmp.name, "tiles")
+        # Empty tiles, however many are requested, leave nothing on disk
+        for x in range(3):
+            self.assertEqual(self.client.get(self._url(18, x, 0)).status_code, 204)
+        self.assertFalse(os.path.exists(tiles_root))
+
+        # A tile deeper than MAX_CACHED_ZOOM is served but not persisted
+        z = vector_tiles.MAX_CACHED_ZOOM + 1
+        x, y = (int(c * 2 ** z) for c in vector_tiles._project(POINT))
+        res = self.client.get(self._url(z, x, y))
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(_decode(res.content)["features"]), 2)
+        self.assertFalse(os.path.exists(tiles_root))
+
+        self.client.get(self._url(10, 610, 418))
+        layer_tiles = os.path.join(tiles_root, f"{self.layer.id}-{self.layer.data_hash}")
+        self.assertEqual(os.listdir(layer_tiles), ["10"])
+
+    def test_saving_layer_invalidates_cached_tiles(self):
+        self.client.get(self._url(0, 0, 0))
+        tiles_root = os.path.join(self._tmp.name, "tiles")
+        self.assertEqual(os.listdir(tiles_root), [f"{self.layer.id}-{self.layer.data_hash}"])
+
+        self.layer.data = {"type": "FeatureCollection", "features": []}
+        self.layer.save()
+        self.assertEqual(os.listdir(tiles_root), [])
+
+        self.assertEqual(self.client.get(self._url(0, 0, 0)).status_code, 204)
+
+    def test_non_wgs84_layer_is_rejected(self):
+        self.layer.data = {**FEATURES, "crs": {"type": "name", "properties": {"name": "EPSG:2039"}}}
+        self.layer.save()
+        self.assertEqual(self.client.get(self._url(0, 0, 0)).status_code, 400)
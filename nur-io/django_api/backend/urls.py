@@ -29,6 +29,7 @@
     OTEFModelConfigViewSet,
     OTEFViewportStateViewSet,
     ImageUploadView,
+    ImagePyramidView,
     serve_map_file,
     pink_line_geojson,
     OTEFBoundsApplyView,
@@ -66,6 +67,12 @@
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    # Vector tiles: registered ahead of the router so ".mvt" isn't taken as a format suffix
+    path(
+        "gis_layers/<int:pk>/tiles/<int:z>/<int:x>/<int:y>.mvt",
+        GISLayerViewSet.as_view({"get": "tiles"}),
+        name="gis_layer_tile",
+    ),
     path("", include((router.urls, "api"))),
     # API Documentation endpoints
     # Visit /swagger/ for interactive API explorer (Swagger UI)
@@ -80,6 +87,8 @@
     path("swagger.json", schema_view.without_ui(cache_timeout=0), name="schema-json"),
     # Image upload endpoint
     path("upload_image/", ImageUploadView.as_view(), name="upload_image"),
+    # Deep-zoom pyramid description for large climate/model images
+    path("image_pyramid/", ImagePyramidView.as_view(), name="image_pyramid"),
     # Bounds apply endpoint for OTEF interactive
     path("otef/bounds/apply/", OTEFBoundsApplyView.as_view(), name="otef_bounds_apply"),
     # Supabase proxy (backend-only; no Supabase client on frontend)
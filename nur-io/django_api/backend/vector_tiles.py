@@ -0,0 +1,536 @@
+"""
+On-demand Mapbox Vector Tiles for database-stored GIS layers.
+
+``/api/gis_layers/<id>/tiles/<z>/<x>/<y>.mvt`` clips a layer's features to the
+requested Web Mercator tile and encodes them as MVT (spec v2) so the map can
+render large workshop submissions tile by tile instead of parsing the whole
+FeatureCollection up front.
+
+Per layer, features are projected to normalized Web Mercator once and bucketed
+into a grid at INDEX_ZOOM (see LayerTileIndex). The index is cached in-process
+keyed by ``data_hash``, so a saved layer is re-indexed on its next tile request.
+Non-empty tiles up to MAX_CACHED_ZOOM are written under
+``<GIS_LAYER_CACHE_DIR>/tiles/<id>-<hash>/`` (with a .gz sibling) and removed
+with the rest of the layer's cache files by layer_cache.purge_layer_cache.
+Empty tiles (answered 204) and deeper zooms are never written, so the cache
+is bounded by the layer's extent rather than by what clients ask for.
+
+The encoder is self-contained (no protobuf/shapely dependency). Only WGS84
+GeoJSON is tiled; layers tagged with another CRS are rejected.
+"""
+
+import gzip
+import json
+import math
+import os
+import struct
+import threading
+from collections import OrderedDict
+
+from .layer_cache import _write_atomic, cache_dir
+
+MVT_CONTENT_TYPE = "application/vnd.mapbox-vector-tile"
+
+EXTENT = 4096
+BUFFER = 64
+MAX_ZOOM = 22
+# Deepest zoom whose tiles are persisted (the OTEF map's maxZoom); deeper tiles are encoded per request
+MAX_CACHED_ZOOM = 19
+# Features are bucketed by the tiles they touch at this zoom
+INDEX_ZOOM = 10
+# Features touching more index cells than this are scanned for every tile
+MAX_INDEX_CELLS = 256
+# Layers whose index stays in memory
+INDEX_CACHE_SIZE = 8
+
+_MAX_LAT = 85.0511287798
+
+POINT, LINESTRING, POLYGON = 1, 2, 3
+_MOVE_TO, _LINE_TO, _CLOSE_PATH = 1, 2, 7
+
+
+class UnsupportedLayerError(ValueError):
+    """The layer's data can't be tiled (e.g. not WGS84)."""
+
+
+def tiles_dir(layer_id, data_hash):
+    return os.path.join(cache_dir(), "tiles", f"{layer_id}-{data_hash}")
+
+
+def tiles_url(layer):
+    """URL template for a layer's tiles (``{z}/{x}/{y}`` left for the map client)."""
+    return f"/api/gis_layers/{layer.id}/tiles/{{z}}/{{x}}/{{y}}.mvt?v={layer.data_hash}"
+
+
+def is_valid_tile(z, x, y):
+    return 0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+# ---------------------------------------------------------------------------
+# Projection and index
+# ---------------------------------------------------------------------------
+
+def _project(coord):
+    """lon/lat -> normalized Web Mercator ([0, 1] on both axes, y down)."""
+    lon, lat = float(coord[0]), float(coord[1])
+    lat = max(-_MAX_LAT, min(_MAX_LAT, lat))
+    s = math.sin(math.radians(lat))
+    x = lon / 360.0 + 0.5
+    y = 0.5 - math.log((1 + s) / (1 - s)) / (4 * math.pi)
+    return x, y
+
+
+def _geometry_parts(geometry):
+    """
+    Flatten a GeoJSON geometry into [(mvt_type, parts)] in projected coordinates.
+    Points: parts is a list of points. Lines: a list of lines. Polygons: a list
+    of polygons, each a list of open rings.
+    """
+    if not isinstance(geometry, dict):
+        return []
+    gtype = geometry.get("type")
+    coords = geometry.get("coordinates")
+    try:
+        if gtype == "Point":
+            return [(POINT, [_project(coords)])]
+        if gtype == "MultiPoint":
+            return [(POINT, [_project(c) for c in coords])]
+        if gtype == "LineString":
+            return [(LINESTRING, [[_project(c) for c in coords]])]
+        if gtype == "MultiLineString":
+            return [(LINESTRING, [[_project(c) for c in line] for line in coords])]
+        if gtype == "Polygon":
+            return [(POLYGON, [_project_polygon(coords)])]
+        if gtype == "MultiPolygon":
+            return [(POLYGON, [_project_polygon(poly) for poly in coords])]
+        if gtype == "GeometryCollection":
+            out = []
+            for child in geometry.get("geometries") or []:
+                out.extend(_geometry_parts(child))
+            return out
+    except (TypeError, ValueError, IndexError):
+        return []
+    return []
+
+
+def _project_polygon(rings):
+    projected = []
+    for ring in rings:
+        points = [_project(c) for c in ring]
+        if len(points) > 1 and points[0] == points[-1]:
+            points.pop()
+        projected.append(points)
+    return projected
+
+
+def _bbox(mvt_type, parts):
+    if mvt_type == POINT:
+        points = parts
+    elif mvt_type == LINESTRING:
+        points = [p for line in parts for p in line]
+    else:
+        points = [p for poly in parts for ring in poly for p in ring]
+    if not points:
+        return None
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _feature_id(feature):
+    fid = feature.get("id")
+    if isinstance(fid, int) and not isinstance(fid, bool) and 0 <= fid < 2 ** 64:
+        return fid
+    return None
+
+
+class LayerTileIndex:
+    """Projected features of one layer, bucketed by INDEX_ZOOM tile."""
+
+    def __init__(self, geojson):
+        self.features = []
+        self.bboxes = []
+        self.grid = {}
+        self.wide = []
+
+        cells = 2 ** INDEX_ZOOM
+        for feature in (geojson or {}).get("features") or []:
+            if not isinstance(feature, dict):
+                continue
+            properties = feature.get("properties") or {}
+            fid = _feature_id(feature)
+            for mvt_type, parts in _geometry_parts(feature.get("geometry")):
+                bbox = _bbox(mvt_type, parts)
+                if bbox is None:
+                    continue
+                idx = len(self.features)
+                self.features.append((mvt_type, parts, properties, fid))
+                self.bboxes.append(bbox)
+
+                x0, y0 = _cell(bbox[0], cells), _cell(bbox[1], cells)
+                x1, y1 = _cell(bbox[2], cells), _cell(bbox[3], cells)
+                if (x1 - x0 + 1) * (y1 - y0 + 1) > MAX_INDEX_CELLS:
+                    self.wide.append(idx)
+                    continue
+                for cx in range(x0, x1 + 1):
+                    for cy in range(y0, y1 + 1):
+                        self.grid.setdefault((cx, cy), []).append(idx)
+
+    def candidates(self, z, x, y):
+        """Indexes of features whose bbox may touch tile z/x/y (buffer included)."""
+        scale = 2 ** z
+        pad = BUFFER / EXTENT
+        minx, miny = (x - pad) / scale, (y - pad) / scale
+        maxx, maxy = (x + 1 + pad) / scale, (y + 1 + pad) / scale
+
+        if z >= INDEX_ZOOM:
+            cells = 2 ** INDEX_ZOOM
+            pool = set(self.wide)
+            for cx in range(_cell(minx, cells), _cell(maxx, cells) + 1):
+                for cy in range(_cell(miny, cells), _cell(maxy, cells) + 1):
+                    pool.update(self.grid.get((cx, cy), ()))
+        else:
+            pool = range(len(self.features))
+
+        out = []
+        for idx in sorted(pool):
+            bx0, by0, bx1, by1 = self.bboxes[idx]
+            if bx1 >= minx and bx0 <= maxx and by1 >= miny and by0 <= maxy:
+                out.append(idx)
+        return out
+
+
+def _cell(value, cells):
+    return min(cells - 1, max(0, int(math.floor(value * cells))))
+
+
+_index_cache = OrderedDict()
+_index_lock = threading.Lock()
+
+
+def layer_crs_is_wgs84(geojson):
+    name = str(((geojson or {}).get("crs") or {}).get("properties", {}).get("name", ""))
+    return not name or "4326" in name or "CRS84" in name.upper()
+
+
+def get_tile_index(layer):
+    """Return the (cached) LayerTileIndex for the layer's current data."""
+    key = (layer.id, layer.data_hash)
+    with _index_lock:
+        index = _index_cache.get(key)
+        if index is not None:
+            _index_cache.move_to_end(key)
+            return index
+
+    data = layer.data
+    if not layer_crs_is_wgs84(data):
+        raise UnsupportedLayerError("Vector tiles require WGS84 GeoJSON")
+    index = LayerTileIndex(data)
+
+    with _index_lock:
+        for stale in [k for k in _index_cache if k[0] == layer.id]:
+            del _index_cache[stale]
+        _index_cache[key] = index
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
+
+
+def reset_tile_indexes():
+    with _index_lock:
+        _index_cache.clear()
+
+
+# ---------------------------------------------------------------------------
+# Clipping (tile pixel space)
+# ---------------------------------------------------------------------------
+
+def _clip_segment(a, b, lo, hi):
+    """Liang-Barsky: the part of segment a-b inside [lo, hi]^2, or None."""
+    t0, t1 = 0.0, 1.0
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    for p, q in ((-dx, a[0] - lo), (dx, hi - a[0]), (-dy, a[1] - lo), (dy, hi - a[1])):
+        if p == 0:
+            if q < 0:
+                return None
+            continue
+        t = q / p
+        if p < 0:
+            if t > t1:
+                return None
+            t0 = max(t0, t)
+        else:
+            if t < t0:
+                return None
+            t1 = min(t1, t)
+    start = a if t0 == 0.0 else (a[0] + t0 * dx, a[1] + t0 * dy)
+    end = b if t1 == 1.0 else (a[0] + t1 * dx, a[1] + t1 * dy)
+    return start, end
+
+
+def _clip_line(points, lo, hi):
+    parts, current = [], []
+    for a, b in zip(points, points[1:]):
+        segment = _clip_segment(a, b, lo, hi)
+        if segment is None:
+            if current:
+                parts.append(current)
+                current = []
+            continue
+        start, end = segment
+        if not current:
+            current = [start]
+        current.append(end)
+        if end is not b:
+            # Left the tile
+            parts.append(current)
+            current = []
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _clip_ring(ring, lo, hi):
+    """Sutherland-Hodgman against the four tile edges."""
+    for axis, bound, keep_above in ((0, lo, True), (0, hi, False), (1, lo, True), (1, hi, False)):
+        if not ring:
+            break
+        out = []
+        prev = ring[-1]
+        prev_in = (prev[axis] >= bound) if keep_above else (prev[axis] <= bound)
+        for cur in ring:
+            cur_in = (cur[axis] >= bound) if keep_above else (cur[axis] <= bound)
+            if cur_in != prev_in:
+                t = (bound - prev[axis]) / (cur[axis] - prev[axis])
+                cross = (prev[0] + t * (cur[0] - prev[0]), prev[1] + t * (cur[1] - prev[1]))
+                out.append(cross)
+            if cur_in:
+                out.append(cur)
+            prev, prev_in = cur, cur_in
+        ring = out
+    return ring
+
+
+def _quantize(points):
+    out = []
+    for px, py in points:
+        point = (int(round(px)), int(round(py)))
+        if not out or out[-1] != point:
+            out.append(point)
+    return out
+
+
+def _ring_area(ring):
+    area = 0
+    for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]):
+        area += x1 * y2 - x2 * y1
+    return area
+
+
+def _tile_geometry(mvt_type, parts, z, x, y):
+    """Project, clip and quantize one feature's parts into tile coordinates."""
+    scale = 2 ** z
+
+    def to_tile(p):
+        return ((p[0] * scale - x) * EXTENT, (p[1] * scale - y) * EXTENT)
+
+    lo, hi = -BUFFER, EXTENT + BUFFER
+    if mvt_type == POINT:
+        return _quantize_points([to_tile(p) for p in parts], lo, hi)
+
+    if mvt_type == LINESTRING:
+        lines = []
+        for line in parts:
+            for clipped in _clip_line([to_tile(p) for p in line], lo, hi):
+                clipped = _quantize(clipped)
+                if len(clipped) >= 2:
+                    lines.append(clipped)
+        return lines
+
+    polygons = []
+    for poly in parts:
+        rings = []
+        for i, ring in enumerate(poly):
+            ring = _quantize(_clip_ring([to_tile(p) for p in ring], lo, hi))
+            if len(ring) > 1 and ring[0] == ring[-1]:
+                ring.pop()
+            area = _ring_area(ring) if len(ring) >= 3 else 0
+            if area == 0:
+                if i == 0:
+                    break  # exterior gone: drop the holes too
+                continue
+            # MVT: exterior rings have positive area, holes negative
+            if (i == 0) != (area > 0):
+                ring.reverse()
+            rings.append(ring)
+        if rings:
+            polygons.append(rings)
+    return polygons
+
+
+def _quantize_points(points, lo, hi):
+    out = []
+    for px, py in points:
+        if lo <= px <= hi and lo <= py <= hi:
+            out.append((int(round(px)), int(round(py))))
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Encoding (protobuf, vector_tile.proto v2)
+# ---------------------------------------------------------------------------
+
+def _varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _zigzag(value):
+    return value << 1 if value >= 0 else ((-value) << 1) - 1
+
+
+def _key(field, wire_type):
+    return _varint((field << 3) | wire_type)
+
+
+def _bytes_field(field, payload):
+    return _key(field, 2) + _varint(len(payload)) + payload
+
+
+def _packed_field(field, values):
+    return _bytes_field(field, b"".join(_varint(v) for v in values))
+
+
+def _command(command, count):
+    return (command & 0x7) | (count << 3)
+
+
+def _encode_geometry(mvt_type, geometry):
+    commands = []
+    cx = cy = 0
+
+    def deltas(points):
+        nonlocal cx, cy
+        for px, py in points:
+            commands.append(_zigzag(px - cx))
+            commands.append(_zigzag(py - cy))
+            cx, cy = px, py
+
+    if mvt_type == POINT:
+        commands.append(_command(_MOVE_TO, len(geometry)))
+        deltas(geometry)
+    elif mvt_type == LINESTRING:
+        for line in geometry:
+            commands.append(_command(_MOVE_TO, 1))
+            deltas(line[:1])
+            commands.append(_command(_LINE_TO, len(line) - 1))
+            deltas(line[1:])
+    else:
+        for rings in geometry:
+            for ring in rings:
+                commands.append(_command(_MOVE_TO, 1))
+                deltas(ring[:1])
+                commands.append(_command(_LINE_TO, len(ring) - 1))
+                deltas(ring[1:])
+                commands.append(_command(_CLOSE_PATH, 1))
+    return commands
+
+
+def _encode_value(value):
+    if isinstance(value, bool):
+        return _key(7, 0) + _varint(int(value))
+    if isinstance(value, int) and -(2 ** 63) <= value < 2 ** 64:
+        if value >= 0:
+            return _key(5, 0) + _varint(value)
+        return _key(6, 0) + _varint(_zigzag(value))
+    if isinstance(value, float) and math.isfinite(value):
+        return _key(3, 1) + struct.pack("<d", value)
+    if not isinstance(value, str):
+        value = json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+    return _bytes_field(1, value.encode("utf-8"))
+
+
+class _LayerEncoder:
+    def __init__(self, name):
+        self.name = name
+        self.features = []
+        self.keys = {}
+        self.values = {}
+
+    def _index(self, table, item):
+        if item not in table:
+            table[item] = len(table)
+        return table[item]
+
+    def add(self, mvt_type, geometry, properties, fid):
+        tags = []
+        for key, value in properties.items():
+            if value is None:
+                continue
+            encoded = _encode_value(value)
+            tags.append(self._index(self.keys, str(key)))
+            tags.append(self._index(self.values, encoded))
+
+        body = b""
+        if fid is not None:
+            body += _key(1, 0) + _varint(fid)
+        if tags:
+            body += _packed_field(2, tags)
+        body += _key(3, 0) + _varint(mvt_type)
+        body += _packed_field(4, _encode_geometry(mvt_type, geometry))
+        self.features.append(body)
+
+    def encode(self):
+        body = _key(15, 0) + _varint(2)
+        body += _bytes_field(1, self.name.encode("utf-8"))
+        for feature in self.features:
+            body += _bytes_field(2, feature)
+        for key in self.keys:
+            body += _bytes_field(3, key.encode("utf-8"))
+        for value in self.values:
+            body += _bytes_field(4, value)
+        body += _key(5, 0) + _varint(EXTENT)
+        return _bytes_field(3, body)
+
+
+def encode_tile(index, layer_name, z, x, y):
+    """Encode tile z/x/y of a LayerTileIndex. An empty tile is ``b""``."""
+    encoder = _LayerEncoder(layer_name)
+    for idx in index.candidates(z, x, y):
+        mvt_type, parts, properties, fid = index.features[idx]
+        geometry = _tile_geometry(mvt_type, parts, z, x, y)
+        if geometry:
+            encoder.add(mvt_type, geometry, properties, fid)
+    if not encoder.features:
+        return b""
+    return encoder.encode()
+
+
+def tile_content(layer, z, x, y):
+    """
+    Tile z/x/y of the layer's current data as (cache path, None) for a cached
+    tile, or (None, body) for a tile that isn't persisted (``b""`` when empty).
+    Non-empty tiles up to MAX_CACHED_ZOOM are encoded on first use and cached.
+    """
+    cacheable = z <= MAX_CACHED_ZOOM
+    path = os.path.join(tiles_dir(layer.id, layer.data_hash), str(z), str(x), f"{y}.mvt")
+    if cacheable and os.path.exists(path):
+        return path, None
+
+    body = encode_tile(get_tile_index(layer), layer.name, z, x, y)
+    if not body or not cacheable:
+        return None, body
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _write_atomic(path + ".gz", gzip.compress(body, compresslevel=6, mtime=0))
+    _write_atomic(path, body)
+    mtime_ns = os.stat(path).st_mtime_ns
+    os.utime(path + ".gz", ns=(mtime_ns, mtime_ns))
+    return path, None
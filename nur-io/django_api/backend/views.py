@@ -1,16 +1,19 @@
 from django.shortcuts import render
 from django.db import models
-from django.db.models import Q
-from django.http import JsonResponse
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+import hashlib
 import json
 import math
 import os
 import re
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag, urlencode
 from datetime import datetime
 
 from .models import (
@@ -28,6 +31,18 @@
     LayerState,
 )
 
+from .layer_cache import (
+    IMMUTABLE_CACHE_CONTROL,
+    geojson_etag,
+    geojson_file_response,
+    geojson_url,
+    precompressed_file_response,
+)
+from . import file_hierarchy, image_pyramid
+from .media_derivatives import derivative_payload, schedule_derivatives
+from .geobin import GEOBIN_RENDERER_CLASSES, wants_geobin
+from .simplify import SIMPLIFY_TOLERANCES, pick_variant, requested_tolerance
+from . import vector_tiles
 from .serializers import (
     TableSerializer,
     IndicatorSerializer,
@@ -44,6 +59,55 @@
 )
 
 
+# Shared caches must not store state payloads, but clients may keep them and
+# revalidate with If-None-Match (see conditional_json_response).
+REVALIDATE_CACHE_CONTROL = "private, no-cache, must-revalidate, max-age=0"
+
+
+def payload_etag(payload):
+    """Strong ETag for a JSON-serializable payload (hash of its canonical JSON)."""
+    body = json.dumps(payload, sort_keys=True, separators=(",", ":"), cls=DjangoJSONEncoder)
+    return quote_etag(hashlib.sha256(body.encode("utf-8")).hexdigest()[:32])
+
+
+def simplification_level(request):
+    """
+    The SIMPLIFY_TOLERANCES key for the request's ?detail= / ?zoom=, or None for
+    full detail. Raises ValueError for invalid values.
+    """
+    tolerance = requested_tolerance(request.GET)
+    return pick_variant([repr(t) for t in SIMPLIFY_TOLERANCES], tolerance)
+
+
+def conditional_json_response(request, payload, response_class=JsonResponse, **kwargs):
+    """
+    Build a JSON response carrying a strong ETag for ``payload``.
+    GET/HEAD requests whose If-None-Match matches get an empty 304 instead,
+    so resyncing after a broadcast costs only headers.
+    """
+    etag = payload_etag(payload)
+    response = None
+    if request.method in ("GET", "HEAD"):
+        response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = response_class(payload, **kwargs)
+    response["ETag"] = etag
+    response["Cache-Control"] = REVALIDATE_CACHE_CONTROL
+    return response
+
+
+def conditional_body_response(request, body, etag, content_type="application/json"):
+    """conditional_json_response for an already-serialized body and its ETag."""
+    response = None
+    if request.method in ("GET", "HEAD"):
+        response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body, content_type=content_type)
+    response["ETag"] = etag
+    response["Cache-Control"] = REVALIDATE_CACHE_CONTROL
+    return response
+
+
 def _normalize_projection_slideshow_patch(raw):
     """
     Validate and normalize projection_slideshow PATCH body (mirrors frontend sanitizer).
@@ -254,37 +318,115 @@ class GISLayerViewSet(viewsets.ModelViewSet):
     serializer_class = GISLayerSerializer
 
     def get_queryset(self):
-        queryset = GISLayer.objects.all()
+        # Simplified variants are only read when a cache file is first written
+        queryset = GISLayer.objects.defer('simplified_data')
         table_name = self.request.query_params.get('table')
         if table_name:
             queryset = queryset.filter(table__name=table_name)
         return queryset.filter(is_active=True)
 
-    @action(detail=True, methods=['get'])
+    @action(detail=True, methods=['get'], renderer_classes=GEOBIN_RENDERER_CLASSES)
     def get_layer_geojson(self, request, pk=None):
-        """Serve GeoJSON data for a layer (for large files)"""
+        """
+        Serve GeoJSON data for a layer (for large files); ?detail= / ?zoom= pick a
+        simplified variant, Accept / ?format=geobin the binary encoding
+        """
         layer = self.get_object()
         if layer.layer_type != 'geojson':
             return Response({'error': 'Not a GeoJSON layer'}, status=400)
 
+        fmt = 'geobin' if wants_geobin(request) else 'json'
         if layer.data:
-            response = JsonResponse(layer.data, safe=False)
-            response['Content-Type'] = 'application/json'
-            return response
+            try:
+                level = simplification_level(request)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=400)
+            # Unversioned URL: clients must revalidate (the hashed geojson/ URL is immutable)
+            not_modified = get_conditional_response(request, etag=geojson_etag(layer, level, fmt))
+            if not_modified is not None:
+                return not_modified
+            return geojson_file_response(request, layer, REVALIDATE_CACHE_CONTROL, level, fmt)
         elif layer.file_path:
             # Serve file from storage
             import os
             from django.conf import settings
             file_path = os.path.join(settings.MEDIA_ROOT, layer.file_path) if not os.path.isabs(layer.file_path) else layer.file_path
             if os.path.exists(file_path):
-                response = FileResponse(open(file_path, 'rb'), content_type='application/json')
-                response["Cache-Control"] = "public, max-age=86400"
-                return response
+                if fmt == 'geobin':
+                    # Encoded per request: file layers have no hash-keyed cache entry
+                    with open(file_path, encoding='utf-8') as fh:
+                        return Response(json.load(fh))
+                return precompressed_file_response(
+                    request, file_path, 'application/json', "public, max-age=86400"
+                )
             else:
                 return Response({'error': 'File not found'}, status=404)
 
         return Response({'error': 'No data available'}, status=404)
 
+    @action(
+        detail=True,
+        methods=['get'],
+        url_path=r'geojson/(?P<data_hash>[0-9a-f]{64})',
+        renderer_classes=GEOBIN_RENDERER_CLASSES,
+    )
+    def geojson(self, request, pk=None, data_hash=None):
+        """Serve a layer's GeoJSON at its content-hash URL (immutable, pre-compressed)"""
+        from django.shortcuts import get_object_or_404
+
+        # data is only loaded if the serialized bytes aren't cached yet
+        layer = get_object_or_404(self.get_queryset().defer('data'), pk=pk)
+        if layer.layer_type != 'geojson' or not layer.data_hash:
+            return Response({'error': 'No data available'}, status=404)
+        try:
+            level = simplification_level(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+        if data_hash != layer.data_hash:
+            # Stale version: point the client at the current one
+            response = HttpResponseRedirect(geojson_url(layer, request.META.get('QUERY_STRING', '')))
+            response["Cache-Control"] = REVALIDATE_CACHE_CONTROL
+            return response
+        fmt = 'geobin' if wants_geobin(request) else 'json'
+        return geojson_file_response(request, layer, IMMUTABLE_CACHE_CONTROL, level, fmt)
+
+    def tiles(self, request, pk=None, z=None, x=None, y=None):
+        """Serve one Mapbox Vector Tile of a layer's GeoJSON (routed in urls.py)"""
+        from django.shortcuts import get_object_or_404
+
+        layer = get_object_or_404(self.get_queryset().defer('data'), pk=pk)
+        if layer.layer_type != 'geojson' or not layer.data_hash:
+            return Response({'error': 'No data available'}, status=404)
+        if not vector_tiles.is_valid_tile(z, x, y):
+            return Response({'error': 'Invalid tile'}, status=404)
+
+        etag = f'"{layer.data_hash}-{z}-{x}-{y}"'
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+        try:
+            path, body = vector_tiles.tile_content(layer, z, x, y)
+        except vector_tiles.UnsupportedLayerError as e:
+            return Response({'error': str(e)}, status=400)
+
+        # ?v=<data_hash> (as in tiles_url) pins the version; otherwise revalidate
+        versioned = request.query_params.get('v') == layer.data_hash
+        cache_control = IMMUTABLE_CACHE_CONTROL if versioned else REVALIDATE_CACHE_CONTROL
+        if path:
+            response = precompressed_file_response(
+                request, path, vector_tiles.MVT_CONTENT_TYPE, cache_control
+            )
+        elif body:
+            response = HttpResponse(body, content_type=vector_tiles.MVT_CONTENT_TYPE)
+            response["Cache-Control"] = cache_control
+        else:
+            # Empty tile: nothing to draw (and nothing written to the cache)
+            response = HttpResponse(status=204)
+            response["Cache-Control"] = cache_control
+        response["ETag"] = etag
+        return response
+
 
 class OTEFModelConfigViewSet(viewsets.ReadOnlyModelViewSet):
     """Read-only access to OTEF model configuration"""
@@ -626,7 +768,7 @@ def by_table(self, request, table_name=None):
             'updated_at': state.updated_at.isoformat() if state.updated_at else None,
         }
 
-        return Response(response_data)
+        return conditional_json_response(request, response_data, response_class=Response)
 
     def _update_layer_groups(self, table, layer_groups_data):
         """Update layer groups and layer states from request data."""
@@ -683,13 +825,13 @@ def _get_layer_groups(self, table):
         for group in groups:
             layer_states = LayerState.objects.filter(
                 table=table,
-                layer_id__startswith=f"{group.group_id}.",
+                group_id=group.group_id,
             ).order_by("layer_id")
 
             layers = []
             group_display_name = None
             for layer_state in layer_states:
-                layer_id = layer_state.layer_id.replace(f"{group.group_id}.", "", 1)
+                layer_id = layer_state.layer_key
                 layer_item = {"id": layer_id, "enabled": layer_state.enabled}
 
                 # For curated groups (project-scoped), attach displayName to layers
@@ -908,11 +1050,7 @@ def _recompute_group_enabled_from_states(self, table, group_id):
         group = LayerGroup.objects.filter(table=table, group_id=group_id).first()
         if not group:
             return
-        states = list(
-            LayerState.objects.filter(
-                table=table, layer_id__startswith=f"{group_id}."
-            )
-        )
+        states = list(LayerState.objects.filter(table=table, group_id=group_id))
         if not states:
             return
         all_on = all(s.enabled for s in states)
@@ -1003,17 +1141,10 @@ def _recompute_group_enabled_from_states_bulk(self, table, group_ids):
         """Sync LayerGroup.enabled with LayerState rows; batched queries."""
         if not group_ids:
             return
-        q = Q()
-        for gid in group_ids:
-            q |= Q(layer_id__startswith=f"{gid}.")
-        states = list(LayerState.objects.filter(table=table).filter(q))
+        states = LayerState.objects.filter(table=table, group_id__in=group_ids)
         by_group = {gid: [] for gid in group_ids}
-        prefix_by_gid = {gid: f"{gid}." for gid in group_ids}
         for st in states:
-            for gid, pref in prefix_by_gid.items():
-                if st.layer_id.startswith(pref):
-                    by_group[gid].append(st)
-                    break
+            by_group[st.group_id].append(st)
         groups = {
             lg.group_id: lg
             for lg in LayerGroup.objects.filter(table=table, group_id__in=group_ids)
@@ -1064,7 +1195,7 @@ def _apply_layer_toggle_change_dicts(self, table, change_dicts, state):
         affected_group_ids = set()
 
         for full_id, en in merged.items():
-            group_id, _tail = self._split_full_layer_id(full_id)
+            group_id, tail = self._split_full_layer_id(full_id)
             if not group_id:
                 continue
             affected_group_ids.add(group_id)
@@ -1074,7 +1205,16 @@ def _apply_layer_toggle_change_dicts(self, table, change_dicts, state):
                     ls.enabled = en
                     to_update.append(ls)
             else:
-                to_create.append(LayerState(table=table, layer_id=full_id, enabled=en))
+                # bulk_create bypasses LayerState.save(), so set the split columns here.
+                to_create.append(
+                    LayerState(
+                        table=table,
+                        layer_id=full_id,
+                        group_id=group_id,
+                        layer_key=tail,
+                        enabled=en,
+                    )
+                )
 
         if to_create:
             LayerState.objects.bulk_create(to_create)
@@ -1326,9 +1466,35 @@ def command(self, request, table_name=None):
 # Now lets program the views for the API as an interactive platform
 
 from . import globals
+from .media_resolution import lookup_current_media, lookup_media, resolve_slide_media
+from .presentation_scheduler import schedule_next_advance, scheduler_enabled
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 
+def _presentation_broadcast_data(table_name, state):
+    """
+    Presentation payload for a single table, including the resolved media for
+    the current and next slide so displays can switch and preload without
+    calling get_image_data.
+    """
+    data = {
+        'table': table_name,
+        'is_playing': state["is_playing"],
+        'sequence': state["sequence"],
+        'sequence_index': state["sequence_index"],
+        'duration': state["duration"],
+        'server_driven': scheduler_enabled(),
+        'next_advance_at': state.get("next_advance_at"),
+    }
+    sequence = state["sequence"] or []
+    if sequence:
+        current_index = max(0, min(state["sequence_index"], len(sequence) - 1))
+        data['current_media'] = resolve_slide_media(table_name, sequence[current_index])
+        data['next_media'] = resolve_slide_media(
+            table_name, sequence[(current_index + 1) % len(sequence)]
+        )
+    return data
+
 def broadcast_presentation_update(table_name=None):
     """Broadcast presentation state to all connected WebSocket clients"""
     channel_layer = get_channel_layer()
@@ -1342,19 +1508,13 @@ def broadcast_presentation_update(table_name=None):
                     'presentation_channel',
                     {
                         'type': 'presentation_update',
-                        'data': {
-                            'table': table_name,
-                            'is_playing': state["is_playing"],
-                            'sequence': state["sequence"],
-                            'sequence_index': state["sequence_index"],
-                            'duration': state["duration"],
-                        }
+                        'data': _presentation_broadcast_data(table_name, state),
                     }
                 )
             else:
                 # Broadcast all table states for backward compatibility and multi-table support
                 all_states = {}
-                for table in globals.PRESENTATION_STATE_BY_TABLE.keys():
+                for table in globals.get_presentation_tables():
                     all_states[table] = globals.get_presentation_state(table)
                 # Also include default table state for legacy clients
                 default_state = globals.get_presentation_state(globals.DEFAULT_TABLE_NAME)
@@ -1400,6 +1560,104 @@ def broadcast_indicator_update(table_name=None):
             print(f"WebSocket broadcast error: {e}")
 
 
+def sync_indicator_from_presentation_slide(table_name=None, presentation_state=None):
+    """
+    Update indicator and state from the current presentation slide for a specific table.
+    Shared by set_presentation_state and the server-side presentation scheduler.
+    """
+    try:
+        if presentation_state is None:
+            if table_name is None:
+                table_name = globals.DEFAULT_TABLE_NAME
+            presentation_state = globals.get_presentation_state(table_name)
+
+        if not presentation_state["sequence"] or len(presentation_state["sequence"]) == 0:
+            return
+
+        current_index = max(
+            0, min(presentation_state["sequence_index"], len(presentation_state["sequence"]) - 1)
+        )
+        current_slide = presentation_state["sequence"][current_index]
+
+        if not current_slide or not current_slide.get("indicator"):
+            return
+
+        indicator_name = current_slide.get("indicator")
+        state_name = current_slide.get("state")
+        slide_type = current_slide.get("type")
+
+        # Map indicator name to ID
+        indicator_mapping = {"mobility": 1, "climate": 2, "land_use": 3}
+        indicator_id = indicator_mapping.get(indicator_name)
+
+        if not indicator_id:
+            print(f"⚠️ Invalid indicator in presentation slide: {indicator_name}")
+            return
+
+        # Collect table-specific indicator changes, then write them in one store update
+        indicator_state = {"indicator_id": indicator_id}
+        print(f"🎬 Synced indicator from presentation (table: {table_name}): {indicator_name} (ID: {indicator_id})")
+
+        # Update table-specific state based on indicator type
+        if indicator_name == "climate" and state_name and slide_type:
+            # For climate, map display name to scenario key
+            from backend.climate_scenarios import CLIMATE_SCENARIO_MAPPING
+            scenario_key = None
+            for key, config in CLIMATE_SCENARIO_MAPPING.items():
+                if config["display_name"] == state_name:
+                    scenario_key = key
+                    break
+
+            if scenario_key:
+                # Find the state object to get full state values
+                state_obj = State.objects.filter(
+                    scenario_name=scenario_key, scenario_type=slide_type
+                ).first()
+                if state_obj:
+                    indicator_state["indicator_state"] = state_obj.state_values.copy()
+                    print(f"✓ Synced climate state: {scenario_key} ({slide_type})")
+                else:
+                    # Fallback: create minimal state
+                    indicator_state["indicator_state"] = {
+                        "scenario": scenario_key,
+                        "type": slide_type,
+                        "label": state_name
+                    }
+            else:
+                # Fallback: use state name as scenario
+                indicator_state["indicator_state"] = {
+                    "scenario": state_name.lower().replace(" ", "_"),
+                    "type": slide_type or "utci",
+                    "label": state_name
+                }
+        else:
+            # For mobility and other indicators, find state by scenario name
+            if state_name:
+                scenario_key = state_name.lower()
+                state_obj = State.matching(scenario=scenario_key).filter(
+                    scenario_type="general"
+                ).first()
+
+                if state_obj:
+                    indicator_state["indicator_state"] = state_obj.state_values.copy()
+                    print(f"✓ Synced {indicator_name} state: {scenario_key}")
+                else:
+                    # Fallback: create minimal state
+                    indicator_state["indicator_state"] = {
+                        "scenario": scenario_key,
+                        "label": state_name
+                    }
+
+        globals.update_indicator_state(table_name, **indicator_state)
+
+        # Broadcast indicator update for this table only
+        broadcast_indicator_update(table_name)
+        print(f"✓ Broadcasted indicator update for presentation slide (table: {table_name})")
+
+    except Exception as e:
+        print(f"❌ Error syncing indicator from presentation slide: {e}")
+
+
 class CustomActionsViewSet(viewsets.ViewSet):
     """
     ViewSet for custom actions, including state management for indicators
@@ -1457,7 +1715,8 @@ def log_frontend_error(self, request):
 
     def _initialize_default_state(self):
         """Set up default state values if none are present"""
-        if not globals.INDICATOR_STATE:
+        default_indicator_state = globals.get_indicator_state()
+        if not default_indicator_state["indicator_state"]:
             try:
                 # Try to get the default state from the database
                 print(
@@ -1474,15 +1733,9 @@ def _initialize_default_state(self):
                     print("Exact match not found, trying partial match...")
                     year = globals.DEFAULT_STATES.get("year")
                     scenario = globals.DEFAULT_STATES.get("scenario")
-                    states = State.objects.all()
-                    for s in states:
-                        if (
-                            s.state_values.get("year") == year
-                            and s.state_values.get("scenario") == scenario
-                        ):
-                            state = s
-                            print(f"Found partial match: {s.state_values}")
-                            break
+                    state = State.matching(year=year, scenario=scenario).first()
+                    if state:
+                        print(f"Found partial match: {state.state_values}")
 
                 # Third attempt: get the first state
                 if not state:
@@ -1490,32 +1743,36 @@ def _initialize_default_state(self):
                     state = State.objects.first()
 
                 if state:
-                    globals.INDICATOR_STATE = state.state_values
-                    print(f"Initialized state: {globals.INDICATOR_STATE}")
+                    globals.update_indicator_state(indicator_state=state.state_values)
+                    print(f"Initialized state: {state.state_values}")
                 else:
                     # Use the default state values directly
-                    globals.INDICATOR_STATE = globals.DEFAULT_STATES
+                    globals.update_indicator_state(
+                        indicator_state=globals.DEFAULT_STATES.copy()
+                    )
                     print(
-                        f"No states in database. Using default: {globals.INDICATOR_STATE}"
+                        f"No states in database. Using default: {globals.DEFAULT_STATES}"
                     )
             except Exception as e:
                 print(f"Error initializing default state: {e}")
                 # Use minimal default state
-                globals.INDICATOR_STATE = {"year": 2023}
+                globals.update_indicator_state(indicator_state={"year": 2023})
 
     @action(detail=False, methods=["get"])
     def get_global_variables(self, request):
-        """Get current global variables (indicator, state, visualization mode, presentation state)"""
-        response = JsonResponse(
+        """Get current global variables (indicator, state, visualization mode, presentation state) for a table"""
+        table_name = request.query_params.get("table", globals.DEFAULT_TABLE_NAME)
+        indicator_state = globals.get_indicator_state(table_name)
+        presentation_state = globals.get_presentation_state(table_name)
+        return conditional_json_response(
+            request,
             {
-                "indicator_id": globals.INDICATOR_ID,
-                "indicator_state": globals.INDICATOR_STATE,
-                "visualization_mode": globals.VISUALIZATION_MODE,
-                "presentation_playing": globals.PRESENTATION_PLAYING,
-            }
+                "indicator_id": indicator_state["indicator_id"],
+                "indicator_state": indicator_state["indicator_state"],
+                "visualization_mode": indicator_state["visualization_mode"],
+                "presentation_playing": presentation_state["is_playing"],
+            },
         )
-        self._add_no_cache_headers(response)
-        return response
 
     @action(detail=False, methods=["get"])
     def get_file_hierarchy(self, request):
@@ -1524,95 +1781,8 @@ def get_file_hierarchy(self, request):
         Returns a tree structure of all data organized by table.
         """
         table_name = request.query_params.get("table")
-
-        tables_query = Table.objects.filter(is_active=True)
-        if table_name:
-            tables_query = tables_query.filter(name=table_name)
-
-        hierarchy = []
-        for table in tables_query.prefetch_related('indicators'):
-            table_data = {
-                'id': table.id,
-                'name': table.name,
-                'display_name': table.display_name,
-                'description': table.description,
-                'indicators': []
-            }
-
-            for indicator in table.indicators.all():
-                indicator_data = {
-                    'id': indicator.id,
-                    'indicator_id': indicator.indicator_id,
-                    'name': indicator.name,
-                    'category': indicator.category,
-                    'description': indicator.description,
-                    'is_user_generated': indicator.is_user_generated,
-                    'has_states': indicator.has_states,
-                    'states': []
-                }
-
-                # Get states through IndicatorData
-                indicator_data_qs = indicator.data.all().select_related('state').prefetch_related('images')
-                seen_states = {}
-
-                for ind_data in indicator_data_qs:
-                    state = ind_data.state
-                    state_id = state.id
-
-                    if state_id not in seen_states:
-                        seen_states[state_id] = {
-                            'id': state_id,
-                            'state_values': state.state_values,
-                            'scenario_type': state.scenario_type,
-                            'scenario_name': state.scenario_name,
-                            'is_user_generated': state.is_user_generated,
-                            'indicator_data_id': ind_data.id,
-                            'media': []
-                        }
-
-                    # Add media for this indicator data
-                    for img in ind_data.images.all():
-                        # Determine media type from extension if not set
-                        media_type = getattr(img, 'media_type', 'image')
-                        image_path = None
-                        if img.image:
-                            image_path = img.image.name
-
-                            # Determine correct URL path based on stored path:
-                            # - indicators/, ugc_indicators/ - use as-is
-                            # - processed/... (legacy system data) - add indicators/ prefix
-                            # - plain filename (no /) - use as-is (stored in media root)
-                            valid_prefixes = ('indicators/', 'ugc_indicators/')
-                            has_valid_prefix = any(image_path.startswith(p) for p in valid_prefixes)
-                            is_plain_filename = '/' not in image_path
-
-                            if not has_valid_prefix and not is_plain_filename:
-                                # Legacy system data with path like processed/... - add indicators/ prefix
-                                image_path = f"indicators/{image_path}"
-
-                            ext = image_path.split('.')[-1].lower() if '.' in image_path else ''
-                            if ext in ['mp4', 'webm', 'ogg', 'avi', 'mov']:
-                                media_type = 'video'
-                            elif ext in ['html', 'htm']:
-                                media_type = 'html_map'
-                            elif ext == 'json':
-                                media_type = 'deckgl_layer'
-
-                        seen_states[state_id]['media'].append({
-                            'id': img.id,
-                            'url': image_path,  # Return path without /media/ prefix
-                            'media_type': media_type,
-                            'uploaded_at': img.uploaded_at.isoformat() if img.uploaded_at else None
-                        })
-
-                indicator_data['states'] = list(seen_states.values())
-                table_data['indicators'].append(indicator_data)
-
-            hierarchy.append(table_data)
-
-        response = JsonResponse(hierarchy, safe=False)
-        self._add_no_cache_headers(response)
-        return response
+        body, etag = file_hierarchy.get_file_hierarchy(table_name)
+        return conditional_body_response(request, body, etag)
 
     @action(detail=False, methods=["post"])
     def set_visualization_mode(self, request):
@@ -1629,12 +1799,7 @@ def set_visualization_mode(self, request):
                 status=400,
             )
 
-        indicator_state = globals.get_indicator_state(table_name)
-        indicator_state["visualization_mode"] = mode
-
-        # Update legacy global for default table (backward compatibility)
-        if table_name == globals.DEFAULT_TABLE_NAME:
-            globals.VISUALIZATION_MODE = mode
+        globals.update_indicator_state(table_name, visualization_mode=mode)
 
         broadcast_indicator_update(table_name)
         print(f"✓ Visualization mode set to: {mode} for table '{table_name}'")
@@ -1648,79 +1813,89 @@ def get_presentation_state(self, request):
         table_name = request.query_params.get("table", globals.DEFAULT_TABLE_NAME)
         state = globals.get_presentation_state(table_name)
 
-        response = JsonResponse({
+        return conditional_json_response(request, {
             "table": table_name,
             "is_playing": state["is_playing"],
             "sequence": state["sequence"],
             "sequence_index": state["sequence_index"],
             "duration": state["duration"],
+            "server_driven": scheduler_enabled(),
+            "next_advance_at": state.get("next_advance_at"),
         })
-        self._add_no_cache_headers(response)
-        return response
 
     @action(detail=False, methods=["post"])
     def set_presentation_state(self, request):
         """Set presentation state (play/pause, sequence, index, duration) for a specific table"""
-        index_changed = False
-        sequence_changed = False
+        changes = {}
+        messages = []
 
         # Get table name from request, default to idistrict for backward compatibility
         table_name = request.data.get("table", globals.DEFAULT_TABLE_NAME)
 
-        # Get presentation state for this table
-        state = globals.get_presentation_state(table_name)
+        def _apply(state):
+            # The store may call this again on a write conflict: start every attempt afresh
+            changes.update(index_changed=False, sequence_changed=False)
+            messages.clear()
+
+            # Update playing state if provided
+            if "is_playing" in request.data:
+                was_playing = state["is_playing"]
+                state["is_playing"] = bool(request.data.get("is_playing"))
+                messages.append(f"✓ Presentation playing for table '{table_name}': {state['is_playing']}")
+                # If presentation just started playing, sync indicator from current slide
+                if state["is_playing"] and not was_playing:
+                    changes["index_changed"] = True
+
+            # Update sequence if provided
+            if "sequence" in request.data:
+                sequence = request.data.get("sequence")
+                if isinstance(sequence, list):
+                    state["sequence"] = sequence
+                    changes["sequence_changed"] = True
+                    messages.append(f"✓ Presentation sequence updated for table '{table_name}': {len(sequence)} slides")
+
+            # Update sequence index if provided
+            if "sequence_index" in request.data:
+                index = request.data.get("sequence_index")
+                if isinstance(index, int):
+                    # Clamp index to valid range instead of silently ignoring out-of-bounds values
+                    sequence_length = len(state["sequence"])
+                    if sequence_length > 0:
+                        clamped_index = max(0, min(index, sequence_length - 1))
+                        if clamped_index != index:
+                            messages.append(f"⚠️ Presentation index {index} out of bounds for table '{table_name}', clamped to {clamped_index}")
+                        old_index = state["sequence_index"]
+                        state["sequence_index"] = clamped_index
+                        changes["index_changed"] = (clamped_index != old_index)
+                        messages.append(f"✓ Presentation index for table '{table_name}': {clamped_index}")
+                    else:
+                        state["sequence_index"] = 0
+                        messages.append(f"⚠️ Empty sequence for table '{table_name}', index reset to 0")
+
+            # Update duration if provided
+            if "duration" in request.data:
+                duration = request.data.get("duration")
+                if isinstance(duration, (int, float)) and duration >= 1:
+                    state["duration"] = int(duration)
+                    messages.append(f"✓ Presentation duration for table '{table_name}': {duration}s")
+
+            # Restart the server-side slide timer whenever playback or the current slide changes
+            if (
+                not state["is_playing"]
+                or changes["index_changed"]
+                or changes["sequence_changed"]
+                or "duration" in request.data
+                or not state.get("next_advance_at")
+            ):
+                schedule_next_advance(state)
 
-        # Update playing state if provided
-        if "is_playing" in request.data:
-            was_playing = state["is_playing"]
-            state["is_playing"] = bool(request.data.get("is_playing"))
-            print(f"✓ Presentation playing for table '{table_name}': {state['is_playing']}")
-            # If presentation just started playing, sync indicator from current slide
-            if state["is_playing"] and not was_playing:
-                index_changed = True
-
-        # Update sequence if provided
-        if "sequence" in request.data:
-            sequence = request.data.get("sequence")
-            if isinstance(sequence, list):
-                state["sequence"] = sequence
-                sequence_changed = True
-                print(f"✓ Presentation sequence updated for table '{table_name}': {len(sequence)} slides")
-
-        # Update sequence index if provided
-        if "sequence_index" in request.data:
-            index = request.data.get("sequence_index")
-            if isinstance(index, int):
-                # Clamp index to valid range instead of silently ignoring out-of-bounds values
-                sequence_length = len(state["sequence"])
-                if sequence_length > 0:
-                    clamped_index = max(0, min(index, sequence_length - 1))
-                    if clamped_index != index:
-                        print(f"⚠️ Presentation index {index} out of bounds for table '{table_name}', clamped to {clamped_index}")
-                    old_index = state["sequence_index"]
-                    state["sequence_index"] = clamped_index
-                    index_changed = (clamped_index != old_index)
-                    print(f"✓ Presentation index for table '{table_name}': {clamped_index}")
-                else:
-                    state["sequence_index"] = 0
-                    print(f"⚠️ Empty sequence for table '{table_name}', index reset to 0")
-
-        # Update duration if provided
-        if "duration" in request.data:
-            duration = request.data.get("duration")
-            if isinstance(duration, (int, float)) and duration >= 1:
-                state["duration"] = int(duration)
-                print(f"✓ Presentation duration for table '{table_name}': {duration}s")
-
-        # Update legacy globals for default table (backward compatibility)
-        if table_name == globals.DEFAULT_TABLE_NAME:
-            globals.PRESENTATION_PLAYING = state["is_playing"]
-            globals.PRESENTATION_SEQUENCE = state["sequence"]
-            globals.PRESENTATION_SEQUENCE_INDEX = state["sequence_index"]
-            globals.PRESENTATION_DURATION = state["duration"]
+        # Read-modify-write in one atomic store update so concurrent workers don't clobber each other
+        state = globals.update_presentation_state(table_name, mutator=_apply)
+        for message in messages:
+            print(message)
 
         # If presentation is playing and (index/sequence changed or just started), update indicator/state from current slide
-        if state["is_playing"] and (index_changed or sequence_changed) and state["sequence"]:
+        if state["is_playing"] and (changes["index_changed"] or changes["sequence_changed"]) and state["sequence"]:
             self._sync_indicator_from_presentation_slide(table_name, state)
 
         # Broadcast to all connected clients via WebSocket
@@ -1737,106 +1912,7 @@ def set_presentation_state(self, request):
 
     def _sync_indicator_from_presentation_slide(self, table_name=None, presentation_state=None):
         """Update global indicator and state from current presentation slide for a specific table"""
-        try:
-            if presentation_state is None:
-                if table_name is None:
-                    table_name = globals.DEFAULT_TABLE_NAME
-                presentation_state = globals.get_presentation_state(table_name)
-
-            if not presentation_state["sequence"] or len(presentation_state["sequence"]) == 0:
-                return
-
-            current_index = max(
-                0, min(presentation_state["sequence_index"], len(presentation_state["sequence"]) - 1)
-            )
-            current_slide = presentation_state["sequence"][current_index]
-
-            if not current_slide or not current_slide.get("indicator"):
-                return
-
-            indicator_name = current_slide.get("indicator")
-            state_name = current_slide.get("state")
-            slide_type = current_slide.get("type")
-
-            # Map indicator name to ID
-            indicator_mapping = {"mobility": 1, "climate": 2, "land_use": 3}
-            indicator_id = indicator_mapping.get(indicator_name)
-
-            if not indicator_id:
-                print(f"⚠️ Invalid indicator in presentation slide: {indicator_name}")
-                return
-
-            # Get table-specific indicator state
-            indicator_state = globals.get_indicator_state(table_name)
-
-            # Update table-specific indicator ID
-            indicator_state["indicator_id"] = indicator_id
-            print(f"🎬 Synced indicator from presentation (table: {table_name}): {indicator_name} (ID: {indicator_id})")
-
-            # Update table-specific state based on indicator type
-            if indicator_name == "climate" and state_name and slide_type:
-                # For climate, map display name to scenario key
-                from backend.climate_scenarios import CLIMATE_SCENARIO_MAPPING
-                scenario_key = None
-                for key, config in CLIMATE_SCENARIO_MAPPING.items():
-                    if config["display_name"] == state_name:
-                        scenario_key = key
-                        break
-
-                if scenario_key:
-                    # Find the state object to get full state values
-                    state_obj = State.objects.filter(
-                        scenario_name=scenario_key, scenario_type=slide_type
-                    ).first()
-                    if state_obj:
-                        indicator_state["indicator_state"] = state_obj.state_values.copy()
-                        print(f"✓ Synced climate state: {scenario_key} ({slide_type})")
-                    else:
-                        # Fallback: create minimal state
-                        indicator_state["indicator_state"] = {
-                            "scenario": scenario_key,
-                            "type": slide_type,
-                            "label": state_name
-                        }
-                else:
-                    # Fallback: use state name as scenario
-                    indicator_state["indicator_state"] = {
-                        "scenario": state_name.lower().replace(" ", "_"),
-                        "type": slide_type or "utci",
-                        "label": state_name
-                    }
-            else:
-                # For mobility and other indicators, find state by scenario name
-                if state_name:
-                    scenario_key = state_name.lower()
-                    states = State.objects.filter(scenario_type="general")
-                    state_obj = None
-                    for s in states:
-                        if s.state_values.get("scenario") == scenario_key:
-                            state_obj = s
-                            break
-
-                    if state_obj:
-                        indicator_state["indicator_state"] = state_obj.state_values.copy()
-                        print(f"✓ Synced {indicator_name} state: {scenario_key}")
-                    else:
-                        # Fallback: create minimal state
-                        indicator_state["indicator_state"] = {
-                            "scenario": scenario_key,
-                            "label": state_name
-                        }
-
-            # Update legacy global for default table (backward compatibility)
-            if table_name == globals.DEFAULT_TABLE_NAME:
-                globals.INDICATOR_ID = indicator_state["indicator_id"]
-                globals.INDICATOR_STATE = indicator_state["indicator_state"]
-
-            # Broadcast indicator update for this table only
-            broadcast_indicator_update(table_name)
-            print(f"✓ Broadcasted indicator update for presentation slide (table: {table_name})")
-
-        except Exception as e:
-            print(f"❌ Error syncing indicator from presentation slide: {e}")
+        sync_indicator_from_presentation_slide(table_name, presentation_state)
 
     @action(detail=False, methods=["post"])
     def set_current_indicator(self, request):
@@ -1862,7 +1938,7 @@ def _set_current_indicator(self, indicator_id, table_name):
             # Pause presentation for this table when dashboard is actively using it
             presentation_state = globals.get_presentation_state(table_name)
             if presentation_state["is_playing"]:
-                presentation_state["is_playing"] = False
+                globals.update_presentation_state(table_name, is_playing=False)
                 print(f"⏸️ Paused presentation for table '{table_name}' (dashboard is using it)")
                 # Broadcast the pause
                 broadcast_presentation_update(table_name)
@@ -1877,20 +1953,25 @@ def _set_current_indicator(self, indicator_id, table_name):
                 print(f"❌ Indicator with ID {indicator_id} not found in table '{table_name}'")
                 return False
 
-            globals.INDICATOR_ID = indicator_id
             print(f"✓ Indicator set to ID: {indicator_id} (table: {table_name})")
 
-            # Update INDICATOR_STATE to match the new indicator's default state
+            # Reset the table's indicator state to the new indicator's default state
             if indicator.category == "climate":
                 # Set default climate state
-                globals.INDICATOR_STATE = globals.DEFAULT_CLIMATE_STATE.copy()
-                print(f"✓ Set default climate state: {globals.INDICATOR_STATE}")
+                new_state = globals.DEFAULT_CLIMATE_STATE.copy()
+                print(f"✓ Set default climate state: {new_state}")
             else:
                 # Set default mobility/other state
-                globals.INDICATOR_STATE = globals.DEFAULT_STATES.copy()
-                print(f"✓ Set default mobility state: {globals.INDICATOR_STATE}")
+                new_state = globals.DEFAULT_STATES.copy()
+                print(f"✓ Set default mobility state: {new_state}")
 
-            broadcast_indicator_update()
+            globals.update_indicator_state(
+                table_name,
+                indicator_id=indicator.indicator_id,
+                indicator_state=new_state,
+            )
+
+            broadcast_indicator_update(table_name)
             return True
         except Exception as e:
             print(f"❌ Error setting indicator: {e}")
@@ -1987,14 +2068,9 @@ def _set_current_state(self, state, table_name=None):
             if table_name is None:
                 table_name = globals.DEFAULT_TABLE_NAME
 
-            indicator_state = globals.get_indicator_state(table_name)
-            indicator_state["indicator_state"] = state
+            globals.update_indicator_state(table_name, indicator_state=state)
             print(f"✓ State updated to: {state} (table: {table_name})")
 
-            # Update legacy global for default table (backward compatibility)
-            if table_name == globals.DEFAULT_TABLE_NAME:
-                globals.INDICATOR_STATE = state
-
             broadcast_indicator_update(table_name)
             return True
         except Exception as e:
@@ -2124,12 +2200,11 @@ def get_image_data(self, request):
         if not use_presentation_mode or effective_indicator_id is None:
             if indicator_param:
                 indicator_id = indicator_mapping.get(indicator_param)
-                if indicator_id and not prefetch_mode:
+                if indicator_id and not prefetch_mode and indicator_state["indicator_id"] != indicator_id:
                     # Only modify table-specific state if NOT in prefetch mode
-                    indicator_state["indicator_id"] = indicator_id
-                    # Update legacy global for default table (backward compatibility)
-                    if table_name == globals.DEFAULT_TABLE_NAME:
-                        globals.INDICATOR_ID = indicator_id
+                    indicator_state = globals.update_indicator_state(
+                        table_name, indicator_id=indicator_id
+                    )
             else:
                 indicator_id = indicator_state["indicator_id"]
 
@@ -2149,6 +2224,34 @@ def get_image_data(self, request):
         # Table name already retrieved above for presentation mode check
         exclude_ugc = request.query_params.get("exclude_ugc", "false").lower() == "true"
 
+        # Fast path: exact (table, indicator, scenario, type) matches come straight from the
+        # precomputed media index; anything else falls through to the lookups below
+        if not is_ugc and effective_indicator_id is not None:
+            current_values = indicator_state["indicator_state"] or {}
+            if prefetch_mode and scenario_param:
+                entries = (
+                    lookup_media(table_name, effective_indicator_id, scenario_param, scenario_type)
+                    for scenario_type in (type_param or "utci", None)
+                )
+            elif effective_indicator_id == indicator_mapping["climate"]:
+                entries = [
+                    lookup_media(
+                        table_name,
+                        effective_indicator_id,
+                        current_values.get("scenario"),
+                        current_values.get("type", "utci"),
+                    )
+                ]
+            else:
+                # Other indicators resolve their current state by exact state_values below
+                entries = [lookup_current_media(table_name, effective_indicator_id, current_values)]
+            for entry in entries:
+                if entry and not (exclude_ugc and entry["is_user_generated"]):
+                    entry.pop("is_user_generated")
+                    response = JsonResponse(entry)
+                    self._add_no_cache_headers(response)
+                    return response
+
         table = Table.objects.filter(name=table_name).first()
         if not table:
             response = JsonResponse(
@@ -2252,30 +2355,24 @@ def get_image_data(self, request):
             if prefetch_mode and scenario_param:
                 # Prefetch mode - look up state by scenario name
                 print(f"📊 PREFETCH mode - {indicator_param} scenario: {scenario_param}")
-                state = None
-                states = State.objects.all()
-                for s in states:
-                    if s.state_values.get("scenario") == scenario_param:
-                        state = s
-                        print(f"✓ Found state by scenario: {s.state_values}")
-                        break
+                state = State.matching(scenario=scenario_param).first()
+                if state:
+                    print(f"✓ Found state by scenario: {state.state_values}")
                 if not state:
                     # Fallback to first state
                     state = State.objects.first()
             elif indicator_obj.has_states == False:
                 state = State.objects.filter(state_values={}).first()
             else:
-                state = State.objects.filter(state_values=globals.INDICATOR_STATE).first()
+                current_state_values = indicator_state["indicator_state"]
+                state = State.objects.filter(state_values=current_state_values).first()
                 if not state:
-                    print(f"No exact state match for {globals.INDICATOR_STATE}, trying year match...")
-                    year = globals.INDICATOR_STATE.get("year")
+                    print(f"No exact state match for {current_state_values}, trying year match...")
+                    year = current_state_values.get("year")
                     if year:
-                        states = State.objects.all()
-                        for s in states:
-                            if s.state_values.get("year") == year:
-                                state = s
-                                print(f"Found state with matching year: {s.state_values}")
-                                break
+                        state = State.matching(year=year).first()
+                        if state:
+                            print(f"Found state with matching year: {state.state_values}")
 
         if not state:
             # Default to the first available state
@@ -2317,7 +2414,8 @@ def get_image_data(self, request):
         # Check if image_data exists and has a first element
         if image_data.exists() and image_data.first():
             try:
-                image_path = image_data.first().image.name
+                image_obj = image_data.first()
+                image_path = image_obj.image.name
                 # UGC indicators already have ugc_indicators/ prefix from upload_to function
                 # Standard indicators may need indicators/ prefix added
                 # Don't modify paths that already have a valid prefix
@@ -2336,9 +2434,11 @@ def get_image_data(self, request):
                 file_extension = os.path.splitext(image_path)[1].lower()
                 is_video = file_extension in [".mp4", ".webm", ".ogg", ".avi", ".mov"]
 
-                response = JsonResponse(
-                    {"image_data": image_path, "type": "video" if is_video else "image"}
-                )
+                payload = {"image_data": image_path, "type": "video" if is_video else "image"}
+                derivatives = list(image_obj.derivatives.all())
+                if derivatives:
+                    payload.update(derivative_payload(derivatives))
+                response = JsonResponse(payload)
                 self._add_no_cache_headers(response)
                 return response
             except (AttributeError, ValueError) as e:
@@ -2403,10 +2503,10 @@ def get_deckgl_data(self, request):
             indicator_mapping = {"mobility": 1, "climate": 2, "land_use": 3}
             indicator_id = indicator_mapping.get(indicator_param)
             if indicator_id:
-                indicator_state["indicator_id"] = indicator_id
-                # Update legacy global for default table (backward compatibility)
-                if table_name == globals.DEFAULT_TABLE_NAME:
-                    globals.INDICATOR_ID = indicator_id
+                if indicator_state["indicator_id"] != indicator_id:
+                    indicator_state = globals.update_indicator_state(
+                        table_name, indicator_id=indicator_id
+                    )
                 print(
                     f"Using indicator from query parameter: {indicator_param} (ID: {indicator_id}) (table: {table_name})"
                 )
@@ -2437,20 +2537,11 @@ def get_deckgl_data(self, request):
             # If no exact match found, try to find a state with the specified year and scenario
             if not state:
                 current_scenario = indicator_state["indicator_state"].get("scenario")
-                states = State.objects.all()
-                for s in states:
-                    if (s.state_values.get("year") == year and
-                        s.state_values.get("scenario") == current_scenario):
-                        state = s
-                        break
+                state = State.matching(year=year, scenario=current_scenario).first()
 
             # If still no state found, use the first state with the year
             if not state:
-                states = State.objects.all()
-                for s in states:
-                    if s.state_values.get("year") == year:
-                        state = s
-                        break
+                state = State.matching(year=year).first()
 
             # Use first available state if none match
             if not state:
@@ -2533,12 +2624,7 @@ def get_current_dashboard_data(self, request):
         if year_param and year_param.isdigit():
             year = int(year_param)
             # Find a state with this year
-            matched_state = None
-            states = State.objects.all()
-            for s in states:
-                if s.state_values.get("year") == year:
-                    matched_state = s
-                    break
+            matched_state = State.matching(year=year).first()
 
             # If we found a state with the requested year, use that instead of the global state
             if matched_state:
@@ -2557,28 +2643,30 @@ def get_current_dashboard_data(self, request):
                     return response
 
         # If no year param or no match found, use the current global state
-        # IMPORTANT: Always return globals.INDICATOR_STATE directly for real-time updates
+        # IMPORTANT: Always return the table's current indicator state directly for real-time updates
         # DO NOT return state.first().state_values as it may be stale
+        table_name = request.query_params.get("table", globals.DEFAULT_TABLE_NAME)
+        current_state_values = globals.get_indicator_state(table_name)["indicator_state"]
         try:
-            state = State.objects.filter(state_values=globals.INDICATOR_STATE).first()
+            state = State.objects.filter(state_values=current_state_values).first()
 
             if state:
                 dashboard_data = DashboardFeedState.objects.filter(state=state).first()
 
                 if dashboard_data:
                     response = JsonResponse(
-                        {"data": dashboard_data.data, "state": globals.INDICATOR_STATE}
+                        {"data": dashboard_data.data, "state": current_state_values}
                     )
                     self._add_no_cache_headers(response)
                     return response
 
             # If no exact match in DB, still return the current global state
             # This handles cases where the state was just updated
-            print(f"⚠️ No database match for state: {globals.INDICATOR_STATE}")
+            print(f"⚠️ No database match for state: {current_state_values}")
             response = JsonResponse(
                 {
                     "data": {},  # Empty data if no match
-                    "state": globals.INDICATOR_STATE,
+                    "state": current_state_values,
                     "warning": "No dashboard data found for current state",
                 }
             )
@@ -2591,7 +2679,7 @@ def get_current_dashboard_data(self, request):
             response = JsonResponse(
                 {
                     "error": str(e),
-                    "state": globals.INDICATOR_STATE,
+                    "state": current_state_values,
                 },
                 status=500,
             )
@@ -2606,7 +2694,20 @@ def get_otef_layers(self, request):
         if not table:
             return Response({'error': 'Table not found'}, status=404)
 
-        layers = GISLayer.objects.filter(table=table, is_active=True).order_by('order')
+        try:
+            simplification_level(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+        # ?detail= / ?zoom= are passed on to the per-layer GeoJSON URLs
+        detail_query = urlencode(
+            {k: request.query_params[k] for k in ('detail', 'zoom') if request.query_params.get(k)}
+        )
+
+        layers = (
+            GISLayer.objects.filter(table=table, is_active=True)
+            .defer('data', 'simplified_data')
+            .order_by('order')
+        )
         data = []
         for layer in layers:
             layer_data = {
@@ -2618,19 +2719,19 @@ def get_otef_layers(self, request):
                 'style_config': layer.style_config,
             }
 
-            if layer.layer_type == 'geojson':
-                if layer.data:
-                    layer_data['geojson'] = layer.data
-                elif layer.file_path:
-                    layer_data['url'] = f'/api/gis_layers/{layer.id}/get_layer_geojson/'
+            # GeoJSON is fetched by URL; DB-stored data gets a content-hash (immutable) URL
+            if layer.layer_type == 'geojson' and (layer.data_hash or layer.file_path):
+                layer_data['url'] = geojson_url(layer, detail_query)
+                layer_data['data_hash'] = layer.data_hash
+                if layer.data_hash:
+                    layer_data['tiles_url'] = vector_tiles.tiles_url(layer)
 
             data.append(layer_data)
 
-        response = JsonResponse(data, safe=False)
-        response["Cache-Control"] = "no-cache, no-store, must-revalidate, max-age=0"
-        return response
+        return conditional_json_response(request, data, safe=False)
 
 
+from django.core.files.move import file_move_safe
 from django.http import FileResponse, HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_GET
@@ -2639,6 +2740,7 @@ def get_otef_layers(self, request):
 from django.conf import settings
 from rest_framework.views import APIView
 from pathlib import Path
+import tempfile
 
 from backend.calibration_io import normalize_calibration_payload, write_model_bounds_to_storage
 
@@ -2684,13 +2786,11 @@ def pink_line_geojson(request):
     if not path:
         return HttpResponse("Pink line data not found", status=404)
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        response = JsonResponse(data, safe=False)
-        response["Content-Type"] = "application/geo+json"
-        response["Cache-Control"] = "public, max-age=86400"
-        return response
-    except (json.JSONDecodeError, OSError):
+        # Stream the processed bytes (or their .br/.gz sibling) as-is
+        return precompressed_file_response(
+            request, path, "application/geo+json", "public, max-age=86400"
+        )
+    except OSError:
         return HttpResponse("Error reading pink line data", status=500)
 
 
@@ -2746,7 +2846,10 @@ def post(self, request, *args, **kwargs):
 
                 # Create image with proper file validation
                 image_extension = Path(image_file.name).suffix.lower()
-                allowed_extensions = [".jpg", ".jpeg", ".png", ".gif", ".svg"]
+                allowed_extensions = [
+                    ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp",
+                    ".mp4", ".webm", ".mov",
+                ]
 
                 if image_extension not in allowed_extensions:
                     return Response(
@@ -2764,34 +2867,49 @@ def post(self, request, *args, **kwargs):
 
                 # Generate path based on indicator category
                 folder_path = f"indicators/{category}"
-                os.makedirs(
-                    os.path.join(settings.MEDIA_ROOT, folder_path), exist_ok=True
-                )
+                folder = os.path.join(settings.MEDIA_ROOT, folder_path)
+                os.makedirs(folder, exist_ok=True)
 
                 # Create a filename based on indicator and state
                 filename = f"{indicator_name}_{state_year}{image_extension}"
                 file_path = f"{folder_path}/{filename}"
+                destination_path = os.path.join(settings.MEDIA_ROOT, file_path)
 
-                # Save the image in the database and file system
+                # Stream the upload to a temp file next to the destination and
+                # swap it in, so readers never see a half-written file. Large
+                # uploads are already spooled to disk by Django; move that file.
+                fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".upload-", suffix=image_extension)
+                try:
+                    if hasattr(image_file, "temporary_file_path"):
+                        # A rename when the spool dir shares MEDIA_ROOT's filesystem, else a copy
+                        os.close(fd)
+                        file_move_safe(image_file.temporary_file_path(), tmp_path, allow_overwrite=True)
+                    else:
+                        with os.fdopen(fd, "wb") as destination:
+                            for chunk in image_file.chunks():
+                                destination.write(chunk)
+                    # Assert correct file permissions
+                    os.chmod(tmp_path, 0o644)
+                    os.replace(tmp_path, destination_path)
+                except BaseException:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                    raise
+
+                # Save the image in the database once the file is in place
                 image = IndicatorImage.objects.create(
                     indicatorData=indicator_data, image=file_path
                 )
-
-                # Save the file to disk
-                with open(
-                    os.path.join(settings.MEDIA_ROOT, file_path), "wb+"
-                ) as destination:
-                    for chunk in image_file.chunks():
-                        destination.write(chunk)
-
-                # Assert correct file permissions
-                os.chmod(os.path.join(settings.MEDIA_ROOT, file_path), 0o644)
+                # Resized WebP/AVIF renditions (and video posters) are rendered
+                # in the background and show up as srcset in get_image_data
+                schedule_derivatives(image.id)
 
                 return Response(
                     {
                         "status": "success",
                         "message": "Image uploaded successfully",
                         "image_url": f"/media/{file_path}",
+                        "derivatives": "pending",
                         "image_id": image.id,
                     },
                     status=status.HTTP_201_CREATED,
@@ -2813,6 +2931,47 @@ def post(self, request, *args, **kwargs):
             )
 
 
+class ImagePyramidView(APIView):
+    """
+    Describe the deep-zoom tile pyramid of a large image (see image_pyramid),
+    so a client can load only the levels and tiles it is displaying.
+
+    GET ?path=<media-relative path, as returned in image_data>
+    GET ?table=otef[&field=model_image|model_image_transparent]
+    404 when no pyramid has been built; clients then load the image whole.
+    """
+
+    MODEL_IMAGE_FIELDS = ("model_image", "model_image_transparent")
+
+    def get(self, request, *args, **kwargs):
+        media_path = request.GET.get("path")
+        if not media_path and request.GET.get("table"):
+            field = request.GET.get("field", "model_image")
+            if field not in self.MODEL_IMAGE_FIELDS:
+                return Response(
+                    {"error": "Invalid field", "allowed": list(self.MODEL_IMAGE_FIELDS)},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            config = OTEFModelConfig.objects.filter(table__name=request.GET["table"]).first()
+            media_path = getattr(config, field).name if config and getattr(config, field) else None
+            if not media_path:
+                return Response({"error": "Model image not found"}, status=status.HTTP_404_NOT_FOUND)
+        if not media_path:
+            return Response(
+                {"error": "path or table parameter is required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            manifest = image_pyramid.read_manifest(media_path)
+        except image_pyramid.InvalidMediaPath as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if manifest is None:
+            return Response({"error": "No pyramid for this image"}, status=status.HTTP_404_NOT_FOUND)
+        manifest.pop("source", None)
+        return conditional_json_response(request, manifest)
+
+
 class OTEFBoundsApplyView(APIView):
     """
     Apply bounds polygon for a given OTEF table and persist it to:
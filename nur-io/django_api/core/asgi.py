@@ -8,13 +8,20 @@
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
-application = ProtocolTypeRouter(
-    {
-        "http": get_asgi_application(),
-        "websocket": AuthMiddlewareStack(
-            URLRouter(
-                websocket_urlpatterns
-            )
-        ),
-    }
+django_asgi_app = get_asgi_application()
+
+from backend.presentation_scheduler import PresentationSchedulerMiddleware
+
+# The scheduler wrapper starts server-driven presentation playback on first connection
+application = PresentationSchedulerMiddleware(
+    ProtocolTypeRouter(
+        {
+            "http": django_asgi_app,
+            "websocket": AuthMiddlewareStack(
+                URLRouter(
+                    websocket_urlpatterns
+                )
+            ),
+        }
+    )
 )
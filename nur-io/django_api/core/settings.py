@@ -141,6 +141,16 @@
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 MEDIA_URL = "/media/"
 
+# Serialized/compressed GeoJSON for DB-stored GIS layers (backend/layer_cache.py)
+GIS_LAYER_CACHE_DIR = os.path.join(MEDIA_ROOT, "cache", "gis_layers")
+
+# Background builds of GISLayer simplified variants (backend/layer_variants.py)
+GIS_LAYER_VARIANT_WORKERS = int(os.getenv("GIS_LAYER_VARIANT_WORKERS", "1"))
+
+# Background WebP/AVIF renditions and video posters for uploads (backend/media_derivatives.py)
+MEDIA_DERIVATIVES_ENABLED = os.getenv("MEDIA_DERIVATIVES_ENABLED", "true").lower() == "true"
+MEDIA_DERIVATIVE_WORKERS = int(os.getenv("MEDIA_DERIVATIVE_WORKERS", "2"))
+
 ASGI_APPLICATION = "core.asgi.application"
 
 # Session Configuration
@@ -157,3 +167,22 @@
         },
     },
 }
+
+# Shared per-table indicator/presentation state (backend/state_store.py).
+# Set STATE_STORE_URL (e.g. redis://redis:6379/1) whenever more than one API worker
+# runs; without it state is kept in-process, which is only correct for a single worker.
+STATE_STORE_URL = os.getenv("STATE_STORE_URL")
+STATE_STORE = (
+    {
+        "BACKEND": "backend.state_store.RedisStateStore",
+        "OPTIONS": {"url": STATE_STORE_URL},
+    }
+    if STATE_STORE_URL
+    else {"BACKEND": "backend.state_store.InMemoryStateStore"}
+)
+
+# Advance playing presentations on the server (backend/presentation_scheduler.py)
+# instead of relying on each client's timer.
+PRESENTATION_SCHEDULER_ENABLED = (
+    os.getenv("PRESENTATION_SCHEDULER_ENABLED", "true").lower() == "true"
+)
@@ -38,6 +38,7 @@ import {
 } from "../map-utils/pink-route-optimizer.js";
 import AdvancedStyleEngine from "../map-utils/advanced-style-engine.js";
 import layerRegistry from "./layer-registry.js";
+import { GEOBIN_MEDIA_TYPE, decodeGeoBin, isGeoBinResponse } from "./geobin.js";
 import MapProjectionConfig from "./map-projection-config.js";
 
 /**
@@ -308,9 +309,10 @@ async function fetchCuratedLayerData(fullLayerId) {
 
   let geojson = layerData.geojson;
   if (!geojson && layerData.url) {
-    const r = await fetch(layerData.url);
+    // Binary geometry; the layer endpoints answer errors (and only errors) in JSON
+    const r = await fetch(layerData.url, { headers: { Accept: GEOBIN_MEDIA_TYPE } });
     if (!r.ok) throw new Error(r.status);
-    geojson = await r.json();
+    geojson = isGeoBinResponse(r) ? decodeGeoBin(await r.arrayBuffer()) : await r.json();
   }
   if (!geojson || !geojson.features) return null;
 
@@ -0,0 +1,115 @@
+/**
+ * GeoBin decoder — the compact binary FeatureCollection encoding served by
+ * the GIS layer endpoints for `Accept: application/vnd.nur.geobin` (or
+ * `?format=geobin`). The layout is documented in
+ * nur-io/django_api/backend/geobin.py.
+ *
+ * Coordinates are read straight out of typed-array views over the response
+ * buffer; only the small properties header goes through JSON.parse.
+ */
+
+export const GEOBIN_MEDIA_TYPE = "application/vnd.nur.geobin";
+
+const MAGIC = "NGB1";
+
+const GEOMETRY_TYPES = [
+  null,
+  "Point",
+  "LineString",
+  "Polygon",
+  "MultiPoint",
+  "MultiLineString",
+  "MultiPolygon",
+];
+
+/**
+ * @param {Response} response - fetch() response
+ * @returns {boolean} true when the body is GeoBin
+ */
+export function isGeoBinResponse(response) {
+  const type = (response && response.headers && response.headers.get("Content-Type")) || "";
+  return type.split(";")[0].trim() === GEOBIN_MEDIA_TYPE;
+}
+
+/**
+ * Decode a GeoBin payload into a GeoJSON FeatureCollection.
+ *
+ * @param {ArrayBuffer} buffer
+ * @returns {Object} GeoJSON FeatureCollection
+ */
+export function decodeGeoBin(buffer) {
+  const view = new DataView(buffer);
+  const magic = String.fromCharCode(
+    view.getUint8(0),
+    view.getUint8(1),
+    view.getUint8(2),
+    view.getUint8(3),
+  );
+  if (magic !== MAGIC) throw new Error("Not a GeoBin payload");
+
+  const headerLength = view.getUint32(4, true);
+  const header = JSON.parse(
+    new TextDecoder("utf-8").decode(new Uint8Array(buffer, 8, headerLength)),
+  );
+  const counts = header.counts;
+  let pos = 8 + headerLength;
+
+  // Sections start on 4-byte boundaries, so typed-array views need no copy
+  // (the payload is little-endian, as are all browsers we target)
+  const take = (ArrayType, length) => {
+    const arr = new ArrayType(buffer, pos, length);
+    pos += length * ArrayType.BYTES_PER_ELEMENT;
+    pos += (4 - (pos % 4)) % 4;
+    return arr;
+  };
+
+  const types = take(Uint8Array, counts.features);
+  const partOffsets = take(Uint32Array, counts.features + 1);
+  const ringOffsets = take(Uint32Array, counts.parts + 1);
+  const coordOffsets = take(Uint32Array, counts.rings + 1);
+  const deltas = take(header.coord_type === "int16" ? Int16Array : Int32Array, counts.coords * 2);
+
+  const [ox, oy] = header.origin;
+  const scale = header.scale;
+  const coords = new Array(counts.coords);
+  let qx = 0;
+  let qy = 0;
+  for (let i = 0; i < counts.coords; i++) {
+    qx += deltas[2 * i];
+    qy += deltas[2 * i + 1];
+    coords[i] = [ox + qx / scale, oy + qy / scale];
+  }
+
+  const raw = header.raw_geometries || {};
+  const ids = header.ids || null;
+  const features = new Array(counts.features);
+  for (let f = 0; f < counts.features; f++) {
+    const type = GEOMETRY_TYPES[types[f]] || null;
+    let geometry = null;
+    if (!type) {
+      geometry = raw[String(f)] || null;
+    } else {
+      const parts = [];
+      for (let p = partOffsets[f]; p < partOffsets[f + 1]; p++) {
+        const rings = [];
+        for (let r = ringOffsets[p]; r < ringOffsets[p + 1]; r++) {
+          rings.push(coords.slice(coordOffsets[r], coordOffsets[r + 1]));
+        }
+        parts.push(rings);
+      }
+      let coordinates;
+      if (type === "Point") coordinates = parts[0][0][0];
+      else if (type === "MultiPoint") coordinates = parts.map((part) => part[0][0]);
+      else if (type === "LineString") coordinates = parts[0][0];
+      else if (type === "MultiLineString") coordinates = parts.map((part) => part[0]);
+      else if (type === "Polygon") coordinates = parts[0];
+      else coordinates = parts;
+      geometry = { type, coordinates };
+    }
+    const feature = { type: "Feature", properties: header.properties[f], geometry };
+    if (ids && ids[f] != null) feature.id = ids[f];
+    features[f] = feature;
+  }
+
+  return { type: "FeatureCollection", ...(header.members || {}), features };
+}
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Tiling Backend Benchmark
+
+Tiles processed layers with each PMTiles backend (tippecanoe + go-pmtiles,
+local or in Docker, and native in-process tiling) and reports wall time, tile count and archive
+size per layer. By default only layers that already have a .pmtiles next to
+their GeoJSON (the ones process_layers.py tiles) are benchmarked. Outputs go
+to a temporary directory; the processed layers are not touched.
+
+Usage:
+  python benchmark_tiling.py
+  python benchmark_tiling.py --layers ../public/processed/layers --pack otef_base --backend native
+  python benchmark_tiling.py --all --output tiling-benchmark.md
+"""
+
+import argparse
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Fix Windows console encoding issues
+if sys.platform == "win32":
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8", errors="replace")
+
+sys.path.insert(0, str(Path(__file__).parent))
+try:
+    from otef_layer_processing.tiling import TILING_BACKENDS, generate_pmtiles_smart
+except ImportError as e:
+    print(f"Error: Could not import otef_layer_processing: {e}")
+    sys.exit(1)
+
+
+def find_layers(layers_dir: Path, packs: Optional[List[str]], include_all: bool) -> List[Path]:
+    layers = []
+    for pack_dir in sorted(p for p in layers_dir.iterdir() if p.is_dir()):
+        if packs and pack_dir.name not in packs:
+            continue
+        for geojson in sorted(pack_dir.glob("*.geojson")):
+            if include_all or geojson.with_suffix(".pmtiles").exists():
+                layers.append(geojson)
+    return layers
+
+
+def tile_count(pmtiles_path: Path) -> Optional[int]:
+    try:
+        from pmtiles.reader import MmapSource, Reader
+
+        with open(pmtiles_path, "rb") as f:
+            return Reader(MmapSource(f)).header()["addressed_tiles_count"]
+    except Exception:
+        return None
+
+
+def run_backend(backend: str, geojson: Path, out_dir: Path) -> Dict:
+    output = out_dir / f"{geojson.parent.name}__{geojson.stem}.{backend}.pmtiles"
+    started = time.perf_counter()
+    ok = generate_pmtiles_smart(geojson, output, high_fidelity=True, backend=backend)
+    elapsed = time.perf_counter() - started
+    result = {"ok": ok and output.exists(), "seconds": elapsed, "tiles": None, "size_mb": None}
+    if result["ok"]:
+        result["tiles"] = tile_count(output)
+        result["size_mb"] = output.stat().st_size / (1024 * 1024)
+        output.unlink()
+    return result
+
+
+def format_report(rows: List[Dict], backends: List[str]) -> str:
+    header = ["Layer", "GeoJSON MB"]
+    for backend in backends:
+        header += [f"{backend} s", f"{backend} tiles", f"{backend} MB"]
+    lines = ["| " + " | ".join(header) + " |", "|" + "---|" * len(header)]
+    totals = {backend: 0.0 for backend in backends}
+    for row in rows:
+        cells = [row["layer"], f"{row['input_mb']:.1f}"]
+        for backend in backends:
+            result = row[backend]
+            if not result["ok"]:
+                cells += [f"failed ({result['seconds']:.1f})", "-", "-"]
+                continue
+            totals[backend] += result["seconds"]
+            tiles = "?" if result["tiles"] is None else str(result["tiles"])
+            cells += [f"{result['seconds']:.1f}", tiles, f"{result['size_mb']:.2f}"]
+        lines.append("| " + " | ".join(cells) + " |")
+    lines.append("")
+    for backend in backends:
+        failed = sum(not row[backend]["ok"] for row in rows)
+        lines.append(f"- **{backend}**: {totals[backend]:.1f}s total over successful layers, {failed} failed")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    default_layers = Path(__file__).resolve().parent.parent / "public" / "processed" / "layers"
+
+    parser = argparse.ArgumentParser(description="Benchmark the PMTiles tiling backends on processed layers")
+    parser.add_argument("--layers", default=str(default_layers), help="Processed layers directory")
+    parser.add_argument("--pack", action="append", help="Only this pack id (repeatable)")
+    parser.add_argument(
+        "--backend",
+        action="append",
+        choices=TILING_BACKENDS,
+        help="Backend to run (repeatable; default: all)",
+    )
+    parser.add_argument("--all", action="store_true", help="Also tile layers that have no PMTiles today")
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many layers")
+    parser.add_argument("--output", help="Also write the markdown report to this file")
+    args = parser.parse_args()
+
+    layers_dir = Path(args.layers)
+    if not layers_dir.is_dir():
+        print(f"Error: Layers directory does not exist: {layers_dir}")
+        sys.exit(1)
+
+    backends = args.backend or list(TILING_BACKENDS)
+    layers = find_layers(layers_dir, args.pack, args.all)[: args.limit]
+    if not layers:
+        print("No layers to benchmark")
+        sys.exit(1)
+
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="tiling-benchmark-") as tmp:
+        for geojson in layers:
+            name = f"{geojson.parent.name}/{geojson.stem}"
+            row = {"layer": name, "input_mb": geojson.stat().st_size / (1024 * 1024)}
+            for backend in backends:
+                print(f"[{backend}] {name} ...", flush=True)
+                row[backend] = run_backend(backend, geojson, Path(tmp))
+            rows.append(row)
+
+    report = format_report(rows, backends)
+    print()
+    print(report)
+    if args.output:
+        Path(args.output).write_text(report, encoding="utf-8")
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
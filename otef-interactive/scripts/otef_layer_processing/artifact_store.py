@@ -0,0 +1,185 @@
+"""
+Content-addressed store of processed layer artifacts.
+
+Each entry is keyed by the hash of (pipeline version, GIS file hash, .lyrx
+hash, label-override hash), so it does not depend on where a layer lives: a
+layer whose outputs were deleted, renamed or moved to another pack is
+materialized from the store instead of being reprojected and re-tiled. An
+entry holds the WGS84 GeoJSON with its precompressed siblings, the PMTiles
+archive (when the layer was tiled) and meta.json with the parsed style and
+geometry type.
+
+Files are hard-linked between the store and the processed outputs (copied
+when they are on different filesystems). Every pipeline writer replaces its
+output file rather than rewriting it in place, so a linked output never
+changes a stored artifact. Bump PIPELINE_VERSION whenever the transform,
+tiling or style parsing changes what they produce.
+
+The default location is scripts/.layer-store (override with OTEF_LAYER_STORE
+or --store). It is safe to share between checkouts and to restore as a CI cache.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .compress import PRECOMPRESSED_SUFFIXES
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_VERSION = "1"
+DEFAULT_STORE_DIR = Path(
+    os.environ.get("OTEF_LAYER_STORE")
+    or Path(__file__).resolve().parent.parent / ".layer-store"
+)
+
+GEOJSON_NAME = "layer.geojson"
+PMTILES_NAME = "layer.pmtiles"
+META_NAME = "meta.json"
+
+
+def artifact_key(fingerprint: str) -> str:
+    """Store key for a layer fingerprint ("geoHash:lyrxHash:overrideHash")."""
+    return hashlib.sha256(f"{PIPELINE_VERSION}:{fingerprint}".encode("utf-8")).hexdigest()
+
+
+def _link_into(source: Path, dest: Path) -> None:
+    """Hard-link (or copy) source to a temp name next to dest, then rename it over dest."""
+    tmp = dest.with_name(f"{dest.name}.store-tmp")
+    if tmp.exists():
+        tmp.unlink()
+    try:
+        os.link(source, tmp)
+    except OSError:
+        shutil.copy2(source, tmp)
+    os.replace(tmp, dest)
+
+
+def _remove(path: Path) -> None:
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+class ArtifactStore:
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def entry_dir(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """meta.json of a complete entry (plus "has_pmtiles"), or None."""
+        entry = self.entry_dir(key)
+        try:
+            with open(entry / META_NAME, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("pipeline_version") != PIPELINE_VERSION or not (entry / GEOJSON_NAME).is_file():
+            return None
+        meta["has_pmtiles"] = (entry / PMTILES_NAME).is_file()
+        return meta
+
+    def put(
+        self,
+        key: str,
+        geojson: Path,
+        geometry_type: str,
+        style: Optional[Dict[str, Any]],
+        pmtiles: Optional[Path] = None,
+    ) -> None:
+        """Record a layer's outputs (GeoJSON + existing precompressed siblings, optional PMTiles)."""
+        entry = self.entry_dir(key)
+        if (entry / META_NAME).is_file():
+            if pmtiles is not None:
+                self.add_pmtiles(key, pmtiles)
+            return
+
+        # Staged under a unique name and renamed into place: concurrent workers
+        # storing the same content (same layer in two packs) can't interleave
+        stage = entry.with_name(f"{key}.{uuid.uuid4().hex}.tmp")
+        stage.mkdir(parents=True)
+        try:
+            _link_into(geojson, stage / GEOJSON_NAME)
+            for suffix in PRECOMPRESSED_SUFFIXES:
+                sibling = geojson.with_name(geojson.name + suffix)
+                if sibling.is_file():
+                    _link_into(sibling, stage / (GEOJSON_NAME + suffix))
+            if pmtiles is not None and pmtiles.is_file():
+                _link_into(pmtiles, stage / PMTILES_NAME)
+            with open(stage / META_NAME, "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "pipeline_version": PIPELINE_VERSION,
+                        "geometry_type": geometry_type,
+                        "style": style,
+                    },
+                    f,
+                    indent=2,
+                    ensure_ascii=False,
+                )
+            try:
+                os.rename(stage, entry)
+            except OSError:
+                pass  # stored meanwhile by another worker
+        finally:
+            if stage.exists():
+                shutil.rmtree(stage, ignore_errors=True)
+
+    def add_pmtiles(self, key: str, pmtiles: Path) -> None:
+        entry = self.entry_dir(key)
+        if entry.is_dir() and pmtiles.is_file() and not (entry / PMTILES_NAME).is_file():
+            _link_into(pmtiles, entry / PMTILES_NAME)
+
+    def materialize(self, key: str, geojson: Path, pmtiles: Optional[Path]) -> None:
+        """
+        Link an entry's files to the output paths. pmtiles is None when the layer
+        should not have tiles; a stale archive at that path is removed by the caller.
+        """
+        entry = self.entry_dir(key)
+        geojson.parent.mkdir(parents=True, exist_ok=True)
+        _link_into(entry / GEOJSON_NAME, geojson)
+        for suffix in PRECOMPRESSED_SUFFIXES:
+            stored = entry / (GEOJSON_NAME + suffix)
+            sibling = geojson.with_name(geojson.name + suffix)
+            if stored.is_file():
+                _link_into(stored, sibling)
+            else:
+                # An older sibling could look fresh next to the linked (older-mtime) GeoJSON
+                _remove(sibling)
+        if pmtiles is not None and (entry / PMTILES_NAME).is_file():
+            _link_into(entry / PMTILES_NAME, pmtiles)
+        # Last use, for prune()
+        os.utime(entry / META_NAME)
+
+    def prune(self, max_age_days: float) -> int:
+        """Delete entries not stored or used for max_age_days; returns how many were removed."""
+        if not self.root.is_dir():
+            return 0
+        cutoff = time.time() - max_age_days * 86400
+        removed = 0
+        for shard in self.root.iterdir():
+            if not shard.is_dir():
+                continue
+            for entry in shard.iterdir():
+                meta = entry / META_NAME
+                try:
+                    last_used = meta.stat().st_mtime
+                except OSError:
+                    last_used = entry.stat().st_mtime  # abandoned staging dir
+                if last_used < cutoff:
+                    shutil.rmtree(entry, ignore_errors=True)
+                    removed += 1
+            try:
+                shard.rmdir()
+            except OSError:
+                pass  # still has entries
+        return removed
@@ -2,7 +2,10 @@
 import sys
 import logging
 from pathlib import Path
-from .orchestrator import ProcessingOrchestrator
+from .artifact_store import DEFAULT_STORE_DIR, ArtifactStore
+from .media_sync import API_CONTAINER, request_media_sync
+from .orchestrator import DEFAULT_MEMORY_BUDGET_MB, ProcessingOrchestrator
+from .tiling import DEFAULT_TILING_BACKEND, TILING_BACKENDS
 
 import os
 
@@ -28,7 +31,42 @@ def main():
         metavar="SECONDS",
         help="If no task completes for this many seconds, log which task(s) are still pending (then keep waiting)",
     )
+    parser.add_argument(
+        "--memory-budget",
+        type=int,
+        default=DEFAULT_MEMORY_BUDGET_MB,
+        metavar="MB",
+        help=f"Estimated memory that concurrent layer transforms may use; 0 disables the cap (default: {DEFAULT_MEMORY_BUDGET_MB}, env OTEF_MEMORY_BUDGET_MB)",
+    )
+    parser.add_argument(
+        "--tiling-backend",
+        choices=TILING_BACKENDS,
+        default=DEFAULT_TILING_BACKEND,
+        help=f"PMTiles generator: tippecanoe (local binaries, else pooled Docker containers), or native in-process tiling (default: {DEFAULT_TILING_BACKEND}, env OTEF_TILING_BACKEND)",
+    )
+    parser.add_argument(
+        "--store",
+        default=str(DEFAULT_STORE_DIR),
+        metavar="DIR",
+        help=f"Content-addressed artifact store reused across packs and checkouts (default: {DEFAULT_STORE_DIR}, env OTEF_LAYER_STORE)",
+    )
+    parser.add_argument("--no-store", action="store_true", help="Neither read nor fill the artifact store")
+    parser.add_argument(
+        "--prune-store",
+        type=float,
+        default=None,
+        metavar="DAYS",
+        help="After processing, delete store entries unused for this many days",
+    )
     parser.add_argument("--debug", action="store_true", help="Enable debug logging")
+    parser.add_argument(
+        "--sync-media",
+        nargs="?",
+        const=API_CONTAINER,
+        default=None,
+        metavar="CONTAINER",
+        help=f"After processing, sync changed outputs into the API media volume (container, default: {API_CONTAINER})",
+    )
     parser.add_argument(
         "--pack",
         type=str,
@@ -68,6 +106,9 @@ def main():
         output_dir=output_dir,
         no_cache=args.no_cache,
         max_workers=args.parallel,
+        tiling_backend=args.tiling_backend,
+        store_dir=None if args.no_store else Path(args.store),
+        memory_budget_mb=args.memory_budget,
     )
 
     if args.pack and args.layer:
@@ -79,5 +120,12 @@ def main():
     else:
         orchestrator.process_all(stuck_timeout=args.stuck_timeout)
 
+    if args.prune_store is not None and not args.no_store:
+        removed = ArtifactStore(Path(args.store)).prune(args.prune_store)
+        logging.getLogger(__name__).info(f"Pruned {removed} artifact store entries")
+
+    if args.sync_media:
+        request_media_sync(args.sync_media)
+
 if __name__ == "__main__":
     main()
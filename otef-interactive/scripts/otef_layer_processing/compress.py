@@ -0,0 +1,78 @@
+"""
+Precompressed siblings (.gz, .br) for processed GeoJSON and manifest files.
+
+The API (pink_line_geojson, get_layer_geojson) and nginx (gzip_static) serve
+these bytes directly, so nothing re-encodes or recompresses the JSON per request.
+Brotli output needs the optional ``brotli`` package; without it only .gz is written.
+"""
+
+import gzip
+import logging
+import os
+from pathlib import Path
+from typing import List
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+PRECOMPRESSED_SUFFIXES = (".gz", ".br")
+
+
+def _write_atomic(path: Path, payload: bytes) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(payload)
+    os.replace(tmp, path)
+
+
+def _is_fresh(sibling: Path, source: Path) -> bool:
+    return sibling.is_file() and sibling.stat().st_mtime_ns >= source.stat().st_mtime_ns
+
+
+def write_precompressed(path: Path) -> List[Path]:
+    """
+    Write ``<path>.gz`` (and ``<path>.br`` when brotli is available) next to path.
+    Siblings newer than the source are left alone. Returns the siblings written.
+    """
+    path = Path(path)
+    if not path.is_file():
+        return []
+
+    targets = [(path.with_name(path.name + ".gz"), "gzip")]
+    if brotli is not None:
+        targets.append((path.with_name(path.name + ".br"), "br"))
+    else:
+        # A stale .br from a machine that had brotli would shadow the new data
+        stale_br = path.with_name(path.name + ".br")
+        if stale_br.exists() and not _is_fresh(stale_br, path):
+            stale_br.unlink()
+
+    pending = [(sibling, encoding) for sibling, encoding in targets if not _is_fresh(sibling, path)]
+    if not pending:
+        return []
+
+    body = path.read_bytes()
+    written = []
+    for sibling, encoding in pending:
+        if encoding == "gzip":
+            # mtime=0 keeps the output byte-identical for identical input
+            payload = gzip.compress(body, compresslevel=9, mtime=0)
+        else:
+            payload = brotli.compress(body, quality=11)
+        _write_atomic(sibling, payload)
+        written.append(sibling)
+    logger.debug("Precompressed %s -> %s", path.name, ", ".join(p.suffix for p in written))
+    return written
+
+
+def remove_precompressed(path: Path) -> None:
+    """Remove the .gz/.br siblings of path, if any."""
+    path = Path(path)
+    for suffix in PRECOMPRESSED_SUFFIXES:
+        sibling = path.with_name(path.name + suffix)
+        if sibling.exists():
+            sibling.unlink()
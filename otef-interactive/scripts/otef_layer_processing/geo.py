@@ -1,7 +1,11 @@
 import logging
+from functools import lru_cache
 from pathlib import Path
+from typing import Iterator, Optional
 import pyogrio
 import geopandas as gpd
+import numpy as np
+import shapely
 from pyproj import Transformer
 import json
 import os
@@ -11,10 +15,108 @@
 
 logger = logging.getLogger(__name__)
 
+# Layers larger than this are reprojected in feature batches instead of as one
+# GeoDataFrame, keeping worker memory bounded (override with OTEF_CHUNKED_REPROJECT_MB)
+CHUNKED_THRESHOLD_BYTES = int(os.environ.get("OTEF_CHUNKED_REPROJECT_MB", "64")) * 1024 * 1024
+CHUNK_FEATURES = 20000
 
-def transform_to_wgs84(input_path: Path, output_path: Path) -> bool:
+# pyogrio's GeoJSON writer labels WGS84 output this way as well
+CRS84 = {"type": "name", "properties": {"name": "urn:ogc:def:crs:OGC:1.3:CRS84"}}
+
+
+def _is_wgs84(crs) -> bool:
+    return bool(crs) and ("4326" in str(crs) or "WGS 84" in str(crs))
+
+
+@lru_cache(maxsize=16)
+def _wgs84_transformer(source_crs: str) -> Transformer:
+    """One Transformer per source CRS and worker process (construction is the slow part)."""
+    return Transformer.from_crs(source_crs, "EPSG:4326", always_xy=True)
+
+
+def _reproject_geometries(geometries: np.ndarray, transformer: Transformer) -> np.ndarray:
+    """Reproject an array of shapely geometries with a single vectorized pyproj call (2D output)."""
+
+    def _apply(coords: np.ndarray) -> np.ndarray:
+        x, y = transformer.transform(coords[:, 0], coords[:, 1])
+        return np.column_stack([x, y])
+
+    return shapely.transform(geometries, _apply)
+
+
+def _iter_feature_batches(input_path: Path, batch_size: int) -> Iterator[gpd.GeoDataFrame]:
+    """
+    Yield the layer as GeoDataFrames of at most batch_size features. Streams
+    through one Arrow reader when pyarrow is installed; otherwise pages with
+    skip_features/max_features.
+    """
+    try:
+        import pyarrow
+    except ImportError:
+        pyarrow = None
+
+    if pyarrow is not None:
+        with pyogrio.open_arrow(input_path, batch_size=batch_size, use_pyarrow=True) as (meta, reader):
+            geometry_name = meta.get("geometry_name") or "wkb_geometry"
+            for batch in reader:
+                frame = pyarrow.Table.from_batches([batch]).to_pandas()
+                geometries = shapely.from_wkb(frame.pop(geometry_name).to_numpy())
+                yield gpd.GeoDataFrame(frame, geometry=geometries)
+        return
+
+    offset = 0
+    while True:
+        frame = pyogrio.read_dataframe(input_path, skip_features=offset, max_features=batch_size)
+        if len(frame):
+            yield frame
+        if len(frame) < batch_size:
+            return
+        offset += len(frame)
+
+
+def _json_default(value):
+    # numpy scalars, timestamps and the like from feature properties
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def _transform_chunked(input_path: Path, tmp_path: Path, source_crs: Optional[str]) -> int:
+    """
+    Stream input_path to tmp_path as a WGS84 FeatureCollection, one batch at a
+    time. Returns the number of features written.
+    """
+    transformer = None if _is_wgs84(source_crs) else _wgs84_transformer(str(source_crs))
+    count = 0
+    with open(tmp_path, "w", encoding="utf-8") as out:
+        out.write(
+            '{"type": "FeatureCollection", "name": '
+            + json.dumps(input_path.stem, ensure_ascii=False)
+            + ', "crs": '
+            + json.dumps(CRS84)
+            + ', "features": [\n'
+        )
+        for batch in _iter_feature_batches(input_path, CHUNK_FEATURES):
+            if transformer is not None:
+                reprojected = _reproject_geometries(np.asarray(batch.geometry.array), transformer)
+                batch = batch.set_geometry(gpd.GeoSeries(reprojected, index=batch.index))
+            for feature in batch.iterfeatures(na="null", drop_id=True):
+                if count:
+                    out.write(",\n")
+                out.write(json.dumps(feature, ensure_ascii=False, default=_json_default))
+                count += 1
+        out.write("\n]}\n")
+    return count
+
+
+def transform_to_wgs84(input_path: Path, output_path: Path, chunked: Optional[bool] = None) -> bool:
     """
     Transform a GeoJSON file to WGS84 (EPSG:4326) using pyogrio for high performance.
+
+    Files above CHUNKED_THRESHOLD_BYTES (or with chunked=True) are read in
+    batches of CHUNK_FEATURES features, reprojected with a cached Transformer
+    and appended to the output as they go, so peak memory tracks the batch
+    size rather than the layer size.
     """
     tmp_path = output_path.with_name(output_path.name + ".tmp")
     try:
@@ -26,15 +128,25 @@ def transform_to_wgs84(input_path: Path, output_path: Path) -> bool:
         if not source_crs:
             source_crs = infer_crs(input_path)
 
+        if chunked is None:
+            chunked = input_path.stat().st_size > CHUNKED_THRESHOLD_BYTES
+
+        # Temp in same directory + replace so readers never see a partial GeoJSON
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+
+        if chunked:
+            count = _transform_chunked(input_path, tmp_path, source_crs)
+            logger.debug(
+                f"Reprojected {input_path.name} from {source_crs} in batches ({count} features)"
+            )
+            os.replace(tmp_path, output_path)
+            return True
+
         # High performance read/reproject/write
         df = pyogrio.read_dataframe(input_path)
 
         # Only reproject if necessary
-        is_already_wgs84 = source_crs and (
-            "4326" in str(source_crs) or "WGS 84" in str(source_crs)
-        )
-
-        if not is_already_wgs84:
+        if not _is_wgs84(source_crs):
             if df.crs is None:
                 df.set_crs(source_crs, inplace=True, allow_override=True)
 
@@ -43,8 +155,6 @@ def transform_to_wgs84(input_path: Path, output_path: Path) -> bool:
             )
             df = df.to_crs("EPSG:4326")
 
-        # Temp in same directory + replace so readers never see a partial GeoJSON
-        output_path.parent.mkdir(parents=True, exist_ok=True)
         pyogrio.write_dataframe(df, tmp_path, driver="GeoJSON")
         os.replace(tmp_path, output_path)
         return True
@@ -0,0 +1,40 @@
+"""
+Trigger the API's incremental media sync after processing.
+
+Processed output lands in ``otef-interactive/public/processed`` on the host,
+which the API container mounts at ``/app/public``. The copy served by nginx
+lives in the ``media_files`` volume, so the sync itself runs inside the API
+container (``manage.py sync_media``, see nur-io/django_api/backend/media_sync.py).
+It transfers only changed files, removes files no longer produced, and swaps
+files in atomically while nginx keeps serving.
+"""
+
+import logging
+import shutil
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+API_CONTAINER = "nur-api"
+
+
+def request_media_sync(container: str = API_CONTAINER) -> bool:
+    """Run ``manage.py sync_media`` in the running API container. Returns True on success."""
+    if not shutil.which("docker"):
+        logger.warning("docker not found; skipping media sync (the API syncs on its next start)")
+        return False
+    result = subprocess.run(
+        ["docker", "exec", container, "python", "manage.py", "sync_media"],
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+    )
+    if result.returncode != 0:
+        logger.warning(
+            f"Media sync in container '{container}' failed (exit {result.returncode}); "
+            f"the API syncs on its next start. {result.stderr.strip()}"
+        )
+        return False
+    logger.info(result.stdout.strip().splitlines()[-1] if result.stdout.strip() else "Media sync complete")
+    return True
@@ -0,0 +1,804 @@
+"""
+In-process vector tiling: WGS84 GeoJSON -> MVT tiles -> PMTiles, without Docker.
+
+Mirrors the tippecanoe invocation in tiling.py closely enough for the GIS map:
+zooms 9-18, one source layer (DEFAULT_TIPPECANOE_LAYER_NAME), tiles clipped
+with a buffer, line/polygon simplification in tile units (off for
+high-fidelity layers) and, below the maximum zoom, features thinned in the
+densest parts of a tile until it fits the tile size/feature limits (the
+``--drop-densest-as-needed`` behaviour). Like ``--no-tile-size-limit``, the
+maximum zoom keeps every feature.
+
+Tiles are cut top-down: each tile is clipped from its parent's (already
+clipped) geometry, so a large polygon is never re-clipped in full for every
+deep tile. Encoded tiles are spooled to a temporary file and written to the
+archive in tile-id order through the ``pmtiles`` package writer.
+
+The GeoJSON is streamed feature by feature, but the projected geometry of the
+whole layer (numpy arrays, 16 bytes per vertex) stays in memory while tiling.
+
+Shared polygon borders (``--detect-shared-borders``) are kept in step by
+pinning the vertices where a shared border starts or ends, plus the points
+where rings cross the tile buffer, and simplifying each stretch between pins
+independently of its direction, so neighbours get identical edges. Not
+reproduced: tippecanoe's point drop rate at low zooms.
+"""
+
+import gzip
+import json
+import logging
+import math
+import struct
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MIN_ZOOM = 9
+MAX_ZOOM = 18
+EXTENT = 4096
+# tippecanoe's default buffer: 5 units of a 256px tile
+BUFFER = 5 * EXTENT // 256
+# tippecanoe's default limits, applied below MAX_ZOOM by dropping the densest features
+MAX_TILE_BYTES = 500 * 1024
+MAX_TILE_FEATURES = 200000
+
+_MAX_LAT = 85.0511287798
+
+POINT, LINESTRING, POLYGON = 1, 2, 3
+_MOVE_TO, _LINE_TO, _CLOSE_PATH = 1, 2, 7
+
+# (mvt_type, parts, tags, feature id, bbox) in normalized Web Mercator.
+# parts: points (n, 2) array | [line arrays] | [[ring arrays]] (rings open);
+# tags: ((key, encoded value), ...), encoded once instead of once per tile
+Feature = Tuple[int, object, dict, Optional[int], Tuple[float, float, float, float]]
+
+
+# ---------------------------------------------------------------------------
+# Projection
+# ---------------------------------------------------------------------------
+
+def _project(coords) -> np.ndarray:
+    """lon/lat sequence -> (n, 2) normalized Web Mercator ([0, 1], y down)."""
+    arr = np.array([c[:2] for c in coords], dtype=np.float64).reshape(-1, 2)
+    lat = np.clip(arr[:, 1], -_MAX_LAT, _MAX_LAT)
+    s = np.sin(np.radians(lat))
+    x = arr[:, 0] / 360.0 + 0.5
+    y = 0.5 - np.log((1 + s) / (1 - s)) / (4 * math.pi)
+    return np.column_stack([x, y])
+
+
+def _project_ring(ring) -> Optional[np.ndarray]:
+    points = _project(ring)
+    if len(points) > 1 and np.array_equal(points[0], points[-1]):
+        points = points[:-1]
+    return points if len(points) >= 3 else None
+
+
+def _project_polygon(rings) -> Optional[List[np.ndarray]]:
+    projected = []
+    for i, ring in enumerate(rings):
+        points = _project_ring(ring)
+        if points is None:
+            if i == 0:
+                return None
+            continue
+        projected.append(points)
+    return projected or None
+
+
+def _geometry_parts(geometry) -> List[Tuple[int, object]]:
+    """Flatten a GeoJSON geometry into [(mvt_type, parts)] (see Feature)."""
+    if not isinstance(geometry, dict):
+        return []
+    gtype = geometry.get("type")
+    coords = geometry.get("coordinates")
+    try:
+        if gtype == "GeometryCollection":
+            out = []
+            for child in geometry.get("geometries") or []:
+                out.extend(_geometry_parts(child))
+            return out
+        if not coords:
+            return []
+        if gtype == "Point":
+            return [(POINT, _project([coords]))]
+        if gtype == "MultiPoint":
+            return [(POINT, _project(coords))]
+        if gtype == "LineString":
+            lines = [coords]
+        elif gtype == "MultiLineString":
+            lines = coords
+        elif gtype in ("Polygon", "MultiPolygon"):
+            polygons = [coords] if gtype == "Polygon" else coords
+            parts = [p for p in (_project_polygon(poly) for poly in polygons if poly) if p]
+            return [(POLYGON, parts)] if parts else []
+        else:
+            return []
+        parts = [_project(line) for line in lines if len(line) >= 2]
+        return [(LINESTRING, parts)] if parts else []
+    except (TypeError, ValueError, IndexError):
+        return []
+
+
+def _points(mvt_type: int, parts) -> np.ndarray:
+    if mvt_type == POINT:
+        return parts
+    if mvt_type == LINESTRING:
+        return np.concatenate(parts)
+    return np.concatenate([ring for poly in parts for ring in poly])
+
+
+def _bbox(mvt_type: int, parts) -> Tuple[float, float, float, float]:
+    points = _points(mvt_type, parts)
+    (x0, y0), (x1, y1) = points.min(axis=0), points.max(axis=0)
+    return float(x0), float(y0), float(x1), float(y1)
+
+
+def _feature_id(feature: dict) -> Optional[int]:
+    fid = feature.get("id")
+    if isinstance(fid, int) and not isinstance(fid, bool) and 0 <= fid < 2 ** 64:
+        return fid
+    return None
+
+
+def _iter_geojson_features(geojson_path: Path, chunk_size: int = 1 << 20) -> Iterator[object]:
+    """
+    Yield the members of a FeatureCollection's "features" array one at a time,
+    reading the file in chunks instead of parsing it as one document.
+    """
+    decoder = json.JSONDecoder()
+    with open(geojson_path, encoding="utf-8") as f:
+        buf = ""
+        pos = 0
+        eof = False
+
+        def fill(min_size: int = chunk_size) -> bool:
+            nonlocal buf, pos, eof
+            if eof:
+                return False
+            chunk = f.read(max(chunk_size, min_size))
+            if not chunk:
+                eof = True
+                return False
+            buf = buf[pos:] + chunk
+            pos = 0
+            return True
+
+        def peek() -> str:
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in " \t\r\n":
+                    pos += 1
+                if pos < len(buf) or not fill():
+                    return buf[pos:pos + 1]
+
+        def decode():
+            nonlocal pos
+            while True:
+                peek()
+                try:
+                    value, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    # Incomplete value: read at least as much again as is buffered
+                    if not fill(len(buf) - pos):
+                        raise
+                    continue
+                # A number may continue past the end of the buffer
+                if end == len(buf) and fill():
+                    continue
+                pos = end
+                return value
+
+        def expect(char: str) -> None:
+            nonlocal pos
+            if peek() != char:
+                raise ValueError(f"{geojson_path.name}: not a FeatureCollection (expected {char!r})")
+            pos += 1
+
+        expect("{")
+        while peek() != "}":
+            key = decode()
+            expect(":")
+            if key != "features" or peek() != "[":
+                decode()
+            else:
+                pos += 1
+                while peek() != "]":
+                    yield decode()
+                    if peek() == ",":
+                        pos += 1
+                pos += 1
+            if peek() == ",":
+                pos += 1
+
+
+def load_features(geojson_path: Path) -> Tuple[List[Feature], Dict[str, str]]:
+    """
+    Stream and project a WGS84 FeatureCollection; features without usable
+    geometry are skipped. Returns (features, {property: MVT field type}).
+    """
+    features = []
+    field_types: Dict[str, str] = {}
+    for feature in _iter_geojson_features(geojson_path):
+        if not isinstance(feature, dict):
+            continue
+        geometry_parts = _geometry_parts(feature.get("geometry"))
+        if not geometry_parts:
+            continue
+        tags = []
+        for key, value in (feature.get("properties") or {}).items():
+            if value is None:
+                continue
+            tags.append((str(key), _encode_value(value)))
+            field_types.setdefault(str(key), _field_type(value))
+        tags = tuple(tags)
+        fid = _feature_id(feature)
+        for mvt_type, parts in geometry_parts:
+            features.append((mvt_type, parts, tags, fid, _bbox(mvt_type, parts)))
+    return features, field_types
+
+
+def _complex(points: np.ndarray) -> np.ndarray:
+    """(n, 2) points -> complex array; numpy sorts and searches complex numbers lexicographically."""
+    return points[:, 0] + 1j * points[:, 1]
+
+
+def shared_border_pins(features: List[Feature]) -> Optional[np.ndarray]:
+    """
+    Sorted (complex) vertices that polygon simplification must keep so shared
+    borders simplify identically on both sides: vertices on 3+ rings, the ends
+    of each run of shared vertices, and one deterministic vertex (the smallest)
+    of rings that are shared all the way round. None if no vertex is shared.
+    """
+    rings = [_complex(ring) for mvt_type, parts, *_ in features if mvt_type == POLYGON
+             for poly in parts for ring in poly]
+    if not rings:
+        return None
+    _, inverse, counts = np.unique(np.concatenate(rings), return_inverse=True, return_counts=True)
+    occurrences = counts[inverse.ravel()]
+    if occurrences.max() < 2:
+        return None
+
+    pins = []
+    start = 0
+    for ring in rings:
+        count = occurrences[start:start + len(ring)]
+        start += len(ring)
+        shared = count >= 2
+        if not shared.any():
+            continue
+        ends = shared & ((count >= 3) | ~np.roll(shared, 1) | ~np.roll(shared, -1))
+        pins.append(ring[ends] if ends.any() else ring[np.argmin(ring)][None])
+    return np.unique(np.concatenate(pins)) if pins else None
+
+
+def _pinned(ring: np.ndarray, pins: Optional[np.ndarray], bounds) -> np.ndarray:
+    """Mask of ring vertices that are shared-border pins or lie on the tile's clip bounds."""
+    x0, y0, x1, y1 = bounds
+    mask = (ring[:, 0] == x0) | (ring[:, 0] == x1) | (ring[:, 1] == y0) | (ring[:, 1] == y1)
+    if pins is not None:
+        values = _complex(ring)
+        index = np.minimum(np.searchsorted(pins, values), len(pins) - 1)
+        mask |= pins[index] == values
+    return mask
+
+
+# ---------------------------------------------------------------------------
+# Clipping (normalized Web Mercator, vectorized per ring/line)
+# ---------------------------------------------------------------------------
+
+def _clip_ring_edge(ring: np.ndarray, axis: int, bound: float, keep_above: bool) -> np.ndarray:
+    """One Sutherland-Hodgman pass: the part of a closed ring on one side of an axis-aligned edge."""
+    nxt = np.roll(ring, -1, axis=0)
+    inside = ring[:, axis] >= bound if keep_above else ring[:, axis] <= bound
+    if inside.all():
+        return ring
+    nxt_inside = np.roll(inside, -1)
+    crossing = inside != nxt_inside
+    a, b = ring[crossing], nxt[crossing]
+    t = (bound - a[:, axis]) / (b[:, axis] - a[:, axis])
+    crossings = a + t[:, None] * (b - a)
+    crossings[:, axis] = bound
+
+    # Each vertex i emits itself (if inside), then its crossing toward i + 1
+    index = np.arange(len(ring))
+    order = np.argsort(np.concatenate([2 * index[inside], 2 * index[crossing] + 1]), kind="stable")
+    return np.concatenate([ring[inside], crossings])[order]
+
+
+def _clip_ring(ring: np.ndarray, bounds) -> Optional[np.ndarray]:
+    x0, y0, x1, y1 = bounds
+    for axis, bound, keep_above in ((0, x0, True), (0, x1, False), (1, y0, True), (1, y1, False)):
+        ring = _clip_ring_edge(ring, axis, bound, keep_above)
+        if len(ring) < 3:
+            return None
+    return ring
+
+
+def _clip_line(line: np.ndarray, bounds) -> List[np.ndarray]:
+    """Liang-Barsky over every segment at once; consecutive surviving segments are rejoined."""
+    x0, y0, x1, y1 = bounds
+    a, b = line[:-1], line[1:]
+    d = b - a
+    t0 = np.zeros(len(a))
+    t1 = np.ones(len(a))
+    keep = np.ones(len(a), dtype=bool)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for p, q in ((-d[:, 0], a[:, 0] - x0), (d[:, 0], x1 - a[:, 0]),
+                     (-d[:, 1], a[:, 1] - y0), (d[:, 1], y1 - a[:, 1])):
+            parallel = p == 0
+            keep &= ~(parallel & (q < 0))
+            t = q / p
+            entering = (p < 0) & ~parallel
+            leaving = (p > 0) & ~parallel
+            t0 = np.where(entering, np.maximum(t0, t), t0)
+            t1 = np.where(leaving, np.minimum(t1, t), t1)
+    keep &= t0 <= t1
+    if not keep.any():
+        return []
+
+    starts = a + t0[:, None] * d
+    ends = a + t1[:, None] * d
+    idx = np.flatnonzero(keep)
+    # A new part starts where the previous kept segment isn't adjacent or left/entered the box
+    breaks = np.ones(len(idx), dtype=bool)
+    breaks[1:] = (idx[1:] != idx[:-1] + 1) | (t1[idx[:-1]] < 1) | (t0[idx[1:]] > 0)
+    parts = []
+    for run in np.split(idx, np.flatnonzero(breaks)[1:]):
+        parts.append(np.concatenate([starts[run[:1]], ends[run]]))
+    return parts
+
+
+def _clip_feature(feature: Feature, bounds) -> Optional[Feature]:
+    mvt_type, parts, tags, fid, bbox = feature
+    x0, y0, x1, y1 = bounds
+    if bbox[2] < x0 or bbox[0] > x1 or bbox[3] < y0 or bbox[1] > y1:
+        return None
+    if bbox[0] >= x0 and bbox[2] <= x1 and bbox[1] >= y0 and bbox[3] <= y1:
+        return feature
+
+    if mvt_type == POINT:
+        mask = (parts[:, 0] >= x0) & (parts[:, 0] <= x1) & (parts[:, 1] >= y0) & (parts[:, 1] <= y1)
+        clipped = parts[mask]
+        if not len(clipped):
+            return None
+    elif mvt_type == LINESTRING:
+        clipped = [piece for line in parts for piece in _clip_line(line, bounds)]
+        if not clipped:
+            return None
+    else:
+        clipped = []
+        for poly in parts:
+            exterior = _clip_ring(poly[0], bounds)
+            if exterior is None:
+                continue
+            holes = [h for h in (_clip_ring(ring, bounds) for ring in poly[1:]) if h is not None]
+            clipped.append([exterior] + holes)
+        if not clipped:
+            return None
+    return mvt_type, clipped, tags, fid, _bbox(mvt_type, clipped)
+
+
+def _tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    scale = 2 ** z
+    pad = BUFFER / EXTENT
+    return (x - pad) / scale, (y - pad) / scale, (x + 1 + pad) / scale, (y + 1 + pad) / scale
+
+
+# ---------------------------------------------------------------------------
+# Tile geometry (tile units)
+# ---------------------------------------------------------------------------
+
+def _simplify(points: np.ndarray, tolerance: float, pinned: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Douglas-Peucker keeping both endpoints and any pinned vertices. Each
+    stretch is simplified in a canonical direction, so a path and its reverse
+    keep the same vertices.
+    """
+    n = len(points)
+    if tolerance <= 0 or n <= 2:
+        return points
+    keep = np.zeros(n, dtype=bool) if pinned is None else pinned.copy()
+    keep[0] = keep[-1] = True
+    kept = np.flatnonzero(keep)
+    stack = list(zip(kept[:-1].tolist(), kept[1:].tolist()))
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        a, b = points[start], points[end]
+        segment = points[start + 1:end]
+        reverse = tuple(b) < tuple(a) or (
+            tuple(a) == tuple(b) and tuple(points[end - 1]) < tuple(points[start + 1])
+        )
+        if reverse:
+            a, b = b, a
+            segment = segment[::-1]
+        d = b - a
+        length = math.hypot(d[0], d[1])
+        if length == 0:
+            dist = np.hypot(segment[:, 0] - a[0], segment[:, 1] - a[1])
+        else:
+            dist = np.abs(d[0] * (segment[:, 1] - a[1]) - d[1] * (segment[:, 0] - a[0])) / length
+        i = int(np.argmax(dist))
+        if dist[i] > tolerance:
+            mid = end - 1 - i if reverse else start + 1 + i
+            keep[mid] = True
+            stack.append((start, mid))
+            stack.append((mid, end))
+    return points[keep]
+
+
+def _quantize(points: np.ndarray) -> np.ndarray:
+    q = np.rint(points).astype(np.int64)
+    if len(q) > 1:
+        q = q[np.concatenate([[True], np.any(q[1:] != q[:-1], axis=1)])]
+    return q
+
+
+def _tile_geometry(mvt_type: int, parts, z: int, x: int, y: int, tolerance: float,
+                   pins: Optional[np.ndarray] = None):
+    """
+    Clipped normalized geometry -> simplified integer tile coordinates (None if
+    it collapses). pins: shared-border vertices (see shared_border_pins).
+    """
+    scale = 2 ** z
+    origin = np.array([x, y], dtype=np.float64)
+
+    def to_tile(points):
+        return (points * scale - origin) * EXTENT
+
+    if mvt_type == POINT:
+        return _quantize(to_tile(parts)) if len(parts) else None
+
+    if mvt_type == LINESTRING:
+        lines = []
+        for line in parts:
+            line = _quantize(_simplify(to_tile(line), tolerance))
+            if len(line) >= 2:
+                lines.append(line)
+        return lines or None
+
+    polygons = []
+    for poly in parts:
+        rings = []
+        for i, ring in enumerate(poly):
+            pinned = None
+            if tolerance > 0:
+                pinned = _pinned(ring, pins, _tile_bounds(z, x, y))
+                if pinned.any():
+                    # Start at a pin, so both sides of a shared border cut it at the same vertices
+                    first = int(np.argmax(pinned))
+                    ring = np.roll(ring, -first, axis=0)
+                    pinned = np.append(np.roll(pinned, -first), True)
+                else:
+                    pinned = None
+            ring = to_tile(ring)
+            # Simplify as a closed path so the start vertex can't drift
+            ring = _quantize(_simplify(np.concatenate([ring, ring[:1]]), tolerance, pinned))
+            if len(ring) > 1 and np.array_equal(ring[0], ring[-1]):
+                ring = ring[:-1]
+            area = _ring_area(ring) if len(ring) >= 3 else 0
+            if area == 0:
+                if i == 0:
+                    break  # exterior gone: drop the holes too
+                continue
+            # MVT: exterior rings have positive area, holes negative
+            if (i == 0) != (area > 0):
+                ring = ring[::-1]
+            rings.append(ring)
+        if rings:
+            polygons.append(rings)
+    return polygons or None
+
+
+def _ring_area(ring: np.ndarray) -> int:
+    x, y = ring[:, 0], ring[:, 1]
+    return int(np.sum(x * np.roll(y, -1) - np.roll(x, -1) * y))
+
+
+def _anchor(mvt_type: int, geometry) -> Tuple[int, int]:
+    if mvt_type == POINT:
+        point = geometry[0]
+    elif mvt_type == LINESTRING:
+        point = geometry[0][0]
+    else:
+        point = geometry[0][0][0]
+    return int(point[0]), int(point[1])
+
+
+# ---------------------------------------------------------------------------
+# Encoding (protobuf, vector_tile.proto v2)
+# ---------------------------------------------------------------------------
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _zigzag(value: int) -> int:
+    return value << 1 if value >= 0 else ((-value) << 1) - 1
+
+
+def _key(field: int, wire_type: int) -> bytes:
+    return _varint((field << 3) | wire_type)
+
+
+def _bytes_field(field: int, payload: bytes) -> bytes:
+    return _key(field, 2) + _varint(len(payload)) + payload
+
+
+_SMALL_VARINTS = [_varint(v) for v in range(1 << 14)]
+
+
+def _packed_field(field: int, values) -> bytes:
+    small = len(_SMALL_VARINTS)
+    return _bytes_field(field, b"".join(_SMALL_VARINTS[v] if v < small else _varint(v) for v in values))
+
+
+def _command(command: int, count: int) -> int:
+    return (command & 0x7) | (count << 3)
+
+
+def _encode_geometry(mvt_type: int, geometry) -> List[int]:
+    commands = []
+    cursor = np.zeros(2, dtype=np.int64)
+
+    def deltas(points):
+        nonlocal cursor
+        if not len(points):
+            return
+        steps = np.diff(np.vstack([cursor, points]), axis=0).ravel()
+        commands.extend(np.where(steps >= 0, steps << 1, ((-steps) << 1) - 1).tolist())
+        cursor = points[-1]
+
+    if mvt_type == POINT:
+        commands.append(_command(_MOVE_TO, len(geometry)))
+        deltas(geometry)
+    elif mvt_type == LINESTRING:
+        for line in geometry:
+            commands.append(_command(_MOVE_TO, 1))
+            deltas(line[:1])
+            commands.append(_command(_LINE_TO, len(line) - 1))
+            deltas(line[1:])
+    else:
+        for rings in geometry:
+            for ring in rings:
+                commands.append(_command(_MOVE_TO, 1))
+                deltas(ring[:1])
+                commands.append(_command(_LINE_TO, len(ring) - 1))
+                deltas(ring[1:])
+                commands.append(_command(_CLOSE_PATH, 1))
+    return commands
+
+
+def _encode_value(value) -> bytes:
+    if isinstance(value, bool):
+        return _key(7, 0) + _varint(int(value))
+    if isinstance(value, int) and -(2 ** 63) <= value < 2 ** 64:
+        if value >= 0:
+            return _key(5, 0) + _varint(value)
+        return _key(6, 0) + _varint(_zigzag(value))
+    if isinstance(value, float) and math.isfinite(value):
+        return _key(3, 1) + struct.pack("<d", value)
+    if not isinstance(value, str):
+        value = json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+    return _bytes_field(1, value.encode("utf-8"))
+
+
+def _field_type(value) -> str:
+    if isinstance(value, bool):
+        return "Boolean"
+    if isinstance(value, (int, float)):
+        return "Number"
+    return "String"
+
+
+def _encode_layer(name: str, features) -> bytes:
+    """features: [(mvt_type, tile geometry, tags, fid)] -> one MVT layer message."""
+    keys: Dict[str, int] = {}
+    values: Dict[bytes, int] = {}
+    body = bytearray(_key(15, 0) + _varint(2))
+    body += _bytes_field(1, name.encode("utf-8"))
+    for mvt_type, geometry, tags, fid in features:
+        indexes = []
+        for key, value in tags:
+            indexes.append(keys.setdefault(key, len(keys)))
+            indexes.append(values.setdefault(value, len(values)))
+        feature = b""
+        if fid is not None:
+            feature += _key(1, 0) + _varint(fid)
+        if indexes:
+            feature += _packed_field(2, indexes)
+        feature += _key(3, 0) + _varint(mvt_type)
+        feature += _packed_field(4, _encode_geometry(mvt_type, geometry))
+        body += _bytes_field(2, feature)
+    for key in keys:
+        body += _bytes_field(3, key.encode("utf-8"))
+    for value in values:
+        body += _bytes_field(4, value)
+    body += _key(5, 0) + _varint(EXTENT)
+    return _bytes_field(3, bytes(body))
+
+
+def _drop_densest(features, spacing: int):
+    """Keep the first feature per spacing x spacing cell (by anchor), thinning crowded areas first."""
+    seen = set()
+    kept = []
+    for feature in features:
+        ax, ay = _anchor(feature[0], feature[1])
+        cell = (ax // spacing, ay // spacing)
+        if cell not in seen:
+            seen.add(cell)
+            kept.append(feature)
+    return kept
+
+
+def encode_tile(features: List[Feature], layer_name: str, z: int, x: int, y: int,
+                tolerance: float, max_zoom: int = MAX_ZOOM,
+                pins: Optional[np.ndarray] = None) -> Tuple[bytes, int]:
+    """Encode the (already clipped) features of tile z/x/y. Returns (tile bytes or b"", dropped count)."""
+    tile_features = []
+    for mvt_type, parts, tags, fid, _ in features:
+        geometry = _tile_geometry(mvt_type, parts, z, x, y, tolerance, pins)
+        if geometry is not None:
+            tile_features.append((mvt_type, geometry, tags, fid))
+    if not tile_features:
+        return b"", 0
+
+    total = len(tile_features)
+    spacing = 1
+    while True:
+        if z >= max_zoom or len(tile_features) <= MAX_TILE_FEATURES:
+            body = _encode_layer(layer_name, tile_features)
+            if z >= max_zoom or len(body) <= MAX_TILE_BYTES or spacing >= EXTENT:
+                return body, total - len(tile_features)
+        spacing *= 2
+        tile_features = _drop_densest(tile_features, spacing)
+
+
+# ---------------------------------------------------------------------------
+# Tiling and PMTiles output
+# ---------------------------------------------------------------------------
+
+class _TileSpool:
+    """Gzipped tiles parked in a temp file until they can be written in tile-id order."""
+
+    def __init__(self):
+        self.file = tempfile.TemporaryFile()
+        self.entries = []  # (tile_id, offset, length)
+        self.offset = 0
+
+    def add(self, tile_id: int, data: bytes) -> None:
+        payload = gzip.compress(data, compresslevel=6, mtime=0)
+        self.file.write(payload)
+        self.entries.append((tile_id, self.offset, len(payload)))
+        self.offset += len(payload)
+
+    def sorted_tiles(self):
+        self.file.flush()
+        for tile_id, offset, length in sorted(self.entries):
+            self.file.seek(offset)
+            yield tile_id, self.file.read(length)
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def generate_pmtiles_native(
+    input_geojson: Path,
+    output_pmtiles: Path,
+    high_fidelity: bool = False,
+    layer_name: str = "layer",
+    min_zoom: int = MIN_ZOOM,
+    max_zoom: int = MAX_ZOOM,
+    simplification: float = 2.0,
+) -> bool:
+    """
+    Tile a WGS84 GeoJSON file into a PMTiles archive in-process. high_fidelity
+    disables line/polygon simplification (tippecanoe --no-line-simplification);
+    otherwise geometry is simplified to ``simplification`` tile units.
+    """
+    from pmtiles.tile import Compression, TileType, zxy_to_tileid
+    from pmtiles.writer import Writer
+
+    features, field_types = load_features(input_geojson)
+    if not features:
+        logger.error(f"Native tiling: no tileable features in {input_geojson.name}")
+        return False
+    tolerance = 0.0 if high_fidelity else simplification
+    pins = shared_border_pins(features) if tolerance > 0 else None
+
+    spool = _TileSpool()
+    dropped = 0
+
+    def tile(z, x, y, parent_features):
+        nonlocal dropped
+        bounds = _tile_bounds(z, x, y)
+        clipped = [c for c in (_clip_feature(f, bounds) for f in parent_features) if c is not None]
+        if not clipped:
+            return
+        data, tile_dropped = encode_tile(clipped, layer_name, z, x, y, tolerance, max_zoom, pins)
+        dropped += tile_dropped
+        if data:
+            spool.add(zxy_to_tileid(z, x, y), data)
+        if z < max_zoom:
+            for dx in (0, 1):
+                for dy in (0, 1):
+                    tile(z + 1, 2 * x + dx, 2 * y + dy, clipped)
+
+    minx = min(f[4][0] for f in features)
+    miny = min(f[4][1] for f in features)
+    maxx = max(f[4][2] for f in features)
+    maxy = max(f[4][3] for f in features)
+    scale = 2 ** min_zoom
+    last = scale - 1
+    try:
+        for x in range(max(0, int(minx * scale)), min(last, int(maxx * scale)) + 1):
+            for y in range(max(0, int(miny * scale)), min(last, int(maxy * scale)) + 1):
+                tile(min_zoom, x, y, features)
+
+        if not spool.entries:
+            logger.error(f"Native tiling produced no tiles for {input_geojson.name}")
+            return False
+
+        tmp = output_pmtiles.with_name(output_pmtiles.name + ".tmp")
+        with open(tmp, "wb") as f:
+            writer = Writer(f)
+            for tile_id, data in spool.sorted_tiles():
+                writer.write_tile(tile_id, data)
+            min_lon, max_lat = _unproject(minx, miny)
+            max_lon, min_lat = _unproject(maxx, maxy)
+            writer.finalize(
+                {
+                    "tile_type": TileType.MVT,
+                    "tile_compression": Compression.GZIP,
+                    "min_zoom": min_zoom,
+                    "max_zoom": max_zoom,
+                    "min_lon_e7": int(min_lon * 10_000_000),
+                    "min_lat_e7": int(min_lat * 10_000_000),
+                    "max_lon_e7": int(max_lon * 10_000_000),
+                    "max_lat_e7": int(max_lat * 10_000_000),
+                    "center_zoom": min_zoom,
+                    "center_lon_e7": int((min_lon + max_lon) / 2 * 10_000_000),
+                    "center_lat_e7": int((min_lat + max_lat) / 2 * 10_000_000),
+                },
+                {
+                    "name": input_geojson.stem,
+                    "format": "pbf",
+                    "generator": "otef_layer_processing.native_tiling",
+                    "vector_layers": [
+                        {
+                            "id": layer_name,
+                            "fields": field_types,
+                            "minzoom": min_zoom,
+                            "maxzoom": max_zoom,
+                        }
+                    ],
+                },
+            )
+        tmp.replace(output_pmtiles)
+    finally:
+        spool.close()
+
+    if dropped:
+        logger.info(f"Native tiling dropped {dropped} feature(s) from dense low-zoom tiles of {input_geojson.name}")
+    return True
+
+
+def _unproject(x: float, y: float) -> Tuple[float, float]:
+    """Normalized Web Mercator -> (lon, lat)."""
+    lon = (x - 0.5) * 360.0
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y))))
+    return lon, lat
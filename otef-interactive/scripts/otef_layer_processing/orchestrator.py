@@ -1,16 +1,29 @@
 import os
+import copy
 import hashlib
 import json
 import logging
 import shutil
+from collections import Counter
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from tqdm import tqdm
 
+try:
+    import blake3
+except ImportError:  # optional: faster content hashing
+    blake3 = None
+try:
+    import xxhash
+except ImportError:  # optional: faster content hashing
+    xxhash = None
+
+from .artifact_store import DEFAULT_STORE_DIR, ArtifactStore, artifact_key
+from .compress import write_precompressed
 from .models import LayerEntry, PackManifest
 from .geo import transform_to_wgs84, get_geometry_type
-from .styles import find_lyrx_file, parse_lyrx_style
+from .styles import StyleIndex
 from .tiling import generate_pmtiles_smart
 
 logger = logging.getLogger(__name__)
@@ -42,6 +55,33 @@ def setup_logging(level=logging.INFO):
 
 
 CACHE_FILE = ".layer-cache.json"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Scheduling (process_all): layer tasks run largest estimated cost first, where cost
+# is source bytes, weighted for layers that get PMTiles. A transform is assumed to
+# need TRANSFORM_MEMORY_FACTOR x its source size in memory; concurrent transforms
+# stay within the memory budget (one always runs, however large).
+PMTILES_COST_FACTOR = 3
+# Layers above this size always get PMTiles (outside projector_base, unless label-only)
+PMTILES_MIN_BYTES = 15 * 1024 * 1024
+TRANSFORM_MEMORY_FACTOR = 8
+# Image copies and boundary assets are I/O-bound: threads, not worker processes
+IO_WORKERS = 4
+
+
+def _default_memory_budget_mb() -> Optional[int]:
+    """OTEF_MEMORY_BUDGET_MB, else half the physical memory (None: unknown, no budget)."""
+    configured = os.environ.get("OTEF_MEMORY_BUDGET_MB")
+    if configured:
+        return int(configured)
+    try:
+        total = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None  # e.g. Windows
+    return total // 2 // (1024 * 1024)
+
+
+DEFAULT_MEMORY_BUDGET_MB = _default_memory_budget_mb()
 
 # Stem of gis files matching this pattern are copied to processed for masking only (not added as layers).
 MASK_ASSET_STEM_SUFFIX = "_boundary"
@@ -83,14 +123,56 @@ def _style_config_is_advanced(style_config: Optional[Dict]) -> bool:
 
 
 def compute_file_hash(path: Path) -> str:
-    hash_sha256 = hashlib.sha256()
+    """
+    Content hash of a file: BLAKE3 or XXH3-128 when installed (prefixed with the
+    algorithm), otherwise SHA-256 (unprefixed, as in older caches).
+    """
+    if blake3 is not None:
+        prefix, digest = "b3-", blake3.blake3()
+    elif xxhash is not None:
+        prefix, digest = "xxh3-", xxhash.xxh3_128()
+    else:
+        prefix, digest = "", hashlib.sha256()
     with open(path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_sha256.update(chunk)
-    return hash_sha256.hexdigest()
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return prefix + digest.hexdigest()
+
+
+def _stat_key(path: Path) -> Optional[List[int]]:
+    """[size, mtime_ns, inode], or None if the file is missing (JSON-friendly for the cache)."""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+
+def _input_stat_signature(geo_file: Path, styles_dir: Path) -> Dict[str, Any]:
+    """
+    Cheap stand-in for _geo_style_cache_fingerprint's inputs: the GIS file's stat,
+    every .lyrx in styles_dir (which one matches can change when files are added
+    or renamed) and, for שמות_יישובים, the label overrides file. When it equals
+    the cached signature the cached hashes are reused without reading any file.
+    """
+    from .shemot_label_overrides import (
+        SHEMOT_LAYER_STEM,
+        shemot_label_overrides_path,
+    )
 
+    styles = []
+    if styles_dir.is_dir():
+        for lyrx in sorted(styles_dir.glob("*.lyrx")):
+            styles.append([lyrx.name] + (_stat_key(lyrx) or []))
+    signature = {"geo": _stat_key(geo_file), "styles": styles}
+    if geo_file.stem == SHEMOT_LAYER_STEM:
+        signature["override"] = _stat_key(shemot_label_overrides_path(styles_dir))
+    return signature
 
-def _geo_style_cache_fingerprint(geo_file: Path, styles_dir: Path) -> Tuple[str, str, str]:
+
+def _geo_style_cache_fingerprint(
+    geo_file: Path, styles_dir: Path, style_index: Optional[StyleIndex] = None
+) -> Tuple[str, str, str]:
     """
     Cache invalidation: GIS body + matching .lyrx so style-only edits re-run transforms.
     Returns (combined, geo_hash, lyrx_hash). combined is "geoHash:lyrxHash" (lyrxHash may be empty).
@@ -102,7 +184,7 @@ def _geo_style_cache_fingerprint(geo_file: Path, styles_dir: Path) -> Tuple[str,
     )
 
     geo_hash = compute_file_hash(geo_file)
-    lyrx_path, _ = find_lyrx_file(geo_file, styles_dir)
+    lyrx_path, _ = (style_index or StyleIndex(styles_dir)).find(geo_file)
     lyrx_hash = (
         compute_file_hash(lyrx_path)
         if lyrx_path is not None and lyrx_path.is_file()
@@ -117,6 +199,15 @@ def _geo_style_cache_fingerprint(geo_file: Path, styles_dir: Path) -> Tuple[str,
     return combined, geo_hash, lyrx_hash
 
 
+def _task_status(needed: bool, restored: bool, stat_hit: bool) -> str:
+    """"built", "restored" (artifact store), "unchanged" (stat match) or "unchanged_hashed"."""
+    if restored:
+        return "restored"
+    if needed:
+        return "built"
+    return "unchanged" if stat_hit else "unchanged_hashed"
+
+
 def _task_id(task: Dict) -> str:
     """Return a stable id for logging (pack_id/layer_or_file_name)."""
     pack_id = task["pack_id"]
@@ -142,11 +233,19 @@ def __init__(
         output_dir: Path,
         no_cache: bool = False,
         max_workers: int = 4,
+        tiling_backend: Optional[str] = None,
+        store_dir: Optional[Path] = DEFAULT_STORE_DIR,
+        memory_budget_mb: Optional[int] = DEFAULT_MEMORY_BUDGET_MB,
     ):
         self.source_dir = source_dir
         self.output_dir = output_dir
         self.no_cache = no_cache
         self.max_workers = max_workers
+        self.tiling_backend = tiling_backend
+        # Content-addressed outputs shared across packs/checkouts (None disables it)
+        self.store = ArtifactStore(store_dir) if store_dir else None
+        # Cap on the estimated memory of concurrent layer transforms (None/0: no cap)
+        self.memory_budget = memory_budget_mb * 1024 * 1024 if memory_budget_mb else None
         self.cache_path = output_dir / CACHE_FILE
         self.cache = {} if no_cache else self._load_cache()
         self.popup_config = self._load_popup_config()
@@ -187,6 +286,11 @@ def _atomic_write_json(self, path: Path, data: Any) -> None:
             json.dump(data, f, indent=2, ensure_ascii=False)
         os.replace(tmp, path)
 
+    def _write_json_asset(self, path: Path, data: Any) -> None:
+        """Atomically write a served JSON file (manifest/styles) plus its .gz/.br siblings."""
+        self._atomic_write_json(path, data)
+        write_precompressed(path)
+
     def _load_popup_config(self) -> Dict:
         # source_dir is typically ".../public/source/layers" or just ".../public/source"
         # We want to find ".../public/source/popup-config.json"
@@ -254,6 +358,8 @@ def process_all(self, stuck_timeout: Optional[int] = None):
             gis_dir = pack_dir / "gis" if (pack_dir / "gis").exists() else pack_dir
             images_dir = pack_dir / "images"
             styles_dir = pack_dir / "styles"
+            # Built once per pack (and once per worker process: it pickles as its path)
+            style_index = StyleIndex.for_dir(styles_dir, refresh=True)
 
             # Prepare output dir
             pack_output = self.output_dir / pack_id
@@ -292,6 +398,7 @@ def process_all(self, stuck_timeout: Optional[int] = None):
                     "pack_id": pack_id,
                     "geo_file": geo_file,
                     "styles_dir": styles_dir,
+                    "style_index": style_index,
                     "pack_output": pack_output,
                 }
                 all_layer_tasks.append(task)
@@ -317,87 +424,108 @@ def process_all(self, stuck_timeout: Optional[int] = None):
             logger.warning("No layers found in packs.")
             return
 
+        # Largest first, so a big layer found last does not become the long pole
+        layer_queue = sorted(
+            ((self._estimate_layer_task(task), task) for task in all_layer_tasks),
+            key=lambda item: item[0][0],
+            reverse=True,
+        )
         logger.info(
             f"Buffered {len(all_layer_tasks)} layers and {len(all_image_tasks)} images. Starting global parallel processing..."
         )
+        if self.memory_budget:
+            logger.info(f"Memory budget for concurrent transforms: {self.memory_budget // (1024 * 1024)} MB")
 
-        # 2. Process all layers in a global pool
+        # 2. Process layers in a global process pool, images and boundary assets in threads
         processed_layers = []
+        statuses = Counter()
 
-        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor, ThreadPoolExecutor(
+            max_workers=IO_WORKERS
+        ) as io_executor:
             # Pass log level to workers
             log_level = logger.getEffectiveLevel()
 
-            # Submit all tasks (GeoJSON layers)
-            futures = {
-                executor.submit(self.process_single_layer, task, log_level): task
-                for task in all_layer_tasks
+            pending = {
+                io_executor.submit(self.process_single_image, image_task, log_level): image_task
+                for image_task in all_image_tasks
             }
+            boundary_futures = [
+                io_executor.submit(self._process_boundary_asset, pack_id, geo_file, pack_output)
+                for pack_id, geo_file, pack_output in boundary_assets
+            ]
 
-            # Submit image tasks (no parallel processing needed, but keep consistent structure)
-            for image_task in all_image_tasks:
-                futures[
-                    executor.submit(self.process_single_image, image_task, log_level)
-                ] = image_task
+            # Layer tasks are submitted as workers free up (each idle worker takes the
+            # largest task that fits the memory budget), not all at once
+            layer_memory = {}  # future -> estimated memory of a running layer task
+
+            def submit_layers():
+                while layer_queue and len(layer_memory) < self.max_workers:
+                    in_flight = sum(layer_memory.values())
+                    for i, ((_cost, memory), task) in enumerate(layer_queue):
+                        if (
+                            not layer_memory
+                            or not self.memory_budget
+                            or in_flight + memory <= self.memory_budget
+                        ):
+                            break
+                    else:
+                        return  # nothing fits until a running transform finishes
+                    del layer_queue[i]
+                    future = executor.submit(self.process_single_layer, task, log_level)
+                    pending[future] = task
+                    layer_memory[future] = memory
+
+            submit_layers()
 
             # Main Progress Bar; optional stuck_timeout to log which task is pending
             total_tasks = len(all_layer_tasks) + len(all_image_tasks)
-            pending = dict(futures)
             with tqdm(total=total_tasks, desc="Total Layers", unit="lyr") as pbar:
                 while pending:
-                    try:
-                        completion_iterator = as_completed(
-                            pending.keys(), timeout=stuck_timeout
-                        )
-                        for future in completion_iterator:
-                            task = pending[future]
-                            task_id = _task_id(task)
-                            try:
-                                result = future.result()
-                                logger.info("Completed: %s", task_id)
-                                if result:
-                                    # result is (layer_entry, style_entry_or_None, cache_key, cache_value)
-                                    layer_entry, style_entry, cache_key, cache_val = result
-                                    pack_id = cache_key.split("/")[0]
-
-                                    # Update local cache in main process
-                                    self.cache[cache_key] = cache_val
-
-                                    # Add to appropriate pack manifest
-                                    if pack_id in pack_manifests:
-                                        pack_manifests[pack_id]["layers"].append(
-                                            layer_entry
-                                        )
-                                        if style_entry:
-                                            styles_map[pack_id][
-                                                layer_entry.id
-                                            ] = style_entry
-                            except Exception as e:
-                                logger.warning("Failed: %s — %s", task_id, e)
-                                tqdm.write(f"Task failed: {e}")
-
-                            del pending[future]
-                            pbar.update(1)
-                    except TimeoutError:
-                        still_pending = [
-                            (f, pending[f]) for f in pending if not f.done()
-                        ]
-                        for _f, t in still_pending:
+                    done, _ = wait(pending, timeout=stuck_timeout, return_when=FIRST_COMPLETED)
+                    if not done:
+                        for t in pending.values():
                             logger.warning(
                                 "No completion in %ss — still pending: %s",
                                 stuck_timeout,
                                 _task_id(t),
                             )
-                        # continue while to keep waiting
-
-        # Copy boundary assets (transform to WGS84, write to processed; not added as layers)
-        for pack_id, geo_file, pack_output in boundary_assets:
-            out_path = pack_output / f"{geo_file.stem}.geojson"
-            try:
-                if transform_to_wgs84(geo_file, out_path):
-                    logger.info(f"Boundary asset: {pack_id}/{geo_file.name} -> {out_path.name}")
-            except Exception as e:
-                logger.warning(f"Boundary asset failed {pack_id}/{geo_file.name}: {e}")
+                        continue  # keep waiting
+
+                    for future in done:
+                        task = pending.pop(future)
+                        layer_memory.pop(future, None)
+                        task_id = _task_id(task)
+                        try:
+                            result = future.result()
+                            logger.info("Completed: %s", task_id)
+                            if result:
+                                # result is (layer_entry, style_entry_or_None, cache_key, cache_value, status)
+                                layer_entry, style_entry, cache_key, cache_val, status = result
+                                pack_id = cache_key.split("/")[0]
+                                statuses[status] += 1
+
+                                # Update local cache in main process
+                                self.cache[cache_key] = cache_val
+
+                                # Add to appropriate pack manifest
+                                if pack_id in pack_manifests:
+                                    pack_manifests[pack_id]["layers"].append(
+                                        layer_entry
+                                    )
+                                    if style_entry:
+                                        styles_map[pack_id][
+                                            layer_entry.id
+                                        ] = style_entry
+                        except Exception as e:
+                            logger.warning("Failed: %s — %s", task_id, e)
+                            tqdm.write(f"Task failed: {e}")
+
+                        pbar.update(1)
+                    submit_layers()
+
+            for future in boundary_futures:
+                future.result()
 
         # 3. Write Manifests
         source_layers = self.source_dir / "source" / "layers"
@@ -447,20 +575,23 @@ def process_all(self, stuck_timeout: Optional[int] = None):
                 "name": manifest_data["name"],
                 "layers": layers_list,
             }
-            with open(pack_output / "manifest.json", "w", encoding="utf-8") as f:
-                json.dump(manifest_dict, f, indent=2, ensure_ascii=False)
-
-            with open(pack_output / "styles.json", "w", encoding="utf-8") as f:
-                json.dump(styles_map[pack_id], f, indent=2, ensure_ascii=False)
+            self._write_json_asset(pack_output / "manifest.json", manifest_dict)
+            self._write_json_asset(pack_output / "styles.json", styles_map[pack_id])
 
         self.generate_root_manifest(processed_pack_ids)
         self.save_cache()
+        unchanged = statuses["unchanged"] + statuses["unchanged_hashed"]
+        logger.info(
+            f"Layers: {statuses['built']} built, {statuses['restored']} restored from the artifact store, "
+            f"{unchanged} unchanged and skipped ({statuses['unchanged']} without hashing)"
+        )
         logger.info("Processing complete.")
 
     def process_single_layer(self, task: Dict, log_level: int) -> Optional[Any]:
         """
         Process a single layer fully.
-        Returns: (LayerEntry, StyleConfig or None, cache_key, cache_value)
+        Returns: (LayerEntry, StyleConfig or None, cache_key, cache_value, status)
+        (status: see _task_status)
         """
         # Configure logging for worker process
         logging.basicConfig(
@@ -470,24 +601,77 @@ def process_single_layer(self, task: Dict, log_level: int) -> Optional[Any]:
         pack_id = task["pack_id"]
         geo_file = task["geo_file"]
         styles_dir = task["styles_dir"]
+        style_index = task.get("style_index") or StyleIndex.for_dir(styles_dir)
         pack_output = task["pack_output"]
 
         logger.info("Processing: %s/%s", pack_id, geo_file.name)
         layer_id = geo_file.stem
         cache_key = f"{pack_id}/{geo_file.name}"
-        fingerprint, geo_hash, lyrx_hash = _geo_style_cache_fingerprint(
-            geo_file, styles_dir
+        cached_entry = self.cache.get(cache_key, {})
+        stat_signature = _input_stat_signature(geo_file, styles_dir)
+        stat_hit = (
+            not self.no_cache
+            and bool(cached_entry.get("hash"))
+            and cached_entry.get("stat") == stat_signature
         )
-
-        needed = self.no_cache or self.cache.get(cache_key, {}).get("hash") != fingerprint
+        if stat_hit:
+            fingerprint = cached_entry["hash"]
+            geo_hash = cached_entry.get("geo_hash")
+            lyrx_hash = cached_entry.get("lyrx_hash")
+        else:
+            fingerprint, geo_hash, lyrx_hash = _geo_style_cache_fingerprint(
+                geo_file, styles_dir, style_index
+            )
 
         wgs84_file = pack_output / f"{layer_id}.geojson"
         pmtiles_file = pack_output / f"{layer_id}.pmtiles"
 
+        needed = (
+            self.no_cache
+            or cached_entry.get("hash") != fingerprint
+            or not wgs84_file.exists()
+        )
+        store_key = artifact_key(fingerprint)
+        # --no-cache rebuilds from source; the store is only read otherwise
+        stored = (
+            self.store.get(store_key)
+            if needed and self.store is not None and not self.no_cache
+            else None
+        )
+
         style_config = None
+        base_style = None  # before animation overrides, as stored
         geom_type = "unknown"
+        tiled = False
 
-        if needed:
+        if stored is not None:
+            try:
+                geom_type = stored.get("geometry_type", "unknown")
+                style_config = self._apply_animation_style_overrides(
+                    pack_id, layer_id, stored.get("style")
+                )
+                use_pmtiles = self._wants_pmtiles(pack_id, geo_file, style_config, geom_type)
+                self.store.materialize(
+                    store_key, wgs84_file, pmtiles_file if use_pmtiles else None
+                )
+                if not use_pmtiles:
+                    pmtiles_file.unlink(missing_ok=True)
+                elif not stored["has_pmtiles"]:
+                    # Stored from a pack where the layer wasn't tiled
+                    pmtiles_file.unlink(missing_ok=True)
+                    if generate_pmtiles_smart(
+                        wgs84_file,
+                        pmtiles_file,
+                        high_fidelity=True,
+                        backend=self.tiling_backend,
+                        workdir=self.output_dir,
+                    ):
+                        self.store.add_pmtiles(store_key, pmtiles_file)
+                logger.info("Restored from artifact store: %s/%s", pack_id, geo_file.name)
+            except Exception as e:
+                logger.error(f"Error restoring {layer_id} from the artifact store: {e}")
+                return None
+        elif needed:
             # logger.info(f"Processing {layer_id}...")
             try:
                 # 1. Transform GeoJSON to WGS84
@@ -502,8 +686,9 @@ def process_single_layer(self, task: Dict, log_level: int) -> Optional[Any]:
 
                 # 2. Parse Style (same path as update_metadata_only for consistent advanced styles)
                 style_config, geom_type = self._resolve_style_for_geo_file(
-                    geo_file, styles_dir
+                    geo_file, styles_dir, style_index
                 )
+                base_style = copy.deepcopy(style_config)
                 style_config = self._apply_animation_style_overrides(
                     pack_id, layer_id, style_config
                 )
@@ -512,30 +697,16 @@ def process_single_layer(self, task: Dict, log_level: int) -> Optional[Any]:
                     geom_type = get_geometry_type(wgs84_file)
 
                 # 3. Tiling
-                # Use PMTiles for large or advanced layers so GIS can use
-                # tile-aware rendering (especially for advanced styles).
-                # Skip PMTiles for label-only layers (they render as text from GeoJSON;
-                # source may have null geometries which tippecanoe rejects).
-                # projector_base layers are used only on the projection page, not the GIS map, so no PMTiles.
-                is_label_layer = bool(
-                    style_config
-                    and isinstance(style_config, dict)
-                    and style_config.get("labels")
-                    and str(geom_type).lower() == "point"
-                )
-                is_large = geo_file.stat().st_size > 15 * 1024 * 1024
-                is_advanced = _style_config_is_advanced(style_config)
-                use_pmtiles = (
-                    pack_id != "projector_base"
-                    and (is_large or is_advanced)
-                    and not is_label_layer
-                )
-                if use_pmtiles:
-                    generate_pmtiles_smart(
+                if self._wants_pmtiles(pack_id, geo_file, style_config, geom_type):
+                    tiled = generate_pmtiles_smart(
                         wgs84_file,
                         pmtiles_file,
                         high_fidelity=True,
+                        backend=self.tiling_backend,
+                        workdir=self.output_dir,
                     )
+                else:
+                    pmtiles_file.unlink(missing_ok=True)
 
             except Exception as e:
                 logger.error(f"Error processing {layer_id}: {e}")
@@ -544,13 +715,27 @@ def process_single_layer(self, task: Dict, log_level: int) -> Optional[Any]:
                 traceback.print_exc()
                 return None
         else:
-            cached = self.cache[cache_key]
-            geom_type = cached.get("geometry_type", "unknown")
-            style_config = cached.get("style")
+            geom_type = cached_entry.get("geometry_type", "unknown")
+            style_config = cached_entry.get("style")
             style_config = self._apply_animation_style_overrides(
                 pack_id, layer_id, style_config
             )
 
+        # Served precompressed by the API and nginx; no-op when siblings are already fresh
+        write_precompressed(wgs84_file)
+
+        if needed and stored is None and self.store is not None:
+            try:
+                self.store.put(
+                    store_key,
+                    wgs84_file,
+                    geom_type,
+                    base_style,
+                    pmtiles_file if tiled else None,
+                )
+            except OSError as e:
+                logger.warning(f"Could not add {layer_id} to the artifact store: {e}")
+
         popup_cfg = self._get_popup_config_for_layer(pack_id, layer_id)
         ui_popup = (
             {k: v for k, v in (popup_cfg or {}).items() if k != "legendLabel"}
@@ -579,14 +764,74 @@ def process_single_layer(self, task: Dict, log_level: int) -> Optional[Any]:
                 "hash": fingerprint,
                 "geo_hash": geo_hash,
                 "lyrx_hash": lyrx_hash,
+                "stat": stat_signature,
                 "geometry_type": geom_type,
                 "style": style_config,
             },
+            _task_status(needed, stored is not None, stat_hit),
         )
 
+    def _estimate_layer_task(self, task: Dict) -> Tuple[int, int]:
+        """
+        (cost, memory) estimate of a layer task for process_all's scheduler, from
+        the source size and PMTiles eligibility; (0, 0) for a layer the cache
+        already covers (its inputs' stat signature is unchanged).
+
+        Eligibility uses only the pack and size. Resolving the layer's style here
+        would parse every .lyrx serially before the first worker starts. Small
+        layers tiled for an advanced style are underestimated, which barely
+        moves them in the queue.
+        """
+        geo_file = task["geo_file"]
+        styles_dir = task["styles_dir"]
+        try:
+            size = geo_file.stat().st_size
+        except OSError:
+            return (0, 0)
+        cached_entry = self.cache.get(f"{task['pack_id']}/{geo_file.name}", {})
+        if (
+            not self.no_cache
+            and cached_entry.get("hash")
+            and cached_entry.get("stat") == _input_stat_signature(geo_file, styles_dir)
+            and (task["pack_output"] / f"{geo_file.stem}.geojson").exists()
+        ):
+            return (0, 0)
+        tiled = task["pack_id"] != "projector_base" and size > PMTILES_MIN_BYTES
+        return (size * (PMTILES_COST_FACTOR if tiled else 1), size * TRANSFORM_MEMORY_FACTOR)
+
+    def _process_boundary_asset(self, pack_id: str, geo_file: Path, pack_output: Path) -> None:
+        """Transform a *_boundary asset to WGS84 in processed (not added as a layer)."""
+        out_path = pack_output / f"{geo_file.stem}.geojson"
+        try:
+            if transform_to_wgs84(geo_file, out_path):
+                write_precompressed(out_path)
+                logger.info(f"Boundary asset: {pack_id}/{geo_file.name} -> {out_path.name}")
+        except Exception as e:
+            logger.warning(f"Boundary asset failed {pack_id}/{geo_file.name}: {e}")
+
+    def _wants_pmtiles(
+        self, pack_id: str, geo_file: Path, style_config: Optional[Dict], geom_type: str
+    ) -> bool:
+        """
+        Use PMTiles for large or advanced layers so GIS can use tile-aware
+        rendering (especially for advanced styles). Skip PMTiles for label-only
+        layers (they render as text from GeoJSON; source may have null geometries
+        which tippecanoe rejects). projector_base layers are used only on the
+        projection page, not the GIS map, so no PMTiles.
+        """
+        is_label_layer = bool(
+            style_config
+            and isinstance(style_config, dict)
+            and style_config.get("labels")
+            and str(geom_type).lower() == "point"
+        )
+        is_large = geo_file.stat().st_size > PMTILES_MIN_BYTES
+        is_advanced = _style_config_is_advanced(style_config)
+        return pack_id != "projector_base" and (is_large or is_advanced) and not is_label_layer
+
     def generate_root_manifest(self, pack_ids: List[str]):
         root_manifest = {"packs": sorted(pack_ids)}
-        self._atomic_write_json(
+        self._write_json_asset(
             self.output_dir / "layers-manifest.json", root_manifest
         )
 
@@ -697,6 +942,7 @@ def process_single_layer_merged(
             "pack_id": pack_id,
             "geo_file": geo_file,
             "styles_dir": styles_dir,
+            "style_index": StyleIndex.for_dir(styles_dir, refresh=True),
             "pack_output": pack_output,
         }
         log_level = logger.getEffectiveLevel()
@@ -704,8 +950,9 @@ def process_single_layer_merged(
         if not result:
             logger.error("Single-layer processing failed for %s/%s", pack_id, layer_stem)
             return
-        layer_entry, style_entry, cache_key, cache_val = result
+        layer_entry, style_entry, cache_key, cache_val, status = result
         self.cache[cache_key] = cache_val
+        logger.info("Layer %s/%s: %s", pack_id, layer_stem, status.replace("_", " "))
         # 1 — GeoJSON (and pmtiles if any) is written inside process_single_layer
         # 2 — Pack cache
         if not self.no_cache:
@@ -723,7 +970,7 @@ def process_single_layer_merged(
             merged_styles[layer_stem] = style_entry
         else:
             merged_styles.pop(layer_stem, None)
-        self._atomic_write_json(styles_path, dict(sorted(merged_styles.items())))
+        self._write_json_asset(styles_path, dict(sorted(merged_styles.items())))
 
         # 4 — Merged pack manifest
         manifest_path = pack_output / "manifest.json"
@@ -747,10 +994,10 @@ def process_single_layer_merged(
             "name": pack_display_name,
             "layers": layer_dicts,
         }
-        self._atomic_write_json(manifest_path, manifest_dict)
+        self._write_json_asset(manifest_path, manifest_dict)
         # 5 — Root layers-manifest.json (scan; last writer)
         root_payload = {"packs": self._discover_packs_having_manifest()}
-        self._atomic_write_json(
+        self._write_json_asset(
             self.output_dir / "layers-manifest.json", root_payload
         )
         logger.info("Single-layer merge complete: pack=%s", pack_id)
@@ -758,7 +1005,7 @@ def process_single_layer_merged(
     def process_single_image(self, task: Dict, log_level: int) -> Optional[Any]:
         """
         Process a single image file (copy to output directory).
-        Returns: (LayerEntry, StyleConfig or None, cache_key, cache_value)
+        Returns: (LayerEntry, StyleConfig or None, cache_key, cache_value, status)
         """
         # Configure logging for worker process
         logging.basicConfig(
@@ -779,11 +1026,17 @@ def process_single_image(self, task: Dict, log_level: int) -> Optional[Any]:
         )
         filename = image_file.name
         cache_key = f"{pack_id}/{filename}"
-        file_hash = compute_file_hash(image_file)
-
-        needed = self.no_cache or self.cache.get(cache_key, {}).get("hash") != file_hash
+        cached_entry = self.cache.get(cache_key, {})
+        stat_signature = {"image": _stat_key(image_file)}
+        stat_hit = (
+            not self.no_cache
+            and bool(cached_entry.get("hash"))
+            and cached_entry.get("stat") == stat_signature
+        )
+        file_hash = cached_entry["hash"] if stat_hit else compute_file_hash(image_file)
 
         output_file = pack_output / filename
+        needed = self.no_cache or cached_entry.get("hash") != file_hash or not output_file.exists()
 
         if needed:
             try:
@@ -812,26 +1065,28 @@ def process_single_image(self, task: Dict, log_level: int) -> Optional[Any]:
             entry,
             style_config,
             cache_key,
-            {"hash": file_hash, "geometry_type": "image", "style": style_config},
+            {
+                "hash": file_hash,
+                "stat": stat_signature,
+                "geometry_type": "image",
+                "style": style_config,
+            },
+            _task_status(needed, False, stat_hit),
         )
 
     def _resolve_style_for_geo_file(
-        self, geo_file: Path, styles_dir: Path
+        self, geo_file: Path, styles_dir: Path, style_index: Optional[StyleIndex] = None
     ) -> Tuple[Optional[Dict], str]:
         """
         Resolve style config (including advanced symbol IR) and geometry type from
         source .lyrx. Shared by process_single_layer and update_metadata_only so
         metadata is always built the same way.
         """
-        lyrx_file, _ = find_lyrx_file(geo_file, styles_dir)
-        style_config = None
-        geom_type = "unknown"
-        if lyrx_file:
-            style_obj = parse_lyrx_style(lyrx_file)
-            if style_obj:
-                style_config = style_obj.to_dict()
-                geom_type = style_obj.geometry_type
-        return (style_config, geom_type)
+        style_index = style_index or StyleIndex(styles_dir)
+        lyrx_file, _ = style_index.find(geo_file)
+        if not lyrx_file:
+            return (None, "unknown")
+        return style_index.resolve_style(lyrx_file)
 
     def _get_popup_config_for_layer(
         self, pack_id: str, layer_id: str
@@ -881,6 +1136,7 @@ def update_metadata_only(self):
             gis_dir = pack_dir / "gis" if (pack_dir / "gis").exists() else pack_dir
             images_dir = pack_dir / "images"
             styles_dir = pack_dir / "styles"
+            style_index = StyleIndex.for_dir(styles_dir, refresh=True)
 
             pack_output = self.output_dir / pack_id
             pack_output.mkdir(parents=True, exist_ok=True)  # Ensure it exists
@@ -911,7 +1167,7 @@ def update_metadata_only(self):
 
                 # Styles (same resolution as process_single_layer for advanced/complexity)
                 style_config, geom_type = self._resolve_style_for_geo_file(
-                    geo_file, styles_dir
+                    geo_file, styles_dir, style_index
                 )
                 style_config = self._apply_animation_style_overrides(
                     pack_id, layer_id, style_config
@@ -1030,8 +1286,7 @@ def update_metadata_only(self):
                 )
                 manifest_dict = manifest.to_dict()
 
-                with open(pack_output / "manifest.json", "w", encoding="utf-8") as f:
-                    json.dump(manifest_dict, f, indent=2, ensure_ascii=False)
+                self._write_json_asset(pack_output / "manifest.json", manifest_dict)
 
                 # Merge styles with existing
                 styles_path = pack_output / "styles.json"
@@ -1045,8 +1300,7 @@ def update_metadata_only(self):
 
                 current_styles.update(new_styles)
 
-                with open(styles_path, "w", encoding="utf-8") as f:
-                    json.dump(current_styles, f, indent=2, ensure_ascii=False)
+                self._write_json_asset(styles_path, current_styles)
 
         self.generate_root_manifest(processed_pack_ids)
         logger.info("Metadata update complete.")
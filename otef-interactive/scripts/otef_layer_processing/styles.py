@@ -1,3 +1,4 @@
+import copy
 import json
 import re
 import logging
@@ -24,70 +25,138 @@ def token_sort_name(name: str) -> str:
     return " ".join(sorted(tokens))
 
 
-def find_lyrx_file(
-    geojson_file: Path, styles_dir: Path
-) -> Tuple[Optional[Path], Optional[str]]:
-    """
-    Find matching .lyrx file using robust matching strategies.
-    """
-    if not styles_dir.exists():
-        return None, None
-
-    layer_name = geojson_file.stem
-    layer_name_normalized = normalize_name(layer_name)
-    layer_name_tokens = token_sort_name(layer_name)
-
-    lyrx_index = {}
-
-    for lyrx_file in styles_dir.glob("*.lyrx"):
-        lyrx_stem = lyrx_file.stem
-        exact_key = normalize_name(lyrx_stem)
-        if exact_key not in lyrx_index:
-            lyrx_index[exact_key] = []
-        lyrx_index[exact_key].append((lyrx_file, lyrx_stem))
+def _lyrx_layer_names(lyrx_data: Dict) -> List[str]:
+    """Layer names a .lyrx declares (layerDefinitions names and layer URI stems)."""
+    names = [
+        layer_def.get("name", "")
+        for layer_def in lyrx_data.get("layerDefinitions", [])
+        if isinstance(layer_def, dict)
+    ]
+    for layer_uri in lyrx_data.get("layers", []):
+        if isinstance(layer_uri, str) and "=" in layer_uri:
+            names.append(Path(layer_uri.split("=", 1)[1]).stem)
+    return names
 
-        token_key = token_sort_name(lyrx_stem)
-        if token_key not in lyrx_index:
-            lyrx_index[token_key] = []
-        if (lyrx_file, lyrx_stem) not in lyrx_index[token_key]:
-            lyrx_index[token_key].append((lyrx_file, lyrx_stem))
 
-    if layer_name_normalized in lyrx_index:
-        candidates = lyrx_index[layer_name_normalized]
-        return candidates[0][0], "exact"
+class StyleIndex:
+    """
+    The .lyrx files of one pack's styles dir, indexed by normalized stem,
+    token-sorted stem and declared layer-definition names, with each file's
+    JSON and parsed style memoized.
+
+    Indexes are built on first use. ``StyleIndex.for_dir`` shares one instance
+    per directory and process, and an instance pickles as just its directory
+    and unpickles to that shared instance. A worker therefore builds each
+    pack's index once and parses each .lyrx at most once, however many layer
+    tasks the index travels with.
+    """
 
-    if layer_name_tokens in lyrx_index:
-        candidates = lyrx_index[layer_name_tokens]
-        return candidates[0][0], "token_sorted"
+    _shared: Dict[Path, "StyleIndex"] = {}
+
+    def __init__(self, styles_dir: Path):
+        self.styles_dir = Path(styles_dir)
+        self._files: Optional[List[Path]] = None
+        # normalized and token-sorted stems share one map, as find_lyrx_file always did
+        self._stems: Optional[Dict[str, List[Path]]] = None
+        # definition name key -> (glob position, path) of the first file declaring it
+        self._definitions: Optional[Dict[str, Tuple[int, Path]]] = None
+        self._documents: Dict[Path, Optional[Dict]] = {}
+        self._styles: Dict[Path, Tuple[Optional[Dict], str]] = {}
+
+    @classmethod
+    def for_dir(cls, styles_dir: Path, refresh: bool = False) -> "StyleIndex":
+        """The process-wide index of styles_dir (a fresh one with refresh=True)."""
+        key = Path(styles_dir)
+        if refresh or key not in cls._shared:
+            cls._shared[key] = cls(key)
+        return cls._shared[key]
+
+    def __reduce__(self):
+        return (StyleIndex.for_dir, (self.styles_dir,))
+
+    def _lyrx_files(self) -> List[Path]:
+        if self._files is None:
+            self._files = list(self.styles_dir.glob("*.lyrx")) if self.styles_dir.exists() else []
+        return self._files
+
+    def _document(self, lyrx_file: Path) -> Optional[Dict]:
+        if lyrx_file not in self._documents:
+            try:
+                with open(lyrx_file, "r", encoding="utf-8") as f:
+                    self._documents[lyrx_file] = json.load(f)
+            except Exception as e:
+                logger.error(f"Error reading .lyrx file {lyrx_file}: {e}")
+                self._documents[lyrx_file] = None
+        return self._documents[lyrx_file]
+
+    def _stem_index(self) -> Dict[str, List[Path]]:
+        if self._stems is None:
+            self._stems = {}
+            for lyrx_file in self._lyrx_files():
+                exact_key = normalize_name(lyrx_file.stem)
+                self._stems.setdefault(exact_key, []).append(lyrx_file)
+                token_list = self._stems.setdefault(token_sort_name(lyrx_file.stem), [])
+                if lyrx_file not in token_list:
+                    token_list.append(lyrx_file)
+        return self._stems
+
+    def _definition_index(self) -> Dict[str, Tuple[int, Path]]:
+        if self._definitions is None:
+            self._definitions = {}
+            for position, lyrx_file in enumerate(self._lyrx_files()):
+                lyrx_data = self._document(lyrx_file)
+                if not isinstance(lyrx_data, dict):
+                    continue
+                for name in _lyrx_layer_names(lyrx_data):
+                    for key in (f"n:{normalize_name(name)}", f"t:{token_sort_name(name)}"):
+                        self._definitions.setdefault(key, (position, lyrx_file))
+        return self._definitions
+
+    def find(self, geojson_file: Path) -> Tuple[Optional[Path], Optional[str]]:
+        """Matching .lyrx for a GIS file: exact stem, token-sorted stem, then declared layer names."""
+        layer_name = geojson_file.stem
+        layer_name_normalized = normalize_name(layer_name)
+        layer_name_tokens = token_sort_name(layer_name)
+
+        stems = self._stem_index()
+        if layer_name_normalized in stems:
+            return stems[layer_name_normalized][0], "exact"
+        if layer_name_tokens in stems:
+            return stems[layer_name_tokens][0], "token_sorted"
+
+        definitions = self._definition_index()
+        matches = [
+            definitions[key]
+            for key in (f"n:{layer_name_normalized}", f"t:{layer_name_tokens}")
+            if key in definitions
+        ]
+        if matches:
+            # First file (in glob order) declaring the name either way
+            return min(matches, key=lambda match: match[0])[1], "metadata"
+        return None, None
 
-    for lyrx_file in styles_dir.glob("*.lyrx"):
-        try:
-            with open(lyrx_file, "r", encoding="utf-8") as f:
-                lyrx_data = json.load(f)
+    def resolve_style(self, lyrx_file: Path) -> Tuple[Optional[Dict], str]:
+        """(style dict, geometry type) of a .lyrx, parsed once; callers get their own copy."""
+        if lyrx_file not in self._styles:
+            lyrx_data = self._document(lyrx_file)
+            style_obj = (
+                parse_lyrx_style(lyrx_file, lyrx_data=lyrx_data) if lyrx_data is not None else None
+            )
+            self._styles[lyrx_file] = (
+                (style_obj.to_dict(), style_obj.geometry_type) if style_obj else (None, "unknown")
+            )
+        style_config, geom_type = self._styles[lyrx_file]
+        return copy.deepcopy(style_config), geom_type
 
-            layer_defs = lyrx_data.get("layerDefinitions", [])
-            for layer_def in layer_defs:
-                def_name = layer_def.get("name", "")
-                if (
-                    normalize_name(def_name) == layer_name_normalized
-                    or token_sort_name(def_name) == layer_name_tokens
-                ):
-                    return lyrx_file, "metadata"
-
-            layers = lyrx_data.get("layers", [])
-            for layer_uri in layers:
-                if "=" in layer_uri:
-                    uri_path = layer_uri.split("=", 1)[1]
-                    uri_name = Path(uri_path).stem
-                    if (
-                        normalize_name(uri_name) == layer_name_normalized
-                        or token_sort_name(uri_name) == layer_name_tokens
-                    ):
-                        return lyrx_file, "metadata"
-        except Exception:
-            continue
 
-    return None, None
+def find_lyrx_file(
+    geojson_file: Path, styles_dir: Path
+) -> Tuple[Optional[Path], Optional[str]]:
+    """
+    Find matching .lyrx file using robust matching strategies (see StyleIndex;
+    callers resolving many layers should keep one StyleIndex per pack).
+    """
+    return StyleIndex(styles_dir).find(geojson_file)
 
 
 def normalize_color_channel(value: object) -> int:
@@ -623,13 +692,15 @@ def _apply_shemot_settlement_label_ir(
     label_config["offsetArrayProperty"] = "otef_map_text_offset_em"
 
 
-def parse_lyrx_style(lyrx_path: Path) -> Optional[StyleConfig]:
-    try:
-        with open(lyrx_path, "r", encoding="utf-8") as f:
-            lyrx_data = json.load(f)
-    except Exception as e:
-        logger.error(f"Error reading .lyrx file {lyrx_path}: {e}")
-        return None
+def parse_lyrx_style(lyrx_path: Path, lyrx_data: Optional[Dict] = None) -> Optional[StyleConfig]:
+    """Style of a .lyrx file; lyrx_data is its already-loaded JSON, if the caller has it."""
+    if lyrx_data is None:
+        try:
+            with open(lyrx_path, "r", encoding="utf-8") as f:
+                lyrx_data = json.load(f)
+        except Exception as e:
+            logger.error(f"Error reading .lyrx file {lyrx_path}: {e}")
+            return None
 
     layer_defs = lyrx_data.get("layerDefinitions", [])
     if not layer_defs:
@@ -1,9 +1,14 @@
 
 import os
+import re
 import subprocess
 import logging
+import uuid
+from contextlib import contextmanager
+from functools import lru_cache
+from multiprocessing.util import Finalize
 from pathlib import Path
-from typing import Optional, List
+from typing import Dict, Iterator, Optional, List, Tuple
 import sys
 import shutil
 
@@ -14,6 +19,34 @@
 # Keep this aligned with frontend PMTiles source-layer fallback.
 DEFAULT_TIPPECANOE_LAYER_NAME = "layer"
 
+# "tippecanoe" runs tippecanoe + go-pmtiles, as local binaries when installed (or named by
+# OTEF_TIPPECANOE_BIN / OTEF_PMTILES_BIN), otherwise in Docker; "native" tiles in-process
+# (native_tiling.py) and stays opt-in until benchmark_tiling.py shows it matches tippecanoe
+TILING_BACKENDS = ("tippecanoe", "native")
+DEFAULT_TILING_BACKEND = os.environ.get("OTEF_TILING_BACKEND", "tippecanoe")
+
+# Docker jobs run in <workdir>/WORK_DIR_NAME/<uuid>; inputs are hard-linked in under ASCII names
+WORK_DIR_NAME = ".tiling-work"
+# Pooled tippecanoe containers exit on their own after this long, even if never stopped
+CONTAINER_TTL_SECONDS = 6 * 60 * 60
+# tippecanoe writes .pmtiles directly from this version on (felt/tippecanoe)
+TIPPECANOE_PMTILES_VERSION = (2, 17)
+
+TIPPECANOE_ARGS = [
+    f"--layer={DEFAULT_TIPPECANOE_LAYER_NAME}",
+    "--force",
+    "--minimum-zoom=9",
+    "--maximum-zoom=18",
+    "--no-feature-limit",
+    "--no-tile-size-limit",
+    "--detect-shared-borders",
+    "--drop-densest-as-needed",
+    "--quiet"
+]
+
+# (image, mounted workdir) -> name of a running container owned by this process
+_containers: Dict[Tuple[str, str], str] = {}
+
 def to_docker_path(path: Path) -> str:
     """Convert path to Docker-compatible format (for Windows/WSL)."""
     if sys.platform == "win32":
@@ -24,73 +57,174 @@ def to_docker_path(path: Path) -> str:
         return abs_path
     return str(path.resolve())
 
-def run_tippecanoe(input_file: Path, output_mbtiles: Path, extra_args: List[str] = None) -> bool:
-    """Run tippecanoe via Docker (One-Pass, Unicode-Safe)."""
-    # CRITICAL: Unicode filenames fail in some Docker mounts.
-    # Use a generic ASCII symlink or copy for the duration of the run.
-    safe_input_name = "_docker_input.geojson"
-    safe_output_name = "_docker_output.mbtiles"
+@lru_cache(maxsize=None)
+def local_binary(name: str) -> Optional[str]:
+    """Path of a local tippecanoe/pmtiles executable (env OTEF_<NAME>_BIN, then PATH), or None."""
+    configured = os.environ.get(f"OTEF_{name.upper()}_BIN")
+    if configured:
+        return configured if shutil.which(configured) else None
+    return shutil.which(name)
+
+@lru_cache(maxsize=None)
+def tippecanoe_writes_pmtiles() -> bool:
+    """Whether the local tippecanoe can write PMTiles itself (skipping the MBTiles conversion)."""
+    binary = local_binary("tippecanoe")
+    if not binary:
+        return False
+    try:
+        result = subprocess.run([binary, "--version"], capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.SubprocessError):
+        return False
+    match = re.search(r"v?(\d+)\.(\d+)", result.stdout + result.stderr)
+    return bool(match) and (int(match.group(1)), int(match.group(2))) >= TIPPECANOE_PMTILES_VERSION
+
+def stop_tiling_containers() -> None:
+    """Remove the tiling containers this process started (also runs at process exit)."""
+    names = list(_containers.values())
+    _containers.clear()
+    if names:
+        subprocess.run(["docker", "rm", "-f", *names], capture_output=True)
+
+def _pooled_container(image: str, workdir: Path) -> str:
+    """A long-running container of image with workdir mounted at /work, started on first use."""
+    key = (image, str(workdir.resolve()))
+    name = _containers.get(key)
+    if name:
+        return name
 
-    import uuid
-    # Use UUID to prevent collisions if multiple layers have the same name (e.g. from different packs)
-    temp_dir = input_file.parent / f"_tmp_tile_{uuid.uuid4().hex}"
-    temp_dir.mkdir(parents=True, exist_ok=True)
+    name = f"otef-tiling-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    subprocess.run(
+        [
+            "docker", "run", "-d", "--rm",
+            "--name", name,
+            "-v", f"{to_docker_path(workdir)}:/work",
+            "--entrypoint", "sleep",
+            image,
+            str(CONTAINER_TTL_SECONDS),
+        ],
+        check=True, capture_output=True, text=True,
+    )
+    if not _containers:
+        # Runs at exit in the main process and in ProcessPoolExecutor workers alike
+        Finalize(None, stop_tiling_containers, exitpriority=10)
+    _containers[key] = name
+    logger.debug(f"Started tiling container {name} for {workdir}")
+    return name
 
+def _docker_exec(image: str, workdir: Path, args: List[str]) -> subprocess.CompletedProcess:
+    """Run a command in the pooled container, restarting it once if it has gone away."""
+    for attempt in range(2):
+        container = _pooled_container(image, workdir)
+        result = subprocess.run(
+            ["docker", "exec", container, *args],
+            capture_output=True, text=True, encoding='utf-8', errors='replace',
+        )
+        gone = "No such container" in result.stderr or "is not running" in result.stderr
+        if result.returncode == 0 or not gone or attempt:
+            return result
+        _containers.pop((image, str(workdir.resolve())), None)
+    return result
+
+def _link_or_copy(source: Path, dest: Path) -> None:
+    try:
+        os.link(source, dest)
+    except OSError:
+        # Different filesystem (or no hard links): fall back to copying
+        shutil.copy2(source, dest)
+
+@contextmanager
+def _job_dir(workdir: Path) -> Iterator[Tuple[Path, str]]:
+    """A scratch directory under workdir; yields (host path, path inside the container)."""
+    job_id = uuid.uuid4().hex
+    job = workdir / WORK_DIR_NAME / job_id
+    job.mkdir(parents=True)
     try:
-        # Copy file to a safe ASCII name in a temp subfolder
-        shutil.copy2(input_file, temp_dir / safe_input_name)
-
-        docker_cmd = [
-            "docker", "run", "--rm",
-            "-v", f"{to_docker_path(temp_dir)}:/work",
-            TIPPECANOE_IMAGE,
-            "tippecanoe",
-            "-o", f"/work/{safe_output_name}",
-            f"/work/{safe_input_name}",
-            f"--layer={DEFAULT_TIPPECANOE_LAYER_NAME}",
-            "--force",
-            "--minimum-zoom=9",
-            "--maximum-zoom=18",
-            "--no-feature-limit",
-            "--no-tile-size-limit",
-            "--detect-shared-borders",
-            "--drop-densest-as-needed",
-            "--quiet"
-        ]
-
-        if extra_args:
-            docker_cmd.extend(extra_args)
-
-        result = subprocess.run(docker_cmd, capture_output=True, text=True, encoding='utf-8', errors='replace')
-
-        success = (temp_dir / safe_output_name).exists()
-
-        if result.returncode != 0 or not success:
-            logger.error(f"Tippecanoe failed for {input_file.name} (Exit code {result.returncode})")
-            logger.error(f"STDOUT: {result.stdout}")
-            logger.error(f"STDERR: {result.stderr}")
-            if success: # File exists but error code was non-zero?
-                 logger.warning("Output file exists despite non-zero exit code.")
-            else:
-                 return False
-
-        if success:
-            if output_mbtiles.exists(): output_mbtiles.unlink()
-            shutil.move(temp_dir / safe_output_name, output_mbtiles)
-
-        return success
+        yield job, f"/work/{WORK_DIR_NAME}/{job_id}"
+    finally:
+        shutil.rmtree(job, ignore_errors=True)
+        try:
+            job.parent.rmdir()
+        except OSError:
+            pass  # other jobs still running
+
+def _log_failure(what: str, result: subprocess.CompletedProcess) -> None:
+    logger.error(f"{what} (Exit code {result.returncode})")
+    logger.error(f"STDOUT: {result.stdout}")
+    logger.error(f"STDERR: {result.stderr}")
+
+def run_tippecanoe(
+    input_file: Path,
+    output_file: Path,
+    extra_args: List[str] = None,
+    workdir: Optional[Path] = None,
+) -> bool:
+    """
+    Run tippecanoe (One-Pass, Unicode-Safe): the local binary when available,
+    otherwise a pooled Docker container with workdir (default: the output's
+    folder) mounted. output_file may be .pmtiles when tippecanoe_writes_pmtiles().
+    """
+    args = TIPPECANOE_ARGS + (extra_args or [])
+    binary = local_binary("tippecanoe")
+    try:
+        if binary:
+            result = subprocess.run(
+                [binary, "-o", str(output_file), str(input_file), *args],
+                capture_output=True, text=True, encoding='utf-8', errors='replace',
+            )
+            success = output_file.exists()
+            if result.returncode != 0 or not success:
+                _log_failure(f"Tippecanoe failed for {input_file.name}", result)
+                if not success:
+                    return False
+                logger.warning("Output file exists despite non-zero exit code.")
+            return success
+
+        # CRITICAL: Unicode filenames fail in some Docker mounts.
+        # Hard-link the input under a generic ASCII name for the duration of the run.
+        workdir = workdir or output_file.parent
+        safe_output_name = f"_docker_output{output_file.suffix}"
+        with _job_dir(workdir) as (job, container_job):
+            _link_or_copy(input_file, job / "_docker_input.geojson")
+            result = _docker_exec(
+                TIPPECANOE_IMAGE,
+                workdir,
+                [
+                    "tippecanoe",
+                    "-o", f"{container_job}/{safe_output_name}",
+                    f"{container_job}/_docker_input.geojson",
+                    *args,
+                ],
+            )
+            success = (job / safe_output_name).exists()
+            if result.returncode != 0 or not success:
+                _log_failure(f"Tippecanoe failed for {input_file.name}", result)
+                if not success:
+                    return False
+                logger.warning("Output file exists despite non-zero exit code.")
+            os.replace(job / safe_output_name, output_file)
+            return True
     except Exception as e:
         logger.error(f"Tippecanoe exception for {input_file.name}: {e}")
         return False
-    finally:
-        if temp_dir.exists(): shutil.rmtree(temp_dir)
 
-def convert_mbtiles_to_pmtiles(mbtiles_path: Path, pmtiles_path: Path) -> bool:
+def convert_mbtiles_to_pmtiles(mbtiles_path: Path, pmtiles_path: Path, workdir: Optional[Path] = None) -> bool:
     """Convert MBTiles to PMTiles using the high-performance Go engine (Unicode-Safe)."""
     try:
         if not mbtiles_path.exists():
             return False
 
+        binary = local_binary("pmtiles")
+        if binary:
+            if pmtiles_path.exists(): pmtiles_path.unlink()
+            result = subprocess.run(
+                [binary, "convert", str(mbtiles_path), str(pmtiles_path)],
+                capture_output=True, text=True, encoding='utf-8', errors='replace',
+            )
+            if result.returncode != 0 or not pmtiles_path.exists():
+                _log_failure("PMTiles conversion failed", result)
+                return False
+            return True
+
         size_mb = mbtiles_path.stat().st_size / (1024 * 1024)
 
         # Threshold: > 2MB MBTiles gets the Go Engine
@@ -100,56 +234,72 @@ def convert_mbtiles_to_pmtiles(mbtiles_path: Path, pmtiles_path: Path) -> bool:
             mbtiles_to_pmtiles(str(mbtiles_path), str(pmtiles_path), maxzoom=18)
             return pmtiles_path.exists()
 
-        # GO GO GO for big ones, using safe ASCII names
-        import uuid
-        temp_dir = mbtiles_path.parent / f"_tmp_pmtiles_{uuid.uuid4().hex}"
-        temp_dir.mkdir(parents=True, exist_ok=True)
-        safe_in = "_in.mbtiles"
-        safe_out = "_out.pmtiles"
-
-        try:
-            shutil.copy2(mbtiles_path, temp_dir / safe_in)
-
+        # GO GO GO for big ones, using safe ASCII names. The go-pmtiles image has
+        # no shell to keep alive, so this is a one-off container, but it shares
+        # the job dir (hard links, no copies) with the tippecanoe runs.
+        workdir = workdir or pmtiles_path.parent
+        with _job_dir(workdir) as (job, container_job):
+            _link_or_copy(mbtiles_path, job / "_in.mbtiles")
             docker_cmd = [
                 "docker", "run", "--rm",
-                "-v", f"{to_docker_path(temp_dir)}:/work",
+                "-v", f"{to_docker_path(workdir)}:/work",
                 PMTILES_IMAGE,
                 "convert",
-                f"/work/{safe_in}",
-                f"/work/{safe_out}"
+                f"{container_job}/_in.mbtiles",
+                f"{container_job}/_out.pmtiles"
             ]
 
             result = subprocess.run(docker_cmd, capture_output=True, text=True)
 
-            success = (temp_dir / safe_out).exists()
+            success = (job / "_out.pmtiles").exists()
             if result.returncode != 0 or not success:
-                logger.error(f"PMTiles docker conversion failed (Exit code {result.returncode})")
-                logger.error(f"STDOUT: {result.stdout}")
-                logger.error(f"STDERR: {result.stderr}")
+                _log_failure("PMTiles docker conversion failed", result)
                 if not success:
                     return False
 
-            if success:
-                if pmtiles_path.exists(): pmtiles_path.unlink()
-                shutil.move(temp_dir / safe_out, pmtiles_path)
-                return True
-            return False
-        finally:
-            if temp_dir.exists(): shutil.rmtree(temp_dir)
+            os.replace(job / "_out.pmtiles", pmtiles_path)
+            return True
 
     except Exception as e:
         logger.error(f"PMTiles conversion failed: {e}")
         return False
 
-def generate_pmtiles_smart(input_geojson: Path, output_pmtiles: Path, high_fidelity: bool = False) -> bool:
-    """Direct, optimized tiling with Unicode-safety."""
+def generate_pmtiles_smart(
+    input_geojson: Path,
+    output_pmtiles: Path,
+    high_fidelity: bool = False,
+    backend: Optional[str] = None,
+    workdir: Optional[Path] = None,
+) -> bool:
+    """
+    Direct, optimized tiling with Unicode-safety (backend: see TILING_BACKENDS).
+    workdir is the directory Docker containers mount; it must contain (or share
+    a filesystem with) the input and output so files are linked rather than copied.
+    """
+    backend = backend or DEFAULT_TILING_BACKEND
+    if backend not in TILING_BACKENDS:
+        logger.error(f"Unknown tiling backend {backend!r} (expected one of {', '.join(TILING_BACKENDS)})")
+        return False
     try:
+        if backend == "native":
+            from .native_tiling import generate_pmtiles_native
+
+            return generate_pmtiles_native(
+                input_geojson,
+                output_pmtiles,
+                high_fidelity=high_fidelity,
+                layer_name=DEFAULT_TIPPECANOE_LAYER_NAME,
+            )
+
         # HIGH-FIDELITY: Disable simplification only if requested
         extra_args = ["--no-line-simplification"] if high_fidelity else ["--simplification=2"]
 
+        if tippecanoe_writes_pmtiles():
+            return run_tippecanoe(input_geojson, output_pmtiles, extra_args, workdir=workdir)
+
         temp_mb = output_pmtiles.with_suffix(".mbtiles")
-        if run_tippecanoe(input_geojson, temp_mb, extra_args):
-            success = convert_mbtiles_to_pmtiles(temp_mb, output_pmtiles)
+        if run_tippecanoe(input_geojson, temp_mb, extra_args, workdir=workdir):
+            success = convert_mbtiles_to_pmtiles(temp_mb, output_pmtiles, workdir=workdir)
             if temp_mb.exists(): temp_mb.unlink()
             return success
 
@@ -0,0 +1,330 @@
+import gzip
+import json
+import math
+import struct
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+from pmtiles.reader import MmapSource, Reader, all_tiles
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from otef_layer_processing.native_tiling import (  # noqa: E402
+    BUFFER,
+    EXTENT,
+    LINESTRING,
+    POINT,
+    POLYGON,
+    _iter_geojson_features,
+    _project,
+    generate_pmtiles_native,
+)
+
+ZOOM = 12
+
+
+# ---------------------------------------------------------------------------
+# Minimal MVT decoder (vector_tile.proto v2)
+# ---------------------------------------------------------------------------
+
+def _read_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, pos
+
+
+def _fields(data):
+    pos = 0
+    while pos < len(data):
+        key, pos = _read_varint(data, pos)
+        field, wire_type = key >> 3, key & 0x7
+        if wire_type == 0:
+            value, pos = _read_varint(data, pos)
+        elif wire_type == 1:
+            value, pos = data[pos:pos + 8], pos + 8
+        elif wire_type == 2:
+            length, pos = _read_varint(data, pos)
+            value, pos = data[pos:pos + length], pos + length
+        else:
+            raise ValueError(f"unexpected wire type {wire_type}")
+        yield field, value
+
+
+def _packed(data):
+    values, pos = [], 0
+    while pos < len(data):
+        value, pos = _read_varint(data, pos)
+        values.append(value)
+    return values
+
+
+def _unzigzag(value):
+    return (value >> 1) ^ -(value & 1)
+
+
+def _decode_value(data):
+    for field, value in _fields(data):
+        if field == 1:
+            return value.decode("utf-8")
+        if field == 3:
+            return struct.unpack("<d", value)[0]
+        if field == 5:
+            return value
+        if field == 6:
+            return _unzigzag(value)
+        if field == 7:
+            return bool(value)
+    raise ValueError("empty value")
+
+
+def _decode_geometry(commands):
+    """-> list of paths (lists of (x, y)); each MoveTo starts a new path."""
+    paths, cursor, i = [], [0, 0], 0
+    while i < len(commands):
+        command, count = commands[i] & 0x7, commands[i] >> 3
+        i += 1
+        if command == 7:
+            continue
+        for _ in range(count):
+            cursor = [cursor[0] + _unzigzag(commands[i]), cursor[1] + _unzigzag(commands[i + 1])]
+            i += 2
+            if command == 1:
+                paths.append([])
+            paths[-1].append(tuple(cursor))
+    return paths
+
+
+def decode_tile(data):
+    if data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+    layers = {}
+    for _, layer_data in _fields(data):
+        name, keys, values, raw_features, extent = None, [], [], [], None
+        for field, value in _fields(layer_data):
+            if field == 1:
+                name = value.decode("utf-8")
+            elif field == 2:
+                raw_features.append(value)
+            elif field == 3:
+                keys.append(value.decode("utf-8"))
+            elif field == 4:
+                values.append(_decode_value(value))
+            elif field == 5:
+                extent = value
+        features = []
+        for raw in raw_features:
+            feature = {"id": None, "properties": {}}
+            for field, value in _fields(raw):
+                if field == 1:
+                    feature["id"] = value
+                elif field == 2:
+                    tags = _packed(value)
+                    feature["properties"] = {keys[k]: values[v] for k, v in zip(tags[::2], tags[1::2])}
+                elif field == 3:
+                    feature["type"] = value
+                elif field == 4:
+                    feature["paths"] = _decode_geometry(_packed(value))
+            features.append(feature)
+        layers[name] = {"extent": extent, "features": features}
+    return layers
+
+
+def _area(ring):
+    """Shoelace sum in tile coordinates (y down): positive for MVT exterior rings."""
+    return sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(ring, ring[1:] + ring[:1]))
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+def _tile_of(lon, lat, z=ZOOM):
+    x, y = _project([(lon, lat)])[0]
+    return int(x * 2 ** z), int(y * 2 ** z)
+
+
+def _lonlat(tile_x, tile_y, z=ZOOM):
+    """Tile-relative fraction (tile_x, tile_y in tiles at zoom z) -> (lon, lat)."""
+    n = 2 ** z
+    lon = tile_x / n * 360.0 - 180.0
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / n))))
+    return [lon, lat]
+
+
+# A tile well inside Israel; coordinates below are offsets within it (0..1)
+TX, TY = _tile_of(34.8, 32.1)
+
+
+def _at(fx, fy):
+    return _lonlat(TX + fx, TY + fy)
+
+
+def _tile_coords(fx, fy):
+    x, y = _project([_at(fx, fy)])[0]
+    return round((x * 2 ** ZOOM - TX) * EXTENT), round((y * 2 ** ZOOM - TY) * EXTENT)
+
+
+class NativeTilingTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.dir = Path(self._tmp.name)
+
+    def _tile(self, features, **kwargs):
+        source = self.dir / "layer.geojson"
+        source.write_text(
+            json.dumps({"type": "FeatureCollection", "name": "layer", "features": features}), encoding="utf-8"
+        )
+        output = self.dir / "layer.pmtiles"
+        kwargs.setdefault("high_fidelity", True)
+        self.assertTrue(generate_pmtiles_native(source, output, min_zoom=ZOOM, max_zoom=ZOOM, **kwargs))
+        with open(output, "rb") as f:
+            reader = Reader(MmapSource(f))
+            metadata = reader.metadata()
+            tiles = {zxy: decode_tile(data)["layer"] for zxy, data in all_tiles(reader.get_bytes)}
+        return tiles, metadata
+
+    def test_geometry_and_winding(self):
+        exterior = [_at(0.1, 0.1), _at(0.1, 0.9), _at(0.9, 0.9), _at(0.9, 0.1)]
+        hole = [_at(0.4, 0.4), _at(0.6, 0.4), _at(0.6, 0.6), _at(0.4, 0.6)]
+        features = [
+            # Winding deliberately wrong for MVT on both rings
+            {"type": "Feature", "id": 1, "properties": {},
+             "geometry": {"type": "Polygon", "coordinates": [exterior[::-1] + exterior[-1:], hole + hole[:1]]}},
+            {"type": "Feature", "id": 2, "properties": {},
+             "geometry": {"type": "LineString", "coordinates": [_at(0.2, 0.2), _at(0.3, 0.25)]}},
+            {"type": "Feature", "id": 3, "properties": {},
+             "geometry": {"type": "Point", "coordinates": _at(0.5, 0.5)}},
+        ]
+        tiles, _ = self._tile(features)
+
+        self.assertEqual(list(tiles), [(ZOOM, TX, TY)])
+        layer = tiles[(ZOOM, TX, TY)]
+        self.assertEqual(layer["extent"], EXTENT)
+        by_id = {f["id"]: f for f in layer["features"]}
+
+        polygon = by_id[1]
+        self.assertEqual(polygon["type"], POLYGON)
+        outer, inner = polygon["paths"]
+        self.assertEqual(
+            sorted(outer), sorted(_tile_coords(x, y) for x, y in [(0.1, 0.1), (0.1, 0.9), (0.9, 0.9), (0.9, 0.1)])
+        )
+        self.assertEqual(
+            sorted(inner), sorted(_tile_coords(x, y) for x, y in [(0.4, 0.4), (0.6, 0.4), (0.6, 0.6), (0.4, 0.6)])
+        )
+        self.assertGreater(_area(outer), 0)
+        self.assertLess(_area(inner), 0)
+
+        self.assertEqual(by_id[2]["type"], LINESTRING)
+        self.assertEqual(by_id[2]["paths"], [[_tile_coords(0.2, 0.2), _tile_coords(0.3, 0.25)]])
+        self.assertEqual(by_id[3]["type"], POINT)
+        self.assertEqual(by_id[3]["paths"], [[_tile_coords(0.5, 0.5)]])
+
+    def test_clipped_at_tile_buffer(self):
+        # Spans the tile and its right/bottom neighbours
+        square = [_at(0.5, 0.5), _at(1.5, 0.5), _at(1.5, 1.5), _at(0.5, 1.5), _at(0.5, 0.5)]
+        line = [_at(0.25, 0.75), _at(1.75, 0.75)]
+        tiles, _ = self._tile([
+            {"type": "Feature", "id": 1, "properties": {}, "geometry": {"type": "Polygon", "coordinates": [square]}},
+            {"type": "Feature", "id": 2, "properties": {}, "geometry": {"type": "LineString", "coordinates": line}},
+        ])
+
+        self.assertEqual(
+            set(tiles), {(ZOOM, TX, TY), (ZOOM, TX + 1, TY), (ZOOM, TX, TY + 1), (ZOOM, TX + 1, TY + 1)}
+        )
+        by_id = {f["id"]: f for f in tiles[(ZOOM, TX, TY)]["features"]}
+        (ring,) = by_id[1]["paths"]
+        xs, ys = [p[0] for p in ring], [p[1] for p in ring]
+        self.assertEqual((max(xs), max(ys)), (EXTENT + BUFFER, EXTENT + BUFFER))
+        self.assertEqual((min(xs), min(ys)), _tile_coords(0.5, 0.5))
+        self.assertGreater(_area(ring), 0)
+
+        ((start, end),) = by_id[2]["paths"]
+        self.assertEqual(start, _tile_coords(0.25, 0.75))
+        self.assertEqual(end[0], EXTENT + BUFFER)
+
+        # The neighbour sees the same line from its left buffer edge
+        ((start, end),) = [f for f in tiles[(ZOOM, TX + 1, TY)]["features"] if f["id"] == 2][0]["paths"]
+        self.assertEqual(start[0], -BUFFER)
+
+    def test_ids_and_properties_survive(self):
+        properties = {"name": "שכונה", "area": 12.5, "floors": 3, "delta": -2, "public": True,
+                      "tags": ["a", "b"], "missing": None}
+        tiles, metadata = self._tile([
+            {"type": "Feature", "id": 2 ** 40, "properties": properties,
+             "geometry": {"type": "Point", "coordinates": _at(0.5, 0.5)}},
+            {"type": "Feature", "id": "not-an-int", "properties": {"name": "other"},
+             "geometry": {"type": "Point", "coordinates": _at(0.25, 0.5)}},
+        ])
+
+        first, second = tiles[(ZOOM, TX, TY)]["features"]
+        self.assertEqual(first["id"], 2 ** 40)
+        self.assertEqual(
+            first["properties"],
+            {"name": "שכונה", "area": 12.5, "floors": 3, "delta": -2, "public": True, "tags": '["a","b"]'},
+        )
+        self.assertIsNone(second["id"])
+        self.assertEqual(second["properties"], {"name": "other"})
+        (layer,) = metadata["vector_layers"]
+        self.assertEqual(
+            layer["fields"],
+            {"name": "String", "area": "Number", "floors": "Number", "delta": "Number", "public": "Boolean",
+             "tags": "String"},
+        )
+
+    def test_shared_borders_simplify_identically(self):
+        rng = np.random.default_rng(0)
+        # A wiggly border between two neighbours, drawn in opposite directions by each
+        border = [(0.5 + float(dx), fy) for dx, fy in zip(rng.normal(0, 0.0006, 200), np.linspace(0.2, 0.8, 200))]
+        # The left polygon's edge runs straight on past both ends of the border
+        left = [(0.2, 0.1), (0.5, 0.1)] + border + [(0.5, 0.9), (0.2, 0.9)]
+        right = [(0.8, 0.8)] + border[::-1] + [(0.8, 0.2)]
+        features = [
+            {"type": "Feature", "id": i, "properties": {},
+             "geometry": {"type": "Polygon", "coordinates": [[_at(*p) for p in ring + ring[:1]]]}}
+            for i, ring in enumerate((left, right))
+        ]
+        tiles, _ = self._tile(features, high_fidelity=False)
+
+        by_id = {f["id"]: f for f in tiles[(ZOOM, TX, TY)]["features"]}
+        (left_ring,), (right_ring,) = by_id[0]["paths"], by_id[1]["paths"]
+        (x0, y0), (x1, y1) = _tile_coords(0.4, 0.2), _tile_coords(0.6, 0.8)
+
+        def border_vertices(ring):
+            return {(x, y) for x, y in ring if x0 <= x <= x1 and y0 <= y <= y1}
+
+        # Simplification did drop border vertices...
+        self.assertLess(len(border_vertices(left_ring)), len(border))
+        self.assertGreater(len(border_vertices(left_ring)), 2)
+        # ...the same ones on both sides
+        self.assertEqual(border_vertices(left_ring), border_vertices(right_ring))
+
+    def test_streams_feature_collection_members(self):
+        collection = {
+            "type": "FeatureCollection",
+            "name": "layer",
+            "crs": {"type": "name", "properties": {"name": "urn:ogc:def:crs:OGC:1.3:CRS84"}},
+            "bbox": [34.1, 31.5, 35.25, 32.75],
+            "features": [
+                {"type": "Feature", "id": i, "properties": {"name": f"שם {i}", "value": i * 1.5},
+                 "geometry": {"type": "Point", "coordinates": [34.8 + i / 1000, 32.1]}}
+                for i in range(50)
+            ],
+            "trailing": 12345,
+        }
+        path = self.dir / "collection.geojson"
+        path.write_text(json.dumps(collection, indent=2, ensure_ascii=False), encoding="utf-8")
+
+        self.assertEqual(list(_iter_geojson_features(path, chunk_size=7)), collection["features"])
+
+
+if __name__ == "__main__":
+    unittest.main()
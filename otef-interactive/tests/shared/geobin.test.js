@@ -0,0 +1,50 @@
+import { describe, expect, test } from "vitest";
+import { decodeGeoBin, isGeoBinResponse } from "../../frontend/src/shared/geobin.js";
+
+// backend.geobin.encode() output for the FeatureCollection below
+const PAYLOAD_B64 =
+  "TkdCMdwAAAB7InZlcnNpb24iOjEsImNvdW50cyI6eyJmZWF0dXJlcyI6NCwicGFydHMiOjQsInJpbmdzIjo0LCJjb29yZHMiOjl9LCJjb29yZF90eXBlIjoiaW50MzIiLCJvcmlnaW4iOlszNC4wLDMwLjBdLCJzY2FsZSI6MTAwMDAwMDAsInByb3BlcnRpZXMiOlt7Im5hbWUiOiJwaW4ifSx7ImsiOjF9LHt9LHt9XSwibWVtYmVycyI6eyJuYW1lIjoidCJ9LCJpZHMiOlszLG51bGwsbnVsbCxudWxsXX0gAQMFAAAAAAABAAAAAgAAAAQAAAAEAAAAAAAAAAEAAAACAAAAAwAAAAQAAAAAAAAAAQAAAAUAAAAHAAAACQAAAAASegAgvL4AAO6F/+BDQf9AQg8AAAAAAAAAAABAQg8AwL3w/8C98P8AEnoAABu3ACChBwAgoQcAIKEHACChBwAgoQcAIKEHAA==";
+
+function payloadBuffer() {
+  const bytes = Uint8Array.from(atob(PAYLOAD_B64), (c) => c.charCodeAt(0));
+  return bytes.buffer;
+}
+
+describe("decodeGeoBin", () => {
+  test("restores features, ids, properties and collection members", () => {
+    const fc = decodeGeoBin(payloadBuffer());
+    expect(fc.type).toBe("FeatureCollection");
+    expect(fc.name).toBe("t");
+    expect(fc.features).toHaveLength(4);
+
+    const [point, polygon, lines, empty] = fc.features;
+    expect(point.id).toBe(3);
+    expect(point.properties).toEqual({ name: "pin" });
+    expect(point.geometry.type).toBe("Point");
+    expect(point.geometry.coordinates[0]).toBeCloseTo(34.8, 6);
+    expect(point.geometry.coordinates[1]).toBeCloseTo(31.25, 6);
+
+    expect(polygon.geometry.type).toBe("Polygon");
+    expect(polygon.geometry.coordinates[0]).toHaveLength(4);
+    expect(polygon.geometry.coordinates[0][0]).toEqual(polygon.geometry.coordinates[0][3]);
+
+    expect(lines.geometry.type).toBe("MultiLineString");
+    expect(lines.geometry.coordinates.map((l) => l.length)).toEqual([2, 2]);
+    expect(lines.geometry.coordinates[1][1][0]).toBeCloseTo(34.95, 6);
+
+    expect(empty.geometry).toBeNull();
+  });
+
+  test("rejects other payloads", () => {
+    expect(() => decodeGeoBin(new TextEncoder().encode('{"type":"x"}').buffer)).toThrow();
+  });
+});
+
+describe("isGeoBinResponse", () => {
+  test("matches the media type regardless of parameters", () => {
+    const res = (type) => ({ headers: { get: () => type } });
+    expect(isGeoBinResponse(res("application/vnd.nur.geobin"))).toBe(true);
+    expect(isGeoBinResponse(res("application/json"))).toBe(false);
+    expect(isGeoBinResponse(res(null))).toBe(false);
+  });
+});